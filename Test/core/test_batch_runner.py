@@ -0,0 +1,103 @@
+"""
+Test script for the concurrent batch runner: streaming JSONL output,
+resumable runs and bounded concurrency
+No network or API keys required
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from batch_runner import run_batch
+
+
+def _write_queries(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": f"q{i}", "query": f"query {i}"}) + "\n")
+        f.write("not json\n")
+        f.write(json.dumps({"query": "no id given"}) + "\n")
+
+
+def test_batch_streams_and_resumes():
+    """结果逐条写入；续跑只处理失败和未完成的查询"""
+    print("=" * 60)
+    print("Testing streaming output and resume")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "queries.jsonl"
+        output = Path(tmp) / "out" / "results.jsonl"
+        _write_queries(source, 10)
+
+        def flaky(item):
+            if item["id"] == "q3":
+                raise RuntimeError("transient failure")
+            # 流水线结果里的 id / status 不应覆盖 runner 的记录字段
+            return {"id": "upstream-id", "status": "done", "query": item["query"],
+                    "tool_result": {"success": True, "result": "x" * 100}, "final_answer": "ok"}
+
+        summary = run_batch(str(source), str(output), flaky, workers=3, drop_payloads=True)
+        assert summary["ok"] == 10 and summary["error"] == 1, summary
+
+        records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+        assert len(records) == 11
+        assert all("result" not in r.get("tool_result", {}) for r in records)
+        assert sorted(r["status"] for r in records) == ["error"] + ["ok"] * 10
+        assert "upstream-id" not in {r["id"] for r in records}
+        print(f"✅ First run: {summary['ok']} ok, {summary['error']} error")
+
+        calls = []
+
+        def recovered(item):
+            calls.append(item["id"])
+            return {"query": item["query"], "final_answer": "ok"}
+
+        summary = run_batch(str(source), str(output), recovered, workers=3)
+        assert calls == ["q3"], calls
+        assert summary["skipped"] == 10 and summary["ok"] == 1, summary
+        print(f"✅ Resumed run only retried {calls}")
+
+
+def test_bounded_concurrency():
+    """同时运行的任务数不超过 worker 数"""
+    print("\n" + "=" * 60)
+    print("Testing bounded worker pool")
+    print("=" * 60)
+
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def slow(item):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.05)
+        with lock:
+            state["running"] -= 1
+        return {"query": item["query"]}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "queries.jsonl"
+        _write_queries(source, 20)
+        summary = run_batch(str(source), str(Path(tmp) / "results.jsonl"), slow, workers=4)
+
+    assert state["peak"] <= 4, state
+    assert summary["processed"] == 21
+    print(f"✅ Peak concurrency {state['peak']}, throughput {summary['throughput_qps']:.1f} q/s")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Batch Runner Test\n")
+
+    test_batch_streams_and_resumes()
+    test_bounded_concurrency()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,54 @@
+"""
+Smoke test for the offline benchmark harness
+No network or API keys required
+"""
+
+import os
+import sys
+
+# 添加项目根目录和 bench 到路径
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from run_benchmark import run_benchmark
+
+
+def test_single_mode():
+    """单工具模式：全部查询成功，重复查询命中缓存"""
+    print("=" * 60)
+    print("Testing offline benchmark (single mode)")
+    print("=" * 60)
+
+    result = run_benchmark([1, 2], num_queries=16, llm_latency_ms=1, token_latency_ms=0, api_latency_ms=1)
+    assert [level["concurrency"] for level in result["levels"]] == [1, 2]
+    for level in result["levels"]:
+        assert level["errors"] == 0 and level["tool_failures"] == 0, level
+        assert level["throughput_qps"] > 0
+        assert {"selection", "tool", "final_answer"} <= set(level["stages_ms"])
+        # 12 个不同查询跑 16 次，至少 4 次命中缓存
+        assert level["tool_cache_hit_ratio"] >= 0.25, level["tool_cache_hit_ratio"]
+    assert result["meta"]["params"]["queries"] == 16
+    print("✅ Single mode benchmark ran cleanly")
+
+
+def test_plan_mode():
+    """规划模式：三个并行步骤全部成功"""
+    print("\n" + "=" * 60)
+    print("Testing offline benchmark (plan mode)")
+    print("=" * 60)
+
+    result = run_benchmark([2], num_queries=4, mode="plan", llm_latency_ms=1, token_latency_ms=0, api_latency_ms=1)
+    level = result["levels"][0]
+    assert level["errors"] == 0 and level["tool_failures"] == 0, level
+    assert "plan_execution" in level["stages_ms"]
+    print("✅ Plan mode benchmark ran cleanly")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Offline Benchmark Smoke Test\n")
+
+    test_single_mode()
+    test_plan_mode()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,156 @@
+"""
+Test script for the HTTP record/replay cassette layer of APIExecutor
+No network or API keys required (uses a local HTTP server)
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from executors import APIExecutor
+from executors.cassette import Cassette
+
+
+# 不是合法 UTF-8 的响应体（如图片、压缩数据）
+BINARY_BODY = bytes(range(256)) * 4
+# 未声明 charset 的 text/plain：requests 按 ISO-8859-1 解码
+PLAIN_BODY = "温度 25°C".encode("utf-8")
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """返回请求路径；/missing 返回 404；/binary、/plain 返回二进制和无 charset 的文本响应体"""
+
+    calls = 0
+
+    def do_GET(self):
+        EchoHandler.calls += 1
+        for prefix, content_type, raw in (("/binary", "application/octet-stream", BINARY_BODY),
+                                          ("/plain", "text/plain", PLAIN_BODY)):
+            if self.path.startswith(prefix):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+                return
+        status = 404 if self.path.startswith("/missing") else 200
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Upstream", "echo")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _config(port, path="echo"):
+    return {
+        "name": "local_echo",
+        "endpoint": f"http://127.0.0.1:{port}/{path}/{{item}}",
+        "method": "GET",
+        "headers": {"x-api-key": "secret-key"},
+        "params": {"item": {"type": "string", "required": True}, "units": {"type": "string", "default": "metric"}},
+    }
+
+
+def test_record_then_replay_offline():
+    """录制后关闭上游，回放仍返回相同的状态码、响应头和响应体"""
+    print("=" * 60)
+    print("Testing record and replay")
+    print("=" * 60)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cassettes = os.path.join(tmp, "cassettes")
+        try:
+            recorder = APIExecutor(os.path.join(tmp, "api1"), cassette=Cassette("record", cassettes))
+            recorded = recorder.execute(_config(port), {"item": "a"})
+            missing = recorder.execute(_config(port, "missing"), {"item": "b"})
+            binary_url = f"http://127.0.0.1:{port}/binary"
+            plain_url = f"http://127.0.0.1:{port}/plain"
+            recorder.cassette.request("GET", binary_url, {}, {}, timeout=5)
+            plain = recorder.cassette.request("GET", plain_url, {}, {}, timeout=5)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert recorded["success"] and recorded["result"] == {"path": "/echo/a?units=metric"}, recorded
+        assert not missing["success"] and "404" in missing["error"], missing
+        calls = EchoHandler.calls
+
+        # 凭证不会写入 cassette
+        for name in os.listdir(cassettes):
+            with open(os.path.join(cassettes, name), "rb") as f:
+                assert b"secret-key" not in f.read()
+
+        # 上游已关闭：回放（新的执行器缓存目录，确保不是命中 API 缓存）
+        replay = Cassette("replay", cassettes, latency_ms=20)
+        player = APIExecutor(os.path.join(tmp, "api2"), cassette=replay)
+        start = time.perf_counter()
+        replayed = player.execute(_config(port), {"item": "a"})
+        elapsed = time.perf_counter() - start
+        assert replayed["success"] and replayed["result"] == recorded["result"], replayed
+        assert elapsed >= 0.02, elapsed
+
+        replayed_404 = player.execute(_config(port, "missing"), {"item": "b"})
+        assert not replayed_404["success"] and "404" in replayed_404["error"], replayed_404
+
+        interaction = replay.lookup("GET", f"http://127.0.0.1:{port}/echo/a", {"units": "metric"})
+        assert interaction["status"] == 200 and interaction["headers"]["X-Upstream"] == "echo"
+        assert EchoHandler.calls == calls
+        print(f"✅ Replayed {len(os.listdir(cassettes))} interactions offline")
+
+        assert replay.lookup("GET", binary_url, {})["body_encoding"] == "base64"
+        assert replay.request("GET", binary_url, {}, {}, timeout=5).content == BINARY_BODY
+        assert interaction["body_encoding"] == "utf-8"
+        print("✅ Binary response body stored as base64 and replayed byte for byte")
+
+        replayed_plain = replay.request("GET", plain_url, {}, {}, timeout=5)
+        assert replay.lookup("GET", plain_url, {})["body_encoding"] == "ISO-8859-1"
+        assert replayed_plain.content == PLAIN_BODY and replayed_plain.text == plain.text
+        assert replayed_plain.headers["Content-Length"] == str(len(replayed_plain.content))
+        print("✅ Text body replayed with the codec it was recorded with")
+
+
+def test_replay_miss_and_env_selection():
+    """未录制的请求在回放模式下报错；模式由环境变量选择"""
+    print("\n" + "=" * 60)
+    print("Testing replay miss and environment selection")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({"URBAN_HTTP_MODE": "replay", "URBAN_CASSETTE_DIR": tmp, "URBAN_REPLAY_LATENCY_MS": "5"})
+        try:
+            cassette = Cassette.from_env()
+        finally:
+            for name in ("URBAN_HTTP_MODE", "URBAN_CASSETTE_DIR", "URBAN_REPLAY_LATENCY_MS"):
+                os.environ.pop(name)
+        assert (cassette.mode, cassette.latency_ms) == ("replay", 5.0)
+
+        executor = APIExecutor(os.path.join(tmp, "api"), cassette=cassette)
+        result = executor.execute(_config(9), {"item": "never-recorded"})
+        assert not result["success"] and "No recorded response" in result["error"], result
+        assert Cassette.from_env().mode == "off"
+        print("✅ Missing interactions fail without touching the network")
+
+
+if __name__ == "__main__":
+    print("\n🧪 HTTP Cassette Test\n")
+
+    test_record_then_replay_offline()
+    test_replay_miss_and_env_selection()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,190 @@
+"""
+Test script for converting code repositories into tools (code_repos, cached per commit)
+Uses local bare git repositories (file:// URLs), no network required
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from executors.code_converter import convert_module
+from executors.code_executor import CodeExecutor
+from tool_manager import UrbanToolManager
+
+PLANNER = '''
+from typing import List, Optional
+
+
+def shortest_path(origin: str, destination: str, max_transfers: int = 2, avoid: Optional[List[str]] = None):
+    """Shortest transit path between two stops.
+
+    Uses the bundled timetable.
+
+    Args:
+        origin: Origin stop id
+        destination: Destination stop id
+        max_transfers: Maximum number of transfers
+    """
+    return {"path": [origin, destination], "transfers": min(max_transfers, 1)}
+
+
+def _helper():
+    """Not a tool"""
+
+
+def undocumented(x):
+    return x
+'''
+
+STATS = '''
+def density(population: float, area_km2: float) -> float:
+    """Population density (people per km2)."""
+    return round(population / area_km2, 1)
+'''
+
+
+def git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def make_origin(root: Path, files: dict):
+    """本地裸仓库 + 工作区，返回 (url, commit 函数)"""
+    bare, work = root / "origin.git", root / "work"
+    git("init", "--quiet", "--bare", "--initial-branch=main", str(bare))
+    git("clone", "--quiet", str(bare), str(work))
+    for key, value in (("user.name", "test"), ("user.email", "test@example.com")):
+        git("config", key, value, cwd=work)
+
+    def commit(changes: dict) -> str:
+        for name, content in changes.items():
+            (work / name).parent.mkdir(parents=True, exist_ok=True)
+            (work / name).write_text(content)
+        git("add", "-A", cwd=work)
+        git("commit", "--quiet", "-m", "update", cwd=work)
+        git("push", "--quiet", "origin", "HEAD:main", cwd=work)
+        return git("rev-parse", "HEAD", cwd=work)
+
+    commit(files)
+    return bare.resolve().as_uri(), commit
+
+
+def test_convert_module():
+    """签名和文档字符串转换为工具 schema"""
+    print("=" * 60)
+    print("Testing module conversion")
+    print("=" * 60)
+
+    tools = convert_module("transit.planner", PLANNER)
+    assert [tool["entry"] for tool in tools] == ["transit.planner:shortest_path"]
+    tool = tools[0]
+    assert tool["description"] == "Shortest transit path between two stops."
+    assert tool["params"]["origin"] == {"type": "string", "required": True, "description": "Origin stop id"}
+    assert tool["params"]["max_transfers"] == {"type": "integer", "required": False,
+                                               "description": "Maximum number of transfers", "default": 2}
+    assert tool["params"]["avoid"]["type"] == "array" and not tool["params"]["avoid"]["required"]
+    assert convert_module("broken", "def oops(:\n") == []
+    print("✅ Public documented functions become tools; private, undocumented and broken code skipped")
+
+
+def test_incremental_conversion():
+    """按提交缓存转换结果，新提交只转换变化的模块"""
+    print("=" * 60)
+    print("Testing cached, incremental conversion")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url, commit = make_origin(Path(tmp), {"src/transit/__init__.py": "", "src/transit/planner.py": PLANNER,
+                                              "src/stats.py": STATS, "src/tests/test_stats.py": STATS})
+        executor = CodeExecutor(os.path.join(tmp, "code"), ref_ttl=0)
+        spec = {"repo": url, "ref": "main", "path": "src", "prefix": "urban_", "timeout": 10}
+        try:
+            tools = {config["name"]: config for config in executor.discover(spec)}
+            assert sorted(tools) == ["urban_density", "urban_shortest_path"]
+            assert tools["urban_density"]["entry"] == "stats:density" and tools["urban_density"]["timeout"] == 10
+            assert "prefix" not in tools["urban_density"] and len(tools["urban_density"]["ref"]) == 40
+            assert executor.conversions.stats["converted"] == 3
+            print("✅ Repository converted into tools pinned to the commit")
+
+            result = executor.execute(tools["urban_density"], {"population": 21500000, "area_km2": 16410})
+            assert result == {"success": True, "result": 1310.2, "error": None}
+            print("✅ Converted tool callable through the worker pool")
+
+            executor.discover(spec)
+            assert executor.conversions.stats["converted"] == 3 and executor.repos.stats["checkouts"] == 1
+            print("✅ Same commit served from the conversion cache")
+
+            commit({"src/stats.py": STATS + STATS.replace("density", "ratio")})
+            tools = {config["name"]: config for config in executor.discover(spec)}
+            assert "urban_ratio" in tools
+            assert executor.conversions.stats["converted"] == 4 and executor.conversions.stats["reused"] == 2
+            print("✅ New commit reconverted only the changed module")
+
+            restarted = CodeExecutor(os.path.join(tmp, "code"))
+            dead = dict(spec, repo=Path(tmp, "gone.git").as_uri())
+            assert restarted.discover(dead) == []
+            assert len(restarted.discover(spec, background=True)) == 3
+            while restarted._converting:
+                time.sleep(0.05)
+            print("✅ Background mode returns the last conversion immediately")
+        finally:
+            executor.close()
+
+
+def test_background_registration():
+    """工具池加载不等待转换，转换完成后工具自动加入"""
+    print("=" * 60)
+    print("Testing background registration in the tool pool")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url, _ = make_origin(Path(tmp), {"stats.py": STATS})
+        config = os.path.join(tmp, "tools.json")
+        with open(config, "w") as f:
+            json.dump({
+                "code_repos": [{"repo": url, "ref": "main", "prefix": "city_"}],
+                "api_tools": [{"name": "weather", "description": "Weather", "endpoint": "http://127.0.0.1:9/x"}],
+            }, f)
+
+        manager = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+        try:
+            assert [tool["name"] for tool in manager.list_tools()] == ["weather"]
+            deadline = time.time() + 30
+            while manager.snapshot().get_config("city_density") is None and time.time() < deadline:
+                time.sleep(0.05)
+            assert manager.snapshot().get_config("city_density") is not None
+            print("✅ Tool pool loaded immediately; converted tools registered when ready")
+
+            result = manager.get_tool_by_name("city_density").invoke({"population": 100, "area_km2": 8})
+            assert result == {"success": True, "result": 12.5, "error": None}
+            assert "city_density" in manager.get_tools_description()
+        finally:
+            while manager.code_executor._converting:
+                time.sleep(0.05)
+            manager.code_executor.close()
+
+        restarted = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+        try:
+            assert [tool["name"] for tool in restarted.list_tools()] == ["weather", "city_density"]
+            print("✅ Restart registers converted tools from cache")
+        finally:
+            # 等待后台的新提交检查结束
+            while restarted.code_executor._converting:
+                time.sleep(0.05)
+            restarted.code_executor.close()
+
+
+if __name__ == "__main__":
+    print("\n🧪 Code Conversion Test\n")
+
+    test_convert_module()
+    test_incremental_conversion()
+    test_background_registration()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,166 @@
+"""
+Test script for code tool resource limits (CPU seconds, address space, wall-clock timeout, output size)
+Uses a temporary module directory and a local bare git repository, no network required
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import tracing
+from executors.code_executor import CodeExecutor
+from executors.code_pool import WorkerError, WorkerPool
+
+HEAVY_MODULE = '''
+import os
+import time
+
+
+def spin(seconds):
+    """Burn CPU for the given wall time"""
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+    return os.getpid()
+
+
+def alloc(mb):
+    return len(bytearray(mb * 1024 * 1024))
+
+
+def text(size):
+    return "x" * size
+
+
+def raw(size):
+    os.write(1, b"x" * size)
+    return "unreachable"
+'''
+
+
+def _pool(tmp, entry, **limits) -> WorkerPool:
+    Path(tmp, "heavy.py").write_text(HEAVY_MODULE)
+    return WorkerPool(Path(tmp), f"heavy:{entry}", size=1, limits=limits)
+
+
+def _error(call) -> WorkerError:
+    try:
+        call()
+    except WorkerError as e:
+        return e
+    raise AssertionError("expected WorkerError")
+
+
+def test_cpu_limit():
+    """CPU 限制按单次调用计算，超出时进程被结束"""
+    print("=" * 60)
+    print("Testing CPU limit")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = _pool(tmp, "spin", cpu_seconds=1)
+        try:
+            pids = {pool.call({"seconds": 0.6}, timeout=10)["result"] for _ in range(4)}
+            assert len(pids) == 1
+            print("✅ 4 calls of 0.6 CPU seconds each pass a 1s per-call limit on one worker")
+
+            start = time.perf_counter()
+            error = _error(lambda: pool.call({"seconds": 30}, timeout=20))
+            assert error.limit == "cpu" and "CPU limit of 1s" in str(error), error
+            assert time.perf_counter() - start < 5 and pool.workers == 0
+            assert pool.call({"seconds": 0}, timeout=10)["result"] not in pids
+            print("✅ Runaway call killed by SIGXCPU, next call gets a fresh worker")
+        finally:
+            pool.close()
+
+
+def test_memory_and_output_limits():
+    """地址空间和输出大小限制"""
+    print("=" * 60)
+    print("Testing memory and output limits")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = _pool(tmp, "alloc", memory_mb=400)
+        try:
+            response = pool.call({"mb": 1024})
+            assert response["limit"] == "memory" and "400 MB" in response["error"]
+            assert pool.stats["recycled"] == 1
+            assert pool.call({"mb": 10}) == {"result": 10 * 1024 * 1024}
+            print("✅ Allocation beyond the address-space limit fails; worker recycled")
+        finally:
+            pool.close()
+
+        pool = _pool(tmp, "text", max_output_bytes=1000)
+        try:
+            response = pool.call({"size": 5000})
+            assert response["limit"] == "output" and "exceeds the limit of 1000 bytes" in response["error"]
+            assert pool.call({"size": 10}) == {"result": "x" * 10} and pool.stats["started"] == 1
+            print("✅ Oversized result replaced by an error, worker kept")
+        finally:
+            pool.close()
+
+        pool = _pool(tmp, "raw", max_output_bytes=1000)
+        try:
+            error = _error(lambda: pool.call({"size": 100000}))
+            assert error.limit == "output" and pool.workers == 0
+            print("✅ Output written around the protocol cut off in the parent")
+        finally:
+            pool.close()
+
+
+def test_executor_envelope():
+    """CodeExecutor 在标准结果中报告超出的限制"""
+    print("=" * 60)
+    print("Testing limit reporting in CodeExecutor")
+    print("=" * 60)
+
+    tracing.metrics.reset()
+    with tempfile.TemporaryDirectory() as tmp:
+        work, bare = Path(tmp, "work"), Path(tmp, "origin.git")
+        work.mkdir()
+        (work / "heavy.py").write_text(HEAVY_MODULE)
+        for args in (["init", "--quiet"], ["add", "-A"],
+                     ["-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "--quiet", "-m", "x"],
+                     ["clone", "--quiet", "--bare", str(work), str(bare)]):
+            subprocess.run(["git", *args], cwd=work, check=True, capture_output=True)
+
+        executor = CodeExecutor(os.path.join(tmp, "code"), limits={"cpu_seconds": 1, "max_output_bytes": 1000})
+        base = {"description": "heavy", "repo": bare.as_uri()}
+        try:
+            spin = dict(base, name="spin", entry="heavy:spin", limits={"timeout": 0.5})
+            result = executor.execute(spin, {"seconds": 3})
+            assert not result["success"] and result["limit_exceeded"] == "timeout"
+
+            text = dict(base, name="text", entry="heavy:text")
+            assert executor.execute(text, {"size": 10})["result"] == "x" * 10
+            result = executor.execute(text, {"size": 5000})
+            assert result["limit_exceeded"] == "output" and "1000 bytes" in result["error"]
+
+            loose = dict(text, limits={"max_output_bytes": 100000})
+            assert executor.execute(loose, {"size": 5000})["success"]
+            assert executor.pools["text"].limits == {"cpu_seconds": 1, "max_output_bytes": 100000}
+            print("✅ Limits reported as limit_exceeded; tool limits override executor defaults")
+        finally:
+            executor.close()
+
+    text = tracing.metrics.to_prometheus()
+    assert 'urban_code_limit_exceeded_total{limit="timeout",tool="spin"} 1' in text
+    assert 'urban_code_limit_exceeded_total{limit="output",tool="text"} 1' in text
+    print("✅ Limit metrics recorded")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Code Tool Limits Test\n")
+
+    test_cpu_limit()
+    test_memory_and_output_limits()
+    test_executor_envelope()
+
+    print("\n🎉 All tests passed!\n")
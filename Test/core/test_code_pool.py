@@ -0,0 +1,169 @@
+"""
+Test script for the warm worker-process pool used by code tools
+Uses a temporary module directory, no network or git required
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from executors.code_pool import WorkerError, WorkerPool
+
+SLOW_MODULE = '''
+import os
+import time
+
+time.sleep(0.5)  # 模拟较重的导入（大型依赖、模型加载）
+IMPORTED = time.time()
+_held = []
+
+
+def whoami(delay=0):
+    time.sleep(delay)
+    print("noise on stdout")
+    return {"pid": os.getpid(), "imported": IMPORTED}
+
+
+def hog(mb):
+    _held.append(bytearray(mb * 1024 * 1024))
+    return len(_held)
+
+
+def hang():
+    time.sleep(60)
+
+
+def die():
+    os._exit(3)
+
+
+def fail():
+    raise KeyError("missing station")
+'''
+
+
+def _pool(tmp, **options) -> WorkerPool:
+    Path(tmp, "slowtool.py").write_text(SLOW_MODULE)
+    return WorkerPool(Path(tmp), "slowtool:whoami", **options)
+
+
+def test_warm_calls():
+    """入口模块只导入一次，预热后的调用为毫秒级"""
+    print("=" * 60)
+    print("Testing warm worker calls")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = _pool(tmp, size=2)
+        try:
+            start = time.perf_counter()
+            pool.start()
+            assert pool.workers == 2 and pool.stats["started"] == 2
+            startup = time.perf_counter() - start
+            assert startup < 1.5, startup  # 两个进程并行导入
+            print(f"✅ 2 workers imported the module in parallel ({startup:.2f}s)")
+
+            start = time.perf_counter()
+            results = [pool.call({}) for _ in range(20)]
+            per_call = (time.perf_counter() - start) / 20
+            assert per_call < 0.05, per_call
+            assert {r["result"]["pid"] for r in results} <= set(pool.idle_pids)
+            assert len({r["result"]["imported"] for r in results}) <= 2
+            print(f"✅ 20 warm calls, {per_call * 1000:.1f} ms each, stdout noise ignored")
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(lambda _: pool.call({"delay": 0.1}), range(4)))
+            assert len({r["result"]["pid"] for r in results}) == 2 and pool.stats["started"] == 2
+            print("✅ Concurrent calls wait for one of the 2 workers")
+        finally:
+            pool.close()
+
+
+def test_recycling():
+    """按调用次数和内存回收进程"""
+    print("=" * 60)
+    print("Testing worker recycling")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = _pool(tmp, size=1, max_calls=3)
+        try:
+            pids = [pool.call({})["result"]["pid"] for _ in range(6)]
+            assert len(set(pids[:3])) == 1 and len(set(pids[3:])) == 1 and pids[0] != pids[3]
+            assert pool.stats["recycled"] == 2
+            print("✅ Worker replaced after max_calls")
+        finally:
+            pool.close()
+
+        pool = WorkerPool(Path(tmp), "slowtool:hog", size=1, max_memory_mb=200)
+        try:
+            pool.call({"mb": 1})
+            assert pool.stats["recycled"] == 0
+            pool.call({"mb": 250})
+            assert pool.stats["recycled"] == 1
+            assert pool.call({"mb": 1}) == {"result": 1}  # 新进程
+            print("✅ Worker replaced after exceeding max_memory_mb")
+        finally:
+            pool.close()
+
+
+def test_failures():
+    """工具异常、超时、崩溃和导入失败"""
+    print("=" * 60)
+    print("Testing worker failures")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _pool(tmp)
+        for entry, check in (("slowtool:fail", "KeyError"), ("slowtool:hang", "timed out"),
+                             ("slowtool:die", "exited with code 3")):
+            pool = WorkerPool(Path(tmp), entry, size=1)
+            try:
+                try:
+                    response = pool.call({}, timeout=1)
+                except WorkerError as e:
+                    response = {"error": str(e)}
+                assert check in response["error"], response
+                assert pool.workers == (1 if check == "KeyError" else 0)
+            finally:
+                pool.close()
+        print("✅ Exceptions returned; hung and crashed workers removed")
+
+        pool = _pool(tmp, size=1)
+        try:
+            assert "timed out" in _error(lambda: pool.call({"delay": 5}, timeout=0.8))
+            assert pool.call({})["result"]["pid"]
+            assert pool.stats["timeouts"] == 1 and pool.stats["started"] == 2
+            print("✅ Next call after a timeout gets a fresh worker")
+        finally:
+            pool.close()
+
+        for entry in ("missing_module:run", "slowtool:missing"):
+            pool = WorkerPool(Path(tmp), entry, size=1)
+            assert "failed to load entry" in _error(lambda: pool.call({})) and pool.workers == 0
+            pool.close()
+        print("✅ Import errors reported")
+
+
+def _error(call) -> str:
+    try:
+        call()
+    except WorkerError as e:
+        return str(e)
+    raise AssertionError("expected WorkerError")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Code Worker Pool Test\n")
+
+    test_warm_calls()
+    test_recycling()
+    test_failures()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,114 @@
+"""
+Test script for the lazy, pluggable executor registry
+No network or API keys required
+"""
+
+import os
+import sys
+import json
+import tempfile
+import textwrap
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from tool_manager import UrbanToolManager
+
+PLUGIN = textwrap.dedent('''
+    class EchoExecutor:
+        def __init__(self, cache_dir, prefix=""):
+            self.cache_dir = cache_dir
+            self.prefix = prefix
+
+        def execute(self, config, arguments):
+            return {"success": True, "result": self.prefix + arguments["text"], "error": None}
+''')
+
+
+def _write(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def _tool(name):
+    return {"name": name, "description": f"{name} tool", "endpoint": "http://127.0.0.1:9/x",
+            "params": {"text": {"type": "string", "required": True}}}
+
+
+def test_executors_created_on_first_use():
+    """未使用的执行器不会创建，也不会创建缓存目录"""
+    print("=" * 60)
+    print("Testing lazy executor creation")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "tools.json")
+        cache_root = os.path.join(tmp, "cache")
+        _write(config, {"api_tools": [_tool("a")]})
+
+        manager = UrbanToolManager(config, cache_root=cache_root)
+        manager.get_tool_by_name("a")
+        assert manager.executors.loaded == {} and not os.path.exists(cache_root)
+
+        manager.prefetch("a")
+        assert list(manager.executors.loaded) == ["api"]
+        assert os.listdir(cache_root) == ["api"]
+        print("✅ Only the API executor was created")
+
+
+def test_config_and_entry_point_executors():
+    """第三方执行器通过配置文件或入口点注册"""
+    print("\n" + "=" * 60)
+    print("Testing pluggable executors")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "echo_plugin.py"), "w") as f:
+            f.write(PLUGIN)
+        # 以已安装发行包的形式声明入口点
+        dist_info = os.path.join(tmp, "echo_plugin-0.1.dist-info")
+        os.makedirs(dist_info)
+        with open(os.path.join(dist_info, "METADATA"), "w") as f:
+            f.write("Metadata-Version: 2.1\nName: echo-plugin\nVersion: 0.1\n")
+        with open(os.path.join(dist_info, "entry_points.txt"), "w") as f:
+            f.write("[urban_computing.executors]\nshout = echo_plugin:EchoExecutor\n")
+        sys.path.insert(0, tmp)
+
+        try:
+            config = os.path.join(tmp, "tools.json")
+            _write(config, {
+                "api_tools": [_tool("a")],
+                "local_tools": [_tool("echo")],
+                "shout_tools": [_tool("shout")],
+                "executors": {"local": {"class": "echo_plugin:EchoExecutor", "options": {"prefix": "> "}}},
+            })
+            manager = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+
+            assert manager.get_tool_by_name("echo").invoke({"text": "hi"})["result"] == "> hi"
+            assert manager.get_tool_by_name("shout").invoke({"text": "hi"})["result"] == "hi"
+            assert set(manager.executors.loaded) == {"local", "shout"}
+
+            description = manager.get_tools_description()
+            assert "=== LOCAL Tools ===" in description and "echo (local)" in description
+            assert manager.snapshot().tool_types == ["api", "local", "shout"]
+            print("✅ Config and entry-point executors handle their tools")
+
+            _write(config, {"grpc_tools": [_tool("g")]})
+            try:
+                manager.reload()
+                raise AssertionError("tool type without executor should be rejected")
+            except ValueError as e:
+                assert "grpc" in str(e)
+            assert manager.get_tool_by_name("echo") is not None
+            print("✅ Unknown tool types are rejected")
+        finally:
+            sys.path.remove(tmp)
+
+
+if __name__ == "__main__":
+    print("\n🧪 Executor Registry Test\n")
+
+    test_executors_created_on_first_use()
+    test_config_and_entry_point_executors()
+
+    print("\n🎉 All tests passed!\n")
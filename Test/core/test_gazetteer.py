@@ -0,0 +1,192 @@
+"""
+Test script for the offline gazetteer (geocoding, reverse geocoding, parameter normalization)
+Uses the bundled GeoNames data and the local stand-in HTTP server, no network required
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import tempfile
+
+# 添加项目根目录到路径
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from executors import gazetteer
+from executors.api_executor import APIExecutor
+from executors.gazetteer import fold, normalize_arguments
+from executors.local_executor import LocalExecutor
+from mock_server import MockToolServer, rewrite_tool_pool
+
+
+def _tool_pool():
+    with open(os.path.join(ROOT, "urban_tools.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * math.asin(math.sqrt(a)) * gazetteer.EARTH_RADIUS_KM
+
+
+def test_geocode():
+    """名称、别名、中文名、国家筛选和前缀"""
+    print("=" * 60)
+    print("Testing geocoding")
+    print("=" * 60)
+
+    places = gazetteer.load()
+    assert len(places) > 30000
+    assert fold("São-Paulo") == "sao paulo" and fold("  St. Louis ") == "st louis"
+
+    cases = {
+        "北京": "Beijing,CN", "Peking": "Beijing,CN", "Zürich": "Zurich,CH", "Cologne": "Koln,DE",
+        "Paris, France": "Paris,FR", "London": "London,GB", "London,CA": "London,CA",
+        "Saint Petersburg, Russia": "Saint Petersburg,RU", "San Fran": "San Francisco,US",
+    }
+    for query, place in cases.items():
+        matches = places.geocode(query)
+        assert matches and matches[0]["place"] == place, (query, matches)
+    print(f"✅ {len(cases)} names resolved (aliases, Chinese names, countries, prefixes)")
+
+    beijing = places.geocode("北京")[0]
+    assert beijing["timezone"] == "Asia/Shanghai" and abs(beijing["latitude"] - 39.9) < 0.1
+    springfields = places.geocode("Springfield", limit=3)
+    assert len(springfields) == 3 and springfields[0]["population"] >= springfields[1]["population"]
+    assert places.geocode("London", country="Canada")[0]["country"] == "CA"
+    assert places.geocode("Xyzzy Qwerty") == [] and places.geocode(" , ") == []
+    assert places.geocode("London", country="Atlantis") == []
+    print("✅ Largest city first; country filter; unknown names give no matches")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        places.geocode("Paris, France")
+    elapsed_us = (time.perf_counter() - start) * 1000
+    assert elapsed_us < 1000, f"geocode took {elapsed_us:.0f} µs"
+    print(f"✅ geocode: {elapsed_us:.1f} µs per query")
+
+
+def test_reverse_geocode():
+    """k-d 树与穷举结果一致"""
+    print("=" * 60)
+    print("Testing reverse geocoding")
+    print("=" * 60)
+
+    places = gazetteer.load()
+    nearest = places.reverse(39.91, 116.40)[0]
+    assert nearest["place"] == "Beijing,CN" and nearest["distance_km"] < 2
+    print(f"✅ (39.91, 116.40) -> {nearest['place']} ({nearest['distance_km']} km)")
+
+    random.seed(7)
+    points = [(random.uniform(-90, 90), random.uniform(-180, 180)) for _ in range(30)]
+    points += [(-18.1, 179.99), (-18.1, -179.99), (89.9, 0.0), (-89.9, 45.0)]  # 日期变更线和两极
+    for lat, lon in points:
+        expected = sorted((_haversine(lat, lon, places.latitudes[i], places.longitudes[i]), i)
+                          for i in range(len(places)))[:3]
+        found = places.nearest(lat, lon, limit=3)
+        assert [i for _, i in found] == [i for _, i in expected], (lat, lon)
+        assert all(abs(a - b) < 1e-6 for (a, _), (b, _) in zip(found, expected))
+    print(f"✅ k-d tree matches brute force at {len(points)} points, including the antimeridian and poles")
+
+    assert places.reverse(0.0, -140.0, max_km=100) == []
+    assert [m["name"] for m in places.reverse(51.51, -0.13, limit=2, max_km=2)] == ["London", "Soho"]
+    assert places.reverse(48.86, 2.35, min_population=1000000)[0]["place"] == "Paris,FR"
+    try:
+        places.reverse(91, 0)
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+    print("✅ max_km, min_population and coordinate range respected")
+
+    start = time.perf_counter()
+    for lat, lon in points * 10:
+        places.reverse(lat, lon)
+    elapsed_us = (time.perf_counter() - start) / (len(points) * 10) * 1e6
+    assert elapsed_us < 2000, f"reverse took {elapsed_us:.0f} µs"
+    print(f"✅ reverse: {elapsed_us:.1f} µs per query")
+
+
+def test_normalize_arguments():
+    """地名 -> "City,CC" / 经纬度"""
+    print("=" * 60)
+    print("Testing parameter normalization")
+    print("=" * 60)
+
+    assert normalize_arguments({"place": "place"}, {"place": "北京", "cnt": 5}) == {"place": "Beijing,CN", "cnt": 5}
+    assert normalize_arguments({"place": "place"}, {"place": "New York,US"}) == {"place": "New York,US"}
+    assert normalize_arguments({"place": "place"}, {"place": "Xyzzy"}) == {"place": "Xyzzy"}
+    print("✅ Place names become 'City,CC'; 'City,CC' and unknown names kept as given")
+
+    beijing = gazetteer.load().geocode("Beijing")[0]
+    arguments = normalize_arguments({"place": "coordinates"}, {"place": "北京", "timezone": "auto"})
+    assert arguments == {"latitude": beijing["latitude"], "longitude": beijing["longitude"], "timezone": "auto"}
+    given = {"place": "Paris", "latitude": 1.0, "longitude": 2.0}
+    assert normalize_arguments({"place": "coordinates"}, given) == {"latitude": 1.0, "longitude": 2.0}
+    assert "place" in given
+    custom = {"where": {"to": "coordinates", "latitude": "lat", "longitude": "lon"}}
+    assert set(normalize_arguments(custom, {"where": "Tokyo"})) == {"lat", "lon"}
+    print("✅ Place names become latitude/longitude; given coordinates win")
+
+    for spec, arguments in (({"place": "coordinates"}, {"place": "Xyzzy Qwerty"}),
+                            ({"place": "zip"}, {"place": "Paris"})):
+        try:
+            normalize_arguments(spec, arguments)
+            raise AssertionError(f"expected ValueError for {spec} {arguments}")
+        except ValueError:
+            pass
+    print("✅ Unknown places (for coordinates) and normalizers rejected")
+
+
+def test_tools():
+    """local 工具和 API 工具的参数规范化"""
+    print("=" * 60)
+    print("Testing local tools and API normalization")
+    print("=" * 60)
+
+    pool = _tool_pool()
+    local = {tool["name"]: tool for tool in pool["local_tools"]}
+    executor = LocalExecutor()
+    executor.warm(local["geocode"])
+    result = executor.execute(local["geocode"], {"place": "上海", "limit": None})
+    assert result["success"] and result["result"]["matches"][0]["place"] == "Shanghai,CN"
+    arguments = {"latitude": 48.86, "longitude": 2.35, "limit": 2, "min_population": 100000}
+    result = executor.execute(local["reverse_geocode"], arguments)
+    assert result["success"] and [m["place"] for m in result["result"]["matches"]][0] == "Paris,FR"
+    result = executor.execute(local["reverse_geocode"], {"latitude": 123, "longitude": 0})
+    assert not result["success"] and "Invalid arguments" in result["error"]
+    print("✅ geocode / reverse_geocode run in process")
+
+    with MockToolServer() as server, tempfile.TemporaryDirectory() as tmp:
+        tools = {tool["name"]: tool for tool in rewrite_tool_pool(pool, server.base_url)["api_tools"]}
+        api = APIExecutor(tools_dir=tmp)
+        free = tools["weather_forecast_free"]
+
+        assert api.execute(free, {"place": "北京"})["success"]
+        beijing = gazetteer.load().geocode("Beijing")[0]
+        cached = api.execute(free, {"latitude": beijing["latitude"], "longitude": beijing["longitude"]})
+        assert cached["from_cache"] and server.requests == 1
+        print("✅ Place name sent as coordinates (same cache entry as explicit coordinates)")
+
+        assert api.execute(tools["weather_forecast"], {"place": "伦敦"})["success"]
+        assert api.execute(tools["weather_forecast"], {"place": "London,GB"})["from_cache"]
+        print("✅ Place name sent as 'City,CC'")
+
+        result = api.execute(free, {"place": "Xyzzy Qwerty"})
+        assert not result["success"] and "Unknown place" in result["error"] and server.requests == 2
+        print("✅ Unknown place rejected before the request")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Gazetteer Test\n")
+
+    test_geocode()
+    test_reverse_geocode()
+    test_normalize_arguments()
+    test_tools()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,97 @@
+"""
+Import-time regression test: entry modules must not load LangChain,
+pydantic, OpenAI or requests until they are actually used
+Measured with `python -X importtime`; budget via URBAN_IMPORT_BUDGET_MS
+"""
+
+import os
+import sys
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# 这些包只应在第一次调用 LLM / 构建工具 / 发送 HTTP 请求时导入
+HEAVY_PACKAGES = {"langchain", "langchain_core", "langchain_openai", "openai", "pydantic", "requests", "urllib3"}
+BUDGET_MS = float(os.getenv("URBAN_IMPORT_BUDGET_MS", "300"))
+
+
+def _importtime(code):
+    """运行代码并解析 -X importtime 输出 -> {模块名: 累计耗时(微秒)}"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        modules[name] = int(cumulative_us)
+    return modules
+
+
+def _heavy(modules, baseline):
+    return sorted({name.split(".")[0] for name in modules if name not in baseline} & HEAVY_PACKAGES)
+
+
+def test_entry_modules_import_fast():
+    """main / planner / tool_manager / executors 导入时不加载重型依赖，且在预算内"""
+    print("=" * 60)
+    print("Testing import time of entry modules")
+    print("=" * 60)
+
+    baseline = _importtime("pass")
+    for module in ("main", "planner", "server", "tool_manager", "executors"):
+        modules = _importtime(f"import {module}")
+        heavy = _heavy(modules, baseline)
+        assert not heavy, f"importing {module} loads {heavy}"
+        elapsed_ms = modules[module] / 1000
+        assert elapsed_ms < BUDGET_MS, f"importing {module} took {elapsed_ms:.1f} ms (budget {BUDGET_MS} ms)"
+        print(f"✅ import {module}: {elapsed_ms:.1f} ms")
+
+
+def test_listing_tools_stays_light():
+    """加载工具池并生成描述（CLI 列出工具）不需要 LangChain"""
+    print("\n" + "=" * 60)
+    print("Testing tool listing without heavy imports")
+    print("=" * 60)
+
+    code = (
+        "import sys, tempfile\n"
+        "from tool_manager import UrbanToolManager\n"
+        "manager = UrbanToolManager('urban_tools.json', cache_root=tempfile.mkdtemp())\n"
+        "assert manager.get_tools_description() and manager.list_tools()\n"
+    )
+    heavy = _heavy(_importtime(code), _importtime("pass"))
+    assert not heavy, f"listing tools loads {heavy}"
+    print("✅ Tool pool listed without LangChain, pydantic or requests")
+
+
+def test_cache_hit_stays_light():
+    """API 工具命中缓存（内存或磁盘）时不导入 requests"""
+    print("\n" + "=" * 60)
+    print("Testing cached API calls without requests")
+    print("=" * 60)
+
+    code = (
+        "import sys, tempfile\n"
+        "from executors.api_executor import APIExecutor\n"
+        "config = {'name': 'demo', 'endpoint': 'http://127.0.0.1:9/demo', 'params': {}}\n"
+        "tools_dir = tempfile.mkdtemp()\n"
+        "executor = APIExecutor(tools_dir=tools_dir)\n"
+        "executor._save_cache(executor._generate_cache_key(config, {'q': 1}), {'answer': 42})\n"
+        "assert executor.execute(config, {'q': 1})['from_cache']\n"
+        "assert APIExecutor(tools_dir=tools_dir).execute(config, {'q': 1})['result'] == {'answer': 42}\n"
+        "assert 'requests' not in sys.modules, 'requests imported on a cache hit'\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+    print("✅ Memory and disk cache hits served without importing requests")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Import Time Test\n")
+
+    test_entry_modules_import_fast()
+    test_listing_tools_stays_light()
+    test_cache_hit_stays_light()
+
+    print("\n🎉 All tests passed!\n")
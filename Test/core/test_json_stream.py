@@ -0,0 +1,77 @@
+"""
+Test script for the incremental JSON parser used by streaming tool selection
+No network or API keys required
+"""
+
+import os
+import sys
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from json_stream import IncrementalJSONParser
+
+
+SELECTION = (
+    '```json\n{"tool_name": "github_user_info", '
+    '"parameters": {"username": "tor\\"valds", "filters": [1, {"a": "}"}]}, '
+    '"reasoning": "The user asks about {GitHub} profiles"}\n```'
+)
+
+
+def _feed_in_chunks(text, size):
+    parser = IncrementalJSONParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+
+def test_fields_complete_in_order():
+    """字段按生成顺序逐个完成，且与整体解析一致"""
+    print("=" * 60)
+    print("Testing incremental field completion")
+    print("=" * 60)
+
+    for size in (1, 3, 16, len(SELECTION)):
+        parser, events = _feed_in_chunks(SELECTION, size)
+        keys = [key for key, _ in events]
+        assert keys == ["tool_name", "parameters", "reasoning"], keys
+        assert parser.done
+        assert parser.values["parameters"] == {"username": 'tor"valds', "filters": [1, {"a": "}"}]}
+        print(f"✅ chunk size {size}: {keys}")
+
+
+def test_parameters_ready_before_reasoning():
+    """parameters 在 reasoning 生成前即可用（推测执行的前提）"""
+    print("\n" + "=" * 60)
+    print("Testing early availability of parameters")
+    print("=" * 60)
+
+    cut = SELECTION.index('"reasoning"')
+    parser = IncrementalJSONParser()
+    events = parser.feed(SELECTION[:cut])
+    assert dict(events).keys() == {"tool_name", "parameters"}
+    assert not parser.done
+    print("✅ tool_name and parameters available while reasoning is still streaming")
+
+
+def test_scalar_values():
+    """数字、布尔、null 在逗号或右括号处完成"""
+    print("\n" + "=" * 60)
+    print("Testing scalar values")
+    print("=" * 60)
+
+    parser, events = _feed_in_chunks('{"a": 1.5, "b": true, "c": null, "d": -2}', 2)
+    assert events == [("a", 1.5), ("b", True), ("c", None), ("d", -2)], events
+    print(f"✅ {events}")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Incremental JSON Parser Test\n")
+
+    test_fields_complete_in_order()
+    test_parameters_ready_before_reasoning()
+    test_scalar_values()
+
+    print("\n🎉 All tests passed!\n")
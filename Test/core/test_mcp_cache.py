@@ -0,0 +1,149 @@
+"""
+Test script for MCP tool result caching (cache_ttl, canonical keys, memory/disk tiers, metrics)
+Uses the local stand-in server (bench/mock_mcp_server.py), no npx or API keys required
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "bench"))
+
+import tracing
+from executors.mcp_executor import MCPExecutor
+from executors.result_cache import ResultCache, canonical_key
+from mock_mcp_server import mcp_server_config, mcp_tool_config
+
+NUMBER_PARAMS = {"a": {"type": "number", "required": True}, "b": {"type": "number", "required": True}}
+
+
+def _server_calls(executor):
+    """服务端累计的 tools/call 次数（不含本次 stats 调用）"""
+    return executor.execute(mcp_tool_config("mock_stats", "stats"), {})["result"]["calls"] - 1
+
+
+def test_canonical_keys():
+    """参数顺序、数值写法、空白、None 和默认值不影响缓存键"""
+    print("=" * 60)
+    print("Testing canonical cache keys")
+    print("=" * 60)
+
+    params = dict(NUMBER_PARAMS, units={"type": "string", "default": "metric"})
+    key = canonical_key("mock:add", params, {"a": 2, "b": 3})
+    assert canonical_key("mock:add", params, {"b": "3", "a": 2.0, "units": " metric "}) == key
+    assert canonical_key("mock:add", params, {"a": 2, "b": 3, "note": None}) == key
+    assert canonical_key("mock:add", params, {"a": 2, "b": 4}) != key
+    assert canonical_key("mock:sub", params, {"a": 2, "b": 3}) != key
+    assert canonical_key("mock:add", params, {"a": 2, "b": 3, "units": "imperial"}) != key
+    print("✅ Equivalent arguments share a key")
+
+
+def test_cacheable_tools_skip_server():
+    """配置了 cache_ttl 的工具重复调用不再到达服务，其他工具每次调用"""
+    print("=" * 60)
+    print("Testing cached MCP results")
+    print("=" * 60)
+
+    tracing.metrics.reset()
+    with tempfile.TemporaryDirectory() as tmp:
+        geo = dict(mcp_tool_config("geo", "add"), params=NUMBER_PARAMS, cache_ttl=3600)
+        action = mcp_tool_config("action", "echo")
+
+        executor = MCPExecutor(os.path.join(tmp, "mcp"))
+        try:
+            first = executor.execute(geo, {"a": 2, "b": 3})
+            assert first == {"success": True, "result": 5, "error": None}
+            second = executor.execute(geo, {"b": "3", "a": 2.0})
+            assert second["from_cache"] and second["result"] == 5
+            for _ in range(2):
+                assert "from_cache" not in executor.execute(action, {"x": 1})
+            assert _server_calls(executor) == 3
+            print("✅ Repeated lookup served from memory, stateful tool always called")
+
+            assert not executor.execute(dict(mcp_tool_config("bad", "fail"), cache_ttl=3600), {})["success"]
+            assert not executor.execute(dict(mcp_tool_config("bad", "fail"), cache_ttl=3600), {})["success"]
+            assert _server_calls(executor) == 6
+            print("✅ Error results are not cached")
+        finally:
+            executor.close()
+
+        executor = MCPExecutor(os.path.join(tmp, "mcp"))
+        try:
+            assert executor.execute(geo, {"a": 2, "b": 3})["from_cache"]
+            assert executor.connections == {}
+            print("✅ Disk tier survives restarts without spawning the server")
+
+            executor.cache._memory.clear()
+            executor.prefetch(geo)
+            assert len(executor.cache._memory) == 1
+
+            short = dict(geo, cache_ttl=0.2)
+            time.sleep(0.3)
+            assert "from_cache" not in executor.execute(short, {"a": 2, "b": 3})
+            print("✅ Prefetch loads the tool's entries, expired entries miss")
+        finally:
+            executor.close()
+
+    text = tracing.metrics.to_prometheus()
+    assert 'urban_cache_requests_total{result="hit",tool="geo"} 2' in text
+    assert 'urban_cache_requests_total{result="miss",tool="geo"} 2' in text
+    print("✅ Hit/miss metrics recorded")
+
+
+def test_discovered_tool_ttls():
+    """mcp_servers 的 cache_ttl 按服务端工具名设置"""
+    print("=" * 60)
+    print("Testing cache TTLs for discovered tools")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = MCPExecutor(os.path.join(tmp, "mcp"))
+        try:
+            tools = {config["mcp_tool"]: config for config in
+                     executor.discover(mcp_server_config(cache_ttl={"add": 600}))}
+            assert tools["add"]["cache_ttl"] == 600
+            assert "cache_ttl" not in tools["echo"]
+            print("✅ Only listed tools are cacheable")
+        finally:
+            executor.close()
+
+
+def test_memory_tier_bounded():
+    """内存层按最近使用淘汰；预取只加载最新的 max_entries 条"""
+    print("=" * 60)
+    print("Testing the bounded memory tier")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(tmp, max_entries=3)
+        for i in range(3):
+            cache.put(f"tool_{i}", {"value": i})
+        assert cache.get("tool_0", 3600) == {"value": 0}  # tool_0 成为最近使用
+        cache.put("tool_3", {"value": 3})
+        assert list(cache._memory) == ["tool_2", "tool_0", "tool_3"]
+        assert cache.get("tool_1", 3600) == {"value": 1}  # 从磁盘层读回
+        assert len(cache._memory) == 3
+        print("✅ Least recently used entry evicted from memory, still served from disk")
+
+        now = time.time()
+        for i in range(10):
+            cache.put(f"many_{i}", {"value": i})
+            os.utime(os.path.join(tmp, f"many_{i}.json"), (now - 100 + i, now - 100 + i))
+        cache._memory.clear()
+        cache.prefetch("many", 3600)
+        assert list(cache._memory) == ["many_7", "many_8", "many_9"]
+        print("✅ Prefetch keeps only the newest max_entries entries")
+
+
+if __name__ == "__main__":
+    print("\n🧪 MCP Cache Test\n")
+
+    test_canonical_keys()
+    test_cacheable_tools_skip_server()
+    test_discovered_tool_ttls()
+    test_memory_tier_bounded()
+
+    print("\n🎉 All tests passed!\n")
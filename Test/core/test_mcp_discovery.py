@@ -0,0 +1,124 @@
+"""
+Test script for cached MCP tool discovery (mcp_servers in urban_tools.json)
+Uses the local stand-in server (bench/mock_mcp_server.py), no npx or API keys required
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "bench"))
+
+from executors.mcp_executor import MCPExecutor
+from mock_mcp_server import mcp_server_config
+from tool_manager import UrbanToolManager
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_discovery_cache():
+    """tools/list 只在缓存缺失、过期或版本变化时执行"""
+    print("=" * 60)
+    print("Testing discovery cache")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tools_dir = os.path.join(tmp, "mcp")
+        server = mcp_server_config(version="1.0")
+
+        executor = MCPExecutor(tools_dir)
+        try:
+            tools = {config["name"]: config for config in executor.discover(server)}
+            add = tools["mock_add"]
+            assert add["mcp_tool"] == "add" and add["server"] == "mock"
+            assert add["params"]["a"] == {"type": "number", "required": True, "description": ""}
+            assert len(executor.connections) == 1
+            print(f"✅ Discovered {len(tools)} tools from a live server")
+        finally:
+            executor.close()
+
+        executor = MCPExecutor(tools_dir)
+        try:
+            assert len(executor.discover(server)) == len(tools)
+            assert executor.connections == {}
+            print("✅ Second discovery served from cache without spawning")
+
+            assert executor.discover(dict(server, discovery_ttl=0))
+            assert len(executor.connections) == 1
+            print("✅ Expired cache refreshed")
+        finally:
+            executor.close()
+
+        # 同样的命令，服务升级到 2.0：调用时发现版本变化，后台刷新缓存
+        upgraded = mcp_server_config(version="2.0")
+        executor = MCPExecutor(tools_dir)
+        try:
+            [add] = [config for config in executor.discover(upgraded) if config["name"] == "mock_add"]
+            assert executor.connections == {}
+            assert executor.execute(add, {"a": 1, "b": 2})["result"] == 3
+
+            cache_files = list((executor.tools_dir / "discovery").glob("mock-*.json"))
+            assert len(cache_files) == 1
+
+            def version():
+                return json.loads(cache_files[0].read_text())["server_info"]["version"]
+            assert _wait_for(lambda: version() == "2.0")
+            print("✅ Server version change refreshed the cache")
+        finally:
+            executor.close()
+
+
+def test_discovered_tools_registered():
+    """UrbanToolManager 注册发现的工具，手写配置优先"""
+    print("=" * 60)
+    print("Testing discovered tools in the tool pool")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "tools.json")
+        with open(config, "w") as f:
+            json.dump({
+                "mcp_servers": [mcp_server_config(prefix="m_")],
+                "mcp_tools": [{"name": "m_echo", "description": "Hand-written echo", "command": sys.executable,
+                               "server": "mock", "mcp_tool": "echo", "params": {}}],
+                "api_tools": [{"name": "weather", "description": "Weather", "endpoint": "http://127.0.0.1:9/x"}],
+            }, f)
+
+        manager = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+        try:
+            names = [tool["name"] for tool in manager.list_tools()]
+            assert names[:2] == ["m_echo", "weather"] and "m_add" in names and "m_sleep" in names
+            assert manager.snapshot().get_config("m_echo")["description"] == "Hand-written echo"
+            assert "m_add" in manager.get_tools_description()
+
+            result = manager.get_tool_by_name("m_add").invoke({"a": 2, "b": 5})
+            assert result == {"success": True, "result": 7, "error": None}
+            print("✅ Discovered tools registered and callable")
+
+            manager.mcp_executor.close()
+            reloaded = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+            assert [tool["name"] for tool in reloaded.list_tools()] == names
+            assert reloaded.mcp_executor.connections == {}
+            print("✅ Restart registers discovered tools from cache")
+        finally:
+            manager.mcp_executor.close()
+
+
+if __name__ == "__main__":
+    print("\n🧪 MCP Discovery Test\n")
+
+    test_discovery_cache()
+    test_discovered_tools_registered()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,101 @@
+"""
+Test script for the persistent MCP stdio session pool
+Uses the local stand-in server (bench/mock_mcp_server.py), no npx or API keys required
+"""
+
+import os
+import sys
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "bench"))
+
+from executors.mcp_executor import MCPExecutor
+from mock_mcp_server import mcp_tool_config
+
+
+def test_session_reused_and_multiplexed():
+    """握手只做一次，并发调用复用同一个进程"""
+    print("=" * 60)
+    print("Testing session reuse and multiplexing")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = MCPExecutor(os.path.join(tmp, "mcp"))
+        try:
+            add = executor.execute(mcp_tool_config("mock_add", "add"), {"a": 2, "b": 3})
+            assert add == {"success": True, "result": 5, "error": None}, add
+
+            echo = executor.execute(mcp_tool_config("mock_echo", "echo"), {"city": "北京"})
+            assert echo["result"] == {"city": "北京"}
+            print("✅ Text and structured results parsed")
+
+            # 单行 2 MB 的响应：stdout 需要缓冲读取（无缓冲时每个字节一次 read 系统调用）
+            start = time.perf_counter()
+            large = executor.execute(mcp_tool_config("mock_echo", "echo"), {"blob": "x" * 2_000_000})
+            elapsed = time.perf_counter() - start
+            assert large["success"] and len(large["result"]["blob"]) == 2_000_000
+            assert elapsed < 1.0, f"2 MB response took {elapsed:.2f}s"
+            print(f"✅ 2 MB response line read in {elapsed:.2f}s")
+
+            sleep = mcp_tool_config("mock_sleep", "sleep")
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=10) as pool:
+                results = list(pool.map(lambda _: executor.execute(sleep, {"seconds": 0.5}), range(10)))
+            elapsed = time.perf_counter() - start
+            assert all(r["success"] for r in results)
+            assert elapsed < 2.5, f"10 concurrent calls took {elapsed:.2f}s"
+            print(f"✅ 10 concurrent 0.5s calls finished in {elapsed:.2f}s")
+
+            stats = executor.execute(mcp_tool_config("mock_stats", "stats"), {})["result"]
+            assert stats["initialize_count"] == 1
+            assert stats["calls"] == 14
+            assert len(executor.connections) == 1
+            print("✅ One process, one initialize handshake")
+        finally:
+            executor.close()
+
+
+def test_errors_and_restart():
+    """工具错误、超时与服务进程退出后的重启"""
+    print("=" * 60)
+    print("Testing error handling and restart")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = MCPExecutor(os.path.join(tmp, "mcp"))
+        try:
+            failed = executor.execute(mcp_tool_config("mock_fail", "fail"), {})
+            assert not failed["success"] and "mock failure" in failed["error"]
+
+            unknown = executor.execute(mcp_tool_config("mock_unknown", "unknown"), {})
+            assert not unknown["success"] and "Unknown tool" in unknown["error"]
+
+            slow = dict(mcp_tool_config("mock_sleep", "sleep"), timeout=0.2)
+            timed_out = executor.execute(slow, {"seconds": 2})
+            assert not timed_out["success"] and "timed out" in timed_out["error"]
+            print("✅ Tool errors and timeouts reported")
+
+            stats = mcp_tool_config("mock_stats", "stats")
+            first_pid = executor.execute(stats, {})["result"]["pid"]
+            crashed = executor.execute(mcp_tool_config("mock_crash", "crash"), {})
+            assert not crashed["success"] and "exited" in crashed["error"]
+
+            second_pid = executor.execute(stats, {})["result"]["pid"]
+            assert second_pid != first_pid
+            print("✅ Session restarted after the server exited")
+        finally:
+            executor.close()
+        assert executor.connections == {}
+
+
+if __name__ == "__main__":
+    print("\n🧪 MCP Executor Test\n")
+
+    test_session_reused_and_multiplexed()
+    test_errors_and_restart()
+
+    print("\n🎉 All tests passed!\n")
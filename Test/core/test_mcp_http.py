@@ -0,0 +1,98 @@
+"""
+Test script for the Streamable HTTP/SSE MCP transport
+Uses the local stand-in server (bench/mock_mcp_http_server.py), no network or API keys required
+"""
+
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "bench"))
+
+from executors.mcp_executor import MCPExecutor
+from mock_mcp_http_server import MockMCPHttpServer, mcp_http_tool_config
+
+ADD_PARAMS = {"a": {"type": "number", "required": True}, "b": {"type": "number", "required": True}}
+
+
+def test_pooled_session():
+    """一次握手，调用复用 keep-alive 连接，多个 worker 共享同一个服务"""
+    print("=" * 60)
+    print("Testing pooled HTTP session")
+    print("=" * 60)
+
+    with MockMCPHttpServer() as server, tempfile.TemporaryDirectory() as tmp:
+        add = dict(mcp_http_tool_config("remote_add", "add", server.url), params=ADD_PARAMS)
+        executor = MCPExecutor(os.path.join(tmp, "mcp"))
+        try:
+            for i in range(20):
+                assert executor.execute(add, {"a": i, "b": 1})["result"] == i + 1
+            assert server.connections == 1 and server.initialize_count == 1
+            print("✅ 20 sequential calls over one connection and one session")
+
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda i: executor.execute(add, {"a": i, "b": 0}), range(40)))
+            assert [r["result"] for r in results] == list(range(40))
+            assert server.connections <= 8 and server.initialize_count == 1
+            print(f"✅ 40 concurrent calls over {server.connections} pooled connections")
+
+            # 另一个 worker 进程：只新建自己的会话，不启动服务
+            worker = MCPExecutor(os.path.join(tmp, "worker"))
+            assert worker.execute(add, {"a": 1, "b": 1})["result"] == 2
+            assert len(server.sessions) == 2
+            worker.close()
+            assert len(server.sessions) == 1
+            print("✅ Second worker shares the server; closing deletes its session")
+        finally:
+            executor.close()
+
+
+def test_progress_resumption_and_expiry():
+    """SSE 进度通知、断流续传和会话失效后重新握手"""
+    print("=" * 60)
+    print("Testing progress, resumption and session expiry")
+    print("=" * 60)
+
+    with MockMCPHttpServer() as server, tempfile.TemporaryDirectory() as tmp:
+        executor = MCPExecutor(os.path.join(tmp, "mcp"))
+        try:
+            result = executor.execute(mcp_http_tool_config("remote_progress", "progress", server.url), {"steps": 3})
+            assert result["success"] and result["result"] == {"steps": 3}
+            assert [p["progress"] for p in result["progress"]] == [1, 2, 3]
+            assert result["progress"][-1]["message"] == "partial 3"
+            print("✅ Progress notifications delivered with the result")
+
+            result = executor.execute(mcp_http_tool_config("remote_drop", "drop", server.url), {})
+            assert result["success"] and result["result"] == {"steps": 1}
+            assert server.resumes == 1 and executor.connections["remote"].resumed_streams == 1
+            print("✅ Dropped stream resumed with Last-Event-ID")
+
+            server.expire_sessions()
+            add = dict(mcp_http_tool_config("remote_add", "add", server.url), params=ADD_PARAMS)
+            assert executor.execute(add, {"a": 2, "b": 2})["result"] == 4
+            assert server.initialize_count == 2
+            print("✅ Expired session re-initialized transparently")
+
+            failed = executor.execute(mcp_http_tool_config("remote_fail", "fail", server.url), {})
+            assert not failed["success"] and "mock failure" in failed["error"]
+        finally:
+            executor.close()
+
+        server.stop()
+        executor = MCPExecutor(os.path.join(tmp, "mcp"))
+        unreachable = executor.execute(mcp_http_tool_config("remote_add", "add", server.url), {})
+        assert not unreachable["success"] and "unreachable" in unreachable["error"]
+        executor.close()
+        print("✅ Unreachable server reported as an error")
+
+
+if __name__ == "__main__":
+    print("\n🧪 MCP HTTP Transport Test\n")
+
+    test_pooled_session()
+    test_progress_resumption_and_expiry()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,177 @@
+"""
+Test script for the MCP process supervisor (LRU cap, idle reaping, restarts, health pings, warm servers)
+Uses the local stand-in server (bench/mock_mcp_server.py), no npx or API keys required
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "bench"))
+
+from executors.mcp_executor import MCPExecutor
+from mock_mcp_server import mcp_tool_config
+from tool_manager import UrbanToolManager
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_capacity_and_idle_reaping():
+    """超过上限按 LRU 关闭，空闲会话被回收（warm 服务保留）"""
+    print("=" * 60)
+    print("Testing LRU capacity and idle reaping")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = MCPExecutor(os.path.join(tmp, "mcp"), max_servers=2, idle_timeout=0.5, check_interval=0.1)
+        try:
+            executor.warm(mcp_tool_config("warm_add", "add", server="warm"))
+            for server in ("a", "b"):
+                assert executor.execute(mcp_tool_config(f"{server}_add", "add", server=server),
+                                        {"a": 1, "b": 1})["success"]
+            assert list(executor.connections) == ["warm", "b"]
+            assert executor.supervisor.stats["evicted"] == 1
+            print("✅ Least recently used idle server evicted at capacity")
+
+            assert _wait_for(lambda: list(executor.connections) == ["warm"])
+            assert executor.supervisor.stats["reaped"] == 1
+            print("✅ Idle server reaped, warm server kept")
+        finally:
+            executor.close()
+
+
+def test_restart_backoff_and_health_ping():
+    """崩溃后退避重启，不响应 ping 的服务被重启"""
+    print("=" * 60)
+    print("Testing crash restarts and health pings")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = MCPExecutor(os.path.join(tmp, "mcp"), restart_backoff=0.5, check_interval=0.1,
+                               ping_interval=0.3, ping_timeout=0.2)
+        stats = mcp_tool_config("mock_stats", "stats")
+        crash = mcp_tool_config("mock_crash", "crash")
+        try:
+            first_pid = executor.execute(stats, {})["result"]["pid"]
+            executor.execute(crash, {})
+            second_pid = executor.execute(stats, {})["result"]["pid"]
+            assert second_pid != first_pid
+            print("✅ First crash restarted immediately")
+
+            # 连续两次崩溃（重启后的会话还没有成功调用过）
+            executor.execute(crash, {})
+            executor.execute(crash, {})
+            in_backoff = executor.execute(stats, {})
+            assert not in_backoff["success"] and "restarting in" in in_backoff["error"], in_backoff
+            assert _wait_for(lambda: "mock" in executor.connections)
+            assert executor.execute(stats, {})["success"]
+            assert executor.supervisor.stats["restarted"] == 3
+            print("✅ Repeated crash restarted by the supervisor after backoff")
+
+            frozen_pid = executor.execute(stats, {})["result"]["pid"]
+            executor.execute(mcp_tool_config("mock_freeze", "freeze"), {})
+            assert _wait_for(lambda: executor.supervisor.stats["crashed"] == 4 and "mock" in executor.connections)
+            assert executor.execute(stats, {})["result"]["pid"] != frozen_pid
+            print("✅ Unresponsive server replaced after failed health ping")
+        finally:
+            executor.close()
+
+
+def test_failures_reset_after_successful_call():
+    """不做健康检查时，重启后第一次调用成功即清零连续失败计数"""
+    print("=" * 60)
+    print("Testing failure count reset without health pings")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = MCPExecutor(os.path.join(tmp, "mcp"), ping_interval=0, restart_backoff=30,
+                               max_restarts=1, check_interval=0.1)
+        stats = mcp_tool_config("mock_stats", "stats")
+        crash = mcp_tool_config("mock_crash", "crash")
+        try:
+            for _ in range(4):
+                executor.execute(crash, {})
+                for _ in range(3):
+                    assert executor.execute(stats, {})["success"]
+                assert "mock" not in executor.supervisor._failures
+            assert executor.supervisor.stats["crashed"] == 4 and executor.supervisor.stats["restarted"] == 4
+            print("✅ Crash after healthy calls restarts immediately (no accumulated backoff)")
+
+            executor.execute(crash, {})
+            executor.execute(crash, {})
+            assert "restarting in" in executor.execute(stats, {})["error"]
+            assert executor.supervisor._failures["mock"][0] == 2
+            print("✅ Consecutive crashes still back off")
+        finally:
+            executor.close()
+
+
+def test_leased_session_not_reaped():
+    """租用中的会话不会被空闲回收或 LRU 关闭"""
+    print("=" * 60)
+    print("Testing leased sessions")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = MCPExecutor(os.path.join(tmp, "mcp"), max_servers=1, idle_timeout=0.01, check_interval=60)
+        add = mcp_tool_config("mock_add", "add")
+        try:
+            with executor._session(add) as session:
+                time.sleep(0.05)
+                executor.supervisor.check()
+                assert executor.supervisor._make_room() == []
+                assert session.call_tool("add", {"a": 1, "b": 2})["content"][0]["text"] == "3"
+            executor.supervisor.check()
+            assert executor.connections == {} and executor.supervisor.stats["reaped"] == 1
+            print("✅ Leased session survives idle reaping and LRU, reaped after release")
+        finally:
+            executor.close()
+
+
+def test_warm_servers_started_with_tool_pool():
+    """warm: true 的 MCP 服务在工具池加载时预先启动"""
+    print("=" * 60)
+    print("Testing warm MCP servers")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "tools.json")
+        with open(config, "w") as f:
+            params = {"a": {"type": "number", "required": True}, "b": {"type": "number", "required": True}}
+            json.dump({"mcp_tools": [dict(mcp_tool_config("mock_add", "add"), warm=True, params=params),
+                                     mcp_tool_config("cold_add", "add", server="cold")]}, f)
+
+        manager = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+        try:
+            assert _wait_for(lambda: "mcp" in manager.executors.loaded
+                             and "mock" in manager.mcp_executor.connections)
+            assert "cold" not in manager.mcp_executor.connections
+            print("✅ Warm server pre-spawned, cold server not started")
+
+            assert manager.get_tool_by_name("mock_add").invoke({"a": 1, "b": 2})["result"] == 3
+        finally:
+            if "mcp" in manager.executors.loaded:
+                manager.mcp_executor.close()
+
+
+if __name__ == "__main__":
+    print("\n🧪 MCP Supervisor Test\n")
+
+    test_capacity_and_idle_reaping()
+    test_restart_backoff_and_health_ping()
+    test_failures_reset_after_successful_call()
+    test_leased_session_not_reaped()
+    test_warm_servers_started_with_tool_pool()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,140 @@
+"""
+Test script for multi-tool planning: plan validation, reference resolution
+and concurrent DAG execution
+No network or API keys required
+"""
+
+import os
+import sys
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from planner import execute_plan, resolve_references, validate_plan
+
+
+class SleepyTool:
+    """模拟工具：固定延迟后回显参数"""
+
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+
+    def invoke(self, parameters):
+        time.sleep(self.delay)
+        if parameters.get("fail"):
+            return {"success": False, "result": None, "error": "boom"}
+        return {"success": True, "result": {"echo": parameters, "items": [{"name": self.name}]}, "error": None}
+
+
+class StubManager:
+    def __init__(self, delay):
+        self.tools = {name: SleepyTool(name, delay) for name in ("a", "b", "c")}
+
+    def get_tool_by_name(self, name):
+        return self.tools.get(name)
+
+
+def test_validate_plan():
+    """环、未知依赖和格式错误的步骤被拒绝（ValueError）"""
+    print("=" * 60)
+    print("Testing plan validation")
+    print("=" * 60)
+
+    order = validate_plan({"steps": [
+        {"id": "s2", "tool_name": "a", "depends_on": ["s1"]},
+        {"id": "s1", "tool_name": "a"},
+    ]})
+    assert order == ["s1", "s2"], order
+
+    for bad in (
+        {"steps": [{"id": "s1", "tool_name": "a", "depends_on": ["s2"]},
+                   {"id": "s2", "tool_name": "a", "depends_on": ["s1"]}]},
+        {"steps": [{"id": "s1", "tool_name": "a", "depends_on": ["missing"]}]},
+        {"steps": [{"tool_name": "a"}]},
+        {"steps": [{"id": "s1"}]},
+        {"steps": ["s1"]},
+        {"steps": [{"id": ["s1"], "tool_name": "a"}]},
+        {"steps": {"s1": {"tool_name": "a"}}},
+        [{"id": "s1", "tool_name": "a"}],
+    ):
+        try:
+            validate_plan(bad)
+        except ValueError as e:
+            print(f"✅ Rejected: {e}")
+        else:
+            raise AssertionError("invalid plan accepted")
+
+
+def test_resolve_references():
+    """整值引用保留类型，嵌入引用按文本替换"""
+    print("\n" + "=" * 60)
+    print("Testing reference resolution")
+    print("=" * 60)
+
+    outputs = {"s1": {"success": True, "result": {"lat": 39.9, "items": [{"name": "x"}]}}}
+    resolved = resolve_references(
+        {"latitude": "{{s1.result.lat}}", "label": "at {{ s1.result.items.0.name }}!", "n": 3},
+        outputs,
+    )
+    assert resolved == {"latitude": 39.9, "label": "at x!", "n": 3}, resolved
+    print(f"✅ {resolved}")
+
+
+def test_parallel_execution_follows_critical_path():
+    """独立步骤并发执行，耗时约等于关键路径长度"""
+    print("\n" + "=" * 60)
+    print("Testing concurrent DAG execution")
+    print("=" * 60)
+
+    delay = 0.2
+    plan = {"steps": [
+        {"id": "s1", "tool_name": "a", "parameters": {"city": "Beijing"}},
+        {"id": "s2", "tool_name": "b", "parameters": {"city": "Tokyo"}},
+        {"id": "s3", "tool_name": "c", "parameters": {"user": "x"}},
+        {"id": "s4", "tool_name": "a", "depends_on": ["s1", "s2"],
+         "parameters": {"from": "{{s1.result.echo.city}}", "to": "{{s2.result.echo.city}}"}},
+    ]}
+
+    start = time.perf_counter()
+    outputs = execute_plan(plan, StubManager(delay))
+    elapsed = time.perf_counter() - start
+
+    assert all(r["success"] for r in outputs.values()), outputs
+    assert outputs["s4"]["result"]["echo"] == {"from": "Beijing", "to": "Tokyo"}
+    # 关键路径 2 * delay，串行需要 4 * delay
+    assert elapsed < 3 * delay, elapsed
+    print(f"✅ 4 steps finished in {elapsed:.2f}s (serial would take {4 * delay:.1f}s)")
+
+
+def test_failed_upstream_skips_downstream():
+    """上游失败时下游被跳过，其他分支照常执行"""
+    print("\n" + "=" * 60)
+    print("Testing failure propagation")
+    print("=" * 60)
+
+    plan = {"steps": [
+        {"id": "s1", "tool_name": "a", "parameters": {"fail": True}},
+        {"id": "s2", "tool_name": "b", "depends_on": ["s1"], "parameters": {}},
+        {"id": "s3", "tool_name": "missing_tool", "parameters": {}},
+        {"id": "s4", "tool_name": "c", "parameters": {}},
+    ]}
+    outputs = execute_plan(plan, StubManager(0.01))
+
+    assert not outputs["s1"]["success"]
+    assert "upstream" in outputs["s2"]["error"]
+    assert "not found" in outputs["s3"]["error"]
+    assert outputs["s4"]["success"]
+    print("✅ Downstream skipped, independent branch succeeded")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Planner / DAG Executor Test\n")
+
+    test_validate_plan()
+    test_resolve_references()
+    test_parallel_execution_follows_critical_path()
+    test_failed_upstream_skips_downstream()
+
+    print("\n🎉 All tests passed!\n")
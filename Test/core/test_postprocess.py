@@ -0,0 +1,152 @@
+"""
+Test script for columnar post-processing of API tool results (postprocess)
+Uses the recorded fixtures and the local stand-in HTTP server, no network required
+"""
+
+import os
+import sys
+import json
+import copy
+import tempfile
+
+# 添加项目根目录到路径
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from executors import postprocess
+from executors.api_executor import APIExecutor
+from executors.postprocess import Postprocessor
+from mock_server import FIXTURES_DIR, MockToolServer, rewrite_tool_pool
+
+
+def _load(name: str):
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _tool_pool():
+    with open(os.path.join(ROOT, "urban_tools.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _weather_spec():
+    return next(tool for tool in _tool_pool()["api_tools"] if tool["name"] == "weather_forecast")["postprocess"]
+
+
+def _summaries(spec, response):
+    """NumPy 和 array 两种实现的摘要"""
+    results = []
+    backends = [postprocess.numpy, None] if postprocess.numpy is not None else [None]
+    saved = postprocess.numpy
+    try:
+        for backend in backends:
+            postprocess.numpy = backend
+            results.append(Postprocessor(spec).summarize(response))
+    finally:
+        postprocess.numpy = saved
+    return results
+
+
+def test_daily_summary():
+    """3 小时记录按本地日期统计、换算单位"""
+    print("=" * 60)
+    print("Testing daily summary of 3-hour forecasts")
+    print("=" * 60)
+
+    response = _load("weather_forecast")
+    summaries = _summaries(_weather_spec(), response)
+    assert all(summary == summaries[0] for summary in summaries)
+    summary = summaries[0]
+    print(f"✅ {len(summaries)} backend(s) agree{' (numpy not installed)' if len(summaries) == 1 else ''}")
+
+    assert summary["cnt"] == 10 and summary["city"]["name"] == "London" and "list" not in summary
+    assert summary["period"] == {"start": "2025-11-07 12:00", "end": "2025-11-08 15:00", "count": 10}
+    assert summary["units"]["wind"] == "km/h" and summary["units"]["temp"] == "°C"
+    first = summary["daily"][0]
+    assert [day["date"] for day in summary["daily"]] == ["2025-11-07", "2025-11-08"]
+    assert first["temp_min"] == 8.7 and first["temp_max"] == 11.8 and first["temp_mean"] == 10.25
+    assert first["rain_sum"] == 1.2 and first["wind_max"] == 11.16
+    assert first["conditions"] == ["broken clouds", "light rain"]
+    print(f"✅ {len(json.dumps(response))} bytes of records -> {len(json.dumps(summary))} bytes of summary")
+
+    shifted = copy.deepcopy(response)
+    shifted["city"]["timezone"] = 8 * 3600
+    summary = Postprocessor(_weather_spec()).summarize(shifted)
+    assert summary["period"]["start"] == "2025-11-07 20:00"
+    assert [day["date"] for day in summary["daily"]] == ["2025-11-07", "2025-11-08"]
+    assert summary["daily"][0]["temp_mean"] == 11.35  # 只有 20:00 和 23:00 两条
+    print("✅ Days follow the city's UTC offset")
+
+
+def test_units_and_missing_values():
+    """记录中的单位、缺失值和列格式的响应"""
+    print("=" * 60)
+    print("Testing units, missing values and columnar responses")
+    print("=" * 60)
+
+    response = _load("weather_forecast")
+    for record in response["list"]:
+        record["main"]["temprature"] += 273.15
+        record["main"]["temprature_unit"] = "K"
+    del response["list"][0]["rain"]
+    response["list"][1]["rain"]["amount"] = "n/a"
+    for summary in _summaries(_weather_spec(), response):
+        first = summary["daily"][0]
+        assert first["temp_min"] == 8.7 and first["rain_sum"] == 1.0
+    print("✅ Kelvin records converted; missing and non-numeric values ignored")
+
+    spec = {"columns": "daily", "time": "time", "fields": {"high": "temperature_2m_max", "rain": "precipitation_sum"},
+            "units": {"high": "°C"}, "convert": {"high": "°F"}, "daily": {"high": ["max"], "rain": ["sum"]}}
+    for summary in _summaries(spec, _load("weather_forecast_free")):
+        assert len(summary["daily"]) == 7
+        assert summary["daily"][0] == {"date": "2025-11-07", "high_max": 53.42, "rain_sum": 4.5}
+    print("✅ Column-oriented responses (Open-Meteo) supported")
+
+    for bad in ({"records": "list", "time": "dt"},
+                dict(spec, daily={"high": ["median"]}),
+                dict(spec, convert={"high": "km/h"})):
+        try:
+            Postprocessor(bad)
+            raise AssertionError(f"expected ValueError for {bad}")
+        except ValueError:
+            pass
+    print("✅ Invalid configurations rejected")
+
+
+def test_api_executor():
+    """APIExecutor 返回并缓存摘要，格式不符时返回原始响应"""
+    print("=" * 60)
+    print("Testing postprocess in APIExecutor")
+    print("=" * 60)
+
+    with MockToolServer() as server, tempfile.TemporaryDirectory() as tmp:
+        tools = {tool["name"]: tool for tool in rewrite_tool_pool(_tool_pool(), server.base_url)["api_tools"]}
+        executor = APIExecutor(tools_dir=tmp)
+        weather = tools["weather_forecast"]
+
+        result = executor.execute(weather, {"place": "London,GB"})
+        assert result["success"] and result["result"]["daily"][0]["date"] == "2025-11-07"
+        cached = executor.execute(weather, {"place": "London,GB"})
+        assert cached["from_cache"] and cached["result"] == result["result"]
+        print("✅ Summary returned and cached")
+
+        raw = dict(weather, postprocess=None)
+        assert "list" in executor.execute(raw, {"place": "London,GB"})["result"] and server.requests == 2
+        print("✅ Tools without postprocess use their own cache entries")
+
+        github = dict(tools["github_user_info"], postprocess=weather["postprocess"])
+        for _ in range(2):
+            result = executor.execute(github, {"username": "torvalds"})
+            assert result["success"] and "daily" not in result["result"] and "from_cache" not in result
+        print("✅ Unexpected payloads returned raw and not cached")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Postprocess Test\n")
+
+    test_daily_summary()
+    test_units_and_missing_values()
+    test_api_executor()
+
+    print("\n🎉 All tests passed!\n")
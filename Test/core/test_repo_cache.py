@@ -0,0 +1,268 @@
+"""
+Test script for the content-addressed repository cache used by CodeExecutor
+Uses local bare git repositories (file:// URLs), no network required
+"""
+
+import os
+import sys
+import tempfile
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from executors.code_executor import CodeExecutor
+from executors.repo_cache import RepoCache, RepoError
+
+GEO_MODULE = '''
+import math
+
+
+def distance(lat1, lon1, lat2, lon2):
+    print("computing distance")  # 不应混入结果
+    dlat, dlon = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return round(6371 * 2 * math.asin(math.sqrt(a)), 1)
+
+
+def broken():
+    raise ValueError("bad input")
+'''
+
+
+def git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class OriginRepo:
+    """本地裸仓库 + 用于提交的工作区"""
+
+    def __init__(self, root: Path):
+        self.bare = root / "origin.git"
+        self.work = root / "work"
+        git("init", "--quiet", "--bare", "--initial-branch=main", str(self.bare))
+        git("config", "uploadpack.allowFilter", "true", cwd=self.bare)
+        git("clone", "--quiet", str(self.bare), str(self.work))
+        for key, value in (("user.name", "test"), ("user.email", "test@example.com")):
+            git("config", key, value, cwd=self.work)
+        self.url = self.bare.resolve().as_uri()
+
+    def commit(self, files: dict, message: str = "update") -> str:
+        for name, content in files.items():
+            path = self.work / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content if isinstance(content, bytes) else content.encode())
+        git("add", "-A", cwd=self.work)
+        git("commit", "--quiet", "-m", message, cwd=self.work)
+        git("push", "--quiet", "origin", "HEAD:main", cwd=self.work)
+        return git("rev-parse", "HEAD", cwd=self.work)
+
+
+def test_content_addressed_checkouts():
+    """同一提交只获取一次并被共享，分支移动时增量获取"""
+    print("=" * 60)
+    print("Testing content-addressed checkouts")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        origin = OriginRepo(Path(tmp))
+        first = origin.commit({"tools/geo.py": GEO_MODULE, "README.md": "geo tools\n"})
+        cache = RepoCache(os.path.join(tmp, "cache"), ref_ttl=0)
+
+        tree = cache.checkout(origin.url, "main")
+        assert tree.name == first and (tree / "tools" / "geo.py").read_text() == GEO_MODULE
+        assert cache.checkout(origin.url, first) == tree
+        assert cache.checkout(origin.url) == tree
+        assert cache.stats["fetches"] == 1 and cache.stats["checkouts"] == 1 and cache.stats["hits"] == 2
+        print("✅ Branch, SHA and HEAD share one fetch and one checkout")
+
+        second = origin.commit({"tools/extra.py": "VALUE = 1\n"})
+        assert cache.checkout(origin.url, "main") == tree  # 解析结果过期：先返回旧检出，后台刷新
+        cache.wait_refreshes()
+        moved = cache.checkout(origin.url, "main")
+        assert moved.name == second and (moved / "tools" / "extra.py").exists()
+        assert (tree / "tools" / "geo.py").exists() and not (tree / "tools" / "extra.py").exists()
+        assert cache.stats["fetches"] == 2 and len(list(cache.mirrors_dir.glob("*.git"))) == 1
+        print("✅ Moved branch fetched incrementally into the same mirror")
+
+        origin.bare.rename(origin.bare.with_name("offline.git"))
+        cache.ref_ttl = 0
+        assert cache.checkout(origin.url, "main") == moved
+        cache.wait_refreshes()
+        assert cache.checkout(origin.url, "main") == moved and cache.resolve(origin.url, "main") == second
+        assert cache.stats["ref_refresh_failures"] >= 2
+        origin.bare.with_name("offline.git").rename(origin.bare)
+        print("✅ Unreachable remote: last resolved commit keeps being served")
+
+        try:
+            cache.checkout(origin.url, "no-such-branch")
+            assert False, "missing ref should fail"
+        except RepoError as e:
+            assert "not found" in str(e)
+        print("✅ Unknown refs raise RepoError")
+
+
+def test_sparse_and_coalescing():
+    """sparse 检出只下载需要的 blob，并发请求只获取一次"""
+    print("=" * 60)
+    print("Testing sparse checkouts and coalescing")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        origin = OriginRepo(Path(tmp))
+        origin.commit({"tools/geo.py": GEO_MODULE, "data/big.bin": os.urandom(512 * 1024)})
+        cache = RepoCache(os.path.join(tmp, "cache"))
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            trees = list(pool.map(lambda _: cache.checkout(origin.url, "main", ["tools"]), range(8)))
+        assert len(set(trees)) == 1
+        assert cache.stats["fetches"] == 1 and cache.stats["checkouts"] == 1
+        assert cache.stats["coalesced"] + cache.stats["hits"] == 7
+        print(f"✅ 8 concurrent requests, 1 fetch ({cache.stats['coalesced']} coalesced)")
+
+        tree = trees[0]
+        assert (tree / "tools" / "geo.py").exists() and not (tree / "data").exists()
+        mirror = next(cache.mirrors_dir.glob("*.git"))
+        pack_bytes = sum(f.stat().st_size for f in mirror.rglob("*.pack"))
+        assert pack_bytes < 64 * 1024, pack_bytes
+        print(f"✅ Sparse checkout skipped the 512 KB blob ({pack_bytes} bytes in packs)")
+
+        full = cache.checkout(origin.url, "main")
+        assert full != tree and (full / "data" / "big.bin").stat().st_size == 512 * 1024
+        print("✅ Full checkout of the same commit fetches the remaining blobs")
+
+
+def test_lru_gc():
+    """超过磁盘上限时删除最久未用的检出，使用中的检出保留"""
+    print("=" * 60)
+    print("Testing LRU garbage collection")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        origin = OriginRepo(Path(tmp))
+        cache = RepoCache(os.path.join(tmp, "cache"), max_bytes=10 ** 9)
+        shas = [origin.commit({f"blob{i}.bin": os.urandom(100 * 1024)}) for i in range(3)]
+        trees = [cache.checkout(origin.url, sha) for sha in shas]
+
+        cache.checkout(origin.url, shas[0])  # 最近使用
+        cache.max_bytes = 900 * 1024
+        with cache.pinned(trees[1]):
+            removed = cache.gc()
+        assert removed == [trees[2]] and trees[0].exists() and trees[1].exists()
+        print("✅ Least recently used unpinned checkout evicted")
+
+        cache.max_bytes = 1
+        cache.gc()
+        assert not any(tree.exists() for tree in trees) and not list(cache.mirrors_dir.glob("*.git"))
+        assert cache.checkout(origin.url, shas[2]).exists()
+        print("✅ Unreferenced mirrors removed; evicted commits are fetched again on demand")
+
+
+def test_pinned_checkout_survives_other_repos():
+    """checkout(pin=True) 返回的检出不会被其他仓库的检出触发的 gc 删除"""
+    print("=" * 60)
+    print("Testing pinned checkouts across repositories")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        origins = []
+        for name in ("a", "b"):
+            (Path(tmp) / name).mkdir()
+            origins.append(OriginRepo(Path(tmp) / name))
+        a, b = origins
+        a.commit({"blob.bin": os.urandom(64 * 1024)})
+        b_shas = [b.commit({f"blob{i}.bin": os.urandom(64 * 1024)}) for i in range(2)]
+        cache = RepoCache(os.path.join(tmp, "cache"), max_bytes=1)
+
+        tree_a = cache.checkout(a.url, "main", pin=True)
+        cache.checkout(b.url, b_shas[0])
+        assert tree_a.exists()
+        cache.unpin(tree_a)
+        cache.checkout(b.url, b_shas[1])
+        assert not tree_a.exists()
+        print("✅ Pinned checkout kept while another repository is checked out; evicted once unpinned")
+
+        # 另一个线程的 gc 在检出完成与固定之间删除了它：重新检出后再返回
+        checkout, raced = cache._coalesced_checkout, []
+
+        def racing(*args):
+            path = checkout(*args)
+            if not raced:
+                raced.append(path)
+                cache.gc()
+            return path
+
+        cache._coalesced_checkout = racing
+        tree_a = cache.checkout(a.url, "main", pin=True)
+        assert raced == [tree_a] and tree_a.exists() and cache._pins[tree_a] == 1
+        cache.unpin(tree_a)
+        print("✅ Checkout removed before pinning is materialized again")
+
+        executor = CodeExecutor(os.path.join(tmp, "code"), max_bytes=1)
+        try:
+            for origin in origins:
+                origin.commit({"src/tools/geo.py": GEO_MODULE})
+            configs = [{"name": f"geo_{i}", "repo": origin.url, "ref": "main", "path": "src",
+                        "entry": "tools.geo:distance"} for i, origin in enumerate(origins)]
+            arguments = {"lat1": 0, "lon1": 0, "lat2": 0, "lon2": 1}
+            for config in configs + configs:
+                assert executor.execute(config, arguments)["result"] == 111.2
+            assert all(pool.root.exists() for pool in executor.pools.values())
+            assert sorted(executor.repos._pins.values()) == [1, 1]
+            print("✅ Each worker pool holds exactly one pin on its checkout")
+        finally:
+            executor.close()
+
+
+def test_code_executor():
+    """CodeExecutor 检出仓库并调用入口函数"""
+    print("=" * 60)
+    print("Testing CodeExecutor")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        origin = OriginRepo(Path(tmp))
+        origin.commit({"src/tools/__init__.py": "", "src/tools/geo.py": GEO_MODULE})
+        executor = CodeExecutor(os.path.join(tmp, "code"), workers=1, ref_ttl=0)
+        config = {"name": "geo_distance", "description": "Great-circle distance", "repo": origin.url,
+                  "ref": "main", "sparse": ["src"], "path": "src", "entry": "tools.geo:distance"}
+
+        executor.prefetch(config)
+        result = executor.execute(config, {"lat1": 39.9, "lon1": 116.4, "lat2": 31.2, "lon2": 121.5})
+        assert result == {"success": True, "result": 1071.3, "error": None}, result
+        assert executor.repos.stats["fetches"] == 1
+        print("✅ Entry function called with keyword arguments")
+
+        pool = executor.pools["geo_distance"]
+        for _ in range(3):
+            executor.execute(config, {"lat1": 0, "lon1": 0, "lat2": 0, "lon2": 1})
+        assert pool.stats["started"] == 1 and pool.stats["calls"] == 4
+        origin.commit({"src/tools/geo.py": GEO_MODULE.replace("6371", "6378")})
+        stale = executor.execute(config, {"lat1": 0, "lon1": 0, "lat2": 0, "lon2": 1})
+        assert stale["result"] == 111.2 and executor.pools["geo_distance"] is pool
+        executor.repos.wait_refreshes()
+        moved = executor.execute(config, {"lat1": 0, "lon1": 0, "lat2": 0, "lon2": 1})
+        assert moved["result"] == 111.3 and executor.pools["geo_distance"] is not pool
+        assert pool.workers == 0 and len(executor.repos._pins) == 1
+        print("✅ Warm worker reused; moved branch refreshed in the background, then gets a new pool")
+
+        failed = executor.execute(dict(config, entry="tools.geo:broken"), {})
+        assert not failed["success"] and "ValueError: bad input" in failed["error"]
+        missing = executor.execute(dict(config, repo=Path(tmp, "missing.git").as_uri()), {})
+        assert not missing["success"] and "checkout failed" in missing["error"]
+        executor.close()
+        print("✅ Tool exceptions and missing repositories reported as errors")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Repository Cache Test\n")
+
+    test_content_addressed_checkouts()
+    test_sparse_and_coalescing()
+    test_lru_gc()
+    test_pinned_checkout_survives_other_repos()
+    test_code_executor()
+
+    print("\n🎉 All tests passed!\n")
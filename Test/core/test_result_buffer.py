@@ -0,0 +1,161 @@
+"""
+Test script for out-of-band transport of large tool results (shared memory / mmap)
+Uses a temporary module directory and the local stand-in MCP server, no network required
+"""
+
+import os
+import sys
+import json
+import array
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "bench"))
+
+from executors.code_pool import WorkerPool
+from executors.mcp_executor import MCPExecutor
+from executors.result_buffer import ResultBuffer, open_buffer, transport_dir, remove_transport_dir
+from mock_mcp_server import mcp_tool_config
+
+RASTER_MODULE = '''
+import array
+
+
+def raster(rows, cols):
+    """A rows x cols float grid plus small metadata"""
+    grid = array.array("d", range(rows * cols))
+    return {"grid": memoryview(grid).cast("B").cast("d", [rows, cols]), "bbox": array.array("f", [1, 2, 3, 4]),
+            "tag": b"raw", "cells": rows * cols}
+
+
+def noisy(rows):
+    return {"grid": array.array("d", range(rows)), "log": "x" * 5000}
+'''
+
+
+def test_result_buffer():
+    """映射、描述信息和校验"""
+    print("=" * 60)
+    print("Testing ResultBuffer")
+    print("=" * 60)
+
+    directory = transport_dir("test")
+    try:
+        path = directory / "grid.bin"
+        with open(path, "wb") as f:
+            array.array("d", range(12)).tofile(f)
+
+        buffer = open_buffer(directory, "grid.bin", "d", [3, 4])
+        assert not path.exists()
+        assert buffer.memoryview()[2, 3] == 11.0 and buffer.tolist()[1] == [4.0, 5.0, 6.0, 7.0]
+        assert json.loads(json.dumps(buffer)) == {"type": "buffer", "format": "d", "shape": [3, 4], "nbytes": 96}
+        print("✅ File mapped and unlinked; serializes as a descriptor")
+
+        view = buffer.memoryview()
+        del buffer
+        assert view[0, 1] == 1.0
+        print("✅ Exported views outlive the handle")
+
+        with open(path, "wb") as f:
+            f.write(b"x" * 10)
+        try:
+            ResultBuffer(path, "d")
+            raise AssertionError("expected ValueError")
+        except ValueError:
+            pass
+        for name in ("../grid.bin", ".hidden", ""):
+            try:
+                open_buffer(directory, name)
+                raise AssertionError("expected ValueError")
+            except ValueError:
+                pass
+        print("✅ Size mismatches and paths outside the transport directory rejected")
+
+        try:
+            import numpy
+        except ImportError:
+            print("⏭️  numpy not installed, skipping array interface check")
+        else:
+            with open(path, "wb") as f:
+                array.array("d", range(6)).tofile(f)
+            grid = numpy.asarray(ResultBuffer(path, "d", [2, 3]))
+            assert grid.shape == (2, 3) and grid[1, 2] == 5.0 and not grid.flags.writeable
+            print("✅ numpy.asarray gives a read-only zero-copy array")
+    finally:
+        remove_transport_dir(directory)
+    assert not directory.exists()
+
+
+def test_code_tool_buffers():
+    """代码工具的大数组经共享内存传输"""
+    print("=" * 60)
+    print("Testing code tool result buffers")
+    print("=" * 60)
+
+    directory = transport_dir("test")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            Path(tmp, "raster.py").write_text(RASTER_MODULE)
+            pool = WorkerPool(Path(tmp), "raster:raster", size=1, result_dir=directory, inline_bytes=1024)
+            try:
+                result = pool.call({"rows": 300, "cols": 400})["result"]
+                grid = result["grid"]
+                assert isinstance(grid, ResultBuffer) and grid["shape"] == [300, 400] and grid.nbytes == 960000
+                assert grid.memoryview()[299, 399] == 119999.0
+                assert result["bbox"] == [1.0, 2.0, 3.0, 4.0] and result["tag"] == "b'raw'"
+                assert pool.stats["buffers"] == 1 and list(directory.iterdir()) == []
+                print("✅ Large array mapped from shared memory; small ones inlined")
+
+                payload = json.dumps(result)
+                assert len(payload) < 500
+                print(f"✅ Result serializes to {len(payload)} bytes instead of ~2 MB of JSON")
+            finally:
+                pool.close()
+
+            pool = WorkerPool(Path(tmp), "raster:noisy", size=1, limits={"max_output_bytes": 1000},
+                              result_dir=directory, inline_bytes=1024)
+            try:
+                response = pool.call({"rows": 10000})
+                assert response["limit"] == "output" and list(directory.iterdir()) == []
+                print("✅ Buffers of a rejected result removed")
+            finally:
+                pool.close()
+    finally:
+        remove_transport_dir(directory)
+
+
+def test_mcp_buffers():
+    """本地 MCP 服务通过传输目录返回大数组"""
+    print("=" * 60)
+    print("Testing MCP result buffers")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = MCPExecutor(os.path.join(tmp, "mcp"))
+        try:
+            config = dict(mcp_tool_config("mock_grid", "grid"), cache_ttl=60)
+            result = executor.execute(config, {"rows": 200, "cols": 50})
+            grid = result["result"]
+            assert result["success"] and isinstance(grid, ResultBuffer)
+            assert grid["shape"] == [200, 50] and grid.memoryview()[199, 49] == 9999.0
+            assert list(executor.result_dir.iterdir()) == []
+            print("✅ file:// resource in the transport directory mapped as a ResultBuffer")
+
+            again = executor.execute(config, {"rows": 200, "cols": 50})
+            assert "from_cache" not in again and isinstance(again["result"], ResultBuffer)
+            print("✅ Results holding buffers are not cached")
+        finally:
+            executor.close()
+        assert not executor.result_dir.exists()
+
+
+if __name__ == "__main__":
+    print("\n🧪 Result Buffer Test\n")
+
+    test_result_buffer()
+    test_code_tool_buffers()
+    test_mcp_buffers()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,160 @@
+"""
+Test script for the HTTP service mode: query/batch/stream endpoints,
+concurrency limit and graceful shutdown
+No network or API keys required (uses a stub pipeline)
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import threading
+import http.client
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from server import UrbanServer
+
+
+class StubPipeline:
+    """模拟查询流水线，记录最大并发数"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, item, on_event=None):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            if on_event:
+                on_event("selection", {"tool_name": "stub_tool", "parameters": {}})
+            time.sleep(item.get("delay", self.delay))
+            if item["query"] == "boom":
+                raise RuntimeError("pipeline failed")
+            if on_event:
+                on_event("final_answer", f"answer to {item['query']}")
+            return {"query": item["query"], "tool_used": "stub_tool", "final_answer": f"answer to {item['query']}"}
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def _start(pipeline, concurrency=2):
+    """在后台线程的事件循环中启动服务"""
+    server = UrbanServer(pipeline, port=0, concurrency=concurrency)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_until_complete(server._stopping.wait())
+        loop.run_until_complete(server.shutdown(grace=5))
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait(5)
+    return server, loop, thread
+
+
+def _request(port, method, path, payload=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    body = json.dumps(payload) if payload is not None else None
+    conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = response.read().decode()
+    conn.close()
+    return response.status, data
+
+
+def _raw_request(port, content_length):
+    """发送带任意 Content-Length 头的原始请求，返回 (状态码, 响应体)"""
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as sock:
+        sock.sendall(f"POST /query HTTP/1.1\r\nHost: x\r\nContent-Length: {content_length}\r\n\r\n".encode())
+        response = b""
+        while chunk := sock.recv(65536):
+            response += chunk
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), body.decode()
+
+
+def test_endpoints():
+    """query / batch / stream / health"""
+    print("=" * 60)
+    print("Testing service endpoints")
+    print("=" * 60)
+
+    pipeline = StubPipeline()
+    server, loop, thread = _start(pipeline, concurrency=2)
+    try:
+        status, data = _request(server.port, "GET", "/health")
+        assert status == 200 and json.loads(data)["status"] == "ok"
+
+        status, data = _request(server.port, "POST", "/query", {"query": "hello"})
+        assert status == 200 and json.loads(data)["final_answer"] == "answer to hello", data
+        print("✅ /query")
+
+        status, data = _request(server.port, "POST", "/query", {"nope": 1})
+        assert status == 400
+
+        for content_length in ("abc", "-5"):
+            status, data = _raw_request(server.port, content_length)
+            assert status == 400 and "Invalid Content-Length" in data, (status, data)
+        print("✅ Non-numeric and negative Content-Length rejected with 400")
+
+        status, data = _request(server.port, "POST", "/batch", {"queries": ["a", "b", "boom", {"query": "c"}, "d"]})
+        results = json.loads(data)["results"]
+        assert [r["status"] for r in results] == ["ok", "ok", "error", "ok", "ok"], results
+        assert pipeline.peak <= 2, pipeline.peak
+        print(f"✅ /batch (peak concurrency {pipeline.peak})")
+
+        status, data = _request(server.port, "POST", "/stream", {"query": "hi"})
+        events = [json.loads(line)["event"] for line in data.splitlines()]
+        assert events == ["selection", "final_answer", "result"], events
+        print(f"✅ /stream events: {events}")
+    finally:
+        loop.call_soon_threadsafe(server.request_shutdown)
+        thread.join(10)
+
+
+def test_graceful_shutdown():
+    """关闭时等待进行中的请求完成"""
+    print("\n" + "=" * 60)
+    print("Testing graceful shutdown")
+    print("=" * 60)
+
+    server, loop, thread = _start(StubPipeline(), concurrency=2)
+    outcome = {}
+
+    def slow_client():
+        outcome["response"] = _request(server.port, "POST", "/query", {"query": "slow", "delay": 0.5})
+
+    client = threading.Thread(target=slow_client)
+    client.start()
+    time.sleep(0.1)
+    loop.call_soon_threadsafe(server.request_shutdown)
+    client.join(10)
+    thread.join(10)
+
+    status, data = outcome["response"]
+    assert status == 200 and json.loads(data)["query"] == "slow"
+    assert not thread.is_alive()
+    print("✅ In-flight request completed before the server stopped")
+
+
+if __name__ == "__main__":
+    print("\n🧪 HTTP Service Test\n")
+
+    test_endpoints()
+    test_graceful_shutdown()
+
+    print("\n🎉 All tests passed!\n")
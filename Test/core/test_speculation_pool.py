@@ -0,0 +1,58 @@
+"""
+Test script for the speculative-execution and cache-prefetch thread pools in main.py
+No network or API keys required
+"""
+
+import os
+import sys
+import time
+import threading
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import main
+
+
+def test_pool_sized_by_concurrency():
+    """推测执行线程池随查询并发数调整，预取使用独立的线程池"""
+    print("=" * 60)
+    print("Testing speculative pool sizing")
+    print("=" * 60)
+
+    previous = main._speculative_pool
+    try:
+        main.set_concurrency(8)
+        pool = main._speculative_pool
+        assert pool is not previous and pool._max_workers == 8
+        assert main._prefetch_pool is not pool
+
+        # 8 个查询同时推测执行，互不排队
+        start = time.perf_counter()
+        futures = [pool.submit(time.sleep, 0.2) for _ in range(8)]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.35, f"8 speculative calls took {elapsed:.2f}s"
+        print(f"✅ 8 concurrent speculative calls finished in {elapsed:.2f}s")
+
+        # 预取堵塞时推测执行不受影响
+        blocked = threading.Event()
+        prefetches = [main._prefetch_pool.submit(blocked.wait, 5) for _ in range(4)]
+        try:
+            assert pool.submit(lambda: "tool result").result(timeout=1) == "tool result"
+        finally:
+            blocked.set()
+            for future in prefetches:
+                future.result()
+        print("✅ Slow prefetches do not delay speculative tool calls")
+    finally:
+        main.set_concurrency(4)
+
+
+if __name__ == "__main__":
+    print("\n🧪 Speculation Pool Test\n")
+
+    test_pool_sized_by_concurrency()
+
+    print("\n🎉 All tests passed!\n")
@@ -0,0 +1,194 @@
+"""
+Test script for the name-indexed tool registry and hot reload
+No network or API keys required
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from tool_manager import UrbanToolManager
+
+
+def _api_tool(name, description="demo tool", **params):
+    return {
+        "name": name,
+        "description": description,
+        "endpoint": f"http://127.0.0.1:9/{name}",
+        "method": "GET",
+        "params": params or {"q": {"type": "string", "required": True}},
+    }
+
+
+def _write(path, api_tools):
+    with open(path, "w") as f:
+        json.dump({"mcp_tools": [], "api_tools": api_tools, "code_tools": []}, f)
+
+
+def test_lookup_and_reload_diff():
+    """按名称查找；重载只重建新增或变化的工具"""
+    print("=" * 60)
+    print("Testing registry lookup and reload diff")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "tools.json")
+        _write(config, [_api_tool("a"), _api_tool("b"), _api_tool("c")])
+        manager = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+
+        before = manager.snapshot()
+        assert before.built_tools == {}
+        tool_a = manager.get_tool_by_name("a")
+        tool_b = manager.get_tool_by_name("b")
+        assert tool_a is before.get_tool_by_name("a") and set(before.built_tools) == {"a", "b"}
+        assert manager.get_tool_by_name("missing") is None
+
+        _write(config, [_api_tool("a"), _api_tool("b", "changed description"), _api_tool("d")])
+        diff = manager.reload()
+        assert diff == {"added": ["d"], "removed": ["c"], "changed": ["b"], "unchanged": ["a"]}, diff
+
+        after = manager.snapshot()
+        assert set(after.built_tools) == {"a"}
+        assert after.get_tool_by_name("a") is tool_a
+        assert after.get_tool_by_name("b") is not tool_b
+        assert "changed description" in manager.get_tools_description()
+
+        # 旧快照保持不变（进行中的查询仍然看到旧工具集）
+        assert before.get_tool_by_name("c") is not None and before.get_tool_by_name("d") is None
+        assert manager.reload()["unchanged"] == ["a", "b", "d"]
+        assert manager.snapshot() is after
+        print(f"✅ Reload diff: {diff}")
+
+
+def test_invalid_config_keeps_snapshot():
+    """无效配置（重名）不会替换当前快照"""
+    print("\n" + "=" * 60)
+    print("Testing invalid reload")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "tools.json")
+        _write(config, [_api_tool("a")])
+        manager = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+        current = manager.snapshot()
+
+        _write(config, [_api_tool("a"), _api_tool("a")])
+        try:
+            manager.reload()
+            raise AssertionError("duplicate names should be rejected")
+        except ValueError as e:
+            assert "Duplicate" in str(e)
+        assert manager.snapshot() is current
+        print("✅ Invalid configuration rejected, snapshot kept")
+
+
+def test_lazy_build_and_shared_schemas():
+    """工具在首次访问时构建；相同参数定义共享同一个 schema 模型"""
+    print("\n" + "=" * 60)
+    print("Testing lazy materialization")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "tools.json")
+        tools = [_api_tool(f"tool_{i}") for i in range(50)]
+        tools.append(_api_tool("other", n={"type": "integer", "default": 3}))
+        _write(config, tools)
+        manager = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+
+        registry = manager.snapshot()
+        assert len(registry) == 51 and registry.built_tools == {}
+        assert "tool_49" in manager.get_tools_description() and registry.built_tools == {}
+
+        first, second = manager.get_tool_by_name("tool_0"), manager.get_tool_by_name("tool_1")
+        other = manager.get_tool_by_name("other")
+        assert first.args_schema is second.args_schema
+        assert other.args_schema is not first.args_schema
+        assert other.invoke({}) is not None  # 默认值来自 schema
+        assert set(registry.built_tools) == {"tool_0", "tool_1", "other"}
+        assert len(manager.get_tools()) == 51 and len(manager._schema_cache) == 2
+        print("✅ Tools built on demand with 2 shared schemas")
+
+
+def test_watch():
+    """后台监听文件修改并自动重载"""
+    print("\n" + "=" * 60)
+    print("Testing watch mode")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "tools.json")
+        _write(config, [_api_tool("a")])
+        manager = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+
+        reloaded = threading.Event()
+        diffs = []
+        manager.watch(interval=0.02, on_reload=lambda diff, error: (diffs.append(diff), reloaded.set()))
+        try:
+            _write(config, [_api_tool("a"), _api_tool("b")])
+            # 保证 mtime 变化（部分文件系统精度较低）
+            os.utime(config, (time.time() + 5, time.time() + 5))
+            assert reloaded.wait(5), "watcher did not reload"
+        finally:
+            manager.stop_watching()
+
+        assert diffs[0]["added"] == ["b"] and manager.get_tool_by_name("b") is not None
+        print("✅ Watcher picked up the new tool")
+
+
+def test_watch_survives_errors():
+    """条目类型错误或回调抛出异常时，监听线程继续工作"""
+    print("\n" + "=" * 60)
+    print("Testing watch mode error handling")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "tools.json")
+        _write(config, [_api_tool("a")])
+        manager = UrbanToolManager(config, cache_root=os.path.join(tmp, "cache"))
+
+        events = []
+        changed = threading.Condition()
+
+        def on_reload(diff, error):
+            with changed:
+                events.append((diff, error))
+                changed.notify_all()
+            raise RuntimeError("callback failed")
+
+        def rewrite(api_tools, offset):
+            _write(config, api_tools)
+            os.utime(config, (time.time() + offset, time.time() + offset))
+            with changed:
+                count = len(events)
+                assert changed.wait_for(lambda: len(events) > count, 5), "watcher stopped"
+            return events[-1]
+
+        manager.watch(interval=0.02, on_reload=on_reload)
+        try:
+            diff, error = rewrite(["not a tool"], 5)
+            assert diff is None and isinstance(error, AttributeError)
+            assert manager.get_tool_by_name("a") is not None
+            diff, error = rewrite([_api_tool("a"), _api_tool("b")], 10)
+            assert error is None and diff["added"] == ["b"]
+            assert manager._watcher.is_alive()
+        finally:
+            manager.stop_watching()
+        print("✅ Watcher kept polling after a bad entry and a failing callback")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Tool Registry Test\n")
+
+    test_lookup_and_reload_diff()
+    test_invalid_config_keeps_snapshot()
+    test_lazy_build_and_shared_schemas()
+    test_watch()
+    test_watch_survives_errors()
+
+    print("\n🎉 All tests passed!\n")
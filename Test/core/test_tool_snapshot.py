@@ -0,0 +1,94 @@
+"""
+Test script for precompiled tool-pool snapshots
+No network or API keys required
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import tool_snapshot
+from tool_manager import UrbanToolManager
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+
+def _copy_pool(tmp):
+    config = os.path.join(tmp, "urban_tools.json")
+    with open(os.path.join(ROOT, "urban_tools.json"), "rb") as src, open(config, "wb") as dst:
+        dst.write(src.read())
+    return config
+
+
+def test_snapshot_matches_json():
+    """从快照加载的工具池与直接解析 JSON 的结果一致"""
+    print("=" * 60)
+    print("Testing snapshot load")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = _copy_pool(tmp)
+        cache_root = os.path.join(tmp, "cache")
+        path = tool_snapshot.compile_snapshot(config)
+        assert path.name == "urban_tools.snapshot"
+
+        fresh = UrbanToolManager(config, cache_root=cache_root, use_snapshot=False)
+        cached = UrbanToolManager(config, cache_root=cache_root)
+        assert cached.loaded_from_snapshot and not fresh.loaded_from_snapshot
+        assert cached.get_tools_description() == fresh.get_tools_description()
+        assert cached.list_tools() == fresh.list_tools()
+        assert [c["name"] for c in cached.api_tools] == [c["name"] for c in fresh.api_tools]
+
+        tool = cached.get_tool_by_name("github_user_info")
+        assert tool is not None and "username" in tool.args
+        assert cached.snapshot().search_tools("weather forecast")[:2] == fresh.snapshot().search_tools("weather forecast")[:2]
+        assert "github_user_info" in cached.snapshot().search_tools("github user")
+        print(f"✅ Snapshot ({path.stat().st_size} bytes) matches JSON")
+
+
+def test_stale_or_invalid_snapshot_falls_back():
+    """JSON 修改后快照失效；损坏或版本不符的快照被忽略"""
+    print("\n" + "=" * 60)
+    print("Testing stale snapshot fallback")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = _copy_pool(tmp)
+        cache_root = os.path.join(tmp, "cache")
+        snapshot = tool_snapshot.compile_snapshot(config)
+
+        with open(config) as f:
+            data = json.load(f)
+        data["api_tools"][0]["description"] = "Edited after compiling"
+        with open(config, "w") as f:
+            json.dump(data, f)
+
+        manager = UrbanToolManager(config, cache_root=cache_root)
+        assert not manager.loaded_from_snapshot
+        assert "Edited after compiling" in manager.get_tools_description()
+
+        # 重新编译后热重载也走快照
+        tool_snapshot.compile_snapshot(config)
+        assert manager.reload()["changed"] == [] and manager.loaded_from_snapshot
+
+        valid = snapshot.read_bytes()
+        snapshot.write_bytes(valid[:len(valid) // 2])
+        assert tool_snapshot.load_snapshot(config) is None
+        snapshot.write_bytes(b"URBANSNAP\x00\x63" + valid[11:])
+        assert tool_snapshot.load_snapshot(config) is None
+        snapshot.unlink()
+        assert UrbanToolManager(config, cache_root=cache_root).get_tool_by_name("weather_forecast") is not None
+        print("✅ Stale and invalid snapshots are ignored")
+
+
+if __name__ == "__main__":
+    print("\n🧪 Tool Snapshot Test\n")
+
+    test_snapshot_matches_json()
+    test_stale_or_invalid_snapshot_falls_back()
+
+    print("\n🎉 All tests passed!\n")
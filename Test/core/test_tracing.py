@@ -0,0 +1,144 @@
+"""
+Test script for per-stage latency tracing: spans across threads, JSONL
+export, Prometheus text output and APIExecutor instrumentation
+No network or API keys required (uses a local HTTP server)
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import tracing
+from executors import APIExecutor
+
+
+def test_spans_across_threads_and_export():
+    """线程池中的 span 记录到同一条 trace，并导出为 JSONL"""
+    print("=" * 60)
+    print("Testing spans and JSONL export")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_file = os.path.join(tmp, "traces.jsonl")
+        tracing.configure(trace_file=trace_file)
+        try:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                with tracing.trace("q") as t:
+                    with tracing.span("selection"):
+                        future = pool.submit(tracing.bind(_traced_tool), "demo_tool")
+                    future.result()
+        finally:
+            tracing.configure(trace_file="")
+
+        names = sorted(span.name for span in t.spans)
+        assert names == ["selection", "tool"], names
+        tool_span = next(span for span in t.spans if span.name == "tool")
+        assert tool_span.attrs == {"tool": "demo_tool", "from_cache": True}
+
+        timings = t.timings()
+        assert set(timings) == {"selection", "tool", "total"}, timings
+
+        with open(trace_file) as f:
+            exported = [json.loads(line) for line in f]
+        assert exported[0]["trace_id"] == t.trace_id and len(exported[0]["spans"]) == 2
+        print(f"✅ Trace exported with spans {names}")
+
+
+def _traced_tool(name):
+    with tracing.span("tool", tool=name) as span:
+        span.set(from_cache=True)
+
+
+def test_prometheus_quantiles():
+    """Prometheus 输出包含每个阶段/工具的 p50/p95/p99"""
+    print("\n" + "=" * 60)
+    print("Testing Prometheus export")
+    print("=" * 60)
+
+    registry = tracing.MetricsRegistry()
+    for ms in range(1, 101):
+        registry.observe("http_request", "weather", ms / 1000)
+    registry.inc("urban_cache_requests_total", tool="weather", result="hit")
+
+    q = registry.quantiles("http_request", "weather")
+    assert (q[0.5], q[0.95], q[0.99]) == (0.05, 0.095, 0.099), q
+
+    text = registry.to_prometheus()
+    assert 'urban_stage_latency_seconds{stage="http_request",tool="weather",quantile="0.99"} 0.099000' in text
+    assert 'urban_stage_latency_seconds_count{stage="http_request",tool="weather"} 100' in text
+    assert 'urban_cache_requests_total{result="hit",tool="weather"} 1' in text
+    print("✅ Quantiles and counters exported")
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """第一次请求返回 503，之后返回 JSON"""
+
+    calls = 0
+
+    def do_GET(self):
+        FlakyHandler.calls += 1
+        if FlakyHandler.calls == 1:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({"ok": True, "path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_api_executor_spans():
+    """APIExecutor 记录缓存查询、重试次数和接收字节数"""
+    print("\n" + "=" * 60)
+    print("Testing APIExecutor instrumentation")
+    print("=" * 60)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            executor = APIExecutor(tools_dir=tmp)
+            config = {
+                "name": "local_echo",
+                "endpoint": f"http://127.0.0.1:{server.server_port}/echo/{{item}}",
+                "method": "GET",
+                "retries": 2,
+                "params": {"item": {"type": "string", "required": True}},
+            }
+
+            with tracing.trace("api") as t:
+                first = executor.execute(config, {"item": "a"})
+                second = executor.execute(config, {"item": "a"})
+
+            assert first["success"] and second.get("from_cache"), (first, second)
+            spans = {}
+            for span in t.spans:
+                spans.setdefault(span.name, []).append(span.attrs)
+            assert [a["hit"] for a in spans["cache_lookup"]] == [False, True]
+            http = spans["http_request"][0]
+            assert http["retries"] == 1 and http["status"] == 200 and http["bytes"] > 0, http
+            print(f"✅ http_request span: {http}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    print("\n🧪 Tracing Test\n")
+
+    test_spans_across_threads_and_export()
+    test_prometheus_quantiles()
+    test_api_executor_spans()
+
+    print("\n🎉 All tests passed!\n")
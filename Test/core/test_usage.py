@@ -0,0 +1,112 @@
+"""
+Test script for LLM token and cost accounting
+No network or API keys required
+"""
+
+import os
+import sys
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+import usage
+
+
+def _message(prompt, completion, cached=0):
+    return AIMessage(content="x", usage_metadata={
+        "input_tokens": prompt,
+        "output_tokens": completion,
+        "total_tokens": prompt + completion,
+        "input_token_details": {"cache_read": cached},
+    })
+
+
+def test_cost_estimate():
+    """缓存部分的 prompt tokens 按折扣价计费"""
+    print("=" * 60)
+    print("Testing cost estimation")
+    print("=" * 60)
+
+    # gpt-4o: $2.50 / $1.25 cached / $10.00 per 1M tokens
+    cost = usage.estimate_cost("gpt-4o-2024-08-06", 1000, 100, cached_tokens=400)
+    assert abs(cost - (600 * 2.5 + 400 * 1.25 + 100 * 10) / 1e6) < 1e-12, cost
+    assert usage.estimate_cost("unknown-model", 10, 10) is None
+    print(f"✅ gpt-4o cost: ${cost:.6f}")
+
+
+def test_per_query_and_per_tool_aggregation():
+    """每个查询分阶段记录，ledger 按工具聚合"""
+    print("\n" + "=" * 60)
+    print("Testing aggregation")
+    print("=" * 60)
+
+    usage.ledger.reset()
+
+    for payload_tokens in (500, 1500):
+        with usage.collect() as query_usage:
+            usage.record("selection", _message(800, 30, cached=768), model="gpt-4o")
+            query_usage.tool = "weather_forecast"
+            usage.record("final_answer", _message(payload_tokens, 200), model="gpt-4o", payload_chars=payload_tokens * 4)
+        result = query_usage.to_dict()
+        assert set(result["stages"]) == {"selection", "final_answer"}
+        assert result["total"]["prompt_tokens"] == 800 + payload_tokens
+
+    # 流式调用：合并后的 chunk 带有完整用量
+    streamed = AIMessageChunk(content="a") + AIMessageChunk(content="b", usage_metadata={
+        "input_tokens": 50, "output_tokens": 5, "total_tokens": 55})
+    with usage.collect() as query_usage:
+        usage.record("selection", streamed, model="gpt-4o-mini")
+        query_usage.tool = "github_user_info"
+        query_usage.from_cache = True
+
+    summary = usage.ledger.summary()
+    weather = summary["by_tool"]["weather_forecast"]
+    assert weather["queries"] == 2
+    assert weather["avg_final_answer_prompt_tokens"] == 1000.0
+    assert weather["cached_prompt_tokens"] == 1536 and weather["cache_savings_usd"] > 0
+    assert summary["by_tool"]["github_user_info"]["tool_cache_hits"] == 1
+    assert summary["run"]["queries"] == 3
+    assert summary["run"]["prompt_tokens"] == 800 * 2 + 500 + 1500 + 50
+    usage.print_summary(summary)
+    usage.ledger.reset()
+    print("✅ Per-tool and per-run totals match")
+
+
+def test_plan_steps_attributed_per_tool():
+    """规划模式：用量按各步骤结果大小分摊到各自的工具，而不是拼接后的工具名"""
+    print("\n" + "=" * 60)
+    print("Testing per-step attribution in planning mode")
+    print("=" * 60)
+
+    usage.ledger.reset()
+
+    with usage.collect():
+        usage.record("planning", _message(1000, 100), model="gpt-4o")
+        usage.record_step("weather_forecast", 3000)
+        usage.record_step("air_quality", 1000, from_cache=True)
+        usage.record_step("weather_forecast", 0)
+        usage.record("final_answer", _message(2000, 200), model="gpt-4o", payload_chars=4000)
+
+    summary = usage.ledger.summary()
+    assert set(summary["by_tool"]) == {"weather_forecast", "air_quality"}, summary["by_tool"]
+    weather, air = summary["by_tool"]["weather_forecast"], summary["by_tool"]["air_quality"]
+    assert weather["queries"] == 1 and air["queries"] == 1 and summary["run"]["queries"] == 1
+    assert weather["payload_chars"] == 3000 and air["payload_chars"] == 1000
+    assert weather["final_answer_prompt_tokens"] == 1500 and air["final_answer_prompt_tokens"] == 500
+    assert weather["prompt_tokens"] + air["prompt_tokens"] == summary["run"]["prompt_tokens"] == 3000
+    assert abs(weather["cost_usd"] + air["cost_usd"] - summary["run"]["cost_usd"]) < 1e-9
+    assert air["tool_cache_hits"] == 1 and weather["tool_cache_hits"] == 0
+    usage.ledger.reset()
+    print("✅ Tokens, cost and payload size split across the plan's tools")
+
+
+if __name__ == "__main__":
+    print("\n🧪 LLM Usage Accounting Test\n")
+
+    test_cost_estimate()
+    test_per_query_and_per_tool_aggregation()
+    test_plan_steps_attributed_per_tool()
+
+    print("\n🎉 All tests passed!\n")
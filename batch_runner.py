@@ -0,0 +1,193 @@
+"""
+批量查询执行器
+
+1. 从 JSONL 文件或 stdin 逐行读取查询
+2. 有界线程池并发处理（在途任务数受限，内存不随批量大小增长）
+3. 每个结果完成即追加写入 JSONL，崩溃不会丢失已完成的结果
+4. 支持断点续跑：跳过输出文件中已成功完成的 id
+
+输入格式（每行一个）:
+    {"id": "q1", "query": "...", "plan": false}
+    {"query": "..."}                 # 无 id 时用查询文本的哈希
+"""
+
+import sys
+import json
+import math
+import time
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Set
+
+
+def query_id(item: Dict) -> str:
+    """获取查询 id（未提供时由查询文本生成，保证续跑时稳定）"""
+    if item.get("id") is not None:
+        return str(item["id"])
+    return hashlib.sha1(item["query"].encode("utf-8")).hexdigest()[:12]
+
+
+def read_queries(source: str) -> Iterator[Dict]:
+    """
+    逐行读取查询
+
+    Args:
+        source: JSONL 文件路径，"-" 表示 stdin
+
+    Yields:
+        {"id": ..., "query": ..., ...}
+    """
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️  Skipping invalid JSON on line {line_no}: {e}", file=sys.stderr)
+                continue
+            if isinstance(item, str):
+                item = {"query": item}
+            if "query" not in item:
+                print(f"⚠️  Skipping line {line_no}: missing 'query'", file=sys.stderr)
+                continue
+            item["id"] = query_id(item)
+            yield item
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def completed_ids(output_path: Path) -> Set[str]:
+    """读取输出文件中已成功完成的 id（失败的会在续跑时重试）"""
+    done = set()
+    if not output_path.exists():
+        return done
+
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 崩溃时可能留下半行
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def _percentile(values, pct: float) -> float:
+    """最近秩百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def run_batch(source: str, output: str, process_fn: Callable[[Dict], Dict],
+              workers: int = 4, drop_payloads: bool = False) -> Dict:
+    """
+    执行批量查询
+
+    Args:
+        source: 输入 JSONL 路径，"-" 表示 stdin
+        output: 输出 JSONL 路径（追加写入）
+        process_fn: 单个查询的处理函数 process_fn(item) -> result dict
+        workers: 并发 worker 数
+        drop_payloads: 是否丢弃原始工具返回（只保留 success/error 与最终答案）
+
+    Returns:
+        吞吐统计
+    """
+    output_path = Path(output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    skip = completed_ids(output_path)
+    if skip:
+        print(f"↩️  Resuming: {len(skip)} queries already completed in {output_path}", file=sys.stderr)
+
+    stats = {"ok": 0, "error": 0, "skipped": 0}
+    latencies = []
+    write_lock = threading.Lock()
+    # 在途任务上限：读取端不会把整个输入排进队列
+    slots = threading.BoundedSemaphore(workers * 2)
+
+    out = open(output_path, "a", encoding="utf-8")
+
+    def handle(item: Dict):
+        start = time.perf_counter()
+        try:
+            result = process_fn(item)
+            # 结果中的 id / status 字段不能覆盖续跑依赖的记录字段
+            record = {**result, "id": item["id"], "status": "ok"}
+            if drop_payloads:
+                record["tool_result"] = _strip_payload(record.get("tool_result"))
+        except Exception as e:
+            record = {"id": item["id"], "status": "error", "query": item["query"], "error": str(e)}
+        record["elapsed_s"] = round(time.perf_counter() - start, 3)
+
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with write_lock:
+            out.write(line + "\n")
+            out.flush()
+            stats[record["status"]] += 1
+            latencies.append(record["elapsed_s"])
+        status = "✅" if record["status"] == "ok" else "❌"
+        print(f"{status} [{item['id']}] {record['elapsed_s']:.2f}s", file=sys.stderr)
+
+    def release(_future):
+        slots.release()
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-worker") as pool:
+            for item in read_queries(source):
+                if item["id"] in skip:
+                    stats["skipped"] += 1
+                    continue
+                slots.acquire()
+                pool.submit(handle, item).add_done_callback(release)
+    finally:
+        out.close()
+
+    wall = time.perf_counter() - started
+    processed = stats["ok"] + stats["error"]
+    summary = {
+        **stats,
+        "processed": processed,
+        "wall_s": round(wall, 3),
+        "throughput_qps": round(processed / wall, 3) if wall > 0 else 0.0,
+        "latency_p50_s": _percentile(latencies, 50),
+        "latency_p95_s": _percentile(latencies, 95),
+        "latency_max_s": max(latencies) if latencies else 0.0,
+    }
+    return summary
+
+
+def _strip_payload(tool_result: Optional[Dict]) -> Optional[Dict]:
+    """只保留工具结果的状态字段"""
+    if not isinstance(tool_result, dict):
+        return tool_result
+    if "success" not in tool_result:
+        # 规划模式 {step_id: result}
+        return {k: _strip_payload(v) for k, v in tool_result.items()}
+    return {k: v for k, v in tool_result.items() if k != "result"}
+
+
+def print_summary(summary: Dict, output: str):
+    """打印吞吐统计"""
+    print(f"\n{'='*60}")
+    print("📊 Batch Summary")
+    print(f"{'='*60}")
+    print(f"  Processed: {summary['processed']} (✅ {summary['ok']}  ❌ {summary['error']}  ↩️  skipped {summary['skipped']})")
+    print(f"  Wall time: {summary['wall_s']:.2f}s")
+    print(f"  Throughput: {summary['throughput_qps']:.2f} queries/s")
+    print(f"  Latency: p50 {summary['latency_p50_s']:.2f}s, p95 {summary['latency_p95_s']:.2f}s, "
+          f"max {summary['latency_max_s']:.2f}s")
+    print(f"💾 Results appended to {output}")
+    print(f"{'='*60}\n")
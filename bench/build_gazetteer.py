@@ -0,0 +1,93 @@
+"""
+生成离线地名库的内置数据（executors/data/）
+
+数据来自 GeoNames（https://www.geonames.org/ ，CC BY 4.0），
+读取 geonamescache 包中打包的 cities15000.json 和 countries.json：
+
+    pip download --no-deps --no-binary :all: geonamescache
+    tar xzf geonamescache-*.tar.gz
+    python bench/build_gazetteer.py geonamescache-*/geonamescache/data
+
+每个城市保留名称、经纬度、国家代码、人口和时区；别名只保留中文名，
+以及人口 10 万以上城市的拉丁字母别名（如 Peking、Bombay），控制文件大小。
+别名以规范化后的形式（见 executors/gazetteer.py 的 fold）写入，加载时不必再处理。
+"""
+
+import re
+import sys
+import gzip
+import json
+import argparse
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from executors.gazetteer import fold
+
+OUTPUT_DIR = ROOT_DIR / "executors" / "data"
+
+ATTRIBUTION = "# GeoNames (https://www.geonames.org/), CC BY 4.0"
+
+# 只由汉字组成的别名，和首字母大写的拉丁字母别名（排除全大写的代码，如机场代码 BJS）
+HAN_NAME = re.compile(r"^[一-鿿]+$")
+LATIN_NAME = re.compile(r"^[A-Z][A-Za-z .'-]+$")
+LATIN_MIN_POPULATION = 100000
+
+
+def _aliases(city: dict) -> list:
+    """规范化后的别名（去掉与名称相同的）"""
+    aliases = []
+    for name in city.get("alternatenames", []):
+        if HAN_NAME.match(name):
+            aliases.append(name)
+        elif city["population"] >= LATIN_MIN_POPULATION and LATIN_NAME.match(name) and not name.isupper():
+            aliases.append(name)
+    keys = dict.fromkeys(fold(name) for name in aliases)
+    keys.pop(fold(city["name"]), None)
+    return [key for key in keys if key]
+
+
+def _clean(text: str) -> str:
+    return " ".join(text.replace("|", " ").split())
+
+
+def build(source_dir: Path, output_dir: Path = OUTPUT_DIR):
+    """
+    生成 cities.tsv.gz 和 countries.tsv
+
+    Args:
+        source_dir: geonamescache 的 data 目录
+        output_dir: 输出目录
+    """
+    with open(source_dir / "cities15000.json", encoding="utf-8") as f:
+        cities = sorted(json.load(f).values(), key=lambda city: city["geonameid"])
+    with open(source_dir / "countries.json", encoding="utf-8") as f:
+        countries = sorted(json.load(f).values(), key=lambda country: country["iso"])
+
+    lines = [ATTRIBUTION, "# name\tfolded aliases\tlatitude\tlongitude\tcountry\tpopulation\ttimezone"]
+    for city in cities:
+        lines.append("\t".join([
+            _clean(city["name"]), "|".join(_aliases(city)),
+            f"{city['latitude']:.4f}", f"{city['longitude']:.4f}", city["countrycode"],
+            str(city["population"]), city["timezone"] or "",
+        ]))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # mtime=0：相同输入生成相同的文件
+    (output_dir / "cities.tsv.gz").write_bytes(gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), 9, mtime=0))
+
+    lines = [ATTRIBUTION, "# code\tiso3\tname"]
+    lines += [f"{country['iso']}\t{country['iso3']}\t{country['name']}" for country in countries]
+    (output_dir / "countries.tsv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    print(f"✅ {len(cities)} cities and {len(countries)} countries written to {output_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the bundled gazetteer data from GeoNames")
+    parser.add_argument("source", type=Path, help="geonamescache data directory")
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    if not (args.source / "cities15000.json").exists():
+        sys.exit(f"❌ cities15000.json not found in {args.source}")
+    build(args.source, args.output)
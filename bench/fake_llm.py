@@ -0,0 +1,93 @@
+"""
+确定性的假聊天模型
+
+按 Prompt 类型返回脚本化的输出，并模拟首 token 延迟与逐 token 流式延迟：
+- 工具选择 Prompt -> selections[query] 的 JSON
+- 规划 Prompt     -> plans[query] 的 JSON
+- 其他（生成答案） -> 固定格式的答案文本
+
+返回带 usage_metadata（按 4 字符 ≈ 1 token 估算），可用于成本统计。
+"""
+
+import json
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeChatModel(BaseChatModel):
+    """脚本化的假模型，可配置延迟"""
+
+    selections: Dict[str, Dict[str, Any]] = {}
+    plans: Dict[str, Dict[str, Any]] = {}
+    first_token_latency_ms: float = 0.0
+    token_latency_ms: float = 0.0
+    chunk_chars: int = 8
+    model_name: str = "fake-chat"
+
+    @property
+    def _llm_type(self) -> str:
+        return "urban-fake-chat"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        system = next((m.content for m in messages if m.type == "system"), "")
+        query = next((m.content for m in reversed(messages) if m.type == "human"), "")
+
+        if "select the most suitable tool" in system:
+            selection = self.selections.get(query)
+            if selection is None:
+                raise ValueError(f"FakeChatModel has no scripted selection for query: {query!r}")
+            return json.dumps({
+                "tool_name": selection["tool_name"],
+                "parameters": selection.get("parameters", {}),
+                "reasoning": selection.get("reasoning", "Scripted selection for benchmarking."),
+            })
+
+        if "plan ALL tool calls" in system:
+            plan = self.plans.get(query)
+            if plan is None:
+                raise ValueError(f"FakeChatModel has no scripted plan for query: {query!r}")
+            return json.dumps(plan)
+
+        # 答案长度与输入相关，使 prompt 体积对延迟和 token 数都有影响
+        return f"Benchmark answer based on {len(query)} characters of tool output."
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> Dict[str, int]:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = max(1, len(text) // 4)
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self._respond(messages)
+        total_ms = self.first_token_latency_ms + self.token_latency_ms * max(1, len(text) // 4)
+        if total_ms:
+            time.sleep(total_ms / 1000)
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text),
+                            response_metadata={"model_name": self.model_name})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        text = self._respond(messages)
+        if self.first_token_latency_ms:
+            time.sleep(self.first_token_latency_ms / 1000)
+
+        for start in range(0, len(text), self.chunk_chars):
+            piece = text[start:start + self.chunk_chars]
+            if self.token_latency_ms:
+                # chunk_chars 个字符约等于 chunk_chars / 4 个 token
+                time.sleep(self.token_latency_ms * max(1, len(piece) // 4) / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=self._usage(messages, text),
+            response_metadata={"model_name": self.model_name}
+        ))
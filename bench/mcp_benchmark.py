@@ -0,0 +1,93 @@
+"""
+MCP 调用基准：每次调用启动新进程 vs 复用长驻会话
+
+使用本地替身服务器（bench/mock_mcp_server.py），--startup-ms 模拟 npx 的启动耗时。
+
+运行:
+    python bench/mcp_benchmark.py
+    python bench/mcp_benchmark.py --calls 50 --concurrency 10 --startup-ms 500 --latency-ms 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from executors.mcp_executor import MCPExecutor
+from mock_mcp_server import mcp_tool_config
+
+
+def run_mode(mode: str, calls: int, concurrency: int, startup_ms: float, latency_ms: float) -> Dict:
+    """
+    Args:
+        mode: "spawn"（每次调用新建执行器和进程）或 "pooled"（共享一个会话）
+    """
+    config = mcp_tool_config("mock_add", "add", latency_ms=latency_ms, startup_ms=startup_ms)
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = MCPExecutor(str(Path(tmp) / "mcp"))
+
+        def call(i: int) -> float:
+            executor = shared if mode == "pooled" else MCPExecutor(str(Path(tmp) / "mcp"))
+            start = time.perf_counter()
+            result = executor.execute(config, {"a": i, "b": 1})
+            elapsed = time.perf_counter() - start
+            if executor is not shared:
+                executor.close()
+            assert result["success"] and result["result"] == i + 1, result
+            return elapsed
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(call, range(calls)))
+        wall = time.perf_counter() - start
+        processes = len(shared.connections) if mode == "pooled" else calls
+        shared.close()
+
+    return {
+        "mode": mode,
+        "calls": calls,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "throughput_qps": round(calls / wall, 2),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+        "processes": processes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP spawn-per-call vs pooled session benchmark")
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--startup-ms", type=float, default=300.0, help="Simulated server startup time")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Simulated per-call latency")
+    parser.add_argument("--output", help="Save results as JSON")
+    args = parser.parse_args()
+
+    print(f"🏁 MCP benchmark: {args.calls} calls, concurrency {args.concurrency}, "
+          f"startup {args.startup_ms}ms, latency {args.latency_ms}ms\n")
+    results = []
+    for mode in ("spawn", "pooled"):
+        row = run_mode(mode, args.calls, args.concurrency, args.startup_ms, args.latency_ms)
+        results.append(row)
+        print(f"  {mode:>7}: wall {row['wall_s']:.2f}s  {row['throughput_qps']:.1f} qps  "
+              f"p50 {row['p50_ms']:.1f}ms  max {row['max_ms']:.1f}ms  processes {row['processes']}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
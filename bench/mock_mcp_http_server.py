@@ -0,0 +1,236 @@
+"""
+本地替身 MCP 服务器（Streamable HTTP 传输）
+
+端点 http://127.0.0.1:<port>/mcp，工具与 stdio 替身服务器相同（见 mock_mcp_server.py），
+另外提供两个以 SSE 流返回的工具：
+- progress: 推送 steps 条 notifications/progress（带部分结果）后返回
+- drop: 推送一条进度后断开连接，结果只能通过 Last-Event-ID 续传拿到
+
+统计 TCP 连接数、initialize 次数和续传次数，expire_sessions() 模拟服务端会话失效。
+"""
+
+import json
+import uuid
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from mock_mcp_server import TOOLS, MockMCPServer
+
+HTTP_TOOLS = TOOLS + [
+    {"name": "progress", "description": "Stream progress notifications before the result",
+     "inputSchema": {"type": "object", "properties": {"steps": {"type": "integer"}}}},
+    {"name": "drop", "description": "Drop the stream before the result (requires resumption)",
+     "inputSchema": {"type": "object", "properties": {}}},
+]
+
+
+def mcp_http_tool_config(name: str, tool: str, url: str, server: str = "remote") -> Dict:
+    """生成指向 HTTP 替身服务器的 mcp_tools 配置"""
+    return {
+        "name": name,
+        "description": f"Remote mock MCP tool '{tool}'",
+        "url": url,
+        "server": server,
+        "mcp_tool": tool,
+        "params": {},
+    }
+
+
+class MockMCPHttpServer:
+    """Streamable HTTP MCP 服务器"""
+
+    def __init__(self, latency_ms: float = 0.0, port: int = 0):
+        """
+        Args:
+            latency_ms: 每次 tools/call 的模拟延迟（毫秒）
+            port: 监听端口（0 表示随机端口）
+        """
+        self.tools = MockMCPServer(latency_ms)
+        # {会话 id: [(事件 id, 流 id, 消息), ...]}
+        self.sessions: Dict[str, List] = {}
+        self.connections = 0
+        self.initialize_count = 0
+        self.resumes = 0
+        self._event_ids = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}/mcp"
+
+    def expire_sessions(self):
+        """丢弃所有会话（之后带旧会话 id 的请求返回 404）"""
+        with self._lock:
+            self.sessions.clear()
+
+    def _record(self, session_id: str, stream_id: int, message: Dict) -> Optional[str]:
+        """把流中的事件记入会话（用于续传），返回事件 id"""
+        with self._lock:
+            if session_id not in self.sessions:
+                return None
+            self._event_ids += 1
+            event_id = str(self._event_ids)
+            self.sessions[session_id].append((event_id, stream_id, message))
+            return event_id
+
+    def _stream_messages(self, message: Dict) -> List[Dict]:
+        """以 SSE 返回的工具：进度通知 + 最终响应"""
+        params = message["params"]
+        token = params.get("_meta", {}).get("progressToken")
+        steps = int(params.get("arguments", {}).get("steps", 1))
+        notifications = [
+            {"jsonrpc": "2.0", "method": "notifications/progress",
+             "params": {"progressToken": token, "progress": i, "total": steps, "message": f"partial {i}"}}
+            for i in range(1, steps + 1)
+        ] if token is not None else []
+        result = {"content": [{"type": "text", "text": json.dumps({"steps": steps})}]}
+        return notifications + [{"jsonrpc": "2.0", "id": message["id"], "result": result}]
+
+    def _handle(self, message: Dict) -> Dict:
+        """JSON 响应的请求"""
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "tools/list":
+            return {"jsonrpc": "2.0", "id": message["id"], "result": {"tools": HTTP_TOOLS}}
+        if method == "ping":
+            return {"jsonrpc": "2.0", "id": message["id"], "result": {}}
+        if method != "tools/call":
+            return {"jsonrpc": "2.0", "id": message["id"],
+                    "error": {"code": -32601, "message": f"Method not found: {method}"}}
+        if params["name"] == "stats":
+            stats = {"connections": self.connections, "sessions": len(self.sessions),
+                     "initialize_count": self.initialize_count, "calls": self.tools.calls}
+            return {"jsonrpc": "2.0", "id": message["id"],
+                    "result": {"content": [{"type": "text", "text": json.dumps(stats)}]}}
+        try:
+            result = self.tools.call_tool(params["name"], params.get("arguments", {}))
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32603, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": message["id"], "result": result}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def _empty(self, status: int, headers: Dict = None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _json(self, message: Dict, headers: Dict = None):
+                body = json.dumps(message).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _open_stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+            def _event(self, event_id: str, message: Dict):
+                self.wfile.write(f"id: {event_id}\ndata: {json.dumps(message)}\n\n".encode())
+                self.wfile.flush()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                message = json.loads(self.rfile.read(length))
+
+                if message.get("method") == "initialize":
+                    session_id = uuid.uuid4().hex
+                    with server._lock:
+                        server.sessions[session_id] = []
+                        server.initialize_count += 1
+                    return self._json({"jsonrpc": "2.0", "id": message["id"], "result": {
+                        "protocolVersion": message["params"]["protocolVersion"],
+                        "capabilities": {"tools": {}},
+                        "serverInfo": {"name": "mock-mcp-http", "version": "1.0"},
+                    }}, {"Mcp-Session-Id": session_id})
+
+                session_id = self.headers.get("Mcp-Session-Id")
+                if session_id not in server.sessions:
+                    return self._empty(404)
+                if "id" not in message or "method" not in message:
+                    return self._empty(202)  # 通知或对服务端请求的响应
+
+                tool = message.get("params", {}).get("name") if message["method"] == "tools/call" else None
+                if tool not in ("progress", "drop"):
+                    return self._json(server._handle(message))
+
+                messages = server._stream_messages(message)
+                self._open_stream()
+                if tool == "drop":
+                    # 只发第一条，其余留给续传
+                    messages[0]["params"]["message"] = "dropping stream"
+                    self._event(server._record(session_id, message["id"], messages[0]), messages[0])
+                    for rest in messages[1:]:
+                        server._record(session_id, message["id"], rest)
+                    return
+                for item in messages:
+                    self._event(server._record(session_id, message["id"], item), item)
+
+            def do_GET(self):
+                session_id = self.headers.get("Mcp-Session-Id")
+                last_event_id = self.headers.get("Last-Event-ID")
+                if session_id not in server.sessions:
+                    return self._empty(404)
+                if "text/event-stream" not in self.headers.get("Accept", "") or not last_event_id:
+                    return self._empty(405)
+
+                events = server.sessions[session_id]
+                stream = next((stream_id for event_id, stream_id, _ in events if event_id == last_event_id), None)
+                with server._lock:
+                    server.resumes += 1
+                self._open_stream()
+                after = False
+                for event_id, stream_id, item in list(events):
+                    if after and stream_id == stream:
+                        self._event(event_id, item)
+                    after = after or event_id == last_event_id
+
+            def do_DELETE(self):
+                with server._lock:
+                    server.sessions.pop(self.headers.get("Mcp-Session-Id"), None)
+                self._empty(200)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockMCPHttpServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
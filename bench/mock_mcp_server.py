@@ -0,0 +1,192 @@
+"""
+本地替身 MCP 服务器（stdio 传输）
+
+按行读取 JSON-RPC 消息，每个请求在独立线程中处理，因此可以验证并发的
+tools/call 是否真正复用同一条管道。提供的工具：
+- echo: 原样返回参数（structuredContent）
+- sleep: 等待 seconds 秒后返回（模拟慢调用）
+- add: 返回 a + b（文本内容）
+- fail: 返回 isError 结果
+- stats: 返回进程 pid 和 initialize 次数
+- crash: 立即退出进程（测试重启）
+- freeze: 之后不再响应任何请求（测试健康检查）
+- grid: rows x cols 的 float64 网格，写入 URBAN_RESULT_DIR 后以 file:// resource 返回（测试带外传输）
+
+上报的服务版本取自环境变量 MOCK_MCP_VERSION（默认 1.0）。
+
+运行:
+    python bench/mock_mcp_server.py --latency-ms 20 --startup-ms 500
+"""
+
+import os
+import sys
+import json
+import time
+import array
+import argparse
+import threading
+from typing import Dict, List
+
+
+SERVER_SCRIPT = os.path.abspath(__file__)
+
+TOOLS = [
+    {"name": "echo", "description": "Echo the arguments back",
+     "inputSchema": {"type": "object", "properties": {}}},
+    {"name": "sleep", "description": "Sleep for a number of seconds",
+     "inputSchema": {"type": "object", "properties": {"seconds": {"type": "number"}}}},
+    {"name": "add", "description": "Add two numbers",
+     "inputSchema": {"type": "object", "properties": {"a": {"type": "number"}, "b": {"type": "number"}},
+                     "required": ["a", "b"]}},
+    {"name": "fail", "description": "Always return an error result",
+     "inputSchema": {"type": "object", "properties": {}}},
+    {"name": "stats", "description": "Server process statistics",
+     "inputSchema": {"type": "object", "properties": {}}},
+    {"name": "crash", "description": "Exit the server process",
+     "inputSchema": {"type": "object", "properties": {}}},
+    {"name": "freeze", "description": "Stop answering requests",
+     "inputSchema": {"type": "object", "properties": {}}},
+    {"name": "grid", "description": "A rows x cols grid of floats, returned out of band",
+     "inputSchema": {"type": "object", "properties": {"rows": {"type": "integer"}, "cols": {"type": "integer"}}}},
+]
+
+
+def mcp_tool_config(name: str, tool: str, latency_ms: float = 0.0, startup_ms: float = 0.0,
+                    server: str = "mock") -> Dict:
+    """
+    生成指向本替身服务器的 mcp_tools 配置
+
+    Args:
+        name: 工具池中的名称
+        tool: 服务端工具名（见 TOOLS）
+        latency_ms: 每次调用的模拟延迟
+        startup_ms: 进程启动的模拟耗时（类似 npx 下载/启动）
+        server: 服务标识（同名的工具共享一个会话）
+    """
+    return {
+        "name": name,
+        "description": f"Mock MCP tool '{tool}'",
+        "command": sys.executable,
+        "args": [SERVER_SCRIPT, "--latency-ms", str(latency_ms), "--startup-ms", str(startup_ms)],
+        "server": server,
+        "mcp_tool": tool,
+        "params": {},
+    }
+
+
+def mcp_server_config(server: str = "mock", version: str = None, **extra) -> Dict:
+    """
+    生成指向本替身服务器的 mcp_servers 声明（工具由 tools/list 自动发现）
+
+    Args:
+        server: 服务标识
+        version: 服务上报的版本（通过环境变量传给服务进程）
+        extra: 其他字段（prefix、discovery_ttl 等）
+    """
+    config = {"server": server, "command": sys.executable, "args": [SERVER_SCRIPT]}
+    if version:
+        config["env"] = {"MOCK_MCP_VERSION": version}
+    config.update(extra)
+    return config
+
+
+class MockMCPServer:
+    """stdio MCP 服务器"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.initialize_count = 0
+        self.calls = 0
+        self.frozen = False
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def send(self, message: Dict):
+        data = json.dumps(message, separators=(",", ":")) + "\n"
+        with self._write_lock:
+            sys.stdout.write(data)
+            sys.stdout.flush()
+
+    def serve(self):
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            message = json.loads(line)
+            if "id" not in message or self.frozen:
+                continue  # notifications/initialized, notifications/cancelled
+            threading.Thread(target=self.handle, args=(message,), daemon=True).start()
+
+    def handle(self, message: Dict):
+        method = message.get("method")
+        params = message.get("params", {})
+        try:
+            if method == "initialize":
+                with self._lock:
+                    self.initialize_count += 1
+                result = {
+                    "protocolVersion": params.get("protocolVersion"),
+                    "capabilities": {"tools": {}},
+                    "serverInfo": {"name": "mock-mcp", "version": os.getenv("MOCK_MCP_VERSION", "1.0")},
+                }
+            elif method == "tools/list":
+                result = {"tools": TOOLS}
+            elif method == "tools/call":
+                result = self.call_tool(params["name"], params.get("arguments", {}))
+            elif method == "ping":
+                result = {}
+            else:
+                self.send({"jsonrpc": "2.0", "id": message["id"],
+                           "error": {"code": -32601, "message": f"Method not found: {method}"}})
+                return
+        except Exception as e:
+            self.send({"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32603, "message": str(e)}})
+            return
+        self.send({"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+    def call_tool(self, name: str, arguments: Dict) -> Dict:
+        with self._lock:
+            self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        if name == "echo":
+            return {"content": [{"type": "text", "text": json.dumps(arguments)}], "structuredContent": arguments}
+        if name == "sleep":
+            time.sleep(float(arguments.get("seconds", 0)))
+            return {"content": [{"type": "text", "text": "done"}]}
+        if name == "add":
+            return {"content": [{"type": "text", "text": json.dumps(arguments["a"] + arguments["b"])}]}
+        if name == "fail":
+            return {"content": [{"type": "text", "text": "mock failure"}], "isError": True}
+        if name == "stats":
+            stats = {"pid": os.getpid(), "initialize_count": self.initialize_count, "calls": self.calls}
+            return {"content": [{"type": "text", "text": json.dumps(stats)}]}
+        if name == "crash":
+            os._exit(1)
+        if name == "freeze":
+            self.frozen = True
+            return {"content": [{"type": "text", "text": "frozen"}]}
+        if name == "grid":
+            rows, cols = int(arguments.get("rows", 1)), int(arguments.get("cols", 1))
+            path = os.path.join(os.environ["URBAN_RESULT_DIR"], f"grid-{os.getpid()}-{time.monotonic_ns()}.bin")
+            with open(path, "wb") as f:
+                array.array("d", (float(i) for i in range(rows * cols))).tofile(f)
+            resource = {"uri": f"file://{path}", "mimeType": "application/octet-stream",
+                        "_meta": {"format": "d", "shape": [rows, cols]}}
+            return {"content": [{"type": "resource", "resource": resource}]}
+        raise ValueError(f"Unknown tool: {name}")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Stand-in MCP server over stdio")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every tools/call")
+    parser.add_argument("--startup-ms", type=float, default=0.0, help="Simulated process startup time")
+    args = parser.parse_args(argv)
+
+    if args.startup_ms:
+        time.sleep(args.startup_ms / 1000)
+    MockMCPServer(args.latency_ms).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+本地替身 HTTP 服务器
+
+按工具名回放 bench/fixtures/<tool_name>.json 中录制的返回，
+可配置固定延迟，用于离线、可复现地测量整条流水线。
+
+URL 约定: http://127.0.0.1:<port>/<tool_name>/<原始路径>
+"""
+
+import json
+import time
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+class MockToolServer:
+    """回放录制返回的 HTTP 服务器"""
+
+    def __init__(self, fixtures_dir: Path = FIXTURES_DIR, latency_ms: float = 0.0, port: int = 0):
+        """
+        Args:
+            fixtures_dir: 录制返回所在目录（每个工具一个 JSON 文件）
+            latency_ms: 每个请求的模拟上游延迟（毫秒）
+            port: 监听端口（0 表示随机端口）
+        """
+        self.fixtures = {
+            path.stem: path.read_bytes() for path in Path(fixtures_dir).glob("*.json")
+        }
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self):
+                with server._lock:
+                    server.requests += 1
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+
+                tool_name = self.path.lstrip("/").split("/", 1)[0].split("?", 1)[0]
+                body = server.fixtures.get(tool_name)
+                if body is None:
+                    body = json.dumps({"error": f"No fixture for '{tool_name}'"}).encode()
+                    self.send_response(404)
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._reply()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                self.rfile.read(length)
+                self._reply()
+
+            do_PUT = do_POST
+            do_DELETE = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockToolServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def rewrite_tool_pool(data: Dict, base_url: str, only: Optional[set] = None) -> Dict:
+    """
+    将工具池中 API 工具的端点改写到替身服务器（保留路径与 {param} 占位符）
+
+    Args:
+        data: urban_tools.json 的内容
+        base_url: 替身服务器地址
+        only: 只改写这些工具（默认全部 API 工具）
+
+    Returns:
+        改写后的新配置
+    """
+    rewritten = json.loads(json.dumps(data))
+    for config in rewritten.get("api_tools", []):
+        if only and config["name"] not in only:
+            continue
+        path = urlparse(config["endpoint"]).path
+        config["endpoint"] = f"{base_url}/{config['name']}{path}"
+        # 替身服务器不需要真实凭证
+        config["headers"] = {k: v for k, v in config.get("headers", {}).items() if k.lower() == "accept"}
+    return rewritten
@@ -0,0 +1,271 @@
+"""
+离线端到端基准测试
+
+- 本地替身 HTTP 服务器回放 bench/fixtures 中录制的工具返回
+- 注入确定性的假聊天模型（可配置首 token / 逐 token 延迟）
+- 在多个并发级别下运行 main.py 的完整流水线，统计吞吐与延迟分位数
+- 结果保存为 JSON（含 git commit），可用 --compare 与历史结果对比
+
+运行:
+    python bench/run_benchmark.py --concurrency 1,4,16 --queries 64
+    python bench/run_benchmark.py --compare bench/results/bench_20251107_120000.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+import llm
+import usage
+import tracing
+from main import process_query, set_concurrency
+from planner import process_planned_query
+from tool_manager import UrbanToolManager
+from tool_snapshot import warm_tools
+from fake_llm import FakeChatModel
+from mock_server import MockToolServer, rewrite_tool_pool
+
+
+GITHUB_USERS = ["torvalds", "gvanrossum", "octocat", "antirez"]
+PLACES = ["London,GB", "Tokyo,JP", "Beijing,CN", "Paris,FR"]
+COORDINATES = [(39.9042, 116.4074), (35.6762, 139.6503), (51.5074, -0.1278), (48.8566, 2.3522)]
+
+
+def build_workload() -> Dict[str, Dict]:
+    """构造查询集合及其脚本化的工具选择"""
+    selections = {}
+    for user in GITHUB_USERS:
+        selections[f"Get GitHub user information for {user}"] = {
+            "tool_name": "github_user_info", "parameters": {"username": user}}
+    for place in PLACES:
+        selections[f"What is the weather in {place.split(',')[0]}?"] = {
+            "tool_name": "weather_forecast", "parameters": {"place": place}}
+    for lat, lon in COORDINATES:
+        selections[f"Weather forecast for coordinates {lat}, {lon}"] = {
+            "tool_name": "weather_forecast_free", "parameters": {"latitude": lat, "longitude": lon}}
+    return selections
+
+
+def build_plans() -> Dict[str, Dict]:
+    """规划模式的复合查询：两个并行的天气调用 + 一个 GitHub 调用"""
+    plans = {}
+    for i, user in enumerate(GITHUB_USERS):
+        a, b = PLACES[i], PLACES[(i + 1) % len(PLACES)]
+        query = f"Compare the weather in {a} and {b} and show the GitHub profile of {user}"
+        plans[query] = {"steps": [
+            {"id": "s1", "tool_name": "weather_forecast", "parameters": {"place": a}, "depends_on": []},
+            {"id": "s2", "tool_name": "weather_forecast", "parameters": {"place": b}, "depends_on": []},
+            {"id": "s3", "tool_name": "github_user_info", "parameters": {"username": user}, "depends_on": []},
+        ], "reasoning": "Scripted plan for benchmarking."}
+    return plans
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def git_revision() -> Dict[str, object]:
+    """当前 git commit（用于跨提交对比）"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def run_level(tool_config: str, cache_root: str, queries: List[str], concurrency: int,
+              mode: str, speculative: bool) -> Dict:
+    """在一个并发级别下运行全部查询"""
+    tracing.metrics.reset()
+    usage.ledger.reset()
+    set_concurrency(concurrency)
+    manager = UrbanToolManager(tool_config, cache_root=cache_root, warm=False)
+    # warm: true 工具的准备（如加载地名库）在计时之前完成
+    warm_up = manager.warm_up(warm_tools(manager.snapshot().configs))
+    if warm_up:
+        warm_up.join()
+
+    def timed(query):
+        start = time.perf_counter()
+        try:
+            if mode == "plan":
+                result = process_planned_query(query, manager)
+            else:
+                result = process_query(query, manager, speculative=speculative)
+            error = None
+        except Exception as e:
+            result, error = {}, str(e)
+        return time.perf_counter() - start, result, error
+
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(timed, queries))
+    wall = time.perf_counter() - started
+
+    latencies = [elapsed * 1000 for elapsed, _, _ in outcomes]
+    errors = [error for _, _, error in outcomes if error]
+    stage_samples = {}
+    tool_results = []
+    for _, result, _ in outcomes:
+        for stage, seconds in result.get("timings", {}).items():
+            stage_samples.setdefault(stage, []).append(seconds * 1000)
+        tool_result = result.get("tool_result") or {}
+        tool_results.extend(tool_result.values() if mode == "plan" else [tool_result])
+
+    failed_tools = sum(1 for r in tool_results if not r.get("success"))
+    cache_hits = sum(1 for r in tool_results if r.get("from_cache"))
+    run_usage = usage.ledger.summary()["run"]
+
+    return {
+        "concurrency": concurrency,
+        "queries": len(queries),
+        "errors": len(errors),
+        "tool_failures": failed_tools,
+        "wall_s": round(wall, 4),
+        "throughput_qps": round(len(queries) / wall, 3) if wall else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+        "stages_ms": {
+            stage: {"p50": round(percentile(values, 50), 3), "p95": round(percentile(values, 95), 3)}
+            for stage, values in sorted(stage_samples.items())
+        },
+        "tool_cache_hit_ratio": round(cache_hits / len(tool_results), 4) if tool_results else 0.0,
+        "tokens": {k: run_usage.get(k, 0) for k in ("prompt_tokens", "completion_tokens")},
+        "sample_errors": errors[:3],
+    }
+
+
+def run_benchmark(concurrency_levels: List[int], num_queries: int = 32, mode: str = "single",
+                  llm_latency_ms: float = 50.0, token_latency_ms: float = 1.0, api_latency_ms: float = 20.0,
+                  speculative: bool = True, config_path: str = str(ROOT_DIR / "urban_tools.json")) -> Dict:
+    """
+    运行基准测试
+
+    Returns:
+        {"meta": {...}, "levels": [...]}
+    """
+    selections = build_workload()
+    plans = build_plans()
+    pool = list(plans if mode == "plan" else selections)
+    queries = [pool[i % len(pool)] for i in range(num_queries)]
+
+    llm.set_chat_model_factory(lambda temperature: FakeChatModel(
+        selections=selections, plans=plans,
+        first_token_latency_ms=llm_latency_ms, token_latency_ms=token_latency_ms,
+    ))
+
+    with open(config_path, encoding="utf-8") as f:
+        tool_pool = json.load(f)
+
+    levels = []
+    try:
+        with MockToolServer(latency_ms=api_latency_ms) as server, tempfile.TemporaryDirectory() as tmp:
+            config_file = Path(tmp) / "urban_tools.json"
+            config_file.write_text(json.dumps(rewrite_tool_pool(tool_pool, server.base_url)), encoding="utf-8")
+
+            for concurrency in concurrency_levels:
+                # 每个级别使用独立的冷缓存
+                cache_root = str(Path(tmp) / f"cache_c{concurrency}")
+                level = run_level(str(config_file), cache_root, queries, concurrency, mode, speculative)
+                levels.append(level)
+                print(f"  c={concurrency:<4} {level['throughput_qps']:>8.2f} q/s   "
+                      f"p50 {level['latency_ms']['p50']:>8.1f} ms   p95 {level['latency_ms']['p95']:>8.1f} ms   "
+                      f"p99 {level['latency_ms']['p99']:>8.1f} ms   errors {level['errors']}")
+    finally:
+        llm.set_chat_model_factory(None)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            **git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "mode": mode,
+                "queries": num_queries,
+                "concurrency": concurrency_levels,
+                "llm_latency_ms": llm_latency_ms,
+                "token_latency_ms": token_latency_ms,
+                "api_latency_ms": api_latency_ms,
+                "speculative": speculative,
+            },
+        },
+        "levels": levels,
+    }
+
+
+def compare(current: Dict, baseline: Dict):
+    """打印与历史结果的对比"""
+    old_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    base_commit = (baseline.get("meta", {}).get("commit") or "unknown")[:10]
+    print(f"\n📊 Compared with {base_commit}:")
+    for level in current["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if not old:
+            continue
+        qps_delta = (level["throughput_qps"] / old["throughput_qps"] - 1) * 100 if old["throughput_qps"] else 0.0
+        p95_delta = (level["latency_ms"]["p95"] / old["latency_ms"]["p95"] - 1) * 100 if old["latency_ms"]["p95"] else 0.0
+        print(f"  c={level['concurrency']:<4} throughput {old['throughput_qps']:.2f} -> {level['throughput_qps']:.2f} "
+              f"({qps_delta:+.1f}%)   p95 {old['latency_ms']['p95']:.1f} -> {level['latency_ms']['p95']:.1f} ms "
+              f"({p95_delta:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--queries", type=int, default=32, help="Queries per concurrency level")
+    parser.add_argument("--mode", choices=["single", "plan"], default="single")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Fake LLM time to first token")
+    parser.add_argument("--token-latency-ms", type=float, default=1.0, help="Fake LLM latency per output token")
+    parser.add_argument("--api-latency-ms", type=float, default=20.0, help="Mock upstream latency per request")
+    parser.add_argument("--no-speculative", action="store_true", help="Disable streamed speculative execution")
+    parser.add_argument("--output", help="Result JSON path (default: bench/results/bench_<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous result JSON to compare against")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    print(f"🏁 Running offline benchmark ({args.mode} mode, {args.queries} queries per level)")
+    result = run_benchmark(levels, args.queries, args.mode, args.llm_latency_ms, args.token_latency_ms,
+                           args.api_latency_ms, speculative=not args.no_speculative)
+
+    output = Path(args.output) if args.output else \
+        BENCH_DIR / "results" / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"💾 Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
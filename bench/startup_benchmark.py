@@ -0,0 +1,134 @@
+"""
+工具池启动耗时基准
+
+为 10 / 1k / 10k 个合成工具生成配置，测量：
+- load: UrbanToolManager 初始化（解析 JSON，只注册描述符）
+- snapshot_load: 从预编译快照初始化并取得工具描述（见 tool_snapshot.py）
+- describe: 生成 LLM Prompt 用的工具描述
+- first_tool: 第一次获取某个工具（构建 schema 和 StructuredTool）
+- materialize_all: 构建全部工具（旧的急切加载的开销）
+
+运行:
+    python bench/startup_benchmark.py
+    python bench/startup_benchmark.py --sizes 10,1000,10000 --schemas 8 --output bench/results/startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from tool_manager import UrbanToolManager
+from tool_snapshot import compile_snapshot
+
+
+PARAM_TYPES = ["string", "number", "integer", "boolean"]
+
+
+def synthetic_pool(size: int, schemas: int = 8) -> Dict:
+    """
+    生成合成工具池
+
+    Args:
+        size: 工具数量
+        schemas: 不同参数定义的数量（工具按序循环使用）
+    """
+    tools = []
+    for i in range(size):
+        variant = i % schemas
+        params = {
+            f"arg_{j}": {
+                "type": PARAM_TYPES[(variant + j) % len(PARAM_TYPES)],
+                "required": j == 0,
+                "description": f"Argument {j} of schema {variant}",
+            }
+            for j in range(1 + variant % 4)
+        }
+        tools.append({
+            "name": f"synthetic_tool_{i}",
+            "description": f"Synthetic tool #{i} used to measure tool pool startup time",
+            "endpoint": f"http://127.0.0.1:9/tools/{i}/{{arg_0}}",
+            "method": "GET",
+            "params": params,
+        })
+    return {"mcp_tools": [], "api_tools": tools, "code_tools": []}
+
+
+def measure(size: int, schemas: int) -> Dict[str, float]:
+    """测量一个规模下各阶段耗时（毫秒）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Path(tmp) / "urban_tools.json"
+        config.write_text(json.dumps(synthetic_pool(size, schemas)), encoding="utf-8")
+        cache_root = str(Path(tmp) / "cache")
+
+        start = time.perf_counter()
+        manager = UrbanToolManager(str(config), cache_root=cache_root, use_snapshot=False)
+        load = time.perf_counter() - start
+
+        compile_snapshot(str(config))
+        start = time.perf_counter()
+        from_snapshot = UrbanToolManager(str(config), cache_root=cache_root)
+        from_snapshot.get_tools_description()
+        snapshot_load = time.perf_counter() - start
+        assert from_snapshot.loaded_from_snapshot
+
+        start = time.perf_counter()
+        manager.get_tools_description()
+        describe = time.perf_counter() - start
+
+        start = time.perf_counter()
+        manager.get_tool_by_name(f"synthetic_tool_{size - 1}")
+        first_tool = time.perf_counter() - start
+
+        start = time.perf_counter()
+        manager.get_tools()
+        materialize_all = time.perf_counter() - start
+
+        return {
+            "tools": size,
+            "load_ms": round(load * 1000, 3),
+            "snapshot_load_ms": round(snapshot_load * 1000, 3),
+            "describe_ms": round(describe * 1000, 3),
+            "first_tool_ms": round(first_tool * 1000, 3),
+            "materialize_all_ms": round(materialize_all * 1000, 3),
+            "schema_models": len(manager._schema_cache),
+        }
+
+
+def run(sizes: List[int], schemas: int = 8) -> List[Dict]:
+    results = []
+    print(f"{'tools':>8} {'load':>10} {'describe':>10} {'snapshot':>10} {'first tool':>11} {'all tools':>11}")
+    for size in sizes:
+        row = measure(size, schemas)
+        results.append(row)
+        print(f"{size:>8} {row['load_ms']:>8.1f}ms {row['describe_ms']:>8.1f}ms {row['snapshot_load_ms']:>8.1f}ms "
+              f"{row['first_tool_ms']:>9.1f}ms {row['materialize_all_ms']:>9.1f}ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool pool startup benchmark")
+    parser.add_argument("--sizes", default="10,1000,10000", help="Comma-separated pool sizes")
+    parser.add_argument("--schemas", type=int, default=8, help="Number of distinct parameter schemas")
+    parser.add_argument("--output", help="Save results as JSON")
+    args = parser.parse_args()
+
+    print(f"🏁 Tool pool startup benchmark ({args.schemas} distinct schemas)\n")
+    results = run([int(s) for s in args.sizes.split(",") if s.strip()], args.schemas)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"schemas": args.schemas, "results": results}, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ Tool Executors Package
 
 各执行器必须实现统一接口：
 - execute(config: Dict, arguments: Dict) -> Dict[str, Any]
+- prefetch(config: Dict)（可选）
 
 返回格式:
 {
@@ -10,10 +11,26 @@ Tool Executors Package
     "result": Any,
     "error": str | None
 }
+
+执行器由 ExecutorRegistry 按工具类型延迟创建（见 registry.py），
+第三方执行器可通过配置文件或入口点注册。
 """
 
-from .mcp_executor import MCPExecutor
-from .api_executor import APIExecutor
-from .code_executor import CodeExecutor
+from .registry import ExecutorRegistry
+
+__all__ = ["MCPExecutor", "APIExecutor", "CodeExecutor", "LocalExecutor", "ExecutorRegistry"]
+
+_LAZY_EXPORTS = {
+    "MCPExecutor": ".mcp_executor",
+    "APIExecutor": ".api_executor",
+    "CodeExecutor": ".code_executor",
+    "LocalExecutor": ".local_executor",
+}
+
 
-__all__ = ["MCPExecutor", "APIExecutor", "CodeExecutor"]
+def __getattr__(name):
+    """内置执行器在第一次访问时才导入"""
+    if name in _LAZY_EXPORTS:
+        from importlib import import_module
+        return getattr(import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
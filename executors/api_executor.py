@@ -4,33 +4,72 @@ API Executor - 调用 REST API
 1. 实现 HTTP 请求（GET/POST/PUT/DELETE）
 2. 处理认证和 API keys
 3. 管理 API 缓存
+4. 录制 / 回放上游响应（见 cassette.py，URBAN_HTTP_MODE 选择）
+5. 后处理：配置了 postprocess 的工具把记录列表转换为列，按天统计并换算单位，
+   返回（并缓存）紧凑的摘要（见 postprocess.py）
+6. 参数规范化：配置了 normalize 的工具在请求前用离线地名库把地名转换为
+   "City,CC" 或经纬度（见 gazetteer.py）
 """
 
 import os
 import json
-import requests
 import hashlib
 import time
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any
 from pathlib import Path
 
+import tracing
+from .result_cache import ResultCache, key_prefix
+
+# requests 和 cassette 在第一次发送请求时才导入（缓存命中和列出工具不需要）
+if TYPE_CHECKING:
+    from .cassette import Cassette
+
+
+class APIRequestError(Exception):
+    """HTTP 请求失败（包装 requests 的异常，execute 捕获时不必导入 requests）"""
+
 
 class APIExecutor:
     """REST API 工具执行器"""
 
-    def __init__(self, tools_dir: str = "./Cache/api"):
+    def __init__(self, tools_dir: str = "./Cache/api", cassette: "Cassette" = None):
         """
         初始化 API 执行器
 
         Args:
             tools_dir: API 工具缓存目录
+            cassette: HTTP 录制/回放层（默认按环境变量创建）
         """
         self.tools_dir = Path(tools_dir)
         self.tools_dir.mkdir(parents=True, exist_ok=True)
 
+        self._cassette = cassette
+
         # 速率限制记录（可选实现）
         self.rate_limits = {}
 
+        # 结果缓存（内存层 + 磁盘层，见 result_cache.py）
+        self.cache = ResultCache(self.tools_dir)
+
+    @property
+    def cassette(self) -> "Cassette":
+        """HTTP 录制/回放层（首次使用时按环境变量创建）"""
+        if self._cassette is None:
+            from .cassette import Cassette
+            self._cassette = Cassette.from_env()
+        return self._cassette
+
+    def prefetch(self, config: Dict, ttl: int = 3600):
+        """
+        预取某个工具的磁盘缓存到内存（工具名确定、参数尚未生成时调用）
+
+        Args:
+            config: API 配置
+            ttl: 缓存有效期（秒）
+        """
+        self.cache.prefetch(self._endpoint_prefix(config["endpoint"]), ttl)
+
     def execute(self, config: Dict, arguments: Dict) -> Dict[str, Any]:
         """
         执行 API 调用
@@ -42,6 +81,8 @@ class APIExecutor:
                 - method: HTTP 方法 (GET/POST/PUT/DELETE)
                 - headers: 请求头
                 - params: 参数定义
+                - postprocess: 可选，结果后处理配置（见 postprocess.py）
+                - normalize: 可选，参数规范化配置（见 gazetteer.normalize_arguments）
             arguments: 实际调用参数
 
         Returns:
@@ -52,9 +93,20 @@ class APIExecutor:
             }
         """
         try:
+            # 规范化后的参数参与缓存 key（"北京" 和 "Beijing,CN" 命中同一条缓存）
+            if config.get("normalize"):
+                try:
+                    arguments = self._normalize(config, arguments)
+                except ValueError as e:
+                    return {
+                        "success": False,
+                        "result": None,
+                        "error": f"Invalid arguments: {e}"
+                    }
+
             # 1. 检查缓存（如果启用）
             cache_key = self._generate_cache_key(config, arguments)
-            cached = self._check_cache(cache_key)
+            cached = self._check_cache(cache_key, tool_name=config["name"])
             if cached:
                 return {
                     "success": True,
@@ -82,7 +134,25 @@ class APIExecutor:
                 params.pop(param_name, None)
 
             # 7. 发送请求
-            response = self._send_request(method, url, headers, params)
+            with tracing.span("http_request", tool=config["name"], method=method) as span:
+                if self.cassette.enabled:
+                    span.set(cassette=self.cassette.mode)
+                response = self._send_request(method, url, headers, params,
+                                              retries=config.get("retries", 0), span=span)
+            tracing.metrics.inc("urban_http_bytes_received_total", span.attrs.get("bytes", 0), tool=config["name"])
+            tracing.metrics.inc("urban_http_retries_total", span.attrs.get("retries", 0), tool=config["name"])
+
+            # 后处理失败（响应格式不符）时返回原始响应，不缓存
+            if config.get("postprocess"):
+                try:
+                    response = self._postprocess(config, response)
+                except ValueError as e:
+                    print(f"⚠️  Postprocess failed for {config['name']}, returning the raw response: {e}")
+                    return {
+                        "success": True,
+                        "result": response,
+                        "error": None
+                    }
 
             # 7. 保存缓存
             self._save_cache(cache_key, response)
@@ -93,7 +163,7 @@ class APIExecutor:
                 "error": None
             }
 
-        except requests.exceptions.RequestException as e:
+        except APIRequestError as e:
             return {
                 "success": False,
                 "result": None,
@@ -190,64 +260,104 @@ class APIExecutor:
 
         return params
 
-    def _send_request(self, method: str, url: str, headers: Dict, params: Dict) -> Any:
+    def _send_request(self, method: str, url: str, headers: Dict, params: Dict,
+                      retries: int = 0, span=None) -> Any:
         """
         发送 HTTP 请求
+
+        Args:
+            retries: 连接错误、超时、429 和 5xx 时的重试次数（指数退避）
+            span: 记录状态码、接收字节数和重试次数的 tracing span
+
+        Raises:
+            APIRequestError: 连接失败、超时、HTTP 错误状态或响应不是 JSON
         """
+        import requests
+
         timeout = 30  # 默认超时 30 秒
 
-        if method == "GET":
-            response = requests.get(url, headers=headers, params=params, timeout=timeout)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=params, timeout=timeout)
-        elif method == "PUT":
-            response = requests.put(url, headers=headers, json=params, timeout=timeout)
-        elif method == "DELETE":
-            response = requests.delete(url, headers=headers, params=params, timeout=timeout)
-        else:
+        if method not in ("GET", "POST", "PUT", "DELETE"):
             raise ValueError(f"Unsupported HTTP method: {method}")
 
-        response.raise_for_status()
-        return response.json()
+        # 回放的结果是确定的，重试没有意义
+        if self.cassette.mode == "replay":
+            retries = 0
+
+        try:
+            attempt = 0
+            while True:
+                try:
+                    response = self.cassette.request(method, url, headers, params, timeout)
+                    retryable = response.status_code == 429 or response.status_code >= 500
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if attempt >= retries:
+                        if span:
+                            span.set(retries=attempt)
+                        raise
+                    response, retryable = None, True
+
+                if not retryable or attempt >= retries:
+                    break
+                attempt += 1
+                time.sleep(min(0.5 * 2 ** (attempt - 1), 8))
+
+            if span:
+                span.set(status=response.status_code, bytes=len(response.content), retries=attempt)
+
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            raise APIRequestError(str(e)) from e
+
+    def _normalize(self, config: Dict, arguments: Dict) -> Dict:
+        """用离线地名库规范化地名参数（见 gazetteer.py）"""
+        from .gazetteer import normalize_arguments
+
+        with tracing.span("normalize", tool=config["name"]):
+            return normalize_arguments(config["normalize"], arguments)
+
+    def _postprocess(self, config: Dict, response: Any) -> Dict:
+        """把响应转换为列式数据并生成摘要（见 postprocess.py）"""
+        from .postprocess import Postprocessor
+
+        with tracing.span("postprocess", tool=config["name"]) as span:
+            summary = Postprocessor(config["postprocess"]).summarize(response)
+            span.set(records=summary["period"]["count"])
+        return summary
+
+    def _endpoint_prefix(self, endpoint: str) -> str:
+        """端点前缀（同一工具的缓存文件共享，便于按工具预取）"""
+        return key_prefix(endpoint)
 
     def _generate_cache_key(self, config: Dict, arguments: Dict) -> str:
-        """生成缓存 key"""
+        """生成缓存 key: {端点前缀}_{完整哈希}"""
         cache_data = {
             "endpoint": config["endpoint"],
             "arguments": arguments
         }
+        # 缓存的是摘要，后处理配置变化后不能命中旧结果
+        if config.get("postprocess"):
+            cache_data["postprocess"] = config["postprocess"]
         cache_str = json.dumps(cache_data, sort_keys=True)
-        return hashlib.md5(cache_str.encode()).hexdigest()
+        digest = hashlib.md5(cache_str.encode()).hexdigest()
+        return f"{self._endpoint_prefix(config['endpoint'])}_{digest}"
 
-    def _check_cache(self, cache_key: str, ttl: int = 3600) -> Any:
+    def _check_cache(self, cache_key: str, ttl: int = 3600, tool_name: str = "") -> Any:
         """
-        检查缓存
+        检查缓存（内存层 + 磁盘层）
 
         Args:
             cache_key: 缓存键
             ttl: 缓存有效期（秒）
+            tool_name: 工具名称（用于 tracing 和命中率指标）
 
         TODO: API 开发者可以实现更复杂的缓存策略
         """
-        cache_file = self.tools_dir / f"{cache_key}.json"
-
-        if not cache_file.exists():
-            return None
-
-        # 检查缓存是否过期
-        cache_age = time.time() - cache_file.stat().st_mtime
-        if cache_age > ttl:
-            cache_file.unlink()  # 删除过期缓存
-            return None
-
-        with open(cache_file) as f:
-            return json.load(f)
+        return self.cache.lookup(tool_name, cache_key, ttl)
 
     def _save_cache(self, cache_key: str, data: Any):
-        """保存缓存"""
-        cache_file = self.tools_dir / f"{cache_key}.json"
-        with open(cache_file, "w") as f:
-            json.dump(data, f)
+        """保存缓存（内存 + 磁盘）"""
+        self.cache.put(cache_key, data)
 
 
 # 测试代码
@@ -0,0 +1,159 @@
+"""
+HTTP 录制 / 回放（cassette）
+
+通过环境变量选择模式：
+- URBAN_HTTP_MODE=record   真实请求，并把状态码、响应头和响应体写入 cassette
+- URBAN_HTTP_MODE=replay   只从 cassette 回放，不访问网络（未录制的请求直接报错）
+- URBAN_HTTP_MODE=off      （默认）直接请求
+
+- URBAN_CASSETTE_DIR        cassette 目录（默认 ./Cache/cassettes）
+- URBAN_REPLAY_LATENCY_MS   回放时的模拟上游延迟（毫秒，默认 0）
+
+每个请求保存为一个 gzip 压缩的 JSON 文件，键为 (method, url, 参数) 的哈希。
+请求头不参与匹配也不会被保存（避免泄露 API key）。
+响应体能按响应编码无损解码时保存为文本（body_encoding 为所用编码），否则保存为 base64
+（body_encoding: "base64"）；回放时按同一编码还原原始字节。
+"""
+
+import os
+import gzip
+import json
+import time
+import base64
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+MODES = ("off", "record", "replay")
+
+# 不写入 cassette 的响应头
+_SKIPPED_HEADERS = {"set-cookie", "content-encoding", "transfer-encoding", "connection"}
+
+
+class CassetteMissError(requests.exceptions.RequestException):
+    """回放模式下请求未被录制"""
+
+
+class Cassette:
+    """HTTP 交互的录制与回放"""
+
+    def __init__(self, mode: str = "off", cassette_dir: str = "./Cache/cassettes", latency_ms: float = 0.0):
+        """
+        Args:
+            mode: off / record / replay
+            cassette_dir: cassette 存放目录
+            latency_ms: 回放时每个请求的模拟延迟（毫秒）
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown HTTP mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.cassette_dir = Path(cassette_dir)
+        self.latency_ms = latency_ms
+        if mode != "off":
+            self.cassette_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "Cassette":
+        """按环境变量创建"""
+        return cls(
+            mode=os.getenv("URBAN_HTTP_MODE", "off").strip().lower() or "off",
+            cassette_dir=os.getenv("URBAN_CASSETTE_DIR", "./Cache/cassettes"),
+            latency_ms=float(os.getenv("URBAN_REPLAY_LATENCY_MS", "0") or 0),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def request(self, method: str, url: str, headers: Dict, params: Dict, timeout: float) -> requests.Response:
+        """
+        发送（或回放）请求，接口与 requests.request 的返回值一致
+
+        Args:
+            method: HTTP 方法
+            url: 完整 URL（路径参数已替换）
+            headers: 请求头（不参与匹配）
+            params: GET/DELETE 为查询参数，其他方法为 JSON body
+            timeout: 超时（秒）
+        """
+        if self.mode == "replay":
+            return self._replay(method, url, params)
+
+        if method in ("GET", "DELETE"):
+            response = requests.request(method, url, headers=headers, params=params, timeout=timeout)
+        else:
+            response = requests.request(method, url, headers=headers, json=params, timeout=timeout)
+
+        if self.mode == "record":
+            self._record(method, url, params, response)
+        return response
+
+    def _key(self, method: str, url: str, params: Dict) -> str:
+        request = json.dumps({"method": method, "url": url, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(request.encode()).hexdigest()[:32]
+
+    def _path(self, key: str) -> Path:
+        return self.cassette_dir / f"{key}.json.gz"
+
+    def _record(self, method: str, url: str, params: Dict, response: requests.Response):
+        body_encoding = response.encoding or "utf-8"
+        try:
+            body = response.content.decode(body_encoding)
+        except (UnicodeDecodeError, LookupError):
+            # 二进制或编码声明错误的响应体：按原始字节保存
+            body, body_encoding = base64.b64encode(response.content).decode("ascii"), "base64"
+
+        interaction = {
+            "request": {"method": method, "url": url, "params": params},
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS},
+            "body": body,
+            "body_encoding": body_encoding,
+            "elapsed_ms": round(response.elapsed.total_seconds() * 1000, 3),
+            "recorded_at": time.time(),
+        }
+        path = self._path(self._key(method, url, params))
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(interaction, f, ensure_ascii=False, separators=(",", ":"), default=str)
+        os.replace(tmp, path)
+
+    def _replay(self, method: str, url: str, params: Dict) -> requests.Response:
+        path = self._path(self._key(method, url, params))
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                interaction = json.load(f)
+        except FileNotFoundError:
+            raise CassetteMissError(f"No recorded response for {method} {url} (params={params})")
+
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.reason = interaction.get("reason")
+        response.headers = CaseInsensitiveDict(interaction.get("headers", {}))
+        body_encoding = interaction.get("body_encoding", "text")
+        if body_encoding == "text":
+            body_encoding = "utf-8"  # 早期录制的文本响应体
+        if body_encoding == "base64":
+            response._content = base64.b64decode(interaction["body"])
+            response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        else:
+            response._content = interaction["body"].encode(body_encoding)
+            response.encoding = body_encoding
+        response.url = url
+        return response
+
+    def lookup(self, method: str, url: str, params: Dict) -> Optional[Dict]:
+        """读取已录制的交互（不存在时返回 None）"""
+        path = self._path(self._key(method, url, params))
+        if not path.exists():
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
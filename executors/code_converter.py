@@ -0,0 +1,257 @@
+"""
+代码仓库 -> 工具的转换（CodeExecutor.discover 使用）
+
+静态分析（ast，不导入、不执行仓库代码）仓库中的 Python 模块，
+把带文档字符串的公开顶层函数转换为工具：
+- 入口 module:function（由 CodeExecutor 的工作进程调用，即工具的包装）
+- 描述：文档字符串的第一段
+- 参数：函数签名（类型注解、默认值）+ 文档字符串 Args 段中的说明
+
+转换结果是确定的，缓存在 Cache/code/conversions/v<转换器版本>:
+    modules/<模块名和源码的哈希>.json   单个模块的转换结果
+    <提交 SHA>-<声明哈希>.json          一次提交的清单（模块 -> 哈希、全部工具）
+    latest-<声明哈希>.json              该声明最近一次完成转换的提交
+新提交只重新转换内容变化的模块，其余模块直接复用。
+修改转换逻辑时必须提高 CONVERTER_VERSION。
+"""
+
+import os
+import ast
+import json
+import hashlib
+import threading
+from pathlib import Path
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+CONVERTER_VERSION = 1
+
+# 注解 -> 参数类型
+ANNOTATION_TYPES = {
+    "str": "string", "int": "integer", "float": "number", "bool": "boolean",
+    "list": "array", "List": "array", "tuple": "array", "Tuple": "array", "Sequence": "array",
+    "dict": "object", "Dict": "object", "Mapping": "object",
+}
+DEFAULT_TYPES = {str: "string", bool: "boolean", int: "integer", float: "number",
+                 list: "array", tuple: "array", dict: "object"}
+# 不转换的目录和文件
+SKIP_DIRS = {"__pycache__", "test", "tests", "docs", "examples", "build", "dist"}
+SKIP_FILES = {"setup.py", "conftest.py"}
+
+
+def iter_modules(root: Path) -> Iterator[Tuple[str, Path]]:
+    """
+    仓库中可导入的模块 (模块名, 文件)
+
+    Args:
+        root: 导入根目录
+    """
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith((".", "_")) and d not in SKIP_DIRS
+                         and d.isidentifier())
+        for file in sorted(files):
+            if not file.endswith(".py") or file in SKIP_FILES or file.startswith("test_"):
+                continue
+            path = Path(directory, file)
+            parts = list(path.relative_to(root).with_suffix("").parts)
+            if parts[-1] == "__init__":
+                parts.pop()
+            elif parts[-1].startswith("_") or not parts[-1].isidentifier():
+                continue
+            if parts:
+                yield ".".join(parts), path
+
+
+def convert_module(module: str, source: str) -> List[Dict]:
+    """
+    转换一个模块
+
+    Args:
+        module: 模块名
+        source: 模块源码
+
+    Returns:
+        [{"function": 函数名, "entry": "module:function", "description": str, "params": {...}}]
+        （语法错误的模块返回空列表）
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+
+    tools = []
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef) or node.name.startswith("_"):
+            continue
+        docstring = ast.get_docstring(node)
+        if not docstring:
+            continue
+        summary, arg_docs = _parse_docstring(docstring)
+        tools.append({
+            "function": node.name,
+            "entry": f"{module}:{node.name}",
+            "description": summary or node.name,
+            "params": _function_params(node.args, arg_docs),
+        })
+    return tools
+
+
+def _parse_docstring(docstring: str) -> Tuple[str, Dict[str, str]]:
+    """文档字符串的第一段，以及 Args 段中每个参数的说明"""
+    lines = docstring.splitlines()
+    summary = []
+    for line in lines:
+        if not line.strip():
+            break
+        summary.append(line.strip())
+
+    arg_docs, current, arg_indent = {}, None, None
+    in_args = False
+    for line in lines:
+        stripped = line.strip()
+        if stripped in ("Args:", "Arguments:", "Parameters:"):
+            in_args = True
+            continue
+        if not in_args or not stripped:
+            continue
+        indent = len(line) - len(line.lstrip())
+        if indent == 0:
+            break  # 下一段（Returns: 等）
+        name, sep, text = stripped.partition(":")
+        name = name.split("(")[0].strip()
+        if sep and name.isidentifier() and (arg_indent is None or indent <= arg_indent):
+            arg_indent, current = indent, name
+            arg_docs[name] = text.strip()
+        elif current:
+            arg_docs[current] = f"{arg_docs[current]} {stripped}"
+    return " ".join(summary), arg_docs
+
+
+def _function_params(args: ast.arguments, arg_docs: Dict[str, str]) -> Dict[str, Dict]:
+    """函数签名 -> 参数定义（只包含可用关键字传入的参数）"""
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    pairs = list(zip(positional, defaults)) + list(zip(args.kwonlyargs, args.kw_defaults))
+
+    params = {}
+    for arg, default in pairs:
+        if arg in args.posonlyargs or arg.arg in ("self", "cls"):
+            continue
+        param = {"type": _annotation_type(arg.annotation), "required": default is None,
+                 "description": arg_docs.get(arg.arg, "")}
+        if default is not None:
+            try:
+                value = ast.literal_eval(default)
+            except (ValueError, TypeError, SyntaxError):
+                value = None
+            if value is not None:
+                param["default"] = value
+                if arg.annotation is None:
+                    param["type"] = DEFAULT_TYPES.get(type(value), "string")
+        params[arg.arg] = param
+    return params
+
+
+def _annotation_type(annotation: Optional[ast.expr]) -> str:
+    """类型注解 -> 参数类型（Optional[X] / X | None 取 X，无法识别时为 string）"""
+    if annotation is None:
+        return "string"
+    if isinstance(annotation, ast.Constant) and isinstance(annotation.value, str):
+        try:
+            annotation = ast.parse(annotation.value, mode="eval").body
+        except SyntaxError:
+            return "string"
+    if isinstance(annotation, ast.BinOp) and isinstance(annotation.op, ast.BitOr):
+        sides = [side for side in (annotation.left, annotation.right)
+                 if not (isinstance(side, ast.Constant) and side.value is None)]
+        return _annotation_type(sides[0]) if len(sides) == 1 else "string"
+    if isinstance(annotation, ast.Subscript):
+        name = _annotation_name(annotation.value)
+        if name == "Optional":
+            return _annotation_type(annotation.slice)
+        return ANNOTATION_TYPES.get(name, "string")
+    return ANNOTATION_TYPES.get(_annotation_name(annotation), "string")
+
+
+def _annotation_name(node: ast.expr) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return ""
+
+
+class ConversionCache:
+    """按提交 SHA 和转换器版本缓存的转换结果（模块级增量）"""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: 缓存目录（Cache/code/conversions）
+        """
+        self.root = Path(root) / f"v{CONVERTER_VERSION}"
+        self.modules_dir = self.root / "modules"
+        self.stats = Counter()
+
+    def manifest_path(self, sha: str, spec_key: str) -> Path:
+        return self.root / f"{sha}-{spec_key}.json"
+
+    def load(self, sha: str, spec_key: str) -> Optional[Dict]:
+        """已完成的转换清单（不存在时返回 None）"""
+        return _read_json(self.manifest_path(sha, spec_key))
+
+    def latest(self, spec_key: str) -> Optional[Dict]:
+        """该声明最近一次完成转换的清单"""
+        pointer = _read_json(self.root / f"latest-{spec_key}.json")
+        return self.load(pointer["sha"], spec_key) if pointer else None
+
+    def convert(self, root: Path, sha: str, spec_key: str, modules: Optional[List[str]] = None) -> Dict:
+        """
+        转换一次检出（内容未变的模块复用已有结果）
+
+        Args:
+            root: 导入根目录
+            sha: 提交 SHA
+            spec_key: 声明哈希（区分同一提交的不同 path / sparse / modules）
+            modules: 只转换这些模块（及其子模块）
+
+        Returns:
+            {"sha", "converter", "modules": {模块名: 哈希}, "tools": [...]}
+        """
+        manifest = {"sha": sha, "converter": CONVERTER_VERSION, "modules": {}, "tools": []}
+        for module, path in iter_modules(root):
+            if modules and not any(module == m or module.startswith(f"{m}.") for m in modules):
+                continue
+            source = path.read_bytes()
+            digest = hashlib.sha256(module.encode() + b"\0" + source).hexdigest()[:32]
+            artifact = self.modules_dir / f"{digest}.json"
+            tools = _read_json(artifact)
+            if tools is None:
+                tools = convert_module(module, source.decode("utf-8", errors="replace"))
+                _write_json(artifact, tools)
+                self.stats["converted"] += 1
+            else:
+                self.stats["reused"] += 1
+            manifest["modules"][module] = digest
+            manifest["tools"].extend(tools)
+
+        _write_json(self.manifest_path(sha, spec_key), manifest)
+        _write_json(self.root / f"latest-{spec_key}.json", {"sha": sha})
+        return manifest
+
+
+def _read_json(path: Path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _write_json(path: Path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp{os.getpid()}.{threading.get_ident()}")
+    with open(tmp, "w") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
@@ -1,52 +1,329 @@
 """
 Code Executor - 处理 GitHub 代码工具
 
-🚀 STATUS: Coming Soon
-这个模块计划在未来版本中实现。目前仅提供接口框架。
+1. 管理 GitHub 代码仓库的克隆：按提交 SHA 寻址的浅层（可选 sparse）检出，
+   同一仓库的工具共享镜像和检出，分支移动时增量获取，磁盘占用按 LRU 回收（见 repo_cache.py）
+2. 每个工具一个常驻工作进程池（code_pool.py）：进程启动时导入一次入口模块，
+   之后通过管道以 JSON 传递参数和结果，按调用次数或内存回收，单次调用超时
+3. 资源限制：按工具配置 CPU 时间、地址空间（rlimit）、墙钟超时和输出大小，
+   超出时调用被终止，结果中的 limit_exceeded 标明超出的限制
+4. 大结果：返回值中不小于 inline_bytes 的数组（bytes、array.array、NumPy 数组等）经共享内存传输，
+   结果中对应位置为 ResultBuffer（零拷贝的只读映射，见 result_buffer.py）
 
-1. 管理 GitHub 代码仓库的克隆
-2. 调用 Code2MCP转换代码为 MCP
-3. 管理转换后的工具缓存
-4. 处理本地 MCP 工具的调用
+5. 工具发现：把 urban_tools.json 中 "code_repos" 声明的仓库转换为工具（见 discover 和 code_converter.py），
+   转换结果按提交 SHA + 转换器版本缓存在 Cache/code/conversions，新提交只重新转换变化的模块
+
+执行器选项（urban_tools.json 的 "executors"，见 executors/registry.py）:
+    "executors": {"code": {"class": "executors.code_executor:CodeExecutor",
+                           "options": {"workers": 2, "max_calls": 1000, "max_memory_mb": 1024,
+                                       "limits": {"cpu_seconds": 30, "memory_mb": 2048}, "inline_bytes": 65536,
+                                       "max_bytes": 1073741824, "ref_ttl": 300}}}
+
+工具配置:
+    {
+        "name": "route_planner",
+        "description": "...",
+        "repo": "https://github.com/org/urban-routing.git",
+        "ref": "main",                      # 可选：分支、标签或提交 SHA（默认 HEAD）
+        "sparse": ["routing/"],             # 可选：只检出这些路径
+        "path": "routing",                  # 可选：导入根目录（相对仓库根目录）
+        "entry": "planner:shortest_path",   # 入口函数 module:function，以关键字参数调用
+        "timeout": 60,                      # 可选：单次调用超时（秒），等同于 limits.timeout
+        "limits": {                         # 可选：资源限制（与执行器选项中的 limits 合并）
+            "cpu_seconds": 5,               #   每次调用的 CPU 时间（RLIMIT_CPU）
+            "memory_mb": 512,               #   工作进程的地址空间（RLIMIT_AS）
+            "timeout": 30,                  #   每次调用的墙钟时间
+            "max_output_bytes": 1048576     #   序列化后的结果大小
+        },
+        "workers": 4,                       # 可选：工作进程数（覆盖执行器选项，下同）
+        "max_calls": 200,                   # 可选：每个进程处理多少次调用后回收
+        "max_memory_mb": 512,               # 可选：进程峰值内存超过该值后回收
+        "warm": true,                       # 可选：启动时预先检出仓库并启动工作进程
+        "params": {...}
+    }
+
+仓库声明（自动转换为工具）:
+    "code_repos": [
+        {
+            "repo": "https://github.com/org/urban-routing.git",
+            "ref": "main",
+            "sparse": ["routing/"],
+            "path": "routing",
+            "modules": ["planner"],             # 可选：只转换这些模块（及其子模块）
+            "prefix": "routing_",               # 可选：工具名前缀
+            "background": true,                 # 可选：后台转换，不阻塞工具池加载（默认 true）
+            "timeout": 30                       # 其余字段复制到每个工具的配置
+        }
+    ]
 """
 
-import os
-import sys
 import json
-from typing import Dict, Any
+import atexit
+import hashlib
+import threading
+from typing import Callable, Dict, Any, List, Optional
 from pathlib import Path
 
+import tracing
+from .code_converter import ConversionCache
+from .code_pool import WorkerError, WorkerPool
+from .repo_cache import RepoCache, RepoError
+from .result_buffer import DEFAULT_INLINE_BYTES, remove_transport_dir, transport_dir
+
+
+# 只用于转换、不复制到工具配置中的字段
+DISCOVERY_KEYS = ("modules", "prefix", "background")
+# 默认的单次调用超时（秒）
+DEFAULT_TIMEOUT = 60
+
 
 class CodeExecutor:
     """GitHub 代码工具执行器"""
 
-    def __init__(self, tools_dir: str = "./Cache/code"):
+    def __init__(self, tools_dir: str = "./Cache/code", workers: int = 2, max_calls: int = 1000,
+                 max_memory_mb: Optional[float] = None, limits: Optional[Dict] = None,
+                 inline_bytes: int = DEFAULT_INLINE_BYTES, **repo_options):
         """
         初始化代码执行器
 
         Args:
-            tools_dir: 转换后的工具存储目录
+            tools_dir: 代码工具缓存目录（仓库镜像和检出在其下的 repos 目录）
+            workers: 每个工具的默认工作进程数
+            max_calls: 工作进程处理多少次调用后回收
+            max_memory_mb: 工作进程峰值内存超过该值（MB）后回收，None 表示不回收
+            limits: 所有代码工具的默认资源限制（工具配置中的 limits 覆盖同名项）
+            inline_bytes: 小于该大小的数组内联在结果中，更大的经共享内存传输
+            repo_options: 传给 RepoCache 的选项（max_bytes、ref_ttl）
         """
         self.tools_dir = Path(tools_dir)
         self.tools_dir.mkdir(parents=True, exist_ok=True)
 
+        self.repos = RepoCache(self.tools_dir / "repos", **repo_options)
+        self.conversions = ConversionCache(self.tools_dir / "conversions")
+        self.pool_defaults = {"workers": workers, "max_calls": max_calls, "max_memory_mb": max_memory_mb}
+        self.limits = dict(limits or {})
+        self.inline_bytes = inline_bytes
+        # 大结果的传输目录（/dev/shm 下，close 时删除）
+        self.result_dir = transport_dir("code")
+        # 工作进程池 {工具名: WorkerPool}（ref 移动到新提交时替换）
+        self.pools: Dict[str, WorkerPool] = {}
+        # 各池使用的检出（池存在期间不会被垃圾回收）
+        self._trees: Dict[str, Path] = {}
+        self._lock = threading.Lock()
+        # 正在后台转换的仓库声明
+        self._converting = set()
+        atexit.register(self.close)
+
     def execute(self, config: Dict, arguments: Dict) -> Dict[str, Any]:
         """
-        执行代码工具（目前仅为框架）
+        执行代码工具
 
         Args:
-            config: 代码工具配置
+            config: 代码工具配置（repo / ref / sparse / path / entry / timeout / limits，见模块说明）
             arguments: 调用参数
 
         Returns:
             {
                 "success": bool,
-                "result": Any,
-                "error": str | None
+                "result": Any（大数组为 ResultBuffer）,
+                "error": str | None,
+                "limit_exceeded": "cpu" | "memory" | "timeout" | "output"（仅在超出资源限制时）
             }
         """
-        return {
-            "success": False,
-            "result": None,
-            "error": "Code Executor is not implemented yet. Coming soon! 🚀"
-        }
+        arguments = {key: value for key, value in arguments.items() if value is not None}
+        limits = self._limits(config)
+
+        with tracing.span("code_call", tool=config["name"]) as span:
+            try:
+                pool = self._get_pool(config)
+            except RepoError as e:
+                span.set(error=str(e))
+                return {
+                    "success": False,
+                    "result": None,
+                    "error": f"Repository checkout failed: {str(e)}"
+                }
+
+            try:
+                output = pool.call(arguments, timeout=limits.get("timeout", DEFAULT_TIMEOUT))
+            except WorkerError as e:
+                output = {"error": str(e), "limit": e.limit}
+
+            if "error" in output:
+                span.set(error=output["error"])
+                response = {
+                    "success": False,
+                    "result": None,
+                    "error": f"Code tool error: {output['error']}"
+                }
+                if output.get("limit"):
+                    tracing.metrics.inc("urban_code_limit_exceeded_total", tool=config["name"], limit=output["limit"])
+                    response["limit_exceeded"] = output["limit"]
+                return response
+            return {
+                "success": True,
+                "result": output["result"],
+                "error": None
+            }
+
+    def _get_pool(self, config: Dict) -> WorkerPool:
+        """检出仓库并获取工具的工作进程池（提交变化时替换旧池）"""
+        # 检出在返回前已固定（其他仓库的检出触发的 gc 不会删除它），由工作进程池持有到关闭
+        with tracing.span("repo_checkout", tool=config["name"]):
+            tree = self.repos.checkout(config["repo"], config.get("ref", "HEAD"), config.get("sparse"), pin=True)
+        root = tree / config.get("path", "")
+
+        try:
+            with self._lock:
+                pool = self.pools.get(config["name"])
+                # 墙钟超时由调用方控制，其余限制在工作进程中生效
+                limits = {key: value for key, value in self._limits(config).items() if key != "timeout"}
+                if pool is not None and pool.root == root and pool.entry == config["entry"] and pool.limits == limits:
+                    self.repos.unpin(tree)  # 现有的池已固定同一检出
+                    return pool
+                options = {key: config.get(key, default) for key, default in self.pool_defaults.items()}
+                self.result_dir.mkdir(exist_ok=True)  # close 之后继续使用时重建
+                new_pool = WorkerPool(root, config["entry"], size=options["workers"],
+                                      max_calls=options["max_calls"], max_memory_mb=options["max_memory_mb"],
+                                      limits=limits, result_dir=self.result_dir, inline_bytes=self.inline_bytes,
+                                      name=config["name"])
+                old_tree = self._trees.get(config["name"])
+                self.pools[config["name"]], self._trees[config["name"]] = new_pool, tree
+        except BaseException:
+            self.repos.unpin(tree)
+            raise
+        if pool is not None:
+            self._close_pool(pool, old_tree)
+        return new_pool
+
+    def _limits(self, config: Dict) -> Dict:
+        """工具的资源限制：执行器默认值 < 工具的 timeout < 工具的 limits"""
+        limits = dict(self.limits)
+        if "timeout" in config:
+            limits["timeout"] = config["timeout"]
+        limits.update(config.get("limits", {}))
+        return limits
+
+    def _close_pool(self, pool: WorkerPool, tree: Path):
+        pool.close()
+        self.repos.unpin(tree)
+
+    def prefetch(self, config: Dict):
+        """
+        后台检出工具的仓库并启动工作进程（工具名确定、参数尚未生成时调用）；
+        随后的 execute 会合并到这次检出
+
+        Args:
+            config: 代码工具配置
+        """
+        threading.Thread(target=self.warm, args=(config,), daemon=True).start()
+
+    def warm(self, config: Dict):
+        """
+        预先检出仓库并启动工作进程（配置了 warm: true 的工具在工具池加载时调用）
+
+        Args:
+            config: 代码工具配置
+        """
+        try:
+            self._get_pool(config).start()
+        except RepoError as e:
+            print(f"⚠️  Failed to fetch repository for {config['name']}: {e}")
+
+    # ---------- 工具发现 ----------
+
+    def discover(self, spec: Dict, background: bool = False,
+                 on_ready: Optional[Callable[[], None]] = None) -> List[Dict]:
+        """
+        把仓库中的函数转换为工具
+
+        转换结果按提交 SHA 缓存，已转换的提交不再检出；转换失败时沿用该声明上一次的结果。
+
+        Args:
+            spec: code_repos 中的仓库声明
+            background: 不等待转换，立即返回该声明上一次转换的工具（没有时为空），
+                        新提交的转换在后台进行
+            on_ready: 后台转换得到新结果后调用（如重新加载工具池）
+
+        Returns:
+            工具配置列表（与 code_tools 条目格式相同，ref 固定为转换时的提交）
+        """
+        key = self._spec_key(spec)
+        if background:
+            manifest = self.conversions.latest(key)
+            self._convert_in_background(spec, key, manifest, on_ready)
+        else:
+            try:
+                manifest = self._convert(spec, key)
+            except RepoError as e:
+                manifest = self.conversions.latest(key)
+                if manifest is None:
+                    print(f"⚠️  Code tool conversion failed for {spec['repo']}: {e}")
+                    return []
+                print(f"⚠️  Using stale code tools for {spec['repo']}: {e}")
+        return self._converted_tool_configs(spec, manifest) if manifest else []
+
+    def _spec_key(self, spec: Dict) -> str:
+        """声明哈希：仓库、ref 和决定转换范围的字段"""
+        fields = [spec["repo"], spec.get("ref", "HEAD"), sorted(spec.get("sparse") or []), spec.get("path", ""),
+                  sorted(spec.get("modules") or [])]
+        return hashlib.sha256(json.dumps(fields).encode()).hexdigest()[:16]
+
+    def _convert(self, spec: Dict, key: str) -> Dict:
+        """解析 ref 并转换对应提交（已转换时直接读取清单）"""
+        sha = self.repos.resolve(spec["repo"], spec.get("ref", "HEAD"))
+        manifest = self.conversions.load(sha, key)
+        if manifest is not None:
+            return manifest
+        with tracing.span("code_convert", repo=spec["repo"], sha=sha):
+            tree = self.repos.checkout(spec["repo"], sha, spec.get("sparse"), pin=True)
+            try:
+                return self.conversions.convert(tree / spec.get("path", ""), sha, key, spec.get("modules"))
+            finally:
+                self.repos.unpin(tree)
+
+    def _convert_in_background(self, spec: Dict, key: str, current: Optional[Dict], on_ready: Optional[Callable]):
+        with self._lock:
+            if key in self._converting:
+                return
+            self._converting.add(key)
+
+        def run():
+            try:
+                manifest = self._convert(spec, key)
+            except RepoError as e:
+                print(f"⚠️  Code tool conversion failed for {spec['repo']}: {e}")
+                return
+            finally:
+                with self._lock:
+                    self._converting.discard(key)
+            if on_ready and (current is None or manifest["sha"] != current["sha"]):
+                on_ready()
+
+        threading.Thread(target=run, name=f"code-convert-{key}", daemon=True).start()
+
+    def _converted_tool_configs(self, spec: Dict, manifest: Dict) -> List[Dict]:
+        """把转换结果变成工具池配置（函数重名时加上模块名）"""
+        prefix = spec.get("prefix", "")
+        counts = {}
+        for tool in manifest["tools"]:
+            counts[tool["function"]] = counts.get(tool["function"], 0) + 1
+
+        configs = []
+        base = {key: value for key, value in spec.items() if key not in DISCOVERY_KEYS}
+        for tool in manifest["tools"]:
+            name = tool["function"]
+            if counts[name] > 1:
+                name = f"{tool['entry'].split(':')[0].replace('.', '_')}_{name}"
+            configs.append(dict(base, name=prefix + name, description=tool["description"], ref=manifest["sha"],
+                                entry=tool["entry"], params=tool["params"]))
+        return configs
+
+    def close(self):
+        """结束所有工作进程，删除传输目录中未取走的数据"""
+        with self._lock:
+            pools = [(pool, self._trees[name]) for name, pool in self.pools.items()]
+            self.pools, self._trees = {}, {}
+        for pool, tree in pools:
+            self._close_pool(pool, tree)
+        remove_transport_dir(self.result_dir)
@@ -0,0 +1,306 @@
+"""
+代码工具的常驻工作进程池
+
+每个代码工具一个池，池中的工作进程（code_runner.py）启动时导入一次入口模块，
+之后通过管道按行收发 JSON 处理调用，预热后的调用只有进程间通信的开销：
+- 池大小 size：同时处理的调用数，没有空闲进程时调用等待
+- 回收：处理 max_calls 次调用、或峰值内存超过 max_memory_mb 后退出，后台补充新的进程
+- 超时：单次调用超时的进程被杀掉（卡住的代码无法中断），由新进程替换
+- 崩溃：进程意外退出时本次调用失败，下一次调用启动新进程
+- 资源限制 limits（见 code_runner.py）：cpu_seconds / memory_mb 由工作进程以 rlimit 设置，
+  max_output_bytes 在工作进程中检查，超长的输出行在这里也会被截断并结束进程；
+  超出限制的错误带有 limit 字段（"cpu" / "memory" / "timeout" / "output"）
+- 大结果：配置 result_dir 时工作进程把大数组写入该目录（见 result_buffer.py），
+  调用返回前映射为 ResultBuffer；进程被结束或崩溃时留下的数据文件在这里删除
+"""
+
+import os
+import sys
+import json
+import queue
+import signal
+import itertools
+import threading
+import subprocess
+from pathlib import Path
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from .result_buffer import DEFAULT_INLINE_BYTES, ENV_DIR, ENV_INLINE_BYTES, attach, release_files
+
+RUNNER = Path(__file__).with_name("code_runner.py")
+# 超过 CPU 软限制时内核发送的信号（Windows 没有）
+SIGXCPU = getattr(signal, "SIGXCPU", None)
+# 输出行超过 max_output_bytes 时的标记
+_OVERFLOW = object()
+
+
+class WorkerError(Exception):
+    """工作进程启动失败、超时、崩溃或超出资源限制"""
+
+    def __init__(self, message: str, limit: Optional[str] = None):
+        super().__init__(message)
+        self.limit = limit
+
+
+class _Worker:
+    """一个工作进程"""
+
+    def __init__(self, root: Path, entry: str, limits: Dict, env: Dict[str, str]):
+        args = [sys.executable, str(RUNNER), str(root), entry]
+        if limits:
+            args.append(json.dumps(limits))
+        self.process = subprocess.Popen(
+            args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=root,
+            env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1", **env),
+        )
+        self.pid = self.process.pid
+        self.limits = limits
+        self.calls = 0
+        self.rss = 0
+        self.exhausted = False
+        self._ids = itertools.count(1)
+        self._responses = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        # 工作进程自己检查输出大小，这里的上限只防止绕过协议直接写 stdout 的工具
+        max_line = self.limits.get("max_output_bytes", 0) + 4096 if self.limits.get("max_output_bytes") else -1
+        while True:
+            line = self.process.stdout.readline(max_line)
+            if not line:
+                break
+            if not line.endswith(b"\n") and len(line) >= max_line > 0:
+                self._responses.put(_OVERFLOW)
+                self.kill()
+                return
+            try:
+                self._responses.put(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        self._responses.put(None)
+
+    def _receive(self, timeout: float) -> Dict:
+        try:
+            message = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise WorkerError(f"timed out after {timeout}s", limit="timeout")
+        if message is _OVERFLOW:
+            raise WorkerError(f"output exceeds the limit of {self.limits['max_output_bytes']} bytes", limit="output")
+        if message is None:
+            code = self.process.wait()
+            if SIGXCPU is not None and code == -SIGXCPU:
+                raise WorkerError(f"exceeded its CPU limit of {self.limits.get('cpu_seconds')}s", limit="cpu")
+            raise WorkerError(f"worker exited with code {code}")
+        return message
+
+    def wait_ready(self, timeout: float):
+        message = self._receive(timeout)
+        if "error" in message:
+            self.kill()
+            raise WorkerError(f"failed to load entry: {message['error']}")
+
+    def call(self, arguments: Dict, timeout: float) -> Dict:
+        request_id = next(self._ids)
+        try:
+            self.process.stdin.write((json.dumps({"id": request_id, "arguments": arguments}) + "\n").encode())
+            self.process.stdin.flush()
+        except OSError:
+            raise WorkerError(f"worker exited with code {self.process.wait()}")
+        while True:
+            message = self._receive(timeout)
+            if message.get("id") == request_id:
+                break
+        self.calls += 1
+        self.rss = message.pop("rss", 0)
+        # 内存分配失败后进程状态不可靠，调用结束后回收
+        self.exhausted = message.get("limit") == "memory"
+        message.pop("id")
+        return message
+
+    def stop(self, timeout: float = 2.0):
+        """关闭 stdin 让进程自行退出，超时则强制结束"""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+        self.process.wait()
+
+
+class WorkerPool:
+    """一个代码工具的工作进程池"""
+
+    def __init__(self, root: Path, entry: str, size: int = 2, max_calls: int = 1000,
+                 max_memory_mb: Optional[float] = None, limits: Optional[Dict] = None,
+                 result_dir: Optional[Path] = None, inline_bytes: int = DEFAULT_INLINE_BYTES,
+                 startup_timeout: float = 60.0, name: str = ""):
+        """
+        Args:
+            root: 导入根目录（工作进程的 sys.path[0] 和工作目录）
+            entry: 入口函数 module:function
+            size: 最大工作进程数
+            max_calls: 每个进程处理多少次调用后回收
+            max_memory_mb: 进程峰值内存超过该值（MB）后回收，None 表示不限制
+            limits: 资源限制 {"cpu_seconds", "memory_mb", "max_output_bytes"}（见 code_runner.py）
+            result_dir: 大结果的传输目录，None 表示全部结果经过管道
+            inline_bytes: 小于该大小的数组仍然内联在结果中
+            startup_timeout: 进程导入入口模块的超时（秒）
+            name: 池名称（用于错误信息）
+        """
+        self.root = Path(root)
+        self.entry = entry
+        self.size = size
+        self.max_calls = max_calls
+        self.max_memory = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        self.limits = dict(limits or {})
+        self.result_dir = result_dir
+        self._env = {ENV_DIR: str(result_dir), ENV_INLINE_BYTES: str(inline_bytes)} if result_dir else {}
+        self.startup_timeout = startup_timeout
+        self.name = name or entry
+        self.stats = Counter()
+
+        self._idle: List[_Worker] = []
+        self._count = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def workers(self) -> int:
+        """当前进程数（空闲 + 忙碌）"""
+        return self._count
+
+    @property
+    def idle_pids(self) -> List[int]:
+        with self._cond:
+            return [worker.pid for worker in self._idle]
+
+    def start(self):
+        """预先启动进程直到池满（并行导入入口模块）"""
+        threads = [threading.Thread(target=self._replenish) for _ in range(self.size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def call(self, arguments: Dict, timeout: float = 60.0) -> Dict[str, Any]:
+        """
+        在空闲进程中调用入口函数
+
+        Args:
+            arguments: 关键字参数
+            timeout: 等待空闲进程和调用本身的超时（秒）
+
+        Returns:
+            {"result": ...}（带外传输的大数组为 ResultBuffer）
+            或 {"error": "..."}（工具抛出的异常；超出内存或输出限制时带 limit 字段）
+
+        Raises:
+            WorkerError: 进程启动失败、调用超时、进程崩溃或超出 CPU 限制
+        """
+        worker = self._acquire(timeout)
+        try:
+            response = worker.call(arguments, timeout)
+        except WorkerError as e:
+            self.stats[{"timeout": "timeouts", None: "crashed"}.get(e.limit, "limit_exceeded")] += 1
+            self._discard(worker)
+            if self.result_dir:
+                release_files(self.result_dir, f"{worker.pid}-")
+            raise WorkerError(f"Code tool '{self.name}' {e}", e.limit)
+        self.stats["calls"] += 1
+        if response.get("limit"):
+            self.stats["limit_exceeded"] += 1
+
+        # 放回进程之前映射，失败时可以安全删除该进程留下的文件
+        buffers = response.pop("buffers", 0)
+        if buffers:
+            self.stats["buffers"] += buffers
+            try:
+                response["result"] = attach(response["result"], self.result_dir)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                release_files(self.result_dir, f"{worker.pid}-")
+                response = {"error": f"Result buffer unavailable: {e}"}
+        self._release(worker)
+        return response
+
+    def close(self):
+        """结束空闲进程，忙碌的进程在调用完成后结束"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+            self._cond.notify_all()
+        for worker in idle:
+            worker.stop()
+
+    # ---------- 进程管理 ----------
+
+    def _acquire(self, timeout: float) -> _Worker:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._closed or self._idle or self._count < self.size, timeout):
+                raise WorkerError(f"Code tool '{self.name}' timed out waiting for a free worker")
+            if self._closed:
+                raise WorkerError(f"Code tool '{self.name}' pool is closed")
+            if self._idle:
+                return self._idle.pop()
+            self._count += 1
+        try:
+            return self._spawn()
+        except WorkerError:
+            self._discard(None)
+            raise
+
+    def _spawn(self) -> _Worker:
+        """启动进程并等待入口模块导入完成"""
+        try:
+            worker = _Worker(self.root, self.entry, self.limits, self._env)
+        except OSError as e:
+            raise WorkerError(f"Code tool '{self.name}' failed to start: {e}")
+        try:
+            worker.wait_ready(self.startup_timeout)
+        except WorkerError as e:
+            raise WorkerError(f"Code tool '{self.name}' {e}")
+        self.stats["started"] += 1
+        return worker
+
+    def _replenish(self):
+        """后台补充一个空闲进程（池未满时）"""
+        with self._cond:
+            if self._closed or self._count >= self.size:
+                return
+            self._count += 1
+        try:
+            worker = self._spawn()
+        except WorkerError:
+            self._discard(None)
+            return
+        self._release(worker)
+
+    def _release(self, worker: _Worker):
+        """放回空闲列表；达到调用次数或内存上限的进程回收并在后台补充"""
+        recycle = (worker.calls >= self.max_calls or worker.exhausted
+                   or (self.max_memory and worker.rss > self.max_memory))
+        with self._cond:
+            if not recycle and not self._closed:
+                self._idle.append(worker)
+                self._cond.notify()
+                return
+        if recycle:
+            self.stats["recycled"] += 1
+        self._discard(worker)
+        if recycle and not self._closed:
+            threading.Thread(target=self._replenish, daemon=True).start()
+
+    def _discard(self, worker: Optional[_Worker]):
+        if worker is not None:
+            worker.stop()
+        with self._cond:
+            self._count -= 1
+            self._cond.notify()
@@ -0,0 +1,179 @@
+"""
+代码工具的工作进程（由 code_pool.WorkerPool 启动）
+
+用法: python code_runner.py <源码目录> <module:function> [资源限制 JSON]
+
+启动时导入一次入口函数，之后在 stdin/stdout 上按行收发 JSON：
+    启动完成  -> {"ready": true}  或 {"error": "..."}（随后退出）
+    {"id": 1, "arguments": {...}}  -> {"id": 1, "result": ..., "rss": 峰值内存字节数}
+                                   或 {"id": 1, "error": "...", "rss": ..., "limit": 超出的限制}
+stdin 关闭时退出。工具自身的 print 输出被重定向到 stderr，不会混入协议。
+
+资源限制（rlimit，导入入口模块之前设置）：
+- memory_mb: 地址空间上限（RLIMIT_AS），分配失败时本次调用返回 limit: "memory"
+- cpu_seconds: 每次调用的 CPU 时间上限（每次调用前按已用时间重设 RLIMIT_CPU 软限制），
+  超出时进程被 SIGXCPU 结束，由进程池报告
+- max_output_bytes: 序列化后的结果上限，超出时返回 limit: "output"
+
+大结果的带外传输（见 result_buffer.py）：结果中支持缓冲区协议的对象（bytes、array.array、
+NumPy 数组等）不小于 URBAN_INLINE_BYTES 时写入 URBAN_RESULT_DIR 下的文件，
+替换为 {"__buffer__": {"name", "format", "shape"}}，响应中的 buffers 为写出的个数；
+更小的数组内联为列表。带外数据不计入 max_output_bytes。
+"""
+
+import os
+import sys
+import json
+import math
+import importlib
+import traceback
+
+try:
+    import resource
+except ImportError:  # Windows：不报告内存，不设资源限制
+    resource = None
+
+
+def load_entry(root: str, entry: str):
+    """把源码目录放在 sys.path 最前面并导入入口函数"""
+    sys.path[0] = root
+    module_name, _, attr = entry.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"Invalid entry '{entry}', expected 'module:function'")
+    target = importlib.import_module(module_name)
+    for part in attr.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def peak_rss() -> int:
+    """本进程的峰值常驻内存（字节）"""
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def apply_memory_limit(limits: dict):
+    """设置地址空间上限（软硬限制相同，工具无法调高）"""
+    if resource is None or not limits.get("memory_mb"):
+        return
+    limit = int(limits["memory_mb"] * 1024 * 1024)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def arm_cpu_limit(limits: dict):
+    """本次调用可用的 CPU 时间：软限制 = 已用 CPU 时间 + cpu_seconds"""
+    if resource is None or not limits.get("cpu_seconds"):
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + limits["cpu_seconds"])
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.getrlimit(resource.RLIMIT_CPU)[1]))
+
+
+def disarm_cpu_limit(limits: dict):
+    if resource is None or not limits.get("cpu_seconds"):
+        return
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def export_buffers(value, prefix: str, inline_bytes: int, written: list):
+    """
+    把结果中的大缓冲区写入传输目录，返回替换后的结果
+
+    Args:
+        value: 工具返回值
+        prefix: 数据文件路径前缀（传输目录/进程号-请求号-）
+        inline_bytes: 小于该大小的缓冲区内联
+        written: 收集写出的文件路径
+    """
+    if isinstance(value, dict):
+        return {key: export_buffers(item, prefix, inline_bytes, written) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [export_buffers(item, prefix, inline_bytes, written) for item in value]
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    try:
+        view = memoryview(value)
+    except TypeError:
+        return value
+    if view.nbytes < inline_bytes or not prefix:
+        if view.format in ("B", "b", "c"):
+            return value  # 小的字节串保持原样
+        try:
+            return view.tolist()
+        except NotImplementedError:
+            return value
+    path = f"{prefix}{len(written)}.buf"
+    written.append(path)
+    with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+        f.write(view.cast("B") if view.c_contiguous else view.tobytes())
+    return {"__buffer__": {"name": os.path.basename(path), "format": view.format, "shape": list(view.shape)}}
+
+
+def remove_files(paths: list):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _reply(stdout, message: dict, max_bytes: int = 0, written: list = ()):
+    """发送一行响应（结果被替换为错误时先删除已写出的带外数据）"""
+    try:
+        line = json.dumps(message, ensure_ascii=False, default=str)
+    except ValueError as e:
+        line = json.dumps({"id": message.get("id"), "error": f"Result is not JSON serializable: {e}"})
+        remove_files(written)
+    if max_bytes and len(line.encode()) > max_bytes:
+        line = json.dumps({"id": message.get("id"), "rss": message.get("rss", 0), "limit": "output",
+                           "error": f"Output of {len(line.encode())} bytes exceeds the limit of {max_bytes} bytes"})
+        remove_files(written)
+    stdout.write(line + "\n")
+    stdout.flush()
+
+
+def main() -> int:
+    root, entry = sys.argv[1], sys.argv[2]
+    limits = json.loads(sys.argv[3]) if len(sys.argv) > 3 else {}
+    result_dir = os.environ.get("URBAN_RESULT_DIR")
+    inline_bytes = int(os.environ.get("URBAN_INLINE_BYTES", 64 * 1024))
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        apply_memory_limit(limits)
+        function = load_entry(root, entry)
+    except Exception as e:
+        traceback.print_exc()
+        _reply(stdout, {"error": f"{type(e).__name__}: {e}"})
+        return 1
+    _reply(stdout, {"ready": True})
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        prefix = os.path.join(result_dir, f"{os.getpid()}-{request['id']}-") if result_dir else ""
+        written = []
+        arm_cpu_limit(limits)
+        try:
+            result = export_buffers(function(**request["arguments"]), prefix, inline_bytes, written)
+            response = {"id": request["id"], "result": result}
+            if written:
+                response["buffers"] = len(written)
+        except MemoryError:
+            response = {"id": request["id"], "limit": "memory",
+                        "error": f"Memory limit of {limits.get('memory_mb')} MB exceeded"}
+        except Exception as e:
+            traceback.print_exc()
+            response = {"id": request["id"], "error": f"{type(e).__name__}: {e}"}
+        finally:
+            disarm_cpu_limit(limits)
+        if "error" in response:
+            remove_files(written)
+        response["rss"] = peak_rss()
+        _reply(stdout, response, limits.get("max_output_bytes", 0), written)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+"""
+离线地名库（Gazetteer）
+
+内置 GeoNames 中人口 15000 以上的城市（data/cities.tsv.gz，由 bench/build_gazetteer.py 生成），
+第一次使用时加载到内存并建立两种索引，之后查询在微秒级完成，不需要网络：
+1. 名称索引：规范化名称（含别名和中文名）-> 城市；排序后的名称数组代替前缀树，
+   二分查找得到某个前缀的全部名称（用于不完整的地名）
+2. 空间索引：城市在单位球面上的三维坐标构成的 k-d 树，用于反向地理编码（最近的城市）
+
+既作为 local 工具（geocode / reverse_geocode），也作为 API 工具的参数规范化器
+（normalize_arguments：把地名转换为 "City,CC" 或经纬度）。
+"""
+
+import re
+import gzip
+import math
+import heapq
+import bisect
+import threading
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+DATA_DIR = Path(__file__).parent / "data"
+CITIES_FILE = DATA_DIR / "cities.tsv.gz"
+COUNTRIES_FILE = DATA_DIR / "countries.tsv"
+
+EARTH_RADIUS_KM = 6371.0088
+
+# 参数规范化方式：place -> "City,CC"；coordinates -> latitude / longitude 参数
+NORMALIZERS = ("place", "coordinates")
+
+# 不是 ISO 代码、但常用来指代国家的写法
+COUNTRY_ALIASES = {"uk": "GB", "usa": "US", "america": "US", "中国": "CN", "美国": "US", "英国": "GB", "日本": "JP"}
+
+_SEPARATORS = re.compile(r"[\s\-‐'’`.,_/()]+")
+_COMBINING = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+_QUALIFIER = re.compile(r"[,，]")
+
+
+def fold(name: str) -> str:
+    """规范化地名：去掉重音符号、统一大小写和分隔符（"São-Paulo" -> "sao paulo"）"""
+    if not name.isascii():
+        name = _COMBINING.sub("", unicodedata.normalize("NFKD", name))
+    return _SEPARATORS.sub(" ", name.casefold()).strip()
+
+
+def ascii_name(name: str) -> str:
+    """保留大小写的 ASCII 名称（"Zürich" -> "Zurich"），用于上游 API 参数"""
+    return _COMBINING.sub("", unicodedata.normalize("NFKD", name)).encode("ascii", "ignore").decode()
+
+
+def _unit_vector(latitude: float, longitude: float):
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)
+
+
+def _chord_to_km(chord_squared: float) -> float:
+    return 2 * math.asin(min(1.0, math.sqrt(chord_squared) / 2)) * EARTH_RADIUS_KM
+
+
+class Gazetteer:
+    """城市名称索引 + 空间索引"""
+
+    def __init__(self, cities_path: Path = CITIES_FILE, countries_path: Path = COUNTRIES_FILE):
+        """
+        加载城市数据并建立索引
+
+        Args:
+            cities_path: 城市数据（gzip 压缩的 TSV，格式见 bench/build_gazetteer.py）
+            countries_path: 国家数据（TSV: 代码、ISO3、名称）
+        """
+        self.country_names: Dict[str, str] = {}
+        self._countries: Dict[str, str] = dict(COUNTRY_ALIASES)
+        with open(countries_path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                code, iso3, name = line.rstrip("\n").split("\t")
+                self.country_names[code] = name
+                for key in (code.casefold(), iso3.casefold(), fold(name)):
+                    self._countries.setdefault(key, code)
+
+        # 列式存储
+        with gzip.open(cities_path, "rt", encoding="utf-8") as f:
+            rows = [line.rstrip("\n").split("\t") for line in f if not line.startswith("#")]
+        names, aliases, lats, lons, countries, populations, timezones = zip(*rows) if rows else ([],) * 7
+        self.names: List[str] = list(names)
+        self.countries: List[str] = list(countries)
+        self.timezones: List[str] = list(timezones)
+        self.latitudes = array("d", map(float, lats))
+        self.longitudes = array("d", map(float, lons))
+        self.populations = array("q", map(int, populations))
+
+        # 同名城市按人口从多到少（数据中的别名已经规范化）
+        self._primary = primary = list(map(fold, names))
+        by_name: Dict[str, List[int]] = {}
+        for i, alias_list in enumerate(aliases):
+            for key in (primary[i], *alias_list.split("|")) if alias_list else (primary[i],):
+                ids = by_name.get(key)
+                if ids is None:
+                    by_name[key] = [i]
+                else:
+                    ids.append(i)
+        population = self.populations.__getitem__
+        for ids in by_name.values():
+            if len(ids) > 1:
+                ids.sort(key=population, reverse=True)
+        self._by_name = by_name
+        self._keys = sorted(by_name)
+
+        # k-d 树：按深度轮流以 x / y / z 为轴，节点为区间中点（隐式平衡树）
+        vectors = list(map(_unit_vector, self.latitudes, self.longitudes))
+        axes = tuple(array("d", axis) for axis in zip(*vectors)) if vectors else (array("d"),) * 3
+        self._tree = list(range(len(self.names)))
+        self._build(axes, 0, len(self._tree), 0)
+        # 按树中顺序连续存放的 x, y, z（查询时顺序访问，不必经过编号间接寻址）
+        self._coords = array("d", (value for i in self._tree for value in (axes[0][i], axes[1][i], axes[2][i])))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _build(self, axes: tuple, lo: int, hi: int, depth: int):
+        if hi - lo <= 1:
+            return
+        self._tree[lo:hi] = sorted(self._tree[lo:hi], key=axes[depth % 3].__getitem__)
+        mid = (lo + hi) // 2
+        self._build(axes, lo, mid, depth + 1)
+        self._build(axes, mid + 1, hi, depth + 1)
+
+    # ---------- 名称 ----------
+
+    def country_code(self, text: str) -> Optional[str]:
+        """国家代码、ISO3 代码或国家名称 -> 两位国家代码（无法识别时为 None）"""
+        return self._countries.get(text.strip().casefold()) or self._countries.get(fold(text))
+
+    def complete(self, prefix: str, limit: int = 10, country: str = None) -> List[int]:
+        """
+        以 prefix 开头的城市（名称以 prefix 开头的优先于别名，再按人口从多到少）
+
+        Args:
+            prefix: 名称前缀
+            limit: 最多返回的数量
+            country: 只返回该国家（两位代码）的城市
+
+        Returns:
+            城市编号列表
+        """
+        key = fold(prefix)
+        if not key:
+            return []
+        found = set()
+        for i in range(bisect.bisect_left(self._keys, key), len(self._keys)):
+            name = self._keys[i]
+            if not name.startswith(key):
+                break
+            found.update(self._by_name[name])
+        if country:
+            found = {i for i in found if self.countries[i] == country}
+        return heapq.nlargest(limit, found, key=lambda i: (self._primary[i].startswith(key), self.populations[i]))
+
+    def lookup(self, name: str, country: str = None, limit: int = 1) -> List[int]:
+        """
+        按名称查找城市：先精确匹配（含别名），没有时按前缀匹配
+
+        Returns:
+            城市编号列表（按人口从多到少）
+        """
+        ids = self._by_name.get(fold(name), [])
+        if country:
+            ids = [i for i in ids if self.countries[i] == country]
+        return ids[:limit] if ids else self.complete(name, limit, country)
+
+    def geocode(self, query: str, country: str = None, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        地名 -> 城市
+
+        支持 "Paris"、"Paris, France"、"London,GB"、"北京" 等写法；逗号后最后一段能识别为国家时用于筛选，
+        否则忽略（如省、州名）。
+
+        Args:
+            query: 地名
+            country: 国家（代码或名称，优先于 query 中的国家）
+            limit: 最多返回的数量
+
+        Returns:
+            匹配的城市（见 record）
+        """
+        parts = [part.strip() for part in _QUALIFIER.split(query) if part.strip()]
+        if not parts:
+            return []
+        code = self.country_code(country) if country else None
+        if country and code is None:
+            return []
+        ids = self._by_name.get(fold(query), []) if len(parts) > 1 and not code else []
+        if not ids:
+            qualifier = self.country_code(parts[-1]) if len(parts) > 1 else None
+            ids = self.lookup(parts[0], code or qualifier, limit)
+        return [self.record(i) for i in ids[:limit]]
+
+    # ---------- 空间 ----------
+
+    def nearest(self, latitude: float, longitude: float, limit: int = 1,
+                max_km: float = None, min_population: int = 0) -> List[tuple]:
+        """
+        最近的城市（k-d 树搜索，单位球面上的弦长与大圆距离单调对应）
+
+        Args:
+            latitude: 纬度
+            longitude: 经度
+            limit: 最多返回的数量
+            max_km: 只返回该距离（公里）以内的城市（同时用于剪枝）
+            min_population: 只返回人口不少于该值的城市（如跳过大城市的街区）
+
+        Returns:
+            [(距离（公里）, 城市编号), ...]，由近到远
+
+        Raises:
+            ValueError: 经纬度超出范围
+        """
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError(f"Coordinates out of range: ({latitude}, {longitude})")
+        point = _unit_vector(latitude, longitude)
+        coords, populations, tree = self._coords, self.populations, self._tree
+        # 弦长平方的上限（单位球上任意两点不超过 4）
+        radius = 4.0 if max_km is None else (2 * math.sin(min(max_km / EARTH_RADIUS_KM, math.pi) / 2)) ** 2
+        best = []  # 大小为 limit 的最大堆 (-弦长平方, 编号)
+
+        # 显式栈：先访问查询点所在一侧，另一侧记下到分割面的距离，出栈时再判断能否剪枝
+        stack = [(0, len(tree), 0, 0.0)]
+        while stack:
+            lo, hi, axis, bound = stack.pop()
+            worst = -best[0][0] if len(best) == limit else radius
+            if bound > worst:
+                continue
+            while lo < hi:
+                mid = (lo + hi) // 2
+                base = mid * 3
+                dx, dy, dz = point[0] - coords[base], point[1] - coords[base + 1], point[2] - coords[base + 2]
+                distance = dx * dx + dy * dy + dz * dz
+                i = tree[mid]
+                if distance <= worst and populations[i] >= min_population:
+                    if len(best) < limit:
+                        heapq.heappush(best, (-distance, i))
+                    else:
+                        heapq.heapreplace(best, (-distance, i))
+                    worst = -best[0][0] if len(best) == limit else radius
+                diff = (dx, dy, dz)[axis]
+                next_axis = (axis + 1) % 3
+                if diff > 0:
+                    stack.append((lo, mid, next_axis, diff * diff))
+                    lo = mid + 1
+                else:
+                    stack.append((mid + 1, hi, next_axis, diff * diff))
+                    hi = mid
+                axis = next_axis
+
+        return sorted((_chord_to_km(-distance), i) for distance, i in best)
+
+    def reverse(self, latitude: float, longitude: float, limit: int = 1,
+                max_km: float = None, min_population: int = 0) -> List[Dict[str, Any]]:
+        """
+        坐标 -> 最近的城市（参数见 nearest）
+
+        Returns:
+            城市（见 record，含 distance_km），由近到远
+        """
+        return [dict(self.record(i), distance_km=round(km, 2))
+                for km, i in self.nearest(latitude, longitude, limit, max_km, min_population)]
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """城市编号 -> 结果字典（place 为 "City,CC" 格式）"""
+        country = self.countries[i]
+        return {
+            "name": self.names[i],
+            "country": country,
+            "country_name": self.country_names.get(country, ""),
+            "latitude": self.latitudes[i],
+            "longitude": self.longitudes[i],
+            "population": self.populations[i],
+            "timezone": self.timezones[i],
+            "place": f"{ascii_name(self.names[i]) or self.names[i]},{country}",
+        }
+
+
+_default: Optional[Gazetteer] = None
+_default_lock = threading.Lock()
+
+
+def load() -> Gazetteer:
+    """内置数据的地名库（第一次调用时加载，之后复用）"""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = Gazetteer()
+    return _default
+
+
+# ---------- local 工具入口 ----------
+
+def geocode(place: str, country: str = None, limit: int = 1) -> Dict[str, Any]:
+    """地名 -> 坐标"""
+    return {"query": place, "matches": load().geocode(place, country, max(1, int(limit)))}
+
+
+def reverse_geocode(latitude: float, longitude: float, limit: int = 1, max_km: float = None,
+                    min_population: int = 0) -> Dict[str, Any]:
+    """坐标 -> 最近的城市"""
+    matches = load().reverse(float(latitude), float(longitude), max(1, int(limit)),
+                             None if max_km is None else float(max_km), int(min_population))
+    return {"matches": matches}
+
+
+# ---------- 参数规范化 ----------
+
+def normalize_arguments(spec: Dict[str, Any], arguments: Dict, gazetteer: Gazetteer = None) -> Dict:
+    """
+    在调用工具之前把地名参数转换为上游 API 需要的格式
+
+    spec 的写法（参数名 -> 方式）:
+        {"place": "place"}          "北京" / "Paris, France" -> "Beijing,CN" / "Paris,FR"；
+                                    已是 "City,CC" 格式或无法识别时保持原样
+        {"place": "coordinates"}    地名 -> latitude / longitude 参数，并移除该参数；
+                                    已给出经纬度时直接移除
+        {"place": {"to": "coordinates", "latitude": "lat", "longitude": "lon"}}   自定义经纬度参数名
+
+    Args:
+        spec: 规范化配置
+        arguments: 调用参数（不修改）
+        gazetteer: 地名库（默认为内置数据）
+
+    Returns:
+        规范化后的参数
+
+    Raises:
+        ValueError: 未知的规范化方式，或需要坐标的地名无法识别
+    """
+    arguments = dict(arguments)
+    for param, rule in spec.items():
+        rule = rule if isinstance(rule, dict) else {"to": rule}
+        if rule.get("to") not in NORMALIZERS:
+            raise ValueError(f"Unknown normalizer for '{param}': {rule.get('to')} (expected one of {NORMALIZERS})")
+        value = arguments.get(param)
+        if value is None or not str(value).strip():
+            arguments.pop(param, None)
+            continue
+        value = str(value).strip()
+
+        if rule["to"] == "place":
+            gazetteer = gazetteer or load()
+            name, _, code = value.rpartition(",")
+            if name.strip() and code.strip().upper() in gazetteer.country_names:
+                continue
+            matches = gazetteer.geocode(value)
+            if matches:
+                arguments[param] = matches[0]["place"]
+            continue
+
+        lat_param, lon_param = rule.get("latitude", "latitude"), rule.get("longitude", "longitude")
+        del arguments[param]
+        if arguments.get(lat_param) is not None and arguments.get(lon_param) is not None:
+            continue
+        matches = (gazetteer or load()).geocode(value)
+        if not matches:
+            raise ValueError(f"Unknown place '{value}'")
+        arguments[lat_param] = matches[0]["latitude"]
+        arguments[lon_param] = matches[0]["longitude"]
+    return arguments
+
+
+# 测试代码
+if __name__ == "__main__":
+    import sys
+    import time
+
+    start = time.perf_counter()
+    gazetteer = load()
+    print(f"✅ {len(gazetteer)} cities loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for query in sys.argv[1:] or ["北京", "Paris, France", "London,CA", "San Fran"]:
+        start = time.perf_counter()
+        matches = gazetteer.geocode(query)
+        elapsed = (time.perf_counter() - start) * 1e6
+        print(f"📍 {query} -> {matches[0]['place'] if matches else None} ({elapsed:.0f} µs)")
+
+    start = time.perf_counter()
+    nearest = gazetteer.reverse(31.23, 121.47)
+    print(f"🧭 (31.23, 121.47) -> {nearest[0]['place']} ({(time.perf_counter() - start) * 1e6:.0f} µs)")
@@ -0,0 +1,103 @@
+"""
+Local Executor - 在当前进程内调用 Python 函数
+
+用于纯计算、不需要隔离和缓存的内置工具（如离线地名库 gazetteer.py）。
+工具写在 local_tools 列表中:
+    {
+        "name": "geocode",
+        "function": "executors.gazetteer:geocode",
+        "setup": "executors.gazetteer:load",
+        "warm": true,
+        ...
+    }
+setup 可选，warm 时调用（如预先加载数据、建立索引），第一次调用工具时不必等待。
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from .registry import load_object
+
+
+class LocalExecutor:
+    """进程内函数工具执行器"""
+
+    def __init__(self, tools_dir: str = "./Cache/local"):
+        """
+        Args:
+            tools_dir: 缓存目录（函数在进程内执行，结果不缓存，不会创建该目录）
+        """
+        self.tools_dir = Path(tools_dir)
+        self._functions: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, spec: str) -> Callable:
+        """按 "module:attr" 导入函数（导入一次后复用）"""
+        function = self._functions.get(spec)
+        if function is None:
+            with self._lock:
+                function = self._functions.get(spec)
+                if function is None:
+                    function = self._functions[spec] = load_object(spec)
+        return function
+
+    def warm(self, config: Dict):
+        """
+        调用工具的 setup（配置了 warm: true 的工具在工具池加载时调用）
+
+        Args:
+            config: 工具配置
+        """
+        if config.get("setup"):
+            try:
+                self._resolve(config["setup"])()
+            except Exception as e:
+                print(f"⚠️  Failed to set up {config['name']}: {e}")
+
+    def execute(self, config: Dict, arguments: Dict) -> Dict[str, Any]:
+        """
+        调用工具函数
+
+        Args:
+            config: 工具配置
+                - name: 工具名称
+                - function: "module:attr"，以关键字参数调用
+            arguments: 实际调用参数
+
+        Returns:
+            {
+                "success": bool,
+                "result": Any,
+                "error": str | None
+            }
+        """
+        try:
+            function = self._resolve(config["function"])
+        except (KeyError, ValueError, ImportError, AttributeError) as e:
+            return {
+                "success": False,
+                "result": None,
+                "error": f"Invalid local tool {config['name']}: {e}"
+            }
+
+        try:
+            result = function(**{key: value for key, value in arguments.items() if value is not None})
+        except (TypeError, ValueError) as e:
+            return {
+                "success": False,
+                "result": None,
+                "error": f"Invalid arguments: {e}"
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "result": None,
+                "error": f"Unexpected error: {str(e)}"
+            }
+
+        return {
+            "success": True,
+            "result": result,
+            "error": None
+        }
@@ -1,11 +1,62 @@
 """
 MCP Executor - 调用 MCP 服务
 
-🚀 STATUS: Coming Soon
-这个模块计划在未来版本中实现。目前仅提供接口框架。
+1. 实现 MCP 协议通信：本地 stdio 传输（mcp_session.py），
+   以及远程共享服务的 Streamable HTTP/SSE 传输（mcp_http.py，配置 url 时使用）
+2. 处理 MCP 服务的启动和连接：每个服务一个长驻会话，
+   initialize 握手只做一次，并发调用复用同一条管道
+3. 会话的容量上限、空闲回收、崩溃重启和健康检查见 mcp_supervisor.py
+4. 工具发现：对 urban_tools.json 中 "mcp_servers" 声明的服务执行 tools/list，
+   结果缓存在 Cache/mcp/discovery（见 discover）
+5. 结果缓存：配置了 cache_ttl 的工具（只读、幂等，如地理编码）按规范化参数缓存结果，
+   与 API 工具共用内存 + 磁盘两级缓存和命中率指标（见 result_cache.py）；
+   未配置的工具（有状态的操作）每次都调用服务
+6. 大结果：本地 stdio 服务通过环境变量 URBAN_RESULT_DIR 得到传输目录（/dev/shm 下），
+   把大数组写入该目录并返回 file:// 的 resource 内容，结果中对应位置为 ResultBuffer
+   （零拷贝的只读映射，见 result_buffer.py）；带有 ResultBuffer 的结果不缓存
 
-1. 实现 MCP 协议通信
-2. 处理 MCP 服务的启动和连接
+执行器选项（urban_tools.json 的 "executors"，见 executors/registry.py）:
+    "executors": {"mcp": {"class": "executors.mcp_executor:MCPExecutor",
+                          "options": {"max_servers": 4, "idle_timeout": 600}}}
+
+工具配置:
+    {
+        "name": "amap_geocode",             # 工具池中的名称
+        "description": "...",
+        "command": "npx",
+        "args": ["-y", "@amap/amap-maps-mcp-server"],
+        "env": {"AMAP_MAPS_API_KEY": "${AMAP_API_KEY}"},
+        "server": "amap",                   # 可选：共享同一服务进程的工具使用相同的 server 名
+        "mcp_tool": "maps_geo",             # 可选：服务端的工具名（默认同 name）
+        "timeout": 30,                      # 可选：单次调用超时（秒）
+        "warm": true,                       # 可选：启动时预先拉起服务进程
+        "cache_ttl": 86400,                 # 可选：结果缓存有效期（秒），只用于只读/幂等工具
+        "params": {...}
+    }
+
+远程服务（Streamable HTTP）用 url 代替 command/args/env:
+    {
+        "name": "traffic_flow",
+        "description": "...",
+        "url": "http://mcp.internal:8080/mcp",
+        "headers": {"Authorization": "Bearer ${MCP_TOKEN}"},
+        "server": "traffic",
+        "params": {...}
+    }
+
+服务声明（自动发现工具）:
+    "mcp_servers": [
+        {
+            "server": "amap",
+            "command": "npx",
+            "args": ["-y", "@amap/amap-maps-mcp-server"],
+            "env": {"AMAP_MAPS_API_KEY": "${AMAP_API_KEY}"},
+            "version": "1.0.0",                 # 可选：参与缓存键，修改后重新发现
+            "prefix": "amap_",                  # 可选：工具名前缀（默认 "<server>_"）
+            "discovery_ttl": 86400,             # 可选：缓存有效期（秒）
+            "cache_ttl": {"maps_geo": 86400}    # 可选：按服务端工具名设置结果缓存
+        }
+    ]
 
 参考资料：
 - MCP 官方文档: https://modelcontextprotocol.io/
@@ -14,119 +65,389 @@ MCP Executor - 调用 MCP 服务
 
 import os
 import json
-import subprocess
-from typing import Dict, Any
+import time
+import atexit
+import hashlib
+import threading
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from typing import TYPE_CHECKING, ContextManager, Dict, Any, List, Union
 from pathlib import Path
 
+import tracing
+from .mcp_session import MCPError, MCPStdioSession
+from .mcp_supervisor import MCPSupervisor
+from .result_buffer import ENV_DIR, ResultBuffer, open_buffer, remove_transport_dir, transport_dir
+from .result_cache import ResultCache, canonical_key, key_prefix
+
+# HTTP 传输（依赖 requests）在第一次连接远程服务时才导入
+if TYPE_CHECKING:
+    from .mcp_http import MCPHttpSession
+
+
+# tools/list 缓存的默认有效期（秒）
+DISCOVERY_TTL = 24 * 3600
+# 只用于发现、不复制到工具配置中的字段
+DISCOVERY_KEYS = ("prefix", "discovery_ttl", "cache_ttl")
+
 
 class MCPExecutor:
     """MCP 工具执行器"""
 
-    def __init__(self, tools_dir: str = "./Cache/mcp"):
+    def __init__(self, tools_dir: str = "./Cache/mcp", **supervisor_options):
         """
         初始化 MCP 执行器
 
         Args:
             tools_dir: MCP 工具缓存目录
+            supervisor_options: 传给 MCPSupervisor 的选项（max_servers、idle_timeout、ping_interval 等）
         """
         self.tools_dir = Path(tools_dir)
         self.tools_dir.mkdir(parents=True, exist_ok=True)
 
-        # MCP 连接池（可选实现）
-        self.connections = {}
+        # 结果缓存（内存层 + 磁盘层）
+        self.cache = ResultCache(self.tools_dir)
+        # 大结果的传输目录（close 时删除）
+        self.result_dir = transport_dir("mcp")
+
+        self.supervisor = MCPSupervisor(self._start_mcp_server, **supervisor_options)
+        # MCP 连接池 {服务标识: MCPStdioSession}（按最近使用排序，由监管器维护）
+        self.connections = self.supervisor.sessions
+        # 已发现工具的服务 {服务标识: (缓存路径, 服务配置)}
+        self._discovered: Dict[str, tuple] = {}
+        atexit.register(self.close)
 
     def execute(self, config: Dict, arguments: Dict) -> Dict[str, Any]:
         """
         执行 MCP 工具调用
 
-        ⚠️ STATUS: Coming Soon
-        此功能尚未实现，计划在下一个版本中推出。
-
         Args:
             config: 工具配置
                 - name: 工具名称
                 - command: 启动命令 (e.g., "npx")
                 - args: 命令参数 (e.g., ["-y", "@amap/amap-maps-mcp-server"])
                 - env: 环境变量
+                - server / mcp_tool / timeout / cache_ttl: 见模块说明
             arguments: 工具参数
 
         Returns:
             {
                 "success": bool,
-                "result": Any,
+                "result": Any（大数组为 ResultBuffer）,
                 "error": str | None
             }
         """
-        return {
-            "success": False,
-            "result": None,
-            "error": "MCP executor is coming soon. This feature will be available in a future release."
+        # 未填写的可选参数不传给服务
+        arguments = {key: value for key, value in arguments.items() if value is not None}
+
+        ttl = config.get("cache_ttl")
+        if ttl:
+            cache_key = self._generate_cache_key(config, arguments)
+            cached = self._check_cache(cache_key, ttl, tool_name=config["name"])
+            if cached is not None:
+                return {
+                    "success": True,
+                    "result": cached,
+                    "error": None,
+                    "from_cache": True
+                }
+
+        progress = []
+        with tracing.span("mcp_call", tool=config["name"]) as span:
+            try:
+                with self._session(config) as session:
+                    result = session.call_tool(config.get("mcp_tool", config["name"]), arguments,
+                                               timeout=config.get("timeout"), on_progress=progress.append)
+            except MCPError as e:
+                span.set(error=str(e))
+                return {
+                    "success": False,
+                    "result": None,
+                    "error": f"MCP call failed: {str(e)}"
+                }
+
+            if progress:
+                span.set(progress=len(progress))
+            if result.get("isError"):
+                return {
+                    "success": False,
+                    "result": None,
+                    "error": f"MCP tool error: {self._content_text(result)}"
+                }
+
+            try:
+                buffers = self._attach_buffers(result)
+            except (OSError, ValueError) as e:
+                span.set(error=str(e))
+                return {
+                    "success": False,
+                    "result": None,
+                    "error": f"MCP result buffer unavailable: {str(e)}"
+                }
+
+        parsed = self._parse_result(result)
+        if ttl and not buffers:
+            self._save_cache(cache_key, parsed)
+        response = {
+            "success": True,
+            "result": parsed,
+            "error": None
         }
+        # 服务端推送的进度通知（长任务的阶段信息和部分结果）
+        if progress:
+            response["progress"] = progress
+        return response
 
-    def _mock_mcp_call(self, config: Dict, arguments: Dict) -> Dict:
+    def prefetch(self, config: Dict):
         """
-        临时的 MCP 调用模拟
-        MCP 开发者应替换此函数为真实实现
+        预取某个工具的磁盘结果缓存到内存（工具名确定、参数尚未生成时调用）
+
+        Args:
+            config: 工具配置（未配置 cache_ttl 时不做任何事）
         """
-        return {
-            "tool": config["name"],
-            "status": "mocked",
-            "message": "This is a mock response. MCP developer should implement real MCP communication.",
-            "arguments": arguments
-        }
+        if config.get("cache_ttl"):
+            self.cache.prefetch(key_prefix(self._cache_namespace(config)), config["cache_ttl"])
 
-    def _start_mcp_server(self, config: Dict) -> subprocess.Popen:
+    def _server_key(self, config: Dict) -> str:
+        """服务标识：优先使用 server 字段，否则按启动命令和环境变量区分"""
+        if config.get("server"):
+            return config["server"]
+        spec = json.dumps([config.get("url") or config["command"], config.get("args", []), config.get("env", {})],
+                          sort_keys=True)
+        return hashlib.md5(spec.encode()).hexdigest()[:12]
+
+    def _session(self, config: Dict) -> ContextManager[Union[MCPStdioSession, "MCPHttpSession"]]:
+        """租用（必要时启动）服务会话，with 块结束时归还"""
+        return self.supervisor.lease(self._server_key(config), config)
+
+    def warm(self, config: Dict):
         """
-        启动 MCP 服务器
+        预先启动服务（配置了 warm: true 的工具在工具池加载时调用）
 
-        TODO: MCP 开发者实现
-        - 使用 subprocess 启动 MCP 服务
-        - 设置环境变量
-        - 建立 stdio 通信
+        Args:
+            config: 工具配置
         """
-        command = config["command"]
-        args = config.get("args", [])
-        env = os.environ.copy()
+        try:
+            self.supervisor.warm(self._server_key(config), config)
+        except MCPError as e:
+            print(f"⚠️  Failed to warm MCP server for {config['name']}: {e}")
 
-        # 添加配置中的环境变量
-        for key, value in config.get("env", {}).items():
-            # 替换 ${VAR} 格式的环境变量引用
-            if value.startswith("${") and value.endswith("}"):
-                env_var = value[2:-1]
-                env[key] = os.getenv(env_var, "")
+    def _start_mcp_server(self, config: Dict) -> Union[MCPStdioSession, "MCPHttpSession"]:
+        """
+        启动 MCP 服务器（或连接远程服务）并完成 initialize 握手
+
+        Args:
+            config: 工具配置（command / args / env / cwd，或 url / headers）
+        """
+        key = self._server_key(config)
+        if config.get("url"):
+            from .mcp_http import MCPHttpSession
+            session = MCPHttpSession(config["url"], headers=self._expand_env(config.get("headers", {})),
+                                     request_timeout=config.get("timeout", 30), name=key)
+        else:
+            self.result_dir.mkdir(exist_ok=True)  # close 之后继续使用时重建
+            env = dict(os.environ, **{ENV_DIR: str(self.result_dir)})
+            env.update(self._expand_env(config.get("env", {})))
+            session = MCPStdioSession([config["command"]] + config.get("args", []), env=env, cwd=config.get("cwd"),
+                                      request_timeout=config.get("timeout", 30), name=key)
+
+        with tracing.span("mcp_start", tool=config["name"], server=key):
+            try:
+                session.start()
+            except OSError as e:
+                raise MCPError(f"Failed to start MCP server '{key}': {e}")
+        self._check_server_version(key, session)
+        return session
+
+    def _expand_env(self, values: Dict) -> Dict[str, str]:
+        """替换 ${VAR} 格式的环境变量引用"""
+        expanded = {}
+        for key, value in values.items():
+            if isinstance(value, str) and value.startswith("${") and value.endswith("}"):
+                expanded[key] = os.getenv(value[2:-1], "")
             else:
-                env[key] = value
-
-        # TODO: 启动进程并返回
-        # process = subprocess.Popen(
-        #     [command] + args,
-        #     stdin=subprocess.PIPE,
-        #     stdout=subprocess.PIPE,
-        #     stderr=subprocess.PIPE,
-        #     env=env
-        # )
-        # return process
-        pass
-
-    def _send_mcp_request(self, process: subprocess.Popen, method: str, params: Dict) -> Dict:
-        """
-        发送 MCP 请求 (待实现)
-        """
-        pass
-
-    def _check_cache(self, cache_key: str) -> Any:
-        """检查缓存"""
-        cache_file = self.tools_dir / f"{cache_key}.json"
-        if cache_file.exists():
-            with open(cache_file) as f:
+                expanded[key] = str(value)
+        return expanded
+
+    # ---------- 工具发现 ----------
+
+    def discover(self, server: Dict, refresh: bool = False) -> List[Dict]:
+        """
+        发现 MCP 服务提供的工具
+
+        tools/list 的结果按服务的 command/args/version 缓存在 Cache/mcp/discovery，
+        缓存有效时不启动服务；缓存过期（discovery_ttl）或服务启动时上报的版本
+        与缓存不一致时才重新获取。获取失败时沿用过期的缓存。
+
+        Args:
+            server: mcp_servers 中的服务声明（其余字段如 timeout、warm 复制到每个工具的配置）
+            refresh: 忽略缓存，强制重新获取
+
+        Returns:
+            工具配置列表（与 mcp_tools 条目格式相同）
+        """
+        key = self._server_key(server)
+        path = self._discovery_path(server)
+        cached = self._read_discovery(path)
+        ttl = server.get("discovery_ttl", DISCOVERY_TTL)
+
+        if refresh or cached is None or time.time() - cached["fetched_at"] >= ttl:
+            try:
+                with tracing.span("mcp_discover", server=key), self._session(dict(server, name=key)) as session:
+                    cached = self._write_discovery(path, session)
+            except (MCPError, OSError) as e:
+                if cached is None:
+                    print(f"⚠️  MCP tool discovery failed for {key}: {e}")
+                    return []
+                print(f"⚠️  Using stale MCP tool list for {key}: {e}")
+
+        self._discovered[key] = (path, server)
+        return [self._discovered_tool_config(server, tool) for tool in cached["tools"]]
+
+    def _discovery_path(self, server: Dict) -> Path:
+        """缓存路径：服务名 + command/args/version 的哈希"""
+        spec = json.dumps([server.get("url") or server["command"], server.get("args", []), server.get("version")],
+                          sort_keys=True)
+        digest = hashlib.sha256(spec.encode()).hexdigest()[:16]
+        return self.tools_dir / "discovery" / f"{self._server_key(server)}-{digest}.json"
+
+    def _read_discovery(self, path: Path) -> Any:
+        try:
+            with open(path) as f:
                 return json.load(f)
-        return None
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_discovery(self, path: Path, session: MCPStdioSession) -> Dict:
+        """执行 tools/list 并写入缓存"""
+        entry = {
+            "server_info": session.server_info,
+            "fetched_at": time.time(),
+            "tools": session.list_tools(),
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp, "w") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return entry
+
+    def _check_server_version(self, key: str, session: MCPStdioSession):
+        """服务版本与发现缓存不一致时在后台刷新缓存（下次加载工具池时生效）"""
+        if key not in self._discovered:
+            return
+        path, _ = self._discovered[key]
+        cached = self._read_discovery(path)
+        version = session.server_info.get("version")
+        if cached is None or cached["server_info"].get("version") == version:
+            return
+
+        def refresh():
+            try:
+                self._write_discovery(path, session)
+                print(f"🔄 MCP server {key} is now version {version}, tool list refreshed")
+            except (MCPError, OSError) as e:
+                print(f"⚠️  Failed to refresh MCP tool list for {key}: {e}")
+
+        threading.Thread(target=refresh, name=f"mcp-discover-{key}", daemon=True).start()
+
+    def _discovered_tool_config(self, server: Dict, tool: Dict) -> Dict:
+        """把 tools/list 中的工具（JSON Schema）转换为工具池配置"""
+        schema = tool.get("inputSchema") or {}
+        required = set(schema.get("required", []))
+        params = {}
+        for name, prop in schema.get("properties", {}).items():
+            param_type = prop.get("type", "string")
+            if isinstance(param_type, list):
+                param_type = next((t for t in param_type if t != "null"), "string")
+            params[name] = {
+                "type": param_type,
+                "required": name in required,
+                "description": prop.get("description", ""),
+            }
+            if "default" in prop:
+                params[name]["default"] = prop["default"]
+
+        config = {key: value for key, value in server.items() if key not in DISCOVERY_KEYS}
+        config.update({
+            "name": server.get("prefix", f"{server['server']}_") + tool["name"],
+            "description": tool.get("description") or tool["name"],
+            "mcp_tool": tool["name"],
+            "params": params,
+        })
+        if tool["name"] in server.get("cache_ttl", {}):
+            config["cache_ttl"] = server["cache_ttl"][tool["name"]]
+        return config
+
+    def _content_text(self, result: Dict) -> str:
+        """拼接结果中的文本内容"""
+        return "\n".join(item.get("text", "") for item in result.get("content", []) if item.get("type") == "text")
+
+    def _attach_buffers(self, result: Dict) -> int:
+        """
+        把指向传输目录的 file:// resource 内容替换为 ResultBuffer
+
+        Returns:
+            替换的个数
+
+        Raises:
+            OSError / ValueError: 文件不存在或格式与大小不符
+        """
+        count = 0
+        content = result.get("content", [])
+        for index, item in enumerate(content):
+            resource = item.get("resource") if item.get("type") == "resource" else None
+            uri = urlparse(resource.get("uri", "")) if resource else None
+            if uri is None or uri.scheme != "file":
+                continue
+            path = Path(url2pathname(uri.path))
+            if path.parent != self.result_dir:
+                continue
+            meta = resource.get("_meta") or {}
+            content[index] = open_buffer(self.result_dir, path.name, meta.get("format", "B"), meta.get("shape"))
+            count += 1
+        return count
+
+    def _parse_result(self, result: Dict) -> Any:
+        """
+        转换 tools/call 结果：优先 structuredContent，
+        单个文本内容若为 JSON 则解析，单个带外数据返回 ResultBuffer，其他情况返回内容列表
+        """
+        if "structuredContent" in result:
+            return result["structuredContent"]
+        content = result.get("content", [])
+        if len(content) == 1 and isinstance(content[0], ResultBuffer):
+            return content[0]
+        if len(content) == 1 and content[0].get("type") == "text":
+            text = content[0].get("text", "")
+            try:
+                return json.loads(text)
+            except (json.JSONDecodeError, TypeError):
+                return text
+        return content
+
+    def close(self):
+        """关闭所有服务会话，删除传输目录中未取走的数据"""
+        self.supervisor.close()
+        remove_transport_dir(self.result_dir)
+
+    # ---------- 结果缓存 ----------
+
+    def _cache_namespace(self, config: Dict) -> str:
+        """缓存命名空间：服务标识 + 服务端工具名（共享服务的工具各自独立）"""
+        return f"{self._server_key(config)}:{config.get('mcp_tool', config['name'])}"
+
+    def _generate_cache_key(self, config: Dict, arguments: Dict) -> str:
+        """生成缓存 key: {工具前缀}_{规范化参数的哈希}"""
+        return canonical_key(self._cache_namespace(config), config.get("params", {}), arguments)
+
+    def _check_cache(self, cache_key: str, ttl: float, tool_name: str = "") -> Any:
+        """检查缓存（未命中返回 None）"""
+        return self.cache.lookup(tool_name, cache_key, ttl)
 
     def _save_cache(self, cache_key: str, data: Any):
-        """保存缓存"""
-        cache_file = self.tools_dir / f"{cache_key}.json"
-        with open(cache_file, "w") as f:
-            json.dump(data, f)
+        """保存缓存（内存 + 磁盘）"""
+        self.cache.put(cache_key, data)
 
 
 # 测试代码
@@ -138,13 +459,14 @@ if __name__ == "__main__":
         "name": "amap_maps",
         "command": "npx",
         "args": ["-y", "@amap/amap-maps-mcp-server"],
-        "env": {"AMAP_MAPS_API_KEY": "${AMAP_API_KEY}"}
+        "env": {"AMAP_MAPS_API_KEY": "${AMAP_API_KEY}"},
+        "mcp_tool": "maps_geo"
     }
 
     arguments = {
-        "query": "北京天安门",
-        "type": "geocoding"
+        "address": "北京天安门"
     }
 
     result = executor.execute(config, arguments)
     print(json.dumps(result, indent=2, ensure_ascii=False))
+    executor.close()
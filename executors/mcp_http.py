@@ -0,0 +1,304 @@
+"""
+MCP Streamable HTTP 会话（远程共享的 MCP 服务）
+
+与 MCPStdioSession 接口相同，由 MCPExecutor / MCPSupervisor 统一管理：
+- 所有消息 POST 到同一个端点，连接由 requests.Session 连接池复用（keep-alive）
+- initialize 响应中的 Mcp-Session-Id 在后续请求中带上；服务端返回 404 表示会话失效，
+  自动重新 initialize 后重发一次
+- 响应可以是 application/json，也可以是 text/event-stream：
+  流中的 notifications/progress 交给 on_progress 回调（进度和部分结果），
+  服务端发起的 ping 会被应答，流在响应前断开时用 Last-Event-ID 发起 GET 续传
+
+多个 worker 进程可以共享同一个常驻的远程服务，而不必各自启动进程。
+"""
+
+import json
+import time
+import itertools
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .mcp_session import CLIENT_INFO, PROTOCOL_VERSION, MCPError
+
+
+# 流断开后的最大续传次数
+MAX_RESUME_ATTEMPTS = 3
+
+
+class MCPHttpSession:
+    """与一个远程 MCP 服务的 Streamable HTTP 会话"""
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None, request_timeout: float = 30.0,
+                 name: str = "", pool_size: int = 16):
+        """
+        Args:
+            url: MCP 端点（如 http://mcp.internal:8080/mcp）
+            headers: 额外请求头（如鉴权）
+            request_timeout: 默认请求超时（秒）
+            name: 会话名称（用于错误信息）
+            pool_size: 连接池大小（可并发的请求数）
+        """
+        self.url = url
+        self.headers = headers or {}
+        self.request_timeout = request_timeout
+        self.name = name or url
+
+        self.session_id: Optional[str] = None
+        self.protocol_version = PROTOCOL_VERSION
+        self.server_info: Dict = {}
+        self.capabilities: Dict = {}
+        self.started_at = None
+        self.resumed_streams = 0
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+
+        self._ids = itertools.count(1)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._broken = False
+        self._closed = False
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> "MCPHttpSession":
+        """完成 initialize 握手（获得会话 id）"""
+        self._initialize()
+        self.started_at = time.time()
+        return self
+
+    def _initialize(self, expired_id: Optional[str] = None):
+        with self._init_lock:
+            # 其他线程已经为同一个失效会话重新握手
+            if expired_id is not None and self.session_id != expired_id:
+                return
+            self.session_id = None
+            result = self._send({"jsonrpc": "2.0", "id": next(self._ids), "method": "initialize", "params": {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": CLIENT_INFO,
+            }}, self.request_timeout)
+            self.server_info = result.get("serverInfo", {})
+            self.capabilities = result.get("capabilities", {})
+            self.protocol_version = result.get("protocolVersion", PROTOCOL_VERSION)
+            self._send({"jsonrpc": "2.0", "method": "notifications/initialized"}, self.request_timeout)
+            self._broken = False
+
+    @property
+    def alive(self) -> bool:
+        return not self._closed and not self._broken and self.started_at is not None
+
+    @property
+    def in_flight(self) -> int:
+        """等待响应的请求数"""
+        return self._in_flight
+
+    def close(self, timeout: float = 2.0):
+        """结束会话（DELETE 会话 id）并关闭连接池"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.session_id:
+            try:
+                self.http.delete(self.url, headers=self._headers(), timeout=timeout)
+            except requests.RequestException:
+                pass
+        self.http.close()
+
+    # ---------- JSON-RPC ----------
+
+    def request(self, method: str, params: Optional[Dict] = None, timeout: Optional[float] = None,
+                on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        发送请求并等待响应（线程安全，可并发调用）
+
+        Args:
+            method: JSON-RPC 方法名
+            params: 参数
+            timeout: 超时（秒），默认 request_timeout
+            on_progress: 收到 notifications/progress 时的回调（参数为通知的 params）
+
+        Returns:
+            响应中的 result
+
+        Raises:
+            MCPError: 错误响应、超时或连接失败
+        """
+        if self._closed:
+            raise MCPError(f"MCP session '{self.name}' is closed")
+
+        request_id = next(self._ids)
+        params = dict(params or {})
+        if on_progress:
+            params["_meta"] = {"progressToken": request_id}
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            session_id = self.session_id
+            try:
+                return self._send(message, timeout or self.request_timeout, on_progress)
+            except _SessionExpired:
+                self._initialize(expired_id=session_id)
+                return self._send(message, timeout or self.request_timeout, on_progress)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def notify(self, method: str, params: Optional[Dict] = None):
+        """发送通知（无响应）"""
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self._send(message, self.request_timeout)
+
+    def call_tool(self, name: str, arguments: Dict, timeout: Optional[float] = None,
+                  on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """调用 tools/call，返回 {"content": [...], "isError": bool, ...}"""
+        return self.request("tools/call", {"name": name, "arguments": arguments}, timeout=timeout,
+                            on_progress=on_progress)
+
+    def list_tools(self, timeout: Optional[float] = None) -> List[Dict]:
+        """tools/list（自动翻页）"""
+        tools, cursor = [], None
+        while True:
+            result = self.request("tools/list", {"cursor": cursor} if cursor else {}, timeout=timeout)
+            tools.extend(result.get("tools", []))
+            cursor = result.get("nextCursor")
+            if not cursor:
+                return tools
+
+    # ---------- HTTP ----------
+
+    def _headers(self, accept: str = "application/json, text/event-stream") -> Dict[str, str]:
+        headers = dict(self.headers, Accept=accept)
+        if self.session_id:
+            headers["Mcp-Session-Id"] = self.session_id
+            headers["MCP-Protocol-Version"] = self.protocol_version
+        return headers
+
+    def _send(self, message: Dict, timeout: float, on_progress: Optional[Callable] = None) -> Optional[Dict]:
+        """POST 一条消息；请求返回 result，通知返回 None"""
+        deadline = time.monotonic() + timeout
+        try:
+            response = self.http.post(self.url, json=message, headers=self._headers(), stream=True,
+                                      timeout=timeout)
+        except requests.exceptions.ReadTimeout:
+            raise MCPError(f"MCP request '{message.get('method')}' timed out after {timeout}s")
+        except requests.RequestException as e:
+            self._broken = True
+            raise MCPError(f"MCP server '{self.name}' unreachable: {e}")
+
+        with response:
+            content_type = response.headers.get("Content-Type", "")
+            if not content_type.startswith("text/event-stream"):
+                # 读完响应体，连接才会放回连接池（未读完的流式响应在关闭时会断开连接）
+                response.content
+            if response.status_code == 404 and self.session_id and message.get("method") != "initialize":
+                raise _SessionExpired()
+            if response.status_code >= 400:
+                raise MCPError(f"MCP server '{self.name}' returned HTTP {response.status_code}: "
+                               f"{response.text[:200]}")
+            if message.get("method") == "initialize" and response.headers.get("Mcp-Session-Id"):
+                self.session_id = response.headers["Mcp-Session-Id"]
+            if "id" not in message:
+                return None
+
+            if content_type.startswith("text/event-stream"):
+                return self._read_stream(response, message, deadline, on_progress)
+            try:
+                return self._result(response.json())
+            except ValueError:
+                raise MCPError(f"MCP server '{self.name}' returned invalid JSON")
+
+    def _read_stream(self, response, message: Dict, deadline: float, on_progress: Optional[Callable]) -> Dict:
+        """读取 SSE 流直到收到对应 id 的响应；流提前断开时用 Last-Event-ID 续传"""
+        last_event_id = None
+        attempts = 0
+        while True:
+            try:
+                for event_id, data in _iter_sse(response):
+                    if event_id:
+                        last_event_id = event_id
+                    result = self._handle_stream_message(data, message["id"], on_progress)
+                    if result is not None:
+                        return self._result(result)
+            except requests.RequestException:
+                pass
+            finally:
+                response.close()
+
+            # 流在响应前结束：续传
+            attempts += 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise MCPError(f"MCP request '{message['method']}' timed out")
+            if last_event_id is None or attempts > MAX_RESUME_ATTEMPTS:
+                raise MCPError(f"MCP stream for '{message['method']}' closed before a response")
+            self.resumed_streams += 1
+            headers = self._headers(accept="text/event-stream")
+            headers["Last-Event-ID"] = last_event_id
+            try:
+                response = self.http.get(self.url, headers=headers, stream=True, timeout=remaining)
+            except requests.RequestException as e:
+                raise MCPError(f"MCP stream for '{message['method']}' could not be resumed: {e}")
+            if response.status_code >= 400:
+                response.close()
+                raise MCPError(f"MCP stream for '{message['method']}' could not be resumed: "
+                               f"HTTP {response.status_code}")
+
+    def _handle_stream_message(self, data: str, request_id: int, on_progress: Optional[Callable]) -> Optional[Dict]:
+        """处理流中的一条消息，是本请求的响应时返回该消息"""
+        try:
+            message = json.loads(data)
+        except json.JSONDecodeError:
+            return None
+        if message.get("id") == request_id and "method" not in message:
+            return message
+        if message.get("method") == "notifications/progress":
+            if on_progress and message.get("params", {}).get("progressToken") == request_id:
+                on_progress(message["params"])
+        elif message.get("method") == "ping" and "id" in message:
+            self._send({"jsonrpc": "2.0", "id": message["id"], "result": {}}, self.request_timeout)
+        return None
+
+    def _result(self, message: Dict) -> Dict:
+        if "error" in message:
+            error = message["error"]
+            raise MCPError(error.get("message", "MCP error"), error.get("code"), error.get("data"))
+        return message.get("result", {})
+
+
+class _SessionExpired(Exception):
+    """服务端不再认识当前会话 id（HTTP 404）"""
+
+
+def _iter_sse(response) -> Iterator[Tuple[Optional[str], str]]:
+    """逐个解析 SSE 事件，产出 (事件 id, data)"""
+    event_id, data = None, []
+    buffer = b""
+    for chunk in response.iter_content(chunk_size=None):
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            line = line.rstrip(b"\r").decode("utf-8")
+            if not line:
+                if data:
+                    yield event_id, "\n".join(data)
+                event_id, data = None, []
+            elif line.startswith(":"):
+                continue
+            else:
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "data":
+                    data.append(value)
+                elif field == "id":
+                    event_id = value
@@ -0,0 +1,264 @@
+"""
+MCP stdio 会话
+
+一个会话对应一个长驻的 MCP 服务进程：
+- 启动时完成一次 initialize 握手
+- 并发的请求通过 JSON-RPC id 复用同一条 stdio 管道
+- 后台读线程把响应分发给等待中的请求
+
+消息格式为按行分隔的 JSON（MCP stdio transport）。
+"""
+
+import os
+import json
+import time
+import itertools
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional
+
+
+PROTOCOL_VERSION = "2024-11-05"
+CLIENT_INFO = {"name": "urban-computing", "version": "1.0"}
+
+
+class MCPError(Exception):
+    """MCP 调用失败（JSON-RPC 错误、超时或服务进程退出）"""
+
+    def __init__(self, message: str, code: Optional[int] = None, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+
+class MCPStdioSession:
+    """与一个 MCP 服务进程的长连接"""
+
+    def __init__(self, command: List[str], env: Optional[Dict[str, str]] = None, cwd: Optional[str] = None,
+                 request_timeout: float = 30.0, name: str = ""):
+        """
+        Args:
+            command: 启动命令及参数（如 ["npx", "-y", "@amap/amap-maps-mcp-server"]）
+            env: 完整的环境变量
+            cwd: 工作目录
+            request_timeout: 默认请求超时（秒）
+            name: 会话名称（用于错误信息）
+        """
+        self.command = command
+        self.env = env
+        self.cwd = cwd
+        self.request_timeout = request_timeout
+        self.name = name or os.path.basename(command[0])
+
+        self.process: Optional[subprocess.Popen] = None
+        self.server_info: Dict = {}
+        self.capabilities: Dict = {}
+        self.started_at = None
+
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._progress: Dict[int, Callable[[Dict], None]] = {}
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stderr_tail = deque(maxlen=20)
+        self._closed = False
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> "MCPStdioSession":
+        """启动服务进程并完成 initialize 握手"""
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self.env,
+            cwd=self.cwd,
+        )
+        self.started_at = time.time()
+        threading.Thread(target=self._read_loop, name=f"mcp-reader-{self.name}", daemon=True).start()
+        threading.Thread(target=self._drain_stderr, name=f"mcp-stderr-{self.name}", daemon=True).start()
+
+        try:
+            result = self.request("initialize", {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": CLIENT_INFO,
+            })
+        except MCPError:
+            self.close()
+            raise
+        self.server_info = result.get("serverInfo", {})
+        self.capabilities = result.get("capabilities", {})
+        self.notify("notifications/initialized")
+        return self
+
+    @property
+    def alive(self) -> bool:
+        return not self._closed and self.process is not None and self.process.poll() is None
+
+    @property
+    def in_flight(self) -> int:
+        """等待响应的请求数"""
+        with self._pending_lock:
+            return len(self._pending)
+
+    def close(self, timeout: float = 2.0):
+        """关闭会话（关闭 stdin，超时后终止进程）"""
+        if self._closed:
+            return
+        self._closed = True
+        if self.process:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+        self._fail_pending(MCPError(f"MCP session '{self.name}' closed"))
+
+    # ---------- JSON-RPC ----------
+
+    def request(self, method: str, params: Optional[Dict] = None, timeout: Optional[float] = None,
+                on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        发送请求并等待响应（线程安全，可并发调用）
+
+        Args:
+            method: JSON-RPC 方法名
+            params: 参数
+            timeout: 超时（秒），默认 request_timeout
+            on_progress: 收到 notifications/progress 时的回调（参数为通知的 params）
+
+        Returns:
+            响应中的 result
+
+        Raises:
+            MCPError: 错误响应、超时或进程退出
+        """
+        request_id = next(self._ids)
+        future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
+        # 先登记再检查：读线程退出时会让所有已登记的请求失败
+        if self._closed:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise MCPError(f"MCP session '{self.name}' is closed")
+
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        if on_progress:
+            message["params"] = dict(params or {}, _meta={"progressToken": request_id})
+            self._progress[request_id] = on_progress
+        try:
+            self._write(message)
+            return future.result(timeout=timeout or self.request_timeout)
+        except FutureTimeout:
+            self._cancel(request_id)
+            raise MCPError(f"MCP request '{method}' timed out after {timeout or self.request_timeout}s")
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            self._progress.pop(request_id, None)
+
+    def notify(self, method: str, params: Optional[Dict] = None):
+        """发送通知（无响应）"""
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self._write(message)
+
+    def call_tool(self, name: str, arguments: Dict, timeout: Optional[float] = None,
+                  on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """调用 tools/call，返回 {"content": [...], "isError": bool, ...}"""
+        return self.request("tools/call", {"name": name, "arguments": arguments}, timeout=timeout,
+                            on_progress=on_progress)
+
+    def list_tools(self, timeout: Optional[float] = None) -> List[Dict]:
+        """tools/list（自动翻页）"""
+        tools, cursor = [], None
+        while True:
+            result = self.request("tools/list", {"cursor": cursor} if cursor else {}, timeout=timeout)
+            tools.extend(result.get("tools", []))
+            cursor = result.get("nextCursor")
+            if not cursor:
+                return tools
+
+    def _write(self, message: Dict):
+        data = (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._write_lock:
+            try:
+                self.process.stdin.write(data)
+                self.process.stdin.flush()
+            except (OSError, ValueError) as e:
+                raise MCPError(f"MCP session '{self.name}' pipe closed: {e}{self._stderr_hint()}")
+
+    def _cancel(self, request_id: int):
+        try:
+            self.notify("notifications/cancelled", {"requestId": request_id, "reason": "timeout"})
+        except MCPError:
+            pass
+
+    def _read_loop(self):
+        """读线程：按 id 把响应分发给等待者"""
+        for line in self.process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                # 部分服务会把日志打到 stdout
+                continue
+            if "id" not in message or "method" in message:
+                self._handle_server_message(message)
+                continue
+
+            with self._pending_lock:
+                future = self._pending.get(message["id"])
+            if future is None or future.done():
+                continue
+            if "error" in message:
+                error = message["error"]
+                future.set_exception(MCPError(error.get("message", "MCP error"), error.get("code"), error.get("data")))
+            else:
+                future.set_result(message.get("result", {}))
+
+        self._closed = True
+        self._fail_pending(MCPError(f"MCP server '{self.name}' exited{self._stderr_hint()}"))
+
+    def _handle_server_message(self, message: Dict):
+        """服务端发起的通知或请求"""
+        if message.get("method") == "notifications/progress":
+            callback = self._progress.get(message.get("params", {}).get("progressToken"))
+            if callback:
+                callback(message["params"])
+        elif message.get("method") == "ping" and "id" in message:
+            self._write({"jsonrpc": "2.0", "id": message["id"], "result": {}})
+        elif "id" in message and "method" in message:
+            self._write({"jsonrpc": "2.0", "id": message["id"],
+                         "error": {"code": -32601, "message": f"Method not found: {message['method']}"}})
+
+    def _drain_stderr(self):
+        for line in self.process.stderr:
+            self._stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+
+    def _stderr_hint(self) -> str:
+        return f" (stderr: {self._stderr_tail[-1]})" if self._stderr_tail else ""
+
+    def _fail_pending(self, error: MCPError):
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,279 @@
+"""
+MCP 服务进程监管
+
+MCPExecutor 的每个服务会话由监管器管理：
+- 容量上限：运行中的服务数超过 max_servers 时按 LRU 关闭空闲会话
+  （所有会话都有请求在执行时暂时超出上限，不会中断请求）
+- 租用：lease() 在取出会话时即计数，调用方发出请求前会话不会被当作空闲而关闭
+- 空闲回收：超过 idle_timeout 未使用的会话被关闭（warm 服务除外）
+- 崩溃重启：会话意外退出后自动重启，连续失败按指数退避
+  （第一次立即重启，之后 restart_backoff * 2^(n-2)，最长 max_backoff；
+  连续失败 max_restarts 次后不再自动重启，等下一次调用时再尝试；
+  重启后的会话第一次调用成功即清零失败计数）
+- 健康检查：空闲会话每 ping_interval 发送一次 ping，无响应视为崩溃
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .mcp_session import MCPError, MCPStdioSession
+
+
+class MCPSupervisor:
+    """按服务标识管理 MCP 会话的生命周期"""
+
+    def __init__(self, start_session: Callable[[Dict], MCPStdioSession], max_servers: int = 8,
+                 idle_timeout: float = 300.0, ping_interval: float = 30.0, ping_timeout: float = 5.0,
+                 restart_backoff: float = 1.0, max_backoff: float = 60.0, max_restarts: int = 5,
+                 check_interval: float = 5.0):
+        """
+        Args:
+            start_session: 根据工具配置启动会话（完成 initialize 握手）
+            max_servers: 同时运行的服务数上限
+            idle_timeout: 空闲多少秒后关闭（0 表示不回收）
+            ping_interval: 健康检查间隔（秒，0 表示不检查）
+            ping_timeout: ping 超时（秒）
+            restart_backoff: 连续崩溃时的初始退避（秒）
+            max_backoff: 最长退避（秒）
+            max_restarts: 后台自动重启的最大连续次数
+            check_interval: 后台巡检间隔（秒）
+        """
+        self.start_session = start_session
+        self.max_servers = max_servers
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.max_restarts = max_restarts
+        self.check_interval = check_interval
+
+        # 运行中的会话，按最近使用排序 {服务标识: MCPStdioSession}
+        self.sessions: "OrderedDict[str, MCPStdioSession]" = OrderedDict()
+        self.stats = {"started": 0, "evicted": 0, "reaped": 0, "crashed": 0, "restarted": 0}
+
+        self._configs: Dict[str, Dict] = {}
+        self._last_used: Dict[str, float] = {}
+        self._last_ping: Dict[str, float] = {}
+        self._warm = set()
+        # 已取出、尚未归还的会话数 {服务标识: 租用数}
+        self._leases: Dict[str, int] = {}
+        # 崩溃待重启的服务 {服务标识: (连续失败次数, 最早重启时间)}
+        self._failures: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._start_locks: Dict[str, threading.Lock] = {}
+        self._stop = threading.Event()
+        self._monitor = None
+
+    # ---------- 获取会话 ----------
+
+    @contextmanager
+    def lease(self, key: str, config: Dict) -> Iterator[MCPStdioSession]:
+        """
+        租用服务会话（必要时启动），with 块内会话不会被空闲回收或 LRU 关闭
+        with 块正常结束时清零该服务的连续失败计数
+
+        Raises:
+            MCPError: 启动失败，或服务在退避期内
+        """
+        session = self._acquire(key, config)
+        ok = False
+        try:
+            yield session
+            ok = True
+        finally:
+            self._release(key, session, ok)
+
+    def acquire(self, key: str, config: Dict) -> MCPStdioSession:
+        """
+        获取服务会话（必要时启动），不租用
+
+        Raises:
+            MCPError: 启动失败，或服务在退避期内
+        """
+        session = self._acquire(key, config)
+        self._release(key, session, ok=False)
+        return session
+
+    def _acquire(self, key: str, config: Dict) -> MCPStdioSession:
+        """获取会话并计入一次租用（调用方负责 _release）"""
+        session = self._lookup(key)
+        if session is not None:
+            return session
+
+        with self._lock:
+            start_lock = self._start_locks.setdefault(key, threading.Lock())
+        with start_lock:
+            session = self._lookup(key)
+            if session is None:
+                failure = self._failures.get(key)
+                if failure and time.monotonic() < failure[1]:
+                    raise MCPError(f"MCP server '{key}' crashed {failure[0]} times, "
+                                   f"restarting in {failure[1] - time.monotonic():.1f}s")
+                session = self._start(key, config)
+        self._ensure_monitor()
+        return session
+
+    def warm(self, key: str, config: Dict) -> MCPStdioSession:
+        """预先启动服务，并免于空闲回收"""
+        with self._lock:
+            self._warm.add(key)
+        return self.acquire(key, config)
+
+    def _lookup(self, key: str) -> Optional[MCPStdioSession]:
+        crashed = None
+        with self._lock:
+            session = self.sessions.get(key)
+            if session is not None and not session.alive:
+                crashed, session = self._mark_crashed(key), None
+            elif session is not None:
+                self.sessions.move_to_end(key)
+                self._last_used[key] = time.monotonic()
+                self._leases[key] = self._leases.get(key, 0) + 1
+        if crashed is not None:
+            crashed.close(timeout=0.1)
+        return session
+
+    def _release(self, key: str, session: MCPStdioSession, ok: bool):
+        """归还租用；调用成功且会话仍在运行时清零连续失败计数"""
+        with self._lock:
+            remaining = self._leases.get(key, 0) - 1
+            if remaining > 0:
+                self._leases[key] = remaining
+            else:
+                self._leases.pop(key, None)
+            if ok and self.sessions.get(key) is session and session.alive:
+                self._failures.pop(key, None)
+
+    def _start(self, key: str, config: Dict) -> MCPStdioSession:
+        for victim in self._make_room():
+            victim.close()
+
+        restart = key in self._failures
+        try:
+            session = self.start_session(config)
+        except MCPError:
+            with self._lock:
+                self._configs[key] = config
+                self._record_failure(key)
+            raise
+
+        now = time.monotonic()
+        with self._lock:
+            self.sessions[key] = session
+            self._configs[key] = config
+            self._last_used[key] = self._last_ping[key] = now
+            self._leases[key] = self._leases.get(key, 0) + 1
+            self.stats["started"] += 1
+            if restart:
+                self.stats["restarted"] += 1
+        return session
+
+    def _make_room(self) -> List[MCPStdioSession]:
+        """达到上限时按 LRU 选出要关闭的空闲会话（优先非 warm）"""
+        victims = []
+        with self._lock:
+            while len(self.sessions) >= self.max_servers:
+                idle = [key for key, session in self.sessions.items() if not self._busy(key, session)]
+                if not idle:
+                    break
+                key = next((k for k in idle if k not in self._warm), idle[0])
+                victims.append(self._forget(key))
+                self.stats["evicted"] += 1
+        return victims
+
+    # ---------- 状态记录（调用方持有 self._lock） ----------
+
+    def _busy(self, key: str, session: MCPStdioSession) -> bool:
+        """会话有请求在执行，或已被租用"""
+        return bool(session.in_flight or self._leases.get(key))
+
+    def _forget(self, key: str) -> MCPStdioSession:
+        self._last_used.pop(key, None)
+        self._last_ping.pop(key, None)
+        self._failures.pop(key, None)
+        return self.sessions.pop(key)
+
+    def _mark_crashed(self, key: str) -> MCPStdioSession:
+        """记录崩溃并返回会话（调用方在释放锁后关闭）"""
+        self.stats["crashed"] += 1
+        self._record_failure(key)
+        return self.sessions.pop(key)
+
+    def _record_failure(self, key: str):
+        count = self._failures.get(key, (0, 0))[0] + 1
+        delay = 0.0 if count == 1 else min(self.restart_backoff * 2 ** (count - 2), self.max_backoff)
+        self._failures[key] = (count, time.monotonic() + delay)
+
+    # ---------- 后台巡检 ----------
+
+    def _ensure_monitor(self):
+        if self._monitor is not None and self._monitor.is_alive():
+            return
+        with self._lock:
+            if self._monitor is None or not self._monitor.is_alive():
+                self._stop.clear()
+                self._monitor = threading.Thread(target=self._monitor_loop, name="mcp-supervisor", daemon=True)
+                self._monitor.start()
+
+    def _monitor_loop(self):
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def check(self):
+        """巡检一次：回收空闲会话、健康检查、重启崩溃的服务"""
+        now = time.monotonic()
+        to_close, to_ping = [], []
+        with self._lock:
+            for key, session in list(self.sessions.items()):
+                if not session.alive:
+                    to_close.append(self._mark_crashed(key))
+                elif self._busy(key, session):
+                    continue
+                elif (self.idle_timeout and key not in self._warm
+                      and now - self._last_used[key] >= self.idle_timeout):
+                    to_close.append(self._forget(key))
+                    self.stats["reaped"] += 1
+                elif self.ping_interval and now - self._last_ping[key] >= self.ping_interval:
+                    to_ping.append((key, session))
+            restarts = [key for key, (count, retry_at) in self._failures.items()
+                        if key not in self.sessions and now >= retry_at and count <= self.max_restarts]
+
+        for session in to_close:
+            session.close(timeout=0.1 if not session.alive else 2.0)
+        for key, session in to_ping:
+            self._ping(key, session)
+        for key in restarts:
+            try:
+                self.acquire(key, self._configs[key])
+            except MCPError:
+                pass
+
+    def _ping(self, key: str, session: MCPStdioSession):
+        try:
+            session.request("ping", timeout=self.ping_timeout)
+        except MCPError as e:
+            if e.code is None:
+                # 超时或进程退出（服务返回 JSON-RPC 错误也说明它还活着）
+                session.close(timeout=0.1)
+                with self._lock:
+                    if self.sessions.get(key) is session:
+                        self._mark_crashed(key)
+                return
+        with self._lock:
+            self._last_ping[key] = time.monotonic()
+            self._failures.pop(key, None)
+
+    def close(self):
+        """停止巡检并关闭所有会话"""
+        self._stop.set()
+        with self._lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+            self._failures.clear()
+            self._leases.clear()
+        for session in sessions:
+            session.close()
@@ -0,0 +1,316 @@
+"""
+API 工具结果的列式后处理（配置了 postprocess 的工具，APIExecutor 使用）
+
+天气预报接口返回按时间排列的记录列表（如 weather_forecast 的 list，每 3 小时一条），
+逐条遍历嵌套 dict 做统计既慢，原样放进提示词又很长。后处理只遍历一次记录，
+把需要的字段转换为列（NumPy 可用时为 float64 数组，否则为 array("d")），
+之后的单位换算和按本地日期分组的统计都在整列上进行，返回紧凑的摘要；
+结果缓存和答案生成使用摘要，不再包含原始记录。
+
+配置:
+    "postprocess": {
+        "records": "list",                  # 记录列表的路径（点分隔），
+                                            # 或 "columns": "hourly"（{列名: [...]} 格式的响应）
+        "time": "dt",                       # 时间字段：Unix 秒，或 ISO 字符串（前 10 位为日期）
+        "utc_offset": "city.timezone",      # 可选：时区偏移（秒，响应中的路径或数字），用于按本地日期分组
+        "fields": {"temp": "main.temprature", "rain": "rain.amount", "wind": "wind.speed"},
+        "units": {"temp": "°C", "rain": "mm", "wind": "m/s"},   # 可选：原始单位
+        "unit_fields": {"temp": "main.temprature_unit"},        # 可选：记录中的单位字段（优先）
+        "convert": {"temp": "°C", "wind": "km/h"},              # 可选：换算后的单位（见 UNIT_CONVERSIONS）
+        "daily": {"temp": ["min", "max", "mean"], "rain": ["sum"], "wind": ["max"]},
+        "labels": {"conditions": "weather.0.main"},             # 可选：文本字段，每天列出出现过的值
+        "keep": ["cnt", "city"],            # 可选：原样保留的顶层字段
+        "precision": 2                      # 可选：小数位数
+    }
+
+摘要:
+    {"cnt": ..., "city": ..., "period": {"start", "end", "count"}, "units": {...},
+     "daily": [{"date": "2025-11-07", "temp_min": ..., "rain_sum": ..., "conditions": [...]}, ...]}
+缺失或非数值的字段记为 NaN，统计时忽略；某天全部缺失时为 null。
+"""
+
+import math
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:  # 没有 NumPy 时用 array("d") 和逐元素循环
+    numpy = None
+
+
+# (原单位, 目标单位) -> (倍数, 偏移)：目标值 = 原值 * 倍数 + 偏移
+UNIT_CONVERSIONS = {
+    ("K", "°C"): (1.0, -273.15),
+    ("°C", "K"): (1.0, 273.15),
+    ("°C", "°F"): (1.8, 32.0),
+    ("°F", "°C"): (5 / 9, -160 / 9),
+    ("K", "°F"): (1.8, -459.67),
+    ("m/s", "km/h"): (3.6, 0.0),
+    ("km/h", "m/s"): (1 / 3.6, 0.0),
+    ("m/s", "mph"): (2.236936, 0.0),
+    ("km/h", "mph"): (0.621371, 0.0),
+    ("m/s", "kn"): (1.943844, 0.0),
+    ("mm", "in"): (1 / 25.4, 0.0),
+    ("in", "mm"): (25.4, 0.0),
+    ("hPa", "inHg"): (0.0295300, 0.0),
+}
+# 单位的其他写法
+UNIT_ALIASES = {"C": "°C", "F": "°F", "°K": "K", "celsius": "°C", "fahrenheit": "°F", "kelvin": "K",
+                "kmh": "km/h", "ms": "m/s"}
+AGGREGATIONS = ("min", "max", "mean", "sum")
+DAY_SECONDS = 86400
+
+
+def lookup(data: Any, path: str) -> Any:
+    """按点分隔的路径取值（列表用数字下标），不存在时返回 None"""
+    for part in path.split("."):
+        if isinstance(data, dict):
+            data = data.get(part)
+        elif isinstance(data, list) and part.isdigit() and int(part) < len(data):
+            data = data[int(part)]
+        else:
+            return None
+    return data
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool) or value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def column(values) -> Any:
+    """浮点数列（NumPy 可用时为 ndarray）"""
+    values = [_number(value) for value in values]
+    return numpy.array(values, dtype=float) if numpy is not None else array("d", values)
+
+
+def conversion(source: str, target: str) -> Optional[Tuple[float, float]]:
+    """
+    单位换算的 (倍数, 偏移)，单位相同时为 None
+
+    Raises:
+        ValueError: 不支持的换算
+    """
+    source, target = UNIT_ALIASES.get(source, source), UNIT_ALIASES.get(target, target)
+    if source == target:
+        return None
+    if (source, target) not in UNIT_CONVERSIONS:
+        raise ValueError(f"Unsupported unit conversion: {source} -> {target}")
+    return UNIT_CONVERSIONS[(source, target)]
+
+
+def convert(values, source: str, target: str):
+    """
+    整列换算单位
+
+    Raises:
+        ValueError: 不支持的换算
+    """
+    factors = conversion(source, target)
+    if factors is None:
+        return values
+    scale, offset = factors
+    if numpy is not None:
+        return values * scale + offset
+    return array("d", (value * scale + offset for value in values))
+
+
+def day_groups(times: List[Any], utc_offset: float = 0) -> Tuple[List[str], Any]:
+    """
+    按本地日期分组
+
+    Args:
+        times: 每条记录的时间（Unix 秒或 ISO 字符串）
+        utc_offset: Unix 秒的时区偏移（秒）
+
+    Returns:
+        (按时间排序的日期列表, 每条记录所在组的下标)
+    """
+    if times and all(isinstance(t, (int, float)) and not isinstance(t, bool) for t in times):
+        if numpy is not None:
+            days, codes = numpy.unique((numpy.asarray(times, dtype=float) + utc_offset) // DAY_SECONDS,
+                                       return_inverse=True)
+            return [_day_text(day) for day in days.tolist()], codes.reshape(-1)
+        keys = [(t + utc_offset) // DAY_SECONDS for t in times]
+        labels = _day_text
+    else:
+        keys = [str(t)[:10] for t in times]
+        labels = str
+
+    order = {key: index for index, key in enumerate(sorted(set(keys)))}
+    codes = [order[key] for key in keys]
+    return [labels(key) for key in sorted(order)], numpy.array(codes, dtype=int) if numpy is not None else codes
+
+
+def _day_text(day: float) -> str:
+    return datetime.fromtimestamp(day * DAY_SECONDS, timezone.utc).strftime("%Y-%m-%d")
+
+
+def aggregate(values, codes, groups: int, op: str) -> List[Optional[float]]:
+    """
+    分组统计（忽略 NaN，没有有效值的组为 None）
+
+    Args:
+        values: 浮点数列
+        codes: 每个值所在组的下标
+        groups: 组数
+        op: min / max / mean / sum
+    """
+    if numpy is not None:
+        valid = ~numpy.isnan(values)
+        codes, values = codes[valid], values[valid]
+        counts = numpy.bincount(codes, minlength=groups)
+        if op in ("sum", "mean"):
+            result = numpy.bincount(codes, weights=values, minlength=groups)
+            if op == "mean":
+                result = result / numpy.maximum(counts, 1)
+        else:
+            result = numpy.full(groups, numpy.inf if op == "min" else -numpy.inf)
+            (numpy.minimum if op == "min" else numpy.maximum).at(result, codes, values)
+        return [value if count else None for value, count in zip(result.tolist(), counts.tolist())]
+
+    counts, result = [0] * groups, [None] * groups
+    for code, value in zip(codes, values):
+        if math.isnan(value):
+            continue
+        counts[code] += 1
+        current = result[code]
+        if current is None:
+            result[code] = value
+        elif op == "min":
+            result[code] = min(current, value)
+        elif op == "max":
+            result[code] = max(current, value)
+        else:
+            result[code] = current + value
+    if op == "mean":
+        result = [total / count if count else None for total, count in zip(result, counts)]
+    return result
+
+
+class Postprocessor:
+    """按 postprocess 配置把记录列表转换为列并生成摘要"""
+
+    def __init__(self, spec: Dict):
+        """
+        Args:
+            spec: 工具配置中的 postprocess（见模块说明）
+
+        Raises:
+            ValueError: 配置不完整、统计方法或单位换算不支持
+        """
+        if not spec.get("fields") or not (spec.get("records") or spec.get("columns")) or not spec.get("time"):
+            raise ValueError("postprocess requires 'records' or 'columns', 'time' and 'fields'")
+        for name, ops in spec.get("daily", {}).items():
+            unknown = set(ops) - set(AGGREGATIONS)
+            if name not in spec["fields"] or unknown:
+                raise ValueError(f"Invalid daily aggregation for '{name}': {ops}")
+        units = spec.get("units", {})
+        for name, target in spec.get("convert", {}).items():
+            if name not in spec["fields"]:
+                raise ValueError(f"Cannot convert unknown field '{name}'")
+            if name not in spec.get("unit_fields", {}):
+                conversion(units.get(name), target)  # 单位写在配置里时提前检查换算
+        self.spec = spec
+        self.precision = spec.get("precision", 2)
+
+    def columns(self, response: Any) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        提取时间和数值列（已换算单位）
+
+        Returns:
+            (时间列表, {字段名: 浮点数列})
+
+        Raises:
+            ValueError: 响应中没有记录列表
+        """
+        times, values, _, _ = self._extract(response)
+        return times, values
+
+    def _extract(self, response: Any) -> Tuple[List[Any], Dict[str, Any], Dict[str, List], Dict[str, str]]:
+        """时间、数值列（已换算单位）、文本字段和各列的单位"""
+        spec = self.spec
+        labels = {}
+        units = dict(spec.get("units", {}))
+        if spec.get("records"):
+            records = lookup(response, spec["records"])
+            if not isinstance(records, list):
+                raise ValueError(f"Response has no record list at '{spec['records']}'")
+            records = [record for record in records if lookup(record, spec["time"]) is not None]
+            times = [lookup(record, spec["time"]) for record in records]
+            values = {name: column(lookup(record, path) for record in records)
+                      for name, path in spec["fields"].items()}
+            labels = {name: [lookup(record, path) for record in records]
+                      for name, path in spec.get("labels", {}).items()}
+            for name, path in spec.get("unit_fields", {}).items():
+                unit = lookup(records[0], path) if records else None
+                if unit:
+                    units[name] = unit
+        else:
+            data = lookup(response, spec["columns"])
+            if not isinstance(data, dict) or not isinstance(data.get(spec["time"]), list):
+                raise ValueError(f"Response has no columns at '{spec['columns']}'")
+            times = data[spec["time"]]
+            values = {}
+            for name, path in spec["fields"].items():
+                raw = lookup(data, path)
+                values[name] = column(raw[:len(times)] if isinstance(raw, list) else [None] * len(times))
+            for name, path in spec.get("labels", {}).items():
+                raw = lookup(data, path)
+                labels[name] = raw[:len(times)] if isinstance(raw, list) else [None] * len(times)
+
+        for name, target in spec.get("convert", {}).items():
+            values[name] = convert(values[name], units.get(name), target)
+            units[name] = target
+        return times, values, labels, {name: unit for name, unit in units.items() if name in spec["fields"]}
+
+    def summarize(self, response: Any) -> Dict:
+        """
+        生成摘要（见模块说明）
+
+        Raises:
+            ValueError: 响应中没有记录列表
+        """
+        spec = self.spec
+        times, values, labels, units = self._extract(response)
+        offset = spec.get("utc_offset", 0)
+        if isinstance(offset, str):
+            offset = _number(lookup(response, offset))
+            offset = 0 if math.isnan(offset) else offset
+
+        kept = response if isinstance(response, dict) else {}
+        summary = {key: kept[key] for key in spec.get("keep", []) if key in kept}
+        summary["period"] = {
+            "start": self._time_text(times[0], offset) if times else None,
+            "end": self._time_text(times[-1], offset) if times else None,
+            "count": len(times),
+        }
+        if units:
+            summary["units"] = units
+
+        dates, codes = day_groups(times, offset)
+        daily = [{"date": date} for date in dates]
+        for name, ops in spec.get("daily", {}).items():
+            for op in ops:
+                for row, value in zip(daily, aggregate(values[name], codes, len(dates), op)):
+                    row[f"{name}_{op}"] = None if value is None else round(value, self.precision)
+        for name, items in labels.items():
+            for row in daily:
+                row[name] = []
+            for code, item in zip(codes, items):
+                if item is not None and item not in daily[code][name]:
+                    daily[code][name].append(item)
+        summary["daily"] = daily
+        return summary
+
+    def _time_text(self, value: Any, offset: float) -> str:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            local = datetime.fromtimestamp(value, timezone.utc) + timedelta(seconds=offset)
+            return local.strftime("%Y-%m-%d %H:%M")
+        return str(value)
@@ -0,0 +1,130 @@
+"""
+执行器注册表（按工具类型）
+
+执行器在该类型的工具第一次被调用（或预取）时才创建，
+未使用的类型不会导入模块、也不会创建 Cache/<类型> 目录。
+
+执行器来源（优先级从高到低）：
+1. urban_tools.json 中的 "executors" 字段:
+       "executors": {"grpc": "my_pkg.grpc_executor:GRPCExecutor"}
+       "executors": {"local": {"class": "my_pkg.local:FunctionExecutor", "options": {"workers": 4}}}
+   对应工具写在 "grpc_tools" / "local_tools" 列表中
+2. 通过 register() 注册的工厂
+3. 入口点组 "urban_computing.executors"（第三方包，名称即工具类型）
+4. 内置的 mcp / api / code / local 执行器
+
+执行器以 factory(cache_dir, **options) 创建，需实现 execute(config, arguments)，
+可选实现 prefetch(config) 和 warm(config)（预先启动 warm: true 工具的服务）。
+"""
+
+import threading
+import importlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Union
+
+
+ENTRY_POINT_GROUP = "urban_computing.executors"
+
+BUILTIN_EXECUTORS = {
+    "mcp": "executors.mcp_executor:MCPExecutor",
+    "api": "executors.api_executor:APIExecutor",
+    "code": "executors.code_executor:CodeExecutor",
+    "local": "executors.local_executor:LocalExecutor",
+}
+
+
+def load_object(spec: str) -> Any:
+    """按 "module:attr" 导入对象"""
+    module_name, _, attr = spec.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"Invalid executor spec '{spec}', expected 'module:attr'")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class ExecutorRegistry:
+    """按工具类型延迟创建执行器"""
+
+    def __init__(self, cache_root: str = "./Cache"):
+        """
+        Args:
+            cache_root: 执行器缓存根目录（每种类型使用其下的同名子目录）
+        """
+        self.cache_root = Path(cache_root)
+        self._factories: Dict[str, Any] = {}
+        self._options: Dict[str, Dict] = {}
+        self._instances: Dict[str, Any] = {}
+        self._entry_points = None
+        self._lock = threading.Lock()
+
+    def register(self, tool_type: str, factory: Union[str, Callable], options: Dict = None):
+        """
+        注册执行器类型（已创建的同类型实例会被替换）
+
+        Args:
+            tool_type: 工具类型（对应配置中的 <tool_type>_tools）
+            factory: 执行器类/工厂，或 "module:attr" 字符串
+            options: 创建时传入的额外关键字参数
+        """
+        with self._lock:
+            if self._factories.get(tool_type) == factory and self._options.get(tool_type) == (options or {}):
+                return
+            self._factories[tool_type] = factory
+            self._options[tool_type] = options or {}
+            self._instances.pop(tool_type, None)
+
+    def configure(self, specs: Dict[str, Union[str, Dict]]):
+        """
+        注册配置文件中声明的执行器
+
+        Args:
+            specs: {"grpc": "pkg.mod:Class"} 或 {"grpc": {"class": "pkg.mod:Class", "options": {...}}}
+        """
+        for tool_type, spec in specs.items():
+            if isinstance(spec, dict):
+                self.register(tool_type, spec["class"], spec.get("options"))
+            else:
+                self.register(tool_type, spec)
+
+    def _entry_point_specs(self) -> Dict[str, Any]:
+        if self._entry_points is None:
+            from importlib.metadata import entry_points
+            self._entry_points = {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+        return self._entry_points
+
+    def _factory(self, tool_type: str):
+        factory = self._factories.get(tool_type)
+        if factory is None and tool_type not in BUILTIN_EXECUTORS:
+            ep = self._entry_point_specs().get(tool_type)
+            factory = ep.load() if ep else None
+        if factory is None:
+            factory = BUILTIN_EXECUTORS.get(tool_type)
+        if isinstance(factory, str):
+            factory = load_object(factory)
+        return factory
+
+    def supports(self, tool_type: str) -> bool:
+        """是否有可用的执行器（不创建实例）"""
+        return (tool_type in self._factories or tool_type in BUILTIN_EXECUTORS
+                or tool_type in self._entry_point_specs())
+
+    def get(self, tool_type: str):
+        """获取执行器（第一次使用时创建）"""
+        executor = self._instances.get(tool_type)
+        if executor is not None:
+            return executor
+        with self._lock:
+            executor = self._instances.get(tool_type)
+            if executor is None:
+                factory = self._factory(tool_type)
+                if factory is None:
+                    raise KeyError(f"No executor registered for tool type '{tool_type}'")
+                executor = factory(str(self.cache_root / tool_type), **self._options.get(tool_type, {}))
+                self._instances[tool_type] = executor
+        return executor
+
+    __getitem__ = get
+
+    @property
+    def loaded(self) -> Dict[str, Any]:
+        """已创建的执行器 {工具类型: 执行器}"""
+        return dict(self._instances)
@@ -0,0 +1,481 @@
+"""
+代码仓库缓存（CodeExecutor 使用）
+
+目录结构（Cache/code/repos）:
+    mirrors/<url 哈希>.git      每个仓库一个浅层、按需取 blob 的裸仓库（partial clone, blob:none）
+    trees/<commit SHA>[-<sparse 哈希>]/        按提交内容寻址的只读检出，使用同一仓库同一提交的工具共享
+    trees/<commit SHA>[-<sparse 哈希>].json    检出的元数据（大小；文件修改时间即最近使用时间）
+
+- 分支移动时只增量获取新提交的树对象和实际需要的 blob
+- sparse 只检出指定路径，其余 blob 不会下载（服务端支持过滤时）
+- 同一 (仓库, ref, sparse) 的并发请求合并为一次获取；同一仓库的 git 操作按仓库加锁（含跨进程文件锁）
+- 检出总大小超过 max_bytes 时按 LRU 删除旧检出（使用中的检出除外），再删除不再被引用的镜像；
+  checkout(pin=True) 在返回前固定检出，调用方拿到目录后不会被其他线程的 gc 删除
+- 分支/标签的解析结果过期后，先返回上一次的检出，在后台重新 ls-remote 并检出新提交
+  （stale-while-revalidate）；远端不可达时继续使用上一次的结果
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import threading
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+from collections import Counter
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows：只做进程内加锁
+    fcntl = None
+
+
+SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+class RepoError(Exception):
+    """git 操作失败或 ref 不存在"""
+
+
+class RepoCache:
+    """按提交 SHA 寻址的仓库检出缓存"""
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024 ** 3, ref_ttl: float = 60.0, git: str = "git"):
+        """
+        Args:
+            root: 缓存根目录
+            max_bytes: 检出和镜像的总大小上限（字节）
+            ref_ttl: 分支/标签解析结果的缓存时间（秒），过期后在后台重新 ls-remote
+            git: git 可执行文件
+        """
+        self.root = Path(root)
+        self.mirrors_dir = self.root / "mirrors"
+        self.trees_dir = self.root / "trees"
+        self.max_bytes = max_bytes
+        self.ref_ttl = ref_ttl
+        self.git = git
+        self.stats = Counter()
+
+        self._refs: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._inflight: Dict[tuple, Future] = {}
+        self._refreshing: Dict[tuple, threading.Thread] = {}
+        self._pins = Counter()
+        self._lock = threading.Lock()
+        self._repo_locks: Dict[str, threading.Lock] = {}
+
+    # ---------- 对外接口 ----------
+
+    def checkout(self, url: str, ref: str = "HEAD", sparse: Optional[Sequence[str]] = None,
+                 pin: bool = False) -> Path:
+        """
+        获取仓库某个 ref 的检出目录（不存在时获取并检出）
+
+        Args:
+            url: 仓库地址（https://、git@、file:// 或本地路径）
+            ref: 分支、标签、HEAD 或 40 位提交 SHA
+            sparse: 只检出这些路径（目录或文件）
+            pin: 返回前固定该检出（用完后由调用方 unpin）
+
+        Returns:
+            只读检出目录（内容由提交 SHA 决定，不要修改）
+
+        Raises:
+            RepoError: git 操作失败或 ref 不存在
+        """
+        path = self._coalesced_checkout(url, ref, sparse)
+        if not pin:
+            return path
+        while True:
+            self.pin(path)
+            if self._touch(path):
+                return path
+            # 固定之前已被其他线程的 gc 删除：重新检出
+            self.unpin(path)
+            path = self._coalesced_checkout(url, ref, sparse)
+
+    def _coalesced_checkout(self, url: str, ref: str, sparse: Optional[Sequence[str]]) -> Path:
+        """同一 (仓库, ref, sparse) 的并发请求合并为一次检出"""
+        key = (url, ref, tuple(sparse or ()))
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            path = self._checkout(url, ref, sparse)
+            future.set_result(path)
+            return path
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def pin(self, path: Path):
+        """在 unpin 之前不回收该检出（可嵌套）"""
+        with self._lock:
+            self._pins[Path(path)] += 1
+
+    def unpin(self, path: Path):
+        with self._lock:
+            self._pins[Path(path)] -= 1
+            if self._pins[Path(path)] <= 0:
+                del self._pins[Path(path)]
+
+    @contextmanager
+    def pinned(self, path: Path) -> Iterator[Path]:
+        """使用期间不回收该检出"""
+        self.pin(path)
+        try:
+            yield path
+        finally:
+            self.unpin(path)
+
+    def resolve(self, url: str, ref: str = "HEAD") -> str:
+        """
+        把 ref 解析为提交 SHA（ls-remote，结果缓存 ref_ttl 秒）
+
+        ls-remote 失败但之前解析过时返回上一次的结果。
+
+        Raises:
+            RepoError: ls-remote 失败且没有之前的结果，或 ref 不存在
+        """
+        if SHA_RE.match(ref):
+            return ref
+        cached = self._refs.get((url, ref))
+        if cached and time.monotonic() - cached[1] < self.ref_ttl:
+            return cached[0]
+        try:
+            return self._ls_remote(url, ref)
+        except RepoError as e:
+            if cached is None:
+                raise
+            self._refs[(url, ref)] = (cached[0], time.monotonic())  # ref_ttl 之后再重试
+            self.stats["ref_refresh_failures"] += 1
+            print(f"⚠️  Using last resolved commit {cached[0][:12]} of {url}@{ref}: {e}")
+            return cached[0]
+
+    def wait_refreshes(self, timeout: Optional[float] = None):
+        """等待后台的 ref 刷新完成"""
+        with self._lock:
+            threads = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def _ls_remote(self, url: str, ref: str, record: bool = True) -> str:
+        """ls-remote 解析 ref（record 时记录结果）"""
+        output = self._run(["ls-remote", url, ref] if ref == "HEAD" else
+                           ["ls-remote", url, ref, f"refs/heads/{ref}", f"refs/tags/{ref}", f"refs/tags/{ref}^{{}}"])
+        refs = dict(reversed(line.split("\t", 1)) for line in output.splitlines() if "\t" in line)
+        sha = next((refs[name] for name in (f"refs/tags/{ref}^{{}}", ref, f"refs/heads/{ref}", f"refs/tags/{ref}")
+                    if name in refs), None)
+        if sha is None:
+            raise RepoError(f"Ref '{ref}' not found in {url}")
+        if record:
+            self._refs[(url, ref)] = (sha, time.monotonic())
+        return sha
+
+    def tree_path(self, sha: str, sparse: Optional[Sequence[str]] = None) -> Path:
+        """检出目录：提交 SHA（+ sparse 路径的哈希）"""
+        if not sparse:
+            return self.trees_dir / sha
+        digest = hashlib.sha256("\n".join(sorted(sparse)).encode()).hexdigest()[:12]
+        return self.trees_dir / f"{sha}-{digest}"
+
+    # ---------- 获取与检出 ----------
+
+    def _checkout(self, url: str, ref: str, sparse: Optional[Sequence[str]]) -> Path:
+        # 解析结果过期但上一次的检出还在：直接使用，在后台刷新（调用路径上没有网络往返）
+        cached = self._refs.get((url, ref))
+        if cached and not SHA_RE.match(ref) and time.monotonic() - cached[1] >= self.ref_ttl:
+            tree = self.tree_path(cached[0], sparse)
+            if self._touch(tree):
+                self.stats["stale_hits"] += 1
+                self._refresh_later(url, ref, sparse)
+                return tree
+        return self._checkout_commit(url, self.resolve(url, ref), sparse)
+
+    def _refresh_later(self, url: str, ref: str, sparse: Optional[Sequence[str]]):
+        """后台重新解析 ref 并检出新提交（同一 ref 同时只有一个刷新）"""
+        key = (url, ref, tuple(sparse or ()))
+
+        def refresh():
+            try:
+                # 新提交检出完成后才更新解析结果，期间的调用继续使用旧检出
+                sha = self._ls_remote(url, ref, record=False)
+                self._checkout_commit(url, sha, sparse)
+                self._refs[(url, ref)] = (sha, time.monotonic())
+            except RepoError as e:
+                stale = self._refs.get((url, ref))
+                if stale:
+                    self._refs[(url, ref)] = (stale[0], time.monotonic())  # ref_ttl 之后再重试
+                self.stats["ref_refresh_failures"] += 1
+                print(f"⚠️  Background refresh of {url}@{ref} failed, keeping the last commit: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.pop(key, None)
+
+        with self._lock:
+            if key in self._refreshing:
+                return
+            thread = self._refreshing[key] = threading.Thread(target=refresh, name="repo-ref-refresh", daemon=True)
+        thread.start()
+
+    def _checkout_commit(self, url: str, sha: str, sparse: Optional[Sequence[str]]) -> Path:
+        tree = self.tree_path(sha, sparse)
+        if self._touch(tree):
+            self.stats["hits"] += 1
+            return tree
+
+        with self._repo_lock(url):
+            if self._touch(tree):
+                self.stats["hits"] += 1
+                return tree
+            mirror = self._mirror(url)
+            if not self._has_commit(mirror, sha):
+                self._run(["fetch", "--quiet", "--depth=1", "--filter=blob:none", "--no-tags", "origin", sha],
+                          cwd=mirror)
+                self._run(["update-ref", f"refs/urban/{sha}", sha], cwd=mirror)
+                self.stats["fetches"] += 1
+            size = self._materialize(mirror, sha, sparse, tree)
+            os.utime(mirror)
+
+        self._write_meta(tree, {"url": url, "sha": sha, "sparse": list(sparse or []), "bytes": size})
+        self._touch(tree)
+        self.stats["checkouts"] += 1
+        self.gc(keep={tree})
+        return tree
+
+    def _mirror(self, url: str) -> Path:
+        """仓库镜像（首次使用时创建为 partial clone 的裸仓库）"""
+        mirror = self.mirrors_dir / self._mirror_name(url)
+        if mirror.exists():
+            return mirror
+        tmp = mirror.with_name(f"{mirror.name}.tmp{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        self._run(["init", "--quiet", "--bare"], cwd=tmp)
+        for key, value in (("core.repositoryformatversion", "1"), ("extensions.partialClone", "origin"),
+                           ("remote.origin.url", url), ("remote.origin.promisor", "true"),
+                           ("remote.origin.partialclonefilter", "blob:none")):
+            self._run(["config", key, value], cwd=tmp)
+        os.replace(tmp, mirror)
+        return mirror
+
+    def _has_commit(self, mirror: Path, sha: str) -> bool:
+        """检查引用而不是对象本身：partial clone 中读取缺失的对象会触发按需下载"""
+        try:
+            self._run(["rev-parse", "--verify", "--quiet", f"refs/urban/{sha}"], cwd=mirror)
+            return True
+        except RepoError:
+            return False
+
+    def _materialize(self, mirror: Path, sha: str, sparse: Optional[Sequence[str]], tree: Path) -> int:
+        """把提交中的文件写入检出目录（只取缺失的 blob），返回总字节数"""
+        listing = self._run(["ls-tree", "-r", "-z", "--full-tree", sha, "--", *(sparse or [])], cwd=mirror)
+        entries = []
+        for item in listing.split("\0"):
+            if not item:
+                continue
+            meta, path = item.split("\t", 1)
+            mode, kind, oid = meta.split()
+            if kind == "blob":  # 跳过子模块
+                entries.append((mode, oid, path))
+        if sparse and not entries:
+            raise RepoError(f"Sparse paths {list(sparse)} not found in {sha}")
+
+        # partial clone：一次性取回缺失的 blob（不会触发逐个对象的按需下载）
+        missing = {line[1:] for line in self._run(["rev-list", "--objects", "--missing=print", sha],
+                                                  cwd=mirror).splitlines() if line.startswith("?")}
+        wanted = sorted({oid for _, oid, _ in entries if oid in missing})
+        if wanted:
+            self._run(["-c", "fetch.negotiationAlgorithm=noop", "fetch", "--quiet", "--no-tags",
+                       "--no-write-fetch-head", "--filter=blob:none", "origin", *wanted], cwd=mirror)
+            self.stats["blob_fetches"] += 1
+
+        tmp = tree.with_name(f"{tree.name}.tmp{os.getpid()}.{threading.get_ident()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        size = 0
+        try:
+            for (mode, _, path), data in zip(entries, self._read_blobs(mirror, [oid for _, oid, _ in entries])):
+                target = tmp / path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if mode == "120000":
+                    os.symlink(data.decode(), target)
+                    continue
+                target.write_bytes(data)
+                if mode == "100755":
+                    target.chmod(0o755)
+                size += len(data)
+            # 持有仓库锁时，存在但没有元数据的检出是中断留下的残留
+            shutil.rmtree(tree, ignore_errors=True)
+            os.rename(tmp, tree)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return size
+
+    def _read_blobs(self, mirror: Path, oids: List[str]) -> Iterator[bytes]:
+        """git cat-file --batch 依次读取 blob 内容"""
+        if not oids:
+            return
+        process = subprocess.Popen([self.git, "cat-file", "--batch"], cwd=mirror, stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+        def feed():
+            try:
+                process.stdin.write("".join(f"{oid}\n" for oid in oids).encode())
+                process.stdin.close()
+            except OSError:
+                pass
+
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+        try:
+            for oid in oids:
+                header = process.stdout.readline().decode().split()
+                if len(header) != 3:
+                    raise RepoError(f"Object {oid} missing from mirror")
+                data = process.stdout.read(int(header[2]))
+                process.stdout.read(1)
+                yield data
+        finally:
+            process.stdout.close()
+            process.wait()
+            writer.join()
+
+    # ---------- 垃圾回收 ----------
+
+    def gc(self, keep=frozenset()) -> List[Path]:
+        """
+        总大小超过 max_bytes 时按最近使用时间删除检出，之后删除没有检出引用的镜像
+
+        Args:
+            keep: 本次不删除的检出
+
+        Returns:
+            删除的目录
+        """
+        trees = []
+        for meta_file in self.trees_dir.glob("*.json"):
+            try:
+                meta = json.loads(meta_file.read_text())
+                trees.append((meta_file.stat().st_mtime, meta_file.with_suffix(""), meta))
+            except (OSError, json.JSONDecodeError):
+                continue
+        mirrors = {path: self._dir_size(path) for path in self.mirrors_dir.glob("*.git")}
+        total = sum(meta["bytes"] for _, _, meta in trees) + sum(mirrors.values())
+        if total <= self.max_bytes:
+            return []
+
+        removed = []
+        for _, tree, meta in sorted(trees, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            if tree in keep:
+                continue
+            # 在锁内确认未被固定并移走目录，之后的 pin + _touch 不会拿到正在删除的检出
+            trash = tree.with_name(f"{tree.name}.removing{os.getpid()}-{threading.get_ident()}")
+            with self._lock:
+                if tree in self._pins:
+                    continue
+                tree.with_suffix(".json").unlink(missing_ok=True)
+                try:
+                    tree.rename(trash)
+                except OSError:
+                    trash = tree
+            shutil.rmtree(trash, ignore_errors=True)
+            total -= meta["bytes"]
+            removed.append(tree)
+            self.stats["evicted"] += 1
+
+        used = {self._mirror_name(meta["url"]) for _, tree, meta in trees if tree not in removed}
+        for mirror in sorted(mirrors, key=lambda path: path.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            if mirror.name in used or not self._remove_idle_mirror(mirror):
+                continue
+            total -= mirrors[mirror]
+            removed.append(mirror)
+        return removed
+
+    def _remove_idle_mirror(self, mirror: Path) -> bool:
+        """删除没有进行中 git 操作的镜像（flock 对同一进程的其他线程同样生效）"""
+        if fcntl is None:
+            with self._lock:
+                busy = any(lock.locked() for url, lock in self._repo_locks.items()
+                           if self._mirror_name(url) == mirror.name)
+            if not busy:
+                shutil.rmtree(mirror, ignore_errors=True)
+            return not busy
+        with open(self.mirrors_dir / f"{mirror.name}.lock", "w") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return False
+            shutil.rmtree(mirror, ignore_errors=True)
+            fcntl.flock(f, fcntl.LOCK_UN)
+        return True
+
+    def _mirror_name(self, url: str) -> str:
+        return f"{hashlib.sha256(url.encode()).hexdigest()[:16]}.git"
+
+    def _dir_size(self, path: Path) -> int:
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+    # ---------- 工具 ----------
+
+    def _touch(self, tree: Path) -> bool:
+        """检出存在时更新最近使用时间"""
+        meta = tree.with_suffix(".json")
+        now = time.time()  # 显式时间戳：文件系统的默认时间戳精度较粗，连续访问可能相同
+        try:
+            os.utime(meta, (now, now))
+        except OSError:
+            return False
+        return tree.is_dir()
+
+    def _write_meta(self, tree: Path, meta: Dict):
+        tmp = tree.with_name(f"{tree.name}.json.tmp{os.getpid()}")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, tree.with_suffix(".json"))
+
+    @contextmanager
+    def _repo_lock(self, url: str):
+        """同一仓库的 git 操作串行执行（线程锁 + 跨进程文件锁）"""
+        with self._lock:
+            lock = self._repo_locks.setdefault(url, threading.Lock())
+        with lock:
+            self.mirrors_dir.mkdir(parents=True, exist_ok=True)
+            self.trees_dir.mkdir(parents=True, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self.mirrors_dir / f"{self._mirror_name(url)}.lock", "w") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _run(self, args: List[str], cwd: Optional[Path] = None) -> str:
+        try:
+            result = subprocess.run([self.git, *args], cwd=cwd, capture_output=True, timeout=600,
+                                    env=dict(os.environ, GIT_TERMINAL_PROMPT="0"))
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise RepoError(f"git {args[0]} failed: {e}")
+        if result.returncode != 0:
+            raise RepoError(f"git {' '.join(args[:2])} failed: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout.decode(errors="replace")
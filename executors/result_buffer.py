@@ -0,0 +1,160 @@
+"""
+大结果的带外传输（代码工具和本地 MCP 服务共用）
+
+网格、轨迹、栅格瓦片等大数组不经过 JSON 管道：工具把原始字节写入执行器的传输目录
+（优先 /dev/shm 共享内存，没有时为系统临时目录），结果中只放一个描述；
+执行器把文件只读映射为 ResultBuffer 后立即删除文件，映射随对象释放自动回收。
+
+传输目录通过环境变量 URBAN_RESULT_DIR 传给工作进程和 stdio MCP 服务：
+- 代码工具：返回值中支持缓冲区协议的对象（bytes、array.array、NumPy 数组等）
+  超过 inline_bytes 时由 code_runner.py 自动写出，描述为 {"__buffer__": {"name", "format", "shape"}}
+- MCP 服务：返回 resource 内容，uri 为传输目录中的 file:// 路径，
+  可选的 _meta 给出 {"format", "shape"}（默认按字节）
+
+ResultBuffer 是 dict 的子类，内容为描述信息 {"type": "buffer", "format", "shape", "nbytes"}，
+结果可以照常序列化（提示词、批量结果、HTTP 响应中只出现描述）；
+数据通过 memoryview() 或 numpy.asarray(buffer) 零拷贝访问，页面在第一次读取时才载入。
+"""
+
+import os
+import mmap
+import shutil
+import struct
+import weakref
+import tempfile
+from pathlib import Path
+from typing import Any, List, Optional
+
+# 传给工作进程和 MCP 服务的环境变量
+ENV_DIR = "URBAN_RESULT_DIR"
+ENV_INLINE_BYTES = "URBAN_INLINE_BYTES"
+# 代码工具结果中的带外数据描述
+MARKER = "__buffer__"
+# 小于该大小的缓冲区仍然内联在 JSON 中
+DEFAULT_INLINE_BYTES = 64 * 1024
+SHM_DIR = "/dev/shm"
+
+
+def transport_dir(name: str) -> Path:
+    """
+    创建执行器的传输目录（共享内存可用时放在 /dev/shm）
+
+    Args:
+        name: 目录名前缀（执行器类型）
+    """
+    base = SHM_DIR if os.access(SHM_DIR, os.W_OK) else None
+    return Path(tempfile.mkdtemp(prefix=f"urban-{name}-", dir=base))
+
+
+def remove_transport_dir(path: Path):
+    """删除传输目录（已映射的结果不受影响）"""
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class ResultBuffer(dict):
+    """带外传输的结果数据（只读内存映射）"""
+
+    def __init__(self, path: Path, format: str = "B", shape: Optional[List[int]] = None):
+        """
+        映射文件并删除（数据在对象及其导出的视图全部释放后回收）
+
+        Args:
+            path: 传输目录中的数据文件
+            format: 元素格式（struct 格式字符，如 "d"、"f"、"i"）
+            shape: 数组形状（默认为一维）
+
+        Raises:
+            OSError: 文件不存在或无法映射
+            ValueError: 格式或形状与文件大小不符
+        """
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._data = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) if size else b""
+        try:
+            os.unlink(path)
+        except OSError:  # Windows 上映射中的文件无法删除
+            weakref.finalize(self, _unlink, path)
+
+        try:
+            itemsize = struct.calcsize(format)
+        except struct.error:
+            raise ValueError(f"Invalid buffer format '{format}'")
+        if shape is None:
+            shape = [size // itemsize]
+        count = 1
+        for dim in shape:
+            count *= dim
+        if count * itemsize != size:
+            raise ValueError(f"Buffer of {size} bytes does not match format '{format}' and shape {list(shape)}")
+        super().__init__(type="buffer", format=format, shape=list(shape), nbytes=size)
+
+    @property
+    def nbytes(self) -> int:
+        return self["nbytes"]
+
+    def memoryview(self) -> memoryview:
+        """按格式和形状的零拷贝视图（memoryview 不支持的格式返回字节视图）"""
+        view = memoryview(self._data)
+        try:
+            return view.cast(self["format"], self["shape"])
+        except (TypeError, ValueError):
+            return view
+
+    def __array__(self, dtype=None, copy=None):
+        """numpy.asarray(buffer) 得到只读的零拷贝数组"""
+        import numpy
+
+        array = numpy.frombuffer(self._data, dtype=self["format"]).reshape(self["shape"])
+        if dtype is not None and numpy.dtype(dtype) != array.dtype:
+            return array.astype(dtype)
+        return array.copy() if copy else array
+
+    def tobytes(self) -> bytes:
+        return bytes(self._data)
+
+    def tolist(self) -> list:
+        return self.memoryview().tolist()
+
+
+def _unlink(path: Path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def attach(value: Any, directory: Path) -> Any:
+    """
+    把代码工具结果中的 {"__buffer__": {...}} 描述替换为 ResultBuffer
+
+    Args:
+        value: 工作进程返回的结果
+        directory: 传输目录（描述中只允许该目录下的文件名）
+    """
+    if isinstance(value, dict):
+        if len(value) == 1 and MARKER in value:
+            spec = value[MARKER]
+            return open_buffer(directory, spec["name"], spec.get("format", "B"), spec.get("shape"))
+        return {key: attach(item, directory) for key, item in value.items()}
+    if isinstance(value, list):
+        return [attach(item, directory) for item in value]
+    return value
+
+
+def open_buffer(directory: Path, name: str, format: str = "B", shape: Optional[List[int]] = None) -> ResultBuffer:
+    """
+    映射传输目录中的数据文件
+
+    Raises:
+        ValueError: 文件名不在传输目录中，或格式与大小不符
+        OSError: 文件不存在
+    """
+    if not name or Path(name).name != name or name.startswith("."):
+        raise ValueError(f"Invalid result buffer name '{name}'")
+    return ResultBuffer(Path(directory, name), format, shape)
+
+
+def release_files(directory: Path, prefix: str):
+    """删除未被映射的数据文件（工作进程崩溃或超时留下的）"""
+    for path in Path(directory).glob(f"{prefix}*"):
+        _unlink(path)
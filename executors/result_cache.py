@@ -0,0 +1,173 @@
+"""
+工具结果缓存（API 和 MCP 执行器共用）
+
+两级缓存：
+- 内存层 {cache_key: (写入时间, 数据)}，按最近使用淘汰，最多 max_entries 条
+- 磁盘层 <cache_dir>/<cache_key>.json（文件修改时间即写入时间）
+
+缓存键为 "{工具前缀}_{参数哈希}"，同一工具的缓存文件共享前缀，便于按工具预取。
+命中/未命中计入 urban_cache_requests_total 指标。
+"""
+
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Dict
+
+import tracing
+
+
+def key_prefix(namespace: str) -> str:
+    """工具前缀（API 为端点，MCP 为 服务:工具名）"""
+    return hashlib.md5(namespace.encode()).hexdigest()[:12]
+
+
+def canonical_arguments(params_def: Dict, arguments: Dict) -> Dict:
+    """
+    规范化调用参数（只用于生成缓存键）：
+    去掉 None、补全默认值、按参数类型统一数值和布尔值、去掉字符串首尾空白
+
+    Args:
+        params_def: 工具的参数定义
+        arguments: 实际调用参数
+    """
+    canonical = {}
+    for name, value in arguments.items():
+        if value is None:
+            continue
+        param_type = params_def.get(name, {}).get("type", "string")
+        try:
+            if param_type == "number" and not isinstance(value, bool):
+                value = float(value)
+            elif param_type == "integer" and not isinstance(value, bool):
+                value = int(float(value))
+            elif param_type == "boolean" and isinstance(value, str):
+                value = value.strip().lower() in ("true", "1", "yes")
+        except (TypeError, ValueError):
+            pass
+        if isinstance(value, str):
+            value = value.strip()
+        canonical[name] = value
+
+    for name, param in params_def.items():
+        if name not in canonical and param.get("default") is not None:
+            canonical[name] = param["default"]
+    return canonical
+
+
+def canonical_key(namespace: str, params_def: Dict, arguments: Dict) -> str:
+    """生成缓存键: {工具前缀}_{规范化参数的哈希}"""
+    payload = json.dumps(canonical_arguments(params_def, arguments), sort_keys=True,
+                         ensure_ascii=False, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(f"{namespace}\n{payload}".encode()).hexdigest()[:32]
+    return f"{key_prefix(namespace)}_{digest}"
+
+
+class ResultCache:
+    """内存 + 磁盘两级结果缓存"""
+
+    def __init__(self, cache_dir: Path, max_entries: int = 1024):
+        """
+        Args:
+            cache_dir: 磁盘缓存目录
+            max_entries: 内存层最多保留的条目数（超出时淘汰最近最少使用的条目，磁盘层不受影响）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, cache_key: str, saved_at: float, data: Any):
+        """写入内存层并淘汰超出 max_entries 的条目（调用方持有锁）"""
+        self._memory[cache_key] = (saved_at, data)
+        self._memory.move_to_end(cache_key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def lookup(self, tool_name: str, cache_key: str, ttl: float) -> Any:
+        """查询缓存并记录 cache_lookup span 和命中指标（未命中返回 None）"""
+        with tracing.span("cache_lookup", tool=tool_name) as span:
+            data = self.get(cache_key, ttl)
+            span.set(hit=data is not None)
+        tracing.metrics.inc("urban_cache_requests_total", tool=tool_name,
+                            result="hit" if data is not None else "miss")
+        return data
+
+    def get(self, cache_key: str, ttl: float) -> Any:
+        """
+        读取缓存（过期的条目会被删除）
+
+        Args:
+            cache_key: 缓存键
+            ttl: 缓存有效期（秒）
+        """
+        # 先查内存层
+        with self._lock:
+            entry = self._memory.get(cache_key)
+            if entry:
+                self._memory.move_to_end(cache_key)
+        if entry:
+            saved_at, data = entry
+            if time.time() - saved_at <= ttl:
+                return data
+            with self._lock:
+                self._memory.pop(cache_key, None)
+
+        cache_file = self.cache_dir / f"{cache_key}.json"
+        try:
+            mtime = cache_file.stat().st_mtime
+            if time.time() - mtime > ttl:
+                cache_file.unlink()  # 删除过期缓存
+                return None
+            with open(cache_file) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        with self._lock:
+            self._remember(cache_key, mtime, data)
+        return data
+
+    def put(self, cache_key: str, data: Any):
+        """写入缓存（内存 + 磁盘）"""
+        with self._lock:
+            self._remember(cache_key, time.time(), data)
+        cache_file = self.cache_dir / f"{cache_key}.json"
+        with open(cache_file, "w") as f:
+            json.dump(data, f)
+
+    def prefetch(self, prefix: str, ttl: float):
+        """
+        把某个工具（缓存键前缀）未过期的磁盘缓存加载到内存
+        最多加载最新的 max_entries 条，已在内存中的条目不重复读取
+
+        Args:
+            prefix: 缓存键前缀（见 key_prefix）
+            ttl: 缓存有效期（秒）
+        """
+        now = time.time()
+        fresh = []
+        for cache_file in self.cache_dir.glob(f"{prefix}_*.json"):
+            try:
+                mtime = cache_file.stat().st_mtime
+            except OSError:
+                continue
+            if now - mtime <= ttl:
+                fresh.append((mtime, cache_file))
+
+        # 从旧到新写入，最新的条目最后成为最近使用
+        for mtime, cache_file in sorted(fresh)[-self.max_entries:]:
+            with self._lock:
+                if cache_file.stem in self._memory:
+                    continue
+            try:
+                with open(cache_file) as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            with self._lock:
+                if cache_file.stem not in self._memory:
+                    self._remember(cache_file.stem, mtime, data)
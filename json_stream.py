@@ -0,0 +1,126 @@
+"""
+增量 JSON 解析器
+
+用于流式 LLM 输出：逐块喂入文本，一旦顶层对象的某个字段值完整生成，
+立即返回 (key, value)，而不必等待整个 JSON 结束。
+"""
+
+import json
+from typing import Any, Dict, List, Tuple
+
+
+class IncrementalJSONParser:
+    """顶层 JSON 对象的增量解析器"""
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.done = False
+
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+
+        # 顶层状态: key -> key_str -> colon -> value -> after
+        self._expect = "key"
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        喂入一段文本
+
+        Args:
+            chunk: 新生成的文本片段
+
+        Returns:
+            本次新完成的顶层字段列表 [(key, value), ...]
+        """
+        completed = []
+        if self.done or not chunk:
+            return completed
+
+        self._buf += chunk
+        buf = self._buf
+
+        while self._pos < len(buf) and not self.done:
+            pos = self._pos
+            c = buf[pos]
+            self._pos += 1
+
+            # 跳过 ```json 等前缀，直到第一个 {
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._expect == "key_str":
+                            self._key = json.loads(buf[self._key_start:pos + 1])
+                            self._expect = "colon"
+                        elif self._expect == "value":
+                            self._emit(buf[self._value_start:pos + 1], completed)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect == "key":
+                        self._key_start = pos
+                        self._expect = "key_str"
+                    elif self._expect == "value" and self._value_start is None:
+                        self._value_start = pos
+                continue
+
+            if self._depth == 1 and self._expect == "colon":
+                if c == ":":
+                    self._expect = "value"
+                    self._value_start = None
+                continue
+
+            if c in "{[":
+                if self._depth == 1 and self._expect == "value" and self._value_start is None:
+                    self._value_start = pos
+                self._depth += 1
+                continue
+
+            if c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "value" and self._value_start is not None:
+                    # 嵌套对象/数组闭合
+                    self._emit(buf[self._value_start:pos + 1], completed)
+                elif self._depth == 0:
+                    if self._expect == "value" and self._value_start is not None:
+                        self._emit(buf[self._value_start:pos], completed)
+                    self.done = True
+                continue
+
+            if self._depth == 1:
+                if c == ",":
+                    if self._expect == "value" and self._value_start is not None:
+                        self._emit(buf[self._value_start:pos], completed)
+                    self._expect = "key"
+                elif self._expect == "value" and self._value_start is None and not c.isspace():
+                    # 数字 / true / false / null
+                    self._value_start = pos
+
+        return completed
+
+    def _emit(self, raw: str, completed: List[Tuple[str, Any]]):
+        """记录一个已完成的顶层字段"""
+        value = json.loads(raw.strip())
+        self.values[self._key] = value
+        completed.append((self._key, value))
+        self._expect = "after"
+        self._value_start = None
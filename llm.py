@@ -0,0 +1,77 @@
+"""
+LLM 客户端管理
+
+同一配置的 ChatOpenAI 客户端只创建一次并复用（HTTP 连接池保持温热），
+长驻进程（server.py）和批量模式不再为每次调用重建客户端。
+
+基准测试可通过 set_chat_model_factory() 注入假模型（见 bench/fake_llm.py）。
+"""
+
+import os
+import threading
+from typing import TYPE_CHECKING, Callable, Optional
+
+# langchain_openai 导入较慢，创建第一个客户端时才导入
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+_clients = {}
+_lock = threading.Lock()
+_factory = None
+
+
+def set_chat_model_factory(factory: Optional[Callable[[float], object]]):
+    """
+    替换聊天模型的创建方式（传入 None 恢复默认 ChatOpenAI）
+
+    Args:
+        factory: factory(temperature) -> LangChain chat model
+    """
+    global _factory
+    with _lock:
+        _factory = factory
+        _clients.clear()
+
+
+def get_chat_model(temperature: float = 0) -> "ChatOpenAI":
+    """
+    获取（复用）聊天模型客户端
+
+    Args:
+        temperature: 采样温度
+
+    Returns:
+        ChatOpenAI 实例（或注入的模型）
+    """
+    key = (
+        os.getenv("OPENAI_MODEL", "gpt-4o"),
+        temperature,
+        os.getenv("OPENAI_API_KEY"),
+        os.getenv("OPENAI_BASE_URL"),
+    )
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None and _factory is not None:
+            client = _clients[key] = _factory(temperature)
+        elif client is None:
+            from langchain_openai import ChatOpenAI
+
+            model, temperature, api_key, base_url = key
+            client = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                api_key=api_key,
+                base_url=base_url,
+                # 流式调用也返回 token 用量（usage.py 统计成本）
+                stream_usage=True
+            )
+            _clients[key] = client
+    return client
+
+
+def reset_chat_models():
+    """清空客户端缓存（环境变量变化后调用）"""
+    with _lock:
+        _clients.clear()
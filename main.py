@@ -3,13 +3,47 @@
 """
 
 import os
+import sys
 import json
+import argparse
+import contextlib
 from pathlib import Path
 from datetime import datetime
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Optional
+import tracing
+import usage
+from batch_runner import print_summary, run_batch
+from json_stream import IncrementalJSONParser
+from llm import get_chat_model
+from planner import process_planned_query
+from prompts import PARAMETER_RULES
 from tool_manager import UrbanToolManager
 
+# LangChain 较重，只在第一次调用 LLM 时导入（见 _build_selection_prompt 等）
+if TYPE_CHECKING:
+    from langchain_core.prompts import ChatPromptTemplate
+
+
+# 推测执行线程池（工具 I/O 与剩余 token 生成重叠），按查询并发数调整大小（见 set_concurrency）
+_speculative_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative-tool")
+# 缓存预取线程池：预取与推测执行分开，不占用工具调用的线程
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-prefetch")
+
+
+def set_concurrency(queries: int):
+    """
+    按同时处理的查询数调整推测执行线程池（每个查询最多一个推测调用）
+    服务模式和批量模式启动时调用
+
+    Args:
+        queries: 查询并发数
+    """
+    global _speculative_pool
+    previous = _speculative_pool
+    _speculative_pool = ThreadPoolExecutor(max_workers=max(1, queries), thread_name_prefix="speculative-tool")
+    previous.shutdown(wait=False)
+
 
 def load_env():
     """加载环境变量"""
@@ -25,29 +59,11 @@ def load_env():
         print("ℹ️  No .env file found, using system environment variables")
 
 
-def simple_tool_selection(query: str, tool_manager: UrbanToolManager) -> dict:
-    """
-    简单的工具选择（单步任务）
-    使用 LLM 从工具池中选择最合适的工具
-
-    Args:
-        query: 用户查询
-        tool_manager: 工具管理器
-
-    Returns:
-        选择结果 {"tool_name": "...", "reasoning": "...", "parameters": {...}}
-    """
-    llm = ChatOpenAI(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o"),
-        temperature=0,
-        api_key=os.getenv("OPENAI_API_KEY"),
-        base_url=os.getenv("OPENAI_BASE_URL")
-    )
-
-    # 获取工具描述
-    tools_desc = tool_manager.get_tools_description()
+def _build_selection_prompt() -> "ChatPromptTemplate":
+    """构建工具选择 Prompt（普通调用与流式调用共用）"""
+    from langchain_core.prompts import ChatPromptTemplate
 
-    prompt = ChatPromptTemplate.from_messages([
+    return ChatPromptTemplate.from_messages([
         ("system", """You are an urban computing expert.
 Given a user query, select the most suitable tool from the available tools.
 
@@ -56,31 +72,25 @@ Available Tools:
 
 Analyze the query and select the best tool to answer it.
 
-IMPORTANT PARAMETER EXTRACTION RULES:
-- For GitHub usernames: convert to lowercase, remove spaces (e.g., "Linus Torvalds" -> "torvalds")
-- For weather_forecast (RapidAPI): Use "place" parameter with format "City,CountryCode" (e.g., "London,GB", "Beijing,CN", "Tokyo,JP")
-- For weather_forecast_free (Open-Meteo): Use "latitude" and "longitude" parameters with decimal coordinates
-- For coordinates queries: use the provided latitude/longitude values if available, otherwise use weather_forecast_free with location name
-- Extract parameter values in the exact format expected by the tool
+{rules}
 
 Respond ONLY with valid JSON in this exact format:
 {{
   "tool_name": "exact_tool_name_from_list",
-  "reasoning": "brief explanation of why this tool is suitable",
-  "parameters": {{"param1": "value1", "param2": "value2"}}
+  "parameters": {{"param1": "value1", "param2": "value2"}},
+  "reasoning": "brief explanation of why this tool is suitable"
 }}
 
 Do not include any markdown formatting or code blocks, just the raw JSON."""),
         ("user", "{query}")
     ])
 
-    chain = prompt | llm
-    response = chain.invoke({"query": query, "tools": tools_desc})
 
-    # 解析 JSON
+def _parse_selection(content: str) -> dict:
+    """解析 LLM 返回的工具选择 JSON"""
     try:
         # 清理可能的 markdown 代码块标记
-        content = response.content.strip()
+        content = content.strip()
         if content.startswith("```"):
             # 移除 ```json 和 ```
             content = content.split("```")[1]
@@ -91,10 +101,78 @@ Do not include any markdown formatting or code blocks, just the raw JSON."""),
         return result
     except json.JSONDecodeError as e:
         print(f"❌ Failed to parse LLM response as JSON: {e}")
-        print(f"Raw response: {response.content}")
+        print(f"Raw response: {content}")
         raise
 
 
+def simple_tool_selection(query: str, tool_manager: UrbanToolManager) -> dict:
+    """
+    简单的工具选择（单步任务）
+    使用 LLM 从工具池中选择最合适的工具
+
+    Args:
+        query: 用户查询
+        tool_manager: 工具管理器
+
+    Returns:
+        选择结果 {"tool_name": "...", "reasoning": "...", "parameters": {...}}
+    """
+    llm = get_chat_model(temperature=0)
+
+    # 获取工具描述
+    tools_desc = tool_manager.get_tools_description()
+
+    chain = _build_selection_prompt() | llm
+    response = chain.invoke({"query": query, "tools": tools_desc, "rules": PARAMETER_RULES})
+    usage.record("selection", response)
+
+    return _parse_selection(response.content)
+
+
+def stream_tool_selection(query: str, tool_manager: UrbanToolManager,
+                          on_field: Optional[Callable[[str, Any], None]] = None) -> dict:
+    """
+    流式工具选择
+    边生成边增量解析 JSON，每个顶层字段完整后立即回调 on_field，
+    调用方可以在 reasoning 还在生成时就开始执行工具
+
+    Args:
+        query: 用户查询
+        tool_manager: 工具管理器
+        on_field: 字段完成回调 on_field(key, value)
+
+    Returns:
+        选择结果 {"tool_name": "...", "reasoning": "...", "parameters": {...}}
+    """
+    llm = get_chat_model(temperature=0)
+
+    tools_desc = tool_manager.get_tools_description()
+
+    chain = _build_selection_prompt() | llm
+    parser = IncrementalJSONParser()
+    chunks = []
+    aggregate = None
+
+    for chunk in chain.stream({"query": query, "tools": tools_desc, "rules": PARAMETER_RULES}):
+        # 合并 chunk 以获得流末尾的 usage_metadata
+        aggregate = chunk if aggregate is None else aggregate + chunk
+        text = chunk.content
+        if not text:
+            continue
+        chunks.append(text)
+        for key, value in parser.feed(text):
+            if on_field:
+                on_field(key, value)
+
+    usage.record("selection", aggregate)
+
+    if parser.done:
+        return parser.values
+
+    # 增量解析未能得到完整对象时，退回整体解析
+    return _parse_selection("".join(chunks))
+
+
 def generate_final_answer(query: str, tool_name: str, tool_result: dict) -> str:
     """
     用 LLM 生成最终答案
@@ -107,12 +185,9 @@ def generate_final_answer(query: str, tool_name: str, tool_result: dict) -> str:
     Returns:
         最终答案文本
     """
-    llm = ChatOpenAI(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o"),
-        temperature=0.3,
-        api_key=os.getenv("OPENAI_API_KEY"),
-        base_url=os.getenv("OPENAI_BASE_URL")
-    )
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm = get_chat_model(temperature=0.3)
 
     answer_prompt = ChatPromptTemplate.from_messages([
         ("system", """You are an urban computing expert.
@@ -128,73 +203,149 @@ Tool Result: {result}
 Please provide a comprehensive answer to the user's query based on this result.""")
     ])
 
+    payload = json.dumps(tool_result, indent=2)
+
     chain = answer_prompt | llm
     final_answer = chain.invoke({
         "query": query,
         "tool_name": tool_name,
-        "result": json.dumps(tool_result, indent=2)
+        "result": payload
     })
+    usage.record("final_answer", final_answer, tool=tool_name, payload_chars=len(payload))
 
     return final_answer.content
 
 
-def process_query(query: str, tool_manager: UrbanToolManager) -> dict:
+def process_query(query: str, tool_manager: UrbanToolManager, speculative: bool = True,
+                  on_event: Optional[Callable[[str, Any], None]] = None) -> dict:
     """
     处理单步查询的主流程
 
     Args:
         query: 用户查询
         tool_manager: 工具管理器
+        speculative: 是否流式选择并推测执行（parameters 生成完即开始调用工具）
+        on_event: 进度回调 on_event(event, data)，事件依次为
+            selection_field / selection / tool_result / final_answer
 
     Returns:
         处理结果字典
     """
-    print(f"\n{'='*60}")
-    print(f"🔍 Query: {query}")
-    print(f"{'='*60}\n")
-
-    # 1. 选择工具
-    print("🤔 Selecting appropriate tool...")
-    selection = simple_tool_selection(query, tool_manager)
-
-    print(f"✅ Selected: {selection['tool_name']}")
-    print(f"💡 Reasoning: {selection['reasoning']}")
-    print(f"📋 Parameters: {json.dumps(selection['parameters'], indent=2)}")
-
-    # 2. 执行工具
-    tool = tool_manager.get_tool_by_name(selection['tool_name'])
-    if not tool:
-        error_msg = f"Tool '{selection['tool_name']}' not found in tool pool"
-        print(f"❌ Error: {error_msg}")
-        return {
-            "query": query,
-            "tool_used": selection['tool_name'],
-            "tool_result": {"success": False, "error": error_msg},
-            "final_answer": f"Error: {error_msg}"
-        }
-
-    print(f"\n⚙️  Executing tool '{selection['tool_name']}'...")
-    tool_result = tool.invoke(selection['parameters'])
-
-    if tool_result.get("success"):
-        print("✅ Tool execution succeeded")
-    else:
-        print(f"❌ Tool execution failed: {tool_result.get('error')}")
-
-    # 3. 生成最终答案
-    print("\n🤖 Generating final answer...")
-    final_answer = generate_final_answer(query, selection['tool_name'], tool_result)
-
-    return {
-        "query": query,
-        "tool_used": selection['tool_name'],
-        "tool_result": tool_result,
-        "final_answer": final_answer
-    }
+    # 固定工具池快照：热重载不影响进行中的查询
+    tool_manager = tool_manager.snapshot()
+
+    with tracing.trace(query, mode="single") as trace, usage.collect() as query_usage:
+        print(f"\n{'='*60}")
+        print(f"🔍 Query: {query}")
+        print(f"{'='*60}\n")
+
+        # 1. 选择工具
+        print("🤔 Selecting appropriate tool...")
+        speculation = {}
+
+        def on_field(key, value):
+            """字段完成回调：工具名确定即预取，参数完整即开始执行"""
+            speculation[key] = value
+            if on_event:
+                on_event("selection_field", {"key": key, "value": value})
+            if key == "tool_name":
+                # 在后台加载缓存，不阻塞 LLM 流式读取
+                _prefetch_pool.submit(tracing.bind(tool_manager.prefetch), value)
+            if "future" in speculation or "tool_name" not in speculation or "parameters" not in speculation:
+                return
+            tool = tool_manager.get_tool_by_name(speculation["tool_name"])
+            if tool and isinstance(speculation["parameters"], dict):
+                print(f"⚡ Speculatively executing '{speculation['tool_name']}'...")
+                speculation["future"] = _speculative_pool.submit(
+                    tracing.bind(tool.invoke), speculation["parameters"]
+                )
+
+        with tracing.span("selection", streamed=speculative):
+            if speculative:
+                selection = stream_tool_selection(query, tool_manager, on_field=on_field)
+            else:
+                selection = simple_tool_selection(query, tool_manager)
+
+        print(f"✅ Selected: {selection['tool_name']}")
+        print(f"💡 Reasoning: {selection.get('reasoning', '')}")
+        print(f"📋 Parameters: {json.dumps(selection['parameters'], indent=2)}")
+        if on_event:
+            on_event("selection", selection)
+
+        # 2. 执行工具
+        query_usage.tool = selection['tool_name']
+        tool = tool_manager.get_tool_by_name(selection['tool_name'])
+        if not tool:
+            error_msg = f"Tool '{selection['tool_name']}' not found in tool pool"
+            print(f"❌ Error: {error_msg}")
+            result = {
+                "query": query,
+                "tool_used": selection['tool_name'],
+                "tool_result": {"success": False, "error": error_msg},
+                "final_answer": f"Error: {error_msg}"
+            }
+        else:
+            future = speculation.get("future")
+            speculated = (future is not None and speculation["tool_name"] == selection["tool_name"]
+                          and speculation["parameters"] == selection["parameters"])
+            # 推测执行时只记录剩余的等待时间，工具本身的耗时记录在 "tool" span
+            with tracing.span("tool_wait", tool=selection['tool_name'], speculative=speculated):
+                if speculated:
+                    print(f"\n⚙️  Waiting for speculative execution of '{selection['tool_name']}'...")
+                    tool_result = future.result()
+                else:
+                    print(f"\n⚙️  Executing tool '{selection['tool_name']}'...")
+                    tool_result = tool.invoke(selection['parameters'])
+
+            query_usage.from_cache = bool(tool_result.get("from_cache"))
+            if tool_result.get("success"):
+                print("✅ Tool execution succeeded")
+            else:
+                print(f"❌ Tool execution failed: {tool_result.get('error')}")
+            if on_event:
+                on_event("tool_result", tool_result)
+
+            # 3. 生成最终答案
+            print("\n🤖 Generating final answer...")
+            with tracing.span("final_answer", tool=selection['tool_name']):
+                final_answer = generate_final_answer(query, selection['tool_name'], tool_result)
+            if on_event:
+                on_event("final_answer", final_answer)
+
+            result = {
+                "query": query,
+                "tool_used": selection['tool_name'],
+                "tool_result": tool_result,
+                "final_answer": final_answer
+            }
+
+    result["trace_id"] = trace.trace_id
+    result["timings"] = trace.timings()
+    result["usage"] = query_usage.to_dict()
+    return result
 
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="Urban Computing Tool System")
+    parser.add_argument("queries", nargs="*", help="Queries to process (defaults to built-in examples)")
+    parser.add_argument("--plan", action="store_true",
+                        help="Planning mode: run several tools per query as a parallel DAG")
+    parser.add_argument("--batch", metavar="JSONL",
+                        help="Batch mode: read queries from a JSONL file ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="Test/results_batch.jsonl",
+                        help="Batch mode: JSONL file results are appended to (resumable)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Batch mode: concurrent workers")
+    parser.add_argument("--drop-payloads", action="store_true",
+                        help="Batch mode: do not store raw tool payloads in the output")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Batch mode: suppress per-query pipeline output")
+    parser.add_argument("--trace-file", help="Append per-query latency traces to this JSONL file")
+    parser.add_argument("--metrics-file", help="Write Prometheus stage latency metrics to this file on exit")
+    args = parser.parse_args()
+
+    tracing.configure(trace_file=args.trace_file, metrics_file=args.metrics_file)
+
     # 加载环境变量
     load_env()
 
@@ -207,13 +358,31 @@ def main():
     # 初始化工具管理器
     try:
         tool_manager = UrbanToolManager("./urban_tools.json")
-        print(f"\n📦 Loaded {len(tool_manager.get_tools())} tools from pool\n")
+        print(f"\n📦 Loaded {len(tool_manager.snapshot())} tools from pool\n")
     except FileNotFoundError as e:
         print(f"❌ Error: {e}")
         return
 
+    # 批量模式：结果逐条追加写入 JSONL
+    if args.batch:
+        set_concurrency(args.workers)
+
+        def process_item(item):
+            if item.get("plan", args.plan):
+                return process_planned_query(item["query"], tool_manager)
+            return process_query(item["query"], tool_manager)
+
+        with open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(devnull if args.quiet else sys.stdout):
+                summary = run_batch(args.batch, args.output, process_item,
+                                    workers=args.workers, drop_payloads=args.drop_payloads)
+        print_summary(summary, args.output)
+        usage.print_summary()
+        _write_metrics()
+        return
+
     # 示例查询（使用实际可用的 API 工具）
-    queries = [
+    queries = args.queries or [
         "Get GitHub user information for Linus Torvalds",
         "What is the weather forecast for Beijing? (coordinates: 39.9042°N, 116.4074°E)",
     ]
@@ -222,7 +391,10 @@ def main():
     results = []
     for query in queries:
         try:
-            result = process_query(query, tool_manager)
+            if args.plan:
+                result = process_planned_query(query, tool_manager)
+            else:
+                result = process_query(query, tool_manager)
             results.append(result)
 
             # 打印最终答案
@@ -245,6 +417,15 @@ def main():
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     print(f"💾 Results saved to {output_file}")
+    usage.print_summary()
+    _write_metrics()
+
+
+def _write_metrics():
+    """写出 Prometheus 指标文件（如已配置）"""
+    path = tracing.write_metrics()
+    if path:
+        print(f"📈 Metrics written to {path}")
 
 
 if __name__ == "__main__":
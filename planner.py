@@ -0,0 +1,356 @@
+"""
+多工具规划与 DAG 执行
+
+1. LLM 一次性生成工具调用依赖图（steps + depends_on）
+2. 无依赖关系的步骤并发执行，上游输出通过引用注入下游参数
+3. 全部结果汇总后只调用一次 LLM 生成最终答案
+
+参数引用语法：
+- "{{s1.result.login}}"            整个值为引用时保留原始类型
+- "User {{s1.result.name}} ..."    嵌入字符串时按文本替换
+"""
+
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, List
+
+import tracing
+import usage
+from llm import get_chat_model
+from prompts import PARAMETER_RULES
+from tool_manager import UrbanToolManager
+
+
+# {{step_id.path.to.value}}
+REFERENCE_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][\w-]*)((?:\.[\w-]+)*)\s*\}\}")
+
+
+def plan_tool_calls(query: str, tool_manager: UrbanToolManager) -> dict:
+    """
+    让 LLM 生成工具调用计划（DAG）
+
+    Args:
+        query: 用户查询
+        tool_manager: 工具管理器
+
+    Returns:
+        {"steps": [{"id", "tool_name", "parameters", "depends_on"}], "reasoning": "..."}
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm = get_chat_model(temperature=0)
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", """You are an urban computing expert.
+Given a user query, plan ALL tool calls needed to answer it.
+
+Available Tools:
+{tools}
+
+{rules}
+
+PLANNING RULES:
+- Use one step per tool call; the same tool may appear in several steps
+- Give every step a short unique id ("s1", "s2", ...)
+- Steps that need another step's output list it in "depends_on" and reference it in
+  parameters as "{{{{step_id.result.field}}}}" (use numbers for list indexes, e.g. "{{{{s1.result.items.0.name}}}}")
+- Independent steps must NOT depend on each other so they can run in parallel
+
+Respond ONLY with valid JSON in this exact format:
+{{
+  "steps": [
+    {{"id": "s1", "tool_name": "exact_tool_name_from_list", "parameters": {{"param1": "value1"}}, "depends_on": []}}
+  ],
+  "reasoning": "brief explanation of the plan"
+}}
+
+Do not include any markdown formatting or code blocks, just the raw JSON."""),
+        ("user", "{query}")
+    ])
+
+    chain = prompt | llm
+    response = chain.invoke({
+        "query": query,
+        "tools": tool_manager.get_tools_description(),
+        "rules": PARAMETER_RULES
+    })
+    usage.record("planning", response)
+
+    content = response.content.strip()
+    if content.startswith("```"):
+        content = content.split("```")[1]
+        if content.startswith("json"):
+            content = content[4:].strip()
+
+    try:
+        plan = json.loads(content)
+    except json.JSONDecodeError as e:
+        print(f"❌ Failed to parse plan as JSON: {e}")
+        print(f"Raw response: {response.content}")
+        raise
+
+    validate_plan(plan)
+    return plan
+
+
+def validate_plan(plan: dict) -> List[str]:
+    """
+    校验计划并返回拓扑序
+
+    Raises:
+        ValueError: 步骤格式错误（不是对象或缺少 id / tool_name）、步骤 id 重复、依赖不存在或存在环
+    """
+    if not isinstance(plan, dict):
+        raise ValueError(f"Plan must be an object, got {type(plan).__name__}")
+    steps = plan.get("steps", [])
+    if not isinstance(steps, list):
+        raise ValueError(f"Plan steps must be a list, got {type(steps).__name__}")
+    for step in steps:
+        if not isinstance(step, dict):
+            raise ValueError(f"Plan step must be an object, got {step!r}")
+        for field in ("id", "tool_name"):
+            if not isinstance(step.get(field), str) or not step[field]:
+                raise ValueError(f"Plan step missing '{field}': {step}")
+        if not isinstance(step.get("depends_on", []), list):
+            raise ValueError(f"Step '{step['id']}' depends_on must be a list")
+
+    ids = [step["id"] for step in steps]
+    if len(ids) != len(set(ids)):
+        raise ValueError(f"Duplicate step ids in plan: {ids}")
+
+    deps = {step["id"]: list(step.get("depends_on", [])) for step in steps}
+    for step_id, upstream in deps.items():
+        for dep in upstream:
+            if dep not in deps:
+                raise ValueError(f"Step '{step_id}' depends on unknown step '{dep}'")
+
+    # Kahn 拓扑排序检测环
+    remaining = {step_id: set(upstream) for step_id, upstream in deps.items()}
+    order = []
+    while remaining:
+        ready = [step_id for step_id, upstream in remaining.items() if not upstream]
+        if not ready:
+            raise ValueError(f"Plan contains a dependency cycle among: {sorted(remaining)}")
+        for step_id in ready:
+            order.append(step_id)
+            del remaining[step_id]
+        for upstream in remaining.values():
+            upstream.difference_update(ready)
+
+    return order
+
+
+def resolve_references(value: Any, outputs: Dict[str, dict]) -> Any:
+    """
+    将参数中的 {{step.path}} 引用替换为上游步骤的输出
+
+    Args:
+        value: 参数值（可为嵌套 dict/list）
+        outputs: 已完成步骤的结果 {step_id: tool_result}
+
+    Returns:
+        替换后的参数值
+    """
+    if isinstance(value, dict):
+        return {k: resolve_references(v, outputs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(v, outputs) for v in value]
+    if not isinstance(value, str):
+        return value
+
+    match = REFERENCE_PATTERN.fullmatch(value.strip())
+    if match:
+        return _lookup(outputs, match.group(1), match.group(2))
+
+    return REFERENCE_PATTERN.sub(
+        lambda m: str(_lookup(outputs, m.group(1), m.group(2))), value
+    )
+
+
+def _lookup(outputs: Dict[str, dict], step_id: str, path: str) -> Any:
+    """按 .a.0.b 路径取值"""
+    if step_id not in outputs:
+        raise KeyError(f"Reference to unfinished step '{step_id}'")
+
+    current = outputs[step_id]
+    for part in filter(None, path.split(".")):
+        if isinstance(current, list):
+            current = current[int(part)]
+        elif isinstance(current, dict):
+            current = current[part]
+        else:
+            raise KeyError(f"Cannot resolve '{part}' in reference to step '{step_id}'")
+    return current
+
+
+def execute_plan(plan: dict, tool_manager: UrbanToolManager, max_workers: int = 8) -> Dict[str, dict]:
+    """
+    并发执行 DAG 计划
+    一个步骤的所有上游完成后立即提交，总耗时由关键路径决定
+
+    Args:
+        plan: plan_tool_calls 生成的计划
+        tool_manager: 工具管理器
+        max_workers: 最大并发工具调用数
+
+    Returns:
+        {step_id: {"success", "result", "error", ...}}
+    """
+    validate_plan(plan)
+    steps = {step["id"]: step for step in plan.get("steps", [])}
+    pending = {step_id: set(step.get("depends_on", [])) for step_id, step in steps.items()}
+    outputs = {}
+
+    def run_step(step: dict) -> dict:
+        tool = tool_manager.get_tool_by_name(step["tool_name"])
+        if not tool:
+            return {"success": False, "result": None,
+                    "error": f"Tool '{step['tool_name']}' not found in tool pool"}
+        try:
+            parameters = resolve_references(step.get("parameters", {}), outputs)
+        except (KeyError, IndexError, ValueError) as e:
+            return {"success": False, "result": None,
+                    "error": f"Failed to resolve parameters: {str(e)}"}
+        return tool.invoke(parameters)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(steps))),
+                            thread_name_prefix="plan-step") as pool:
+        running = {}
+
+        def mark_done(step_id):
+            for upstream in pending.values():
+                upstream.discard(step_id)
+
+        def submit_ready():
+            for step_id in [s for s, upstream in pending.items() if not upstream]:
+                del pending[step_id]
+                failed = [dep for dep in steps[step_id].get("depends_on", [])
+                          if not outputs[dep].get("success")]
+                if failed:
+                    outputs[step_id] = {"success": False, "result": None,
+                                        "error": f"Skipped: upstream step(s) failed: {', '.join(failed)}"}
+                    mark_done(step_id)
+                    continue
+                print(f"⚙️  [{step_id}] Executing tool '{steps[step_id]['tool_name']}'...")
+                running[pool.submit(tracing.bind(run_step), steps[step_id])] = step_id
+
+        submit_ready()
+        while running or pending:
+            if not running:
+                # 被跳过的步骤可能释放新的就绪步骤
+                submit_ready()
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step_id = running.pop(future)
+                try:
+                    outputs[step_id] = future.result()
+                except Exception as e:
+                    outputs[step_id] = {"success": False, "result": None,
+                                        "error": f"Unexpected error: {str(e)}"}
+                status = "✅" if outputs[step_id].get("success") else "❌"
+                print(f"{status} [{step_id}] {steps[step_id]['tool_name']} finished")
+                mark_done(step_id)
+            submit_ready()
+
+    return outputs
+
+
+def generate_plan_answer(query: str, plan: dict, outputs: Dict[str, dict]) -> str:
+    """
+    用 LLM 基于所有步骤结果生成一次最终答案
+
+    Args:
+        query: 用户查询
+        plan: 执行的计划
+        outputs: 每个步骤的执行结果
+
+    Returns:
+        最终答案文本
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm = get_chat_model(temperature=0.3)
+
+    answer_prompt = ChatPromptTemplate.from_messages([
+        ("system", """You are an urban computing expert.
+Generate a clear, comprehensive answer based on the results of several tool calls.
+
+If a step failed (success=False), explain the error to the user in a friendly way
+and still answer with the information from the successful steps."""),
+        ("user", """User Query: {query}
+
+Step Results:
+{results}
+
+Please provide a comprehensive answer to the user's query based on these results.""")
+    ])
+
+    step_results = [
+        {"id": step["id"], "tool": step["tool_name"], "result": outputs.get(step["id"])}
+        for step in plan.get("steps", [])
+    ]
+
+    payload = json.dumps(step_results, indent=2)
+    # 每个步骤的结果大小，ledger 按此把本次查询的用量分摊到各个工具
+    for step_result in step_results:
+        output = step_result["result"] or {}
+        usage.record_step(step_result["tool"], len(json.dumps(step_result, indent=2)),
+                          from_cache=bool(output.get("from_cache")))
+
+    chain = answer_prompt | llm
+    final_answer = chain.invoke({
+        "query": query,
+        "results": payload
+    })
+    usage.record("final_answer", final_answer, tool="plan", payload_chars=len(payload))
+
+    return final_answer.content
+
+
+def process_planned_query(query: str, tool_manager: UrbanToolManager, max_workers: int = 8) -> dict:
+    """
+    规划模式的主流程：规划 -> 并发执行 DAG -> 一次生成答案
+
+    Args:
+        query: 用户查询
+        tool_manager: 工具管理器
+        max_workers: 最大并发工具调用数
+
+    Returns:
+        处理结果字典
+    """
+    # 固定工具池快照：热重载不影响进行中的查询
+    tool_manager = tool_manager.snapshot()
+
+    with tracing.trace(query, mode="plan") as trace, usage.collect() as query_usage:
+        print(f"\n{'='*60}")
+        print(f"🔍 Query (planning mode): {query}")
+        print(f"{'='*60}\n")
+
+        print("🗺️  Planning tool calls...")
+        with tracing.span("planning"):
+            plan = plan_tool_calls(query, tool_manager)
+        for step in plan["steps"]:
+            deps = ", ".join(step.get("depends_on", [])) or "-"
+            print(f"  [{step['id']}] {step['tool_name']} (depends on: {deps})")
+        print(f"💡 Reasoning: {plan.get('reasoning', '')}\n")
+
+        with tracing.span("plan_execution", steps=len(plan["steps"])):
+            outputs = execute_plan(plan, tool_manager, max_workers=max_workers)
+
+        print("\n🤖 Generating final answer...")
+        with tracing.span("final_answer"):
+            final_answer = generate_plan_answer(query, plan, outputs)
+
+    return {
+        "query": query,
+        "tool_used": [step["tool_name"] for step in plan["steps"]],
+        "plan": plan,
+        "tool_result": outputs,
+        "final_answer": final_answer,
+        "trace_id": trace.trace_id,
+        "timings": trace.timings(),
+        "usage": query_usage.to_dict()
+    }
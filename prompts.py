@@ -0,0 +1,12 @@
+"""
+共享的 Prompt 片段
+"""
+
+# 参数抽取规则（工具选择与多工具规划共用）
+PARAMETER_RULES = """IMPORTANT PARAMETER EXTRACTION RULES:
+- For GitHub usernames: convert to lowercase, remove spaces (e.g., "Linus Torvalds" -> "torvalds")
+- For weather_forecast (RapidAPI): Use "place" parameter with format "City,CountryCode" (e.g., "London,GB", "Beijing,CN", "Tokyo,JP")
+- For weather_forecast_free (Open-Meteo): Use "latitude" and "longitude" parameters with decimal coordinates when the query gives them; otherwise pass the city name as "place" (do not guess coordinates)
+- For coordinates queries: use the provided latitude/longitude values if available, otherwise use weather_forecast_free with location name
+- For geocode / reverse_geocode: use them when the user asks where a place is or which city is near given coordinates
+- Extract parameter values in the exact format expected by the tool"""
@@ -0,0 +1,424 @@
+"""
+HTTP 服务模式
+
+长驻进程保持工具管理器、执行器缓存和 LLM 客户端温热，
+避免每个查询都重新加载 .env、LangChain 和 urban_tools.json。
+
+接口:
+- GET  /health   服务状态
+- GET  /metrics  Prometheus 文本格式的阶段延迟指标（p50/p95/p99）
+- GET  /usage    LLM token 与成本汇总
+- POST /query    {"query": "...", "plan": false}            -> 处理结果
+- POST /batch    {"queries": ["...", {"query": "..."}]}     -> 结果列表
+- POST /stream   {"query": "..."}                            -> NDJSON 事件流（chunked）
+
+运行:
+    python server.py --port 8080 --concurrency 8
+"""
+
+import json
+import signal
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import tracing
+import usage
+
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+# 请求体上限
+MAX_BODY_BYTES = 1 << 20
+
+_DONE = object()
+
+
+class HTTPError(Exception):
+    """带状态码的请求错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class UrbanServer:
+    """基于 asyncio 的轻量 HTTP 服务"""
+
+    def __init__(self, process_fn: Callable[[Dict, Optional[Callable]], Dict],
+                 host: str = "127.0.0.1", port: int = 8080, concurrency: int = 8,
+                 info: Optional[Dict] = None):
+        """
+        初始化服务
+
+        Args:
+            process_fn: 查询处理函数 process_fn(item, on_event) -> result dict（在线程池中运行）
+            host: 监听地址
+            port: 监听端口（0 表示随机端口）
+            concurrency: 同时处理的查询数上限
+            info: /health 附带的信息（值可以是无参函数，每次请求时求值）
+        """
+        self.process_fn = process_fn
+        self.host = host
+        self.port = port
+        self.concurrency = concurrency
+        self.info = info or {}
+
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="urban-server")
+        self._semaphore = None
+        self._server = None
+        self._stopping = None
+        self._connections = set()
+        self._busy = 0
+        self._idle = None
+
+    async def start(self):
+        """开始监听"""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._stopping = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"🚀 Serving on http://{self.host}:{self.port} (concurrency={self.concurrency})")
+
+    async def serve_forever(self, grace: float = 30.0):
+        """运行直到收到 SIGINT/SIGTERM，然后优雅退出"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.request_shutdown)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        await self._stopping.wait()
+        await self.shutdown(grace)
+
+    def request_shutdown(self):
+        """请求优雅退出（可在事件循环线程中调用）"""
+        if not self._stopping.is_set():
+            print("\n🛑 Shutdown requested, draining in-flight requests...")
+            self._stopping.set()
+
+    async def shutdown(self, grace: float = 30.0):
+        """
+        优雅退出：停止接受新连接，等待进行中的请求完成后关闭
+
+        Args:
+            grace: 等待进行中请求的最长时间（秒）
+        """
+        self._stopping.set()
+        self._server.close()
+
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=grace)
+        except asyncio.TimeoutError:
+            print(f"⚠️  {self._busy} request(s) still running after {grace}s, closing anyway")
+
+        # 剩余的都是空闲的 keep-alive 连接
+        for task in list(self._connections):
+            task.cancel()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        print("👋 Server stopped")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个连接（支持 keep-alive）"""
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while not self._stopping.is_set():
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+
+                self._enter()
+                try:
+                    await self._dispatch(writer, method, path, body, keep_alive and not self._stopping.is_set())
+                finally:
+                    self._leave()
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    def _enter(self):
+        self._busy += 1
+        self._idle.clear()
+
+    def _leave(self):
+        self._busy -= 1
+        if self._busy == 0:
+            self._idle.set()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """读取一个 HTTP/1.1 请求，连接关闭时返回 None"""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(400, "Request header too large")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, path, _version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b""
+
+        return method.upper(), path.split("?", 1)[0], headers, body
+
+    async def _dispatch(self, writer, method: str, path: str, body: bytes, keep_alive: bool):
+        """路由请求"""
+        routes = {
+            "/health": ("GET", self._health),
+            "/metrics": ("GET", self._metrics),
+            "/usage": ("GET", self._usage),
+            "/query": ("POST", self._query),
+            "/batch": ("POST", self._batch),
+            "/stream": ("POST", self._stream),
+        }
+
+        if path not in routes:
+            await self._send_json(writer, 404, {"error": f"Unknown path: {path}"}, keep_alive)
+            return
+        expected, handler = routes[path]
+        if method != expected:
+            await self._send_json(writer, 405, {"error": f"{path} only accepts {expected}"}, keep_alive)
+            return
+
+        try:
+            payload = json.loads(body) if body else {}
+        except json.JSONDecodeError as e:
+            await self._send_json(writer, 400, {"error": f"Invalid JSON body: {e}"}, keep_alive)
+            return
+
+        try:
+            await handler(writer, payload, keep_alive)
+        except HTTPError as e:
+            await self._send_json(writer, e.status, {"error": str(e)}, keep_alive)
+
+    async def _health(self, writer, payload: Dict, keep_alive: bool):
+        await self._send_json(writer, 200, {
+            "status": "stopping" if self._stopping.is_set() else "ok",
+            "in_flight": self._busy,
+            "concurrency": self.concurrency,
+            **{key: value() if callable(value) else value for key, value in self.info.items()}
+        }, keep_alive)
+
+    async def _metrics(self, writer, payload: Dict, keep_alive: bool):
+        """Prometheus 文本格式的阶段延迟指标"""
+        body = tracing.metrics.to_prometheus().encode()
+        head = (
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def _usage(self, writer, payload: Dict, keep_alive: bool):
+        """LLM token 与成本汇总（按工具和整个进程）"""
+        await self._send_json(writer, 200, usage.ledger.summary(), keep_alive)
+
+    async def _query(self, writer, payload: Dict, keep_alive: bool):
+        item = self._parse_item(payload)
+        try:
+            result = await self._run(item)
+        except HTTPError:
+            raise
+        except Exception as e:
+            await self._send_json(writer, 500, {"query": item["query"], "error": str(e)}, keep_alive)
+            return
+        await self._send_json(writer, 200, result, keep_alive)
+
+    async def _batch(self, writer, payload: Dict, keep_alive: bool):
+        queries = payload.get("queries")
+        if not isinstance(queries, list):
+            raise HTTPError(400, "'queries' must be a list")
+        items = [self._parse_item(q if isinstance(q, dict) else {"query": q}) for q in queries]
+
+        async def run_one(item):
+            try:
+                return {"status": "ok", **(await self._run(item))}
+            except Exception as e:
+                return {"status": "error", "query": item["query"], "error": str(e)}
+
+        results = await asyncio.gather(*(run_one(item) for item in items))
+        await self._send_json(writer, 200, {"results": results}, keep_alive)
+
+    async def _stream(self, writer, payload: Dict, keep_alive: bool):
+        """以 NDJSON 分块流式返回处理进度"""
+        item = self._parse_item(payload)
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def on_event(event: str, data: Any):
+            # 在工作线程中调用
+            loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+        writer.write((
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: application/x-ndjson; charset=utf-8\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode())
+        await writer.drain()
+
+        future = asyncio.ensure_future(self._run(item, on_event))
+        future.add_done_callback(lambda _: queue.put_nowait((_DONE, None)))
+
+        while True:
+            event, data = await queue.get()
+            if event is _DONE:
+                break
+            await self._write_chunk(writer, {"event": event, "data": data})
+
+        try:
+            await self._write_chunk(writer, {"event": "result", "data": future.result()})
+        except Exception as e:
+            await self._write_chunk(writer, {"event": "error", "data": str(e)})
+
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _run(self, item: Dict, on_event: Optional[Callable] = None) -> Dict:
+        """在并发上限内于线程池中执行查询"""
+        if self._stopping.is_set():
+            raise HTTPError(503, "Server is shutting down")
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.process_fn, item, on_event)
+
+    def _parse_item(self, payload: Any) -> Dict:
+        if not isinstance(payload, dict) or not isinstance(payload.get("query"), str):
+            raise HTTPError(400, "Body must be a JSON object with a 'query' string")
+        return payload
+
+    async def _write_chunk(self, writer, obj: Dict):
+        line = (json.dumps(obj, ensure_ascii=False, default=str) + "\n").encode()
+        writer.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+        await writer.drain()
+
+    async def _send_json(self, writer, status: int, payload: Any, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode()
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+
+def build_pipeline(config_path: str = "./urban_tools.json", concurrency: int = 8):
+    """
+    加载环境与工具池并预热 LLM 客户端（服务启动时只做一次）
+
+    Args:
+        config_path: 工具池配置
+        concurrency: 查询并发数（推测执行线程池按此调整大小）
+
+    Returns:
+        (tool_manager, process_fn)
+    """
+    from main import load_env, process_query, set_concurrency
+    from planner import process_planned_query
+    from llm import get_chat_model
+    from tool_manager import UrbanToolManager
+
+    load_env()
+    set_concurrency(concurrency)
+    tool_manager = UrbanToolManager(config_path)
+    get_chat_model(temperature=0)
+    get_chat_model(temperature=0.3)
+
+    def process(item: Dict, on_event: Optional[Callable] = None) -> Dict:
+        if item.get("plan"):
+            return process_planned_query(item["query"], tool_manager)
+        return process_query(item["query"], tool_manager, on_event=on_event)
+
+    return tool_manager, process
+
+
+def main():
+    """服务入口"""
+    parser = argparse.ArgumentParser(description="Urban Computing Tool System - HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=8, help="Max queries processed at once")
+    parser.add_argument("--config", default="./urban_tools.json", help="Tool pool configuration")
+    parser.add_argument("--grace", type=float, default=30.0,
+                        help="Seconds to wait for in-flight requests on shutdown")
+    parser.add_argument("--trace-file", help="Append per-query latency traces to this JSONL file")
+    parser.add_argument("--watch", action="store_true",
+                        help="Hot-reload the tool pool when the configuration file changes")
+    args = parser.parse_args()
+
+    tracing.configure(trace_file=args.trace_file)
+
+    tool_manager, process = build_pipeline(args.config, args.concurrency)
+    print(f"📦 Loaded {len(tool_manager.snapshot())} tools from pool")
+
+    if args.watch:
+        def on_reload(diff, error):
+            if error:
+                print(f"⚠️  Tool pool reload failed, keeping current tools: {error}")
+            else:
+                print(f"🔄 Tool pool reloaded: +{len(diff['added'])} -{len(diff['removed'])} "
+                      f"~{len(diff['changed'])} ({len(diff['unchanged'])} unchanged)")
+        tool_manager.watch(on_reload=on_reload)
+        print(f"👀 Watching {args.config} for changes")
+
+    server = UrbanServer(process, args.host, args.port, args.concurrency,
+                         info={"tools": lambda: len(tool_manager.snapshot())})
+
+    async def run():
+        await server.start()
+        await server.serve_forever(grace=args.grace)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -2,91 +2,520 @@
 模块化工具池管理器
 """
 
+import re
 import json
-from typing import List, Dict, Any
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 from pathlib import Path
-from langchain.tools import StructuredTool
+from collections import ChainMap
+from collections.abc import Mapping
 
-from executors import MCPExecutor, APIExecutor, CodeExecutor
+import tracing
+from executors import ExecutorRegistry
+from tool_snapshot import (TOOL_TYPES, build_keyword_index, index_tool_pool, load_snapshot, parse_tool_pool,
+                           warm_tools)
+
+# LangChain / pydantic 在第一次构建工具时才导入，列出工具和生成描述不需要它们
+if TYPE_CHECKING:
+    from langchain_core.tools import StructuredTool
+
+
+class ToolRegistry:
+    """
+    工具池的不可变快照（按名称索引）
+
+    工具以轻量描述符 (类型, 配置) 注册，参数 schema 和 StructuredTool
+    在第一次访问时才构建并缓存，启动时不再为每个工具付出构建开销。
+    热重载时构建新的快照并整体替换；查询开始时持有一个快照，
+    整个查询过程中看到的工具集合保持一致。
+    """
+
+    def __init__(self, entries: Mapping, build_tool: Callable[[str, Dict], "StructuredTool"],
+                 executors: Dict[str, Any], built: Dict[str, "StructuredTool"] = None,
+                 description: str = None, keyword_index=None):
+        """
+        Args:
+            entries: {工具名: (类型, 配置)}，按配置文件顺序（快照中为延迟解码的映射）
+            build_tool: build_tool(tool_type, config) -> StructuredTool
+            executors: 执行器注册表（按工具类型延迟创建）
+            built: 已构建、可直接复用的工具 {工具名: StructuredTool}
+            description: 预先生成的工具描述（来自快照）
+            keyword_index: 预先构建的关键词索引（来自快照，JSON 编码，第一次检索时解码）
+        """
+        self.configs = entries
+        self.executors = executors
+        self._build_tool = build_tool
+        self._built = dict(built or {})
+        self._build_lock = threading.Lock()
+        self._by_type = None
+        self._description = description
+        self._keyword_index = keyword_index
+
+    def __len__(self) -> int:
+        return len(self.configs)
+
+    def snapshot(self) -> "ToolRegistry":
+        """快照本身不可变"""
+        return self
+
+    def _configs_of(self, tool_type: str) -> List[Dict]:
+        if self._by_type is None:
+            by_type = {t: [] for t in TOOL_TYPES}
+            for tool_type_, config in self.configs.values():
+                by_type.setdefault(tool_type_, []).append(config)
+            self._by_type = by_type
+        return self._by_type.get(tool_type, [])
+
+    @property
+    def tool_types(self) -> List[str]:
+        """工具池中出现的全部类型（内置类型在前）"""
+        self._configs_of("mcp")
+        return [t for t, configs in self._by_type.items() if configs]
+
+    @property
+    def mcp_tools(self) -> List[Dict]:
+        return self._configs_of("mcp")
+
+    @property
+    def api_tools(self) -> List[Dict]:
+        return self._configs_of("api")
+
+    @property
+    def code_tools(self) -> List[Dict]:
+        return self._configs_of("code")
+
+    @property
+    def built_tools(self) -> Dict[str, "StructuredTool"]:
+        """已构建的工具（热重载时复用）"""
+        return dict(self._built)
+
+    @property
+    def langchain_tools(self) -> List["StructuredTool"]:
+        return self.get_tools()
+
+    def get_tools(self) -> List["StructuredTool"]:
+        """获取所有 LangChain 工具（会构建全部工具）"""
+        return [self.get_tool_by_name(name) for name in self.configs]
+
+    def get_tool_by_name(self, name: str) -> "StructuredTool":
+        """根据名称获取工具（首次访问时构建）"""
+        tool = self._built.get(name)
+        if tool is not None:
+            return tool
+        entry = self.configs.get(name)
+        if entry is None:
+            return None
+        with self._build_lock:
+            tool = self._built.get(name)
+            if tool is None:
+                tool = self._built[name] = self._build_tool(*entry)
+        return tool
+
+    def get_config(self, name: str) -> Dict:
+        """根据名称获取工具配置"""
+        entry = self.configs.get(name)
+        return entry[1] if entry else None
+
+    def prefetch(self, name: str):
+        """
+        预取工具（流式选择时工具名一确定就调用）
+        让对应执行器提前把该工具的缓存加载到内存
+
+        Args:
+            name: 工具名称
+        """
+        entry = self.configs.get(name)
+        if not entry:
+            return
+        tool_type, config = entry
+        executor = self.executors[tool_type]
+        if hasattr(executor, "prefetch"):
+            with tracing.span("prefetch", tool=name):
+                executor.prefetch(config)
+
+    def list_tools(self) -> List[Dict[str, str]]:
+        """列出所有工具的基本信息"""
+        return [
+            {"name": name, "type": tool_type, "description": config["description"]}
+            for name, (tool_type, config) in self.configs.items()
+        ]
+
+    def search_tools(self, text: str, limit: int = 10) -> List[str]:
+        """
+        按关键词检索工具（名称、描述、参数名、能力）
+
+        Args:
+            text: 检索文本
+            limit: 最多返回的工具数
+
+        Returns:
+            按命中词数排序的工具名列表
+        """
+        if self._keyword_index is None:
+            self._keyword_index = build_keyword_index(self.configs)
+        elif isinstance(self._keyword_index, bytes):
+            self._keyword_index = json.loads(self._keyword_index)
+        scores = {}
+        for word in set(re.findall(r"[a-z0-9]+", text.lower())):
+            for name in self._keyword_index.get(word, []):
+                scores[name] = scores.get(name, 0) + 1
+        return sorted(scores, key=lambda name: -scores[name])[:limit]
+
+    def get_tools_description(self) -> str:
+        """获取格式化的工具描述（用于 LLM Prompt，每个快照只生成一次）"""
+        if self._description is None:
+            self._description = self._format_description()
+        return self._description
+
+    def _format_description(self) -> str:
+        descriptions = []
+        idx = 1
+
+        # MCP 工具
+        if self.mcp_tools:
+            descriptions.append("\n=== MCP Services ===")
+            for config in self.mcp_tools:
+                desc = f"{idx}. {config['name']} (MCP)\n"
+                desc += f"   {config['description']}\n"
+                if "capabilities" in config:
+                    desc += f"   Capabilities: {', '.join(config['capabilities'])}\n"
+                descriptions.append(desc)
+                idx += 1
+
+        # API 工具
+        if self.api_tools:
+            descriptions.append("\n=== REST APIs ===")
+            for config in self.api_tools:
+                desc = f"{idx}. {config['name']} (API)\n"
+                desc += f"   {config['description']}\n"
+                if "params" in config:
+                    required_params = [
+                        k for k, v in config["params"].items()
+                        if v.get("required", False)
+                    ]
+                    if required_params:
+                        desc += f"   Required params: {', '.join(required_params)}\n"
+                descriptions.append(desc)
+                idx += 1
+
+        # 代码工具
+        if self.code_tools:
+            descriptions.append("\n=== GitHub Code Tools ===")
+            for config in self.code_tools:
+                desc = f"{idx}. {config['name']} (Code)\n"
+                desc += f"   {config['description']}\n"
+                descriptions.append(desc)
+                idx += 1
+
+        # 第三方执行器的工具
+        for tool_type in self.tool_types:
+            if tool_type in TOOL_TYPES:
+                continue
+            descriptions.append(f"\n=== {tool_type.upper()} Tools ===")
+            for config in self._configs_of(tool_type):
+                desc = f"{idx}. {config['name']} ({tool_type})\n"
+                desc += f"   {config['description']}\n"
+                if "params" in config:
+                    required_params = [k for k, v in config["params"].items() if v.get("required", False)]
+                    if required_params:
+                        desc += f"   Required params: {', '.join(required_params)}\n"
+                descriptions.append(desc)
+                idx += 1
+
+        return "\n".join(descriptions)
 
 
 class UrbanToolManager:
     """Urban Computing 工具池管理器"""
 
-    def __init__(self, config_path: str = "./urban_tools.json"):
+    def __init__(self, config_path: str = "./urban_tools.json", cache_root: str = "./Cache",
+                 use_snapshot: bool = True, warm: bool = True):
         """
         初始化工具管理器
 
         Args:
             config_path: 工具配置文件路径
+            cache_root: 执行器缓存根目录（各执行器使用其下与工具类型同名的子目录）
+            use_snapshot: 存在与 JSON 一致的预编译快照时直接加载（见 tool_snapshot.py）
+            warm: 在后台预先启动配置了 warm: true 的工具的服务（见 warm_up）
         """
-        config_file = Path(config_path)
-        if not config_file.exists():
+        self.config_path = Path(config_path)
+        self.use_snapshot = use_snapshot
+        self.warm = warm
+        if not self.config_path.exists():
             raise FileNotFoundError(f"Tool configuration file not found: {config_path}")
 
-        # 加载配置
-        with open(config_file) as f:
-            data = json.load(f)
-            self.mcp_tools = data.get("mcp_tools", [])
-            self.api_tools = data.get("api_tools", [])
-            self.code_tools = data.get("code_tools", [])
+        # 执行器按工具类型在第一次使用时创建（由不同开发者实现，可通过配置/入口点扩展）
+        self.executors = ExecutorRegistry(cache_root)
+
+        # 参数定义相同的工具共享同一个 schema 模型
+        self._schema_cache = {}
+        self._schema_lock = threading.Lock()
+
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._watch_stop = threading.Event()
+
+        # 加载配置并构建工具（持有重载锁：后台转换完成的回调会等待初始化结束）
+        with self._reload_lock:
+            self._mtime = self.config_path.stat().st_mtime
+            pool = self._load_pool()
+            self._registry = self._build_registry(pool)
+        if warm:
+            self.warm_up(pool["warm"])
+
+    # ---------- 快照与热重载 ----------
 
-        # 初始化三个独立的执行器（由不同开发者实现）
-        self.mcp_executor = MCPExecutor()
-        self.api_executor = APIExecutor()
-        self.code_executor = CodeExecutor()
+    def snapshot(self) -> ToolRegistry:
+        """当前工具池快照（查询开始时获取，保证查询内视图一致）"""
+        return self._registry
 
-        # LangChain 工具列表
-        self.langchain_tools = []
+    @property
+    def mcp_executor(self):
+        return self.executors.get("mcp")
 
-        # 构建工具
-        self._build_langchain_tools()
+    @property
+    def api_executor(self):
+        return self.executors.get("api")
 
-    def _build_langchain_tools(self):
-        """将配置转换为 LangChain Tools"""
+    @property
+    def code_executor(self):
+        return self.executors.get("code")
 
-        # 注册 MCP 工具
-        for config in self.mcp_tools:
-            self._register_tool("mcp", config, self.mcp_executor)
+    @property
+    def mcp_tools(self) -> List[Dict]:
+        return self._registry.mcp_tools
 
-        # 注册 API 工具
-        for config in self.api_tools:
-            self._register_tool("api", config, self.api_executor)
+    @property
+    def api_tools(self) -> List[Dict]:
+        return self._registry.api_tools
 
-        # 注册代码工具
-        for config in self.code_tools:
-            self._register_tool("code", config, self.code_executor)
+    @property
+    def code_tools(self) -> List[Dict]:
+        return self._registry.code_tools
 
-    def _register_tool(self, tool_type: str, config: Dict, executor):
+    @property
+    def langchain_tools(self) -> List["StructuredTool"]:
+        return self._registry.get_tools()
+
+    def _load_pool(self) -> Dict[str, Any]:
+        """
+        读取工具池：优先使用与 JSON 一致的预编译快照，否则解析并校验 JSON
+
+        Returns:
+            {"entries": {工具名: (类型, 配置)}, "warm": [工具名], "description": str | None,
+             "keyword_index": ... | None}
+
+        Raises:
+            ValueError: 配置无效，或某个工具类型没有可用的执行器
+        """
+        data = self.config_path.read_bytes()
+        pool = load_snapshot(self.config_path, data=data) if self.use_snapshot else None
+        self.loaded_from_snapshot = pool is not None
+        if pool is None:
+            configs, executors, mcp_servers, code_repos = parse_tool_pool(data)
+            pool = {
+                "entries": index_tool_pool(configs),
+                "tool_types": {tool_type for tool_type, tool_configs in configs.items() if tool_configs},
+                "executors": executors,
+                "mcp_servers": mcp_servers,
+                "code_repos": code_repos,
+                "warm": None,
+                "description": None,
+                "keyword_index": None,
+            }
+
+        if pool["warm"] is None:
+            pool["warm"] = warm_tools(pool["entries"])
+        for tool_type in pool["tool_types"]:
+            if tool_type not in pool["executors"] and not self.executors.supports(tool_type):
+                raise ValueError(f"No executor registered for tool type '{tool_type}'")
+        self.executors.configure(pool["executors"])
+        if pool["mcp_servers"] or pool["code_repos"]:
+            self._add_discovered_tools(pool)
+        return pool
+
+    def _add_discovered_tools(self, pool: Dict[str, Any]):
+        """
+        把 mcp_servers 中发现的工具和 code_repos 转换出的工具加入工具池
+        （schema 来自 Cache/mcp 的发现缓存和 Cache/code 的转换缓存）
+        与手写配置重名时以手写配置为准；预生成的描述和关键词索引随之失效
+        代码仓库默认在后台转换，完成后自动重新加载工具池
+        """
+        discovered = {}
+        for server in pool["mcp_servers"]:
+            for config in self.mcp_executor.discover(server):
+                if config["name"] not in pool["entries"]:
+                    discovered[config["name"]] = ("mcp", config)
+        for repo in pool["code_repos"]:
+            for config in self.code_executor.discover(repo, background=repo.get("background", True),
+                                                      on_ready=self._on_code_tools_converted):
+                if config["name"] not in pool["entries"] and config["name"] not in discovered:
+                    discovered[config["name"]] = ("code", config)
+        if not discovered:
+            return
+
+        # 两者没有重名，ChainMap 按 pool["entries"] 在前的顺序迭代
+        pool["entries"] = ChainMap(discovered, pool["entries"])
+        pool["tool_types"] = pool["tool_types"] | {tool_type for tool_type, _ in discovered.values()}
+        pool["warm"] = pool["warm"] + warm_tools(discovered)
+        pool["description"] = pool["keyword_index"] = None
+
+    def _on_code_tools_converted(self):
+        """后台转换完成：重新加载工具池，注册新提交的代码工具"""
+        try:
+            diff = self.reload()
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Failed to reload tools after code conversion: {e}")
+            return
+        print(f"🔄 Code tools converted: {len(diff['added'])} added, {len(diff['changed'])} changed, "
+              f"{len(diff['removed'])} removed")
+
+    def _build_registry(self, pool: Dict[str, Any], previous: ToolRegistry = None,
+                        unchanged: set = frozenset()) -> ToolRegistry:
+        """构建快照；unchanged 中已构建的工具直接复用 previous 中的对象"""
+        built = {}
+        if previous is not None:
+            built = {name: tool for name, tool in previous.built_tools.items() if name in unchanged}
+        return ToolRegistry(pool["entries"], self._register_tool, self.executors, built,
+                            description=pool.get("description"), keyword_index=pool.get("keyword_index"))
+
+    def reload(self) -> Dict[str, List[str]]:
+        """
+        重新加载配置文件，只重建新增或变化的工具，然后原子替换快照
+        配置无效时抛出异常，当前快照保持不变
+
+        Returns:
+            {"added": [...], "removed": [...], "changed": [...], "unchanged": [...]}
+        """
+        with self._reload_lock:
+            self._mtime = self.config_path.stat().st_mtime
+            pool = self._load_pool()
+            new_entries = pool["entries"]
+            current = self._registry
+
+            diff = {"added": [], "removed": [], "changed": [], "unchanged": []}
+            for name, entry in new_entries.items():
+                if name not in current.configs:
+                    diff["added"].append(name)
+                elif current.configs[name] == entry:
+                    diff["unchanged"].append(name)
+                else:
+                    diff["changed"].append(name)
+            diff["removed"] = [name for name in current.configs if name not in new_entries]
+
+            if diff["added"] or diff["removed"] or diff["changed"]:
+                self._registry = self._build_registry(pool, current, set(diff["unchanged"]))
+            if self.warm:
+                self.warm_up([name for name in pool["warm"] if name not in diff["unchanged"]])
+            return diff
+
+    def warm_up(self, names: List[str]) -> Optional[threading.Thread]:
+        """
+        在后台预先启动工具的服务（如 MCP 服务进程），让第一次调用不必等待启动
+        执行器需实现 warm(config)，未实现的类型忽略
+
+        Args:
+            names: 工具名列表
+
+        Returns:
+            后台线程（没有需要预热的工具时为 None）
+        """
+        if not names:
+            return None
+        registry = self._registry
+
+        def run():
+            for name in names:
+                tool_type, config = registry.configs[name]
+                executor = self.executors[tool_type]
+                if hasattr(executor, "warm"):
+                    with tracing.span("warm", tool=name):
+                        executor.warm(config)
+
+        thread = threading.Thread(target=run, name="tool-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def watch(self, interval: float = 1.0, on_reload=None):
+        """
+        后台轮询配置文件，修改后自动热重载
+
+        Args:
+            interval: 轮询间隔（秒）
+            on_reload: 回调 on_reload(diff, error)（重载或回调出错时监听继续）
+        """
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._watch_stop.clear()
+
+        def loop():
+            while not self._watch_stop.wait(interval):
+                try:
+                    if self.config_path.stat().st_mtime == self._mtime:
+                        continue
+                    diff, error = self.reload(), None
+                except Exception as e:
+                    # 文件写到一半或配置无效（含条目字段类型错误）：保留旧快照，等待下一次修改
+                    try:
+                        self._mtime = self.config_path.stat().st_mtime
+                    except OSError:
+                        self._mtime = None
+                    diff, error = None, e
+                    if not on_reload:
+                        print(f"⚠️  Tool pool reload failed, keeping current tools: {e}")
+                if on_reload:
+                    try:
+                        on_reload(diff, error)
+                    except Exception as e:
+                        print(f"⚠️  Tool pool reload callback failed: {e}")
+
+        self._watcher = threading.Thread(target=loop, name="tool-config-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """停止配置文件监听"""
+        self._watch_stop.set()
+        if self._watcher:
+            self._watcher.join()
+            self._watcher = None
+
+    # ---------- 工具构建 ----------
+
+    def _register_tool(self, tool_type: str, config: Dict, executor=None) -> "StructuredTool":
         """
-        注册工具（统一接口）
+        构建工具（统一接口）
 
         Args:
             tool_type: 工具类型 (mcp/api/code)
             config: 工具配置
-            executor: 对应的执行器
+            executor: 对应的执行器（默认在调用时按工具类型从注册表获取）
+
+        Returns:
+            LangChain StructuredTool
         """
-        from pydantic import BaseModel, Field, create_model
+        from langchain_core.tools import StructuredTool
 
         def tool_func(**kwargs):
-            """工具函数包装器"""
-            return executor.execute(config, kwargs)
+            """工具函数包装器（执行器在第一次调用时创建）"""
+            with tracing.span("tool", tool=config["name"], type=tool_type) as span:
+                result = (executor or self.executors.get(tool_type)).execute(config, kwargs)
+                span.set(success=result.get("success"), from_cache=result.get("from_cache", False))
+            return result
 
         # 构建参数 schema
         args_schema = self._build_args_schema(config, tool_type)
 
-        lc_tool = StructuredTool.from_function(
+        return StructuredTool.from_function(
             func=tool_func,
             name=config["name"],
             description=config["description"],
             args_schema=args_schema if args_schema else None
         )
 
-        self.langchain_tools.append(lc_tool)
-
     def _build_args_schema(self, config: Dict, tool_type: str):
         """
-        构建工具参数的 Pydantic schema
+        构建工具参数的 Pydantic schema（相同参数定义只生成一次）
 
         Args:
             config: 工具配置
@@ -95,18 +524,21 @@ class UrbanToolManager:
         Returns:
             Pydantic 模型类或 None
         """
-        from pydantic import BaseModel, Field, create_model
-
-        # 获取参数定义
-        if tool_type == "api":
-            params_def = config.get("params", {})
-        else:
-            # MCP 和 Code 工具的参数定义
-            params_def = config.get("params", {})
-
+        # MCP、API 和 Code 工具都使用 params 定义参数
+        params_def = config.get("params", {})
         if not params_def:
             return None
 
+        key = json.dumps(params_def, sort_keys=True, default=str)
+        with self._schema_lock:
+            if key not in self._schema_cache:
+                self._schema_cache[key] = self._create_args_model(params_def)
+            return self._schema_cache[key]
+
+    def _create_args_model(self, params_def: Dict):
+        """根据参数定义生成 Pydantic 模型"""
+        from pydantic import Field, create_model
+
         # 构建 Pydantic 字段
         fields = {}
         for param_name, param_info in params_def.items():
@@ -122,6 +554,10 @@ class UrbanToolManager:
                 python_type = int
             elif param_type == "boolean":
                 python_type = bool
+            elif param_type == "array":
+                python_type = list
+            elif param_type == "object":
+                python_type = dict
 
             # 构建字段
             if required:
@@ -132,91 +568,31 @@ class UrbanToolManager:
 
         # 创建动态模型
         if fields:
-            model = create_model("ToolArgs", **fields)
-            return model
+            return create_model("ToolArgs", **fields)
 
         return None
 
-    def get_tools(self) -> List[StructuredTool]:
+    # ---------- 查询接口（委托给当前快照） ----------
+
+    def get_tools(self) -> List["StructuredTool"]:
         """获取所有 LangChain 工具"""
-        return self.langchain_tools
+        return self._registry.get_tools()
 
-    def get_tool_by_name(self, name: str) -> StructuredTool:
+    def get_tool_by_name(self, name: str) -> "StructuredTool":
         """根据名称获取工具"""
-        for tool in self.langchain_tools:
-            if tool.name == name:
-                return tool
-        return None
+        return self._registry.get_tool_by_name(name)
+
+    def prefetch(self, name: str):
+        """预取工具缓存（见 ToolRegistry.prefetch）"""
+        self._registry.prefetch(name)
 
     def list_tools(self) -> List[Dict[str, str]]:
         """列出所有工具的基本信息"""
-        tools_info = []
-
-        for config in self.mcp_tools:
-            tools_info.append({
-                "name": config["name"],
-                "type": "mcp",
-                "description": config["description"]
-            })
-
-        for config in self.api_tools:
-            tools_info.append({
-                "name": config["name"],
-                "type": "api",
-                "description": config["description"]
-            })
-
-        for config in self.code_tools:
-            tools_info.append({
-                "name": config["name"],
-                "type": "code",
-                "description": config["description"]
-            })
-
-        return tools_info
+        return self._registry.list_tools()
 
     def get_tools_description(self) -> str:
         """获取格式化的工具描述（用于 LLM Prompt）"""
-        descriptions = []
-        idx = 1
-
-        # MCP 工具
-        if self.mcp_tools:
-            descriptions.append("\n=== MCP Services ===")
-            for config in self.mcp_tools:
-                desc = f"{idx}. {config['name']} (MCP)\n"
-                desc += f"   {config['description']}\n"
-                if "capabilities" in config:
-                    desc += f"   Capabilities: {', '.join(config['capabilities'])}\n"
-                descriptions.append(desc)
-                idx += 1
-
-        # API 工具
-        if self.api_tools:
-            descriptions.append("\n=== REST APIs ===")
-            for config in self.api_tools:
-                desc = f"{idx}. {config['name']} (API)\n"
-                desc += f"   {config['description']}\n"
-                if "params" in config:
-                    required_params = [
-                        k for k, v in config["params"].items()
-                        if v.get("required", False)
-                    ]
-                    if required_params:
-                        desc += f"   Required params: {', '.join(required_params)}\n"
-                descriptions.append(desc)
-                idx += 1
-
-        # 代码工具
-        if self.code_tools:
-            descriptions.append("\n=== GitHub Code Tools ===")
-            for config in self.code_tools:
-                desc = f"{idx}. {config['name']} (Code)\n"
-                desc += f"   {config['description']}\n"
-                descriptions.append(desc)
-                idx += 1
-
-        return "\n".join(descriptions)
+        return self._registry.get_tools_description()
 
 
 # 测试代码
@@ -230,7 +606,7 @@ if __name__ == "__main__":
     print(manager.get_tools_description())
 
     print(f"\n{'=' * 60}")
-    print(f"Total: {len(manager.get_tools())} tools loaded")
+    print(f"Total: {len(manager.snapshot())} tools loaded")
     print(f"  - MCP tools: {len(manager.mcp_tools)}")
     print(f"  - API tools: {len(manager.api_tools)}")
     print(f"  - Code tools: {len(manager.code_tools)}")
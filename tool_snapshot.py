@@ -0,0 +1,258 @@
+"""
+工具池预编译快照
+
+把 urban_tools.json 编译成带版本号的二进制快照（pickle），包含：
+- 工具名与类型的索引，以及自定义执行器声明
+- 需要预热（warm: true）的工具名
+- 自动发现工具的 MCP 服务声明（mcp_servers；发现的工具来自 Cache/mcp 的缓存，不写入快照）
+- 自动转换为工具的代码仓库声明（code_repos；转换结果在 Cache/code，不写入快照）
+- 每个工具校验后的配置（单独序列化，第一次访问时才解码）
+- 预先生成的工具描述文本（get_tools_description）
+- 关键词索引（ToolRegistry.search_tools，第一次检索时才解码）
+
+UrbanToolManager 启动时若快照的源文件哈希与当前 JSON 一致，直接加载快照，
+跳过 JSON 解析、校验和描述生成，也不会为每个工具创建配置字典；
+不一致（或版本不符）时回退到 JSON。
+
+快照只应由本项目生成和读取（pickle 不能加载不可信的文件）。
+
+运行:
+    python tool_snapshot.py                        # 编译 ./urban_tools.json
+    python tool_snapshot.py --config pool.json -o pool.snapshot
+"""
+
+import os
+import re
+import json
+import pickle
+import hashlib
+import argparse
+from pathlib import Path
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+TOOL_TYPES = ("mcp", "api", "code")
+
+SNAPSHOT_MAGIC = b"URBANSNAP"
+SNAPSHOT_VERSION = 5
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def default_snapshot_path(config_path) -> Path:
+    """默认快照路径：与 JSON 同目录，扩展名为 .snapshot"""
+    return Path(config_path).with_suffix(".snapshot")
+
+
+def source_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_tool_pool(data: bytes) -> Tuple[Dict[str, List[Dict]], Dict, List[Dict], List[Dict]]:
+    """
+    解析并校验工具池配置
+
+    除内置的 mcp_tools / api_tools / code_tools 外，任何 "<类型>_tools" 列表都视为
+    一种工具类型，由 "executors" 中声明（或通过入口点注册）的执行器处理。
+    "mcp_servers" 中声明的服务由 MCPExecutor.discover 发现其工具，
+    "code_repos" 中声明的仓库由 CodeExecutor.discover 转换为工具。
+
+    Args:
+        data: urban_tools.json 的内容
+
+    Returns:
+        ({"mcp": [...], "api": [...], "code": [...], "<类型>": [...]}, executors 声明, mcp_servers 声明,
+         code_repos 声明)
+
+    Raises:
+        ValueError: 缺少 name/description、工具重名，MCP 服务缺少 server/command(url)，或代码仓库缺少 repo
+    """
+    raw = json.loads(data)
+
+    extra_types = [key[:-len("_tools")] for key in raw if key.endswith("_tools")
+                   and key[:-len("_tools")] not in TOOL_TYPES]
+    configs = {tool_type: raw.get(f"{tool_type}_tools", []) for tool_type in (*TOOL_TYPES, *extra_types)}
+    seen = set()
+    for tool_type, tool_configs in configs.items():
+        if not isinstance(tool_configs, list):
+            raise ValueError(f"'{tool_type}_tools' must be a list")
+        for config in tool_configs:
+            name = config.get("name")
+            if not name or "description" not in config:
+                raise ValueError(f"Invalid {tool_type} tool config (name and description are required): {config}")
+            if name in seen:
+                raise ValueError(f"Duplicate tool name: {name}")
+            seen.add(name)
+
+    servers = raw.get("mcp_servers", [])
+    for server in servers:
+        if not server.get("server") or not (server.get("command") or server.get("url")):
+            raise ValueError(f"Invalid MCP server (server and command or url are required): {server}")
+    if len({server["server"] for server in servers}) != len(servers):
+        raise ValueError("Duplicate MCP server name in mcp_servers")
+
+    repos = raw.get("code_repos", [])
+    for repo in repos:
+        if not repo.get("repo"):
+            raise ValueError(f"Invalid code repository (repo is required): {repo}")
+    return configs, raw.get("executors", {}), servers, repos
+
+
+def index_tool_pool(configs: Dict[str, List[Dict]]) -> Dict[str, Tuple[str, Dict]]:
+    """按名称索引工具池 {工具名: (类型, 配置)}，保持配置文件中的顺序"""
+    return {
+        config["name"]: (tool_type, config)
+        for tool_type, tool_configs in configs.items() for config in tool_configs
+    }
+
+
+def warm_tools(entries: Mapping) -> List[str]:
+    """配置了 warm: true 的工具名（启动时预先拉起其服务）"""
+    return [name for name, (_, config) in entries.items() if config.get("warm")]
+
+
+def build_keyword_index(entries: Mapping) -> Dict[str, List[str]]:
+    """
+    构建关键词倒排索引 {词: [工具名, ...]}（名称、描述、参数名和能力）
+
+    Args:
+        entries: {工具名: (类型, 配置)}
+    """
+    index = {}
+    for name, (_, config) in entries.items():
+        text = " ".join([
+            name.replace("_", " "),
+            config["description"],
+            " ".join(config.get("params", {})),
+            " ".join(config.get("capabilities", [])),
+        ]).lower()
+        for word in set(_WORD.findall(text)):
+            index.setdefault(word, []).append(name)
+    return index
+
+
+class SnapshotEntries(Mapping):
+    """快照中的工具索引 {工具名: (类型, 配置)}，配置在第一次访问时解码"""
+
+    def __init__(self, names: List[str], types: List[str], blobs: List[bytes]):
+        self._names = names
+        self._position = {name: i for i, name in enumerate(names)}
+        self._types = types
+        self._blobs = blobs
+        self._decoded = {}
+
+    def __getitem__(self, name: str) -> Tuple[str, Dict]:
+        entry = self._decoded.get(name)
+        if entry is None:
+            i = self._position[name]
+            entry = self._decoded[name] = (self._types[i], json.loads(self._blobs[i]))
+        return entry
+
+    def __contains__(self, name) -> bool:
+        return name in self._position
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def type_of(self, name: str) -> str:
+        """工具类型（不解码配置）"""
+        return self._types[self._position[name]]
+
+
+def compile_snapshot(config_path: str = "./urban_tools.json", snapshot_path: Optional[str] = None) -> Path:
+    """
+    编译工具池快照
+
+    Args:
+        config_path: 工具配置文件路径
+        snapshot_path: 输出路径（默认见 default_snapshot_path）
+
+    Returns:
+        快照文件路径
+    """
+    from tool_manager import ToolRegistry
+
+    config_path = Path(config_path)
+    snapshot_path = Path(snapshot_path) if snapshot_path else default_snapshot_path(config_path)
+
+    data = config_path.read_bytes()
+    configs, executors, mcp_servers, code_repos = parse_tool_pool(data)
+    entries = index_tool_pool(configs)
+    snapshot = {
+        "source_sha256": source_hash(data),
+        "executors": executors,
+        "mcp_servers": mcp_servers,
+        "code_repos": code_repos,
+        "names": list(entries),
+        "types": [tool_type for tool_type, _ in entries.values()],
+        "warm": warm_tools(entries),
+        "configs": [json.dumps(config, separators=(",", ":")).encode() for _, config in entries.values()],
+        "description": ToolRegistry(entries, None, {}).get_tools_description(),
+        "keyword_index": json.dumps(build_keyword_index(entries), separators=(",", ":")).encode(),
+    }
+
+    tmp = snapshot_path.with_suffix(f".tmp{os.getpid()}")
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_MAGIC + SNAPSHOT_VERSION.to_bytes(2, "big"))
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, snapshot_path)
+    return snapshot_path
+
+
+def load_snapshot(config_path: str, snapshot_path: Optional[str] = None,
+                  data: Optional[bytes] = None) -> Optional[Dict]:
+    """
+    加载快照（不存在、版本不符或与 JSON 源文件不一致时返回 None）
+
+    Args:
+        config_path: 工具配置文件路径
+        snapshot_path: 快照路径（默认见 default_snapshot_path）
+        data: 已读取的 JSON 内容（避免重复读取）
+
+    Returns:
+        {"entries": SnapshotEntries, "tool_types": set, "executors": dict, "mcp_servers": list,
+         "code_repos": list, "warm": list, "description": str, "keyword_index": bytes}
+    """
+    snapshot_path = Path(snapshot_path) if snapshot_path else default_snapshot_path(config_path)
+    try:
+        with open(snapshot_path, "rb") as f:
+            header = f.read(len(SNAPSHOT_MAGIC) + 2)
+            if header != SNAPSHOT_MAGIC + SNAPSHOT_VERSION.to_bytes(2, "big"):
+                return None
+            if data is None:
+                data = Path(config_path).read_bytes()
+            snapshot = pickle.load(f)
+    except Exception:
+        # 快照只是加速手段：不存在或任何读取失败都回退到 JSON
+        return None
+
+    if snapshot.get("source_sha256") != source_hash(data):
+        return None
+    return {
+        "entries": SnapshotEntries(snapshot["names"], snapshot["types"], snapshot["configs"]),
+        "tool_types": set(snapshot["types"]),
+        "executors": snapshot["executors"],
+        "mcp_servers": snapshot["mcp_servers"],
+        "code_repos": snapshot["code_repos"],
+        "warm": snapshot["warm"],
+        "description": snapshot["description"],
+        "keyword_index": snapshot["keyword_index"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile urban_tools.json into a binary snapshot")
+    parser.add_argument("--config", default="./urban_tools.json", help="Tool pool configuration")
+    parser.add_argument("-o", "--output", help="Snapshot path (default: <config>.snapshot)")
+    args = parser.parse_args()
+
+    path = compile_snapshot(args.config, args.output)
+    print(f"📦 Compiled {args.config} -> {path} ({path.stat().st_size} bytes, format v{SNAPSHOT_VERSION})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+轻量级链路追踪与延迟指标
+
+用法:
+    with tracing.trace(query) as t:            # 一个查询一条 trace
+        with tracing.span("selection"):        # 每个阶段一个 span
+            ...
+        with tracing.span("http_request", tool="github_user_info") as s:
+            s.set(bytes=1234, retries=0)
+
+- 当前 trace 通过 contextvars 传递；提交到线程池的函数用 tracing.bind(fn) 包装
+- 完成的 trace 可追加写入 JSONL（URBAN_TRACE_FILE）
+- 每个 (stage, tool) 的延迟进入指标表，可导出为 Prometheus 文本（p50/p95/p99）
+"""
+
+import os
+import json
+import math
+import time
+import uuid
+import threading
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+_current_trace = contextvars.ContextVar("urban_trace", default=None)
+_current_span = contextvars.ContextVar("urban_span", default=None)
+
+# 每个 (stage, tool) 保留的最近样本数（分位数按此窗口计算）
+RESERVOIR_SIZE = 10000
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Span:
+    """一个计时阶段"""
+
+    def __init__(self, name: str, parent: Optional[str] = None, **attrs):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.parent = parent
+        self.attrs = dict(attrs)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attrs):
+        """附加属性（from_cache / bytes / retries 等）"""
+        self.attrs.update(attrs)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._t0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent": self.parent,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            **({"attrs": self.attrs} if self.attrs else {}),
+        }
+
+
+class Trace:
+    """一个查询的全部 span"""
+
+    def __init__(self, name: str, **attrs):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attrs = dict(attrs)
+        self.spans = []
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def timings(self) -> Dict[str, float]:
+        """各阶段耗时汇总（秒）"""
+        totals = defaultdict(float)
+        with self._lock:
+            for span in self.spans:
+                totals[span.name] += span.duration or 0
+        totals["total"] = self.duration if self.duration is not None else time.perf_counter() - self._t0
+        return {name: round(value, 4) for name, value in totals.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            **({"attrs": self.attrs} if self.attrs else {}),
+            "spans": spans,
+        }
+
+
+class MetricsRegistry:
+    """阶段延迟与计数指标"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=RESERVOIR_SIZE))
+        self._count = defaultdict(int)
+        self._sum = defaultdict(float)
+        self._counters = defaultdict(float)
+
+    def observe(self, stage: str, tool: str, seconds: float):
+        key = (stage, tool)
+        with self._lock:
+            self._samples[key].append(seconds)
+            self._count[key] += 1
+            self._sum[key] += seconds
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def quantiles(self, stage: str, tool: str = "") -> Dict[float, float]:
+        with self._lock:
+            samples = sorted(self._samples.get((stage, tool), ()))
+        return {q: _quantile(samples, q) for q in QUANTILES}
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._count.clear()
+            self._sum.clear()
+            self._counters.clear()
+
+    def to_prometheus(self) -> str:
+        """导出 Prometheus 文本格式"""
+        with self._lock:
+            samples = {key: sorted(values) for key, values in self._samples.items()}
+            counts = dict(self._count)
+            sums = dict(self._sum)
+            counters = dict(self._counters)
+
+        lines = [
+            "# HELP urban_stage_latency_seconds Latency of each pipeline stage per tool",
+            "# TYPE urban_stage_latency_seconds summary",
+        ]
+        for (stage, tool) in sorted(samples):
+            labels = f'stage="{_escape(stage)}",tool="{_escape(tool)}"'
+            for q in QUANTILES:
+                value = _quantile(samples[(stage, tool)], q)
+                lines.append(f'urban_stage_latency_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+            lines.append(f"urban_stage_latency_seconds_sum{{{labels}}} {sums[(stage, tool)]:.6f}")
+            lines.append(f"urban_stage_latency_seconds_count{{{labels}}} {counts[(stage, tool)]}")
+
+        names = sorted({name for name, _ in counters})
+        for name in names:
+            lines.append(f"# TYPE {name} counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter != name:
+                    continue
+                label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {value:g}" if label_text else f"{name} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _quantile(ordered, q: float) -> float:
+    """最近秩分位数（输入已排序）"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# 全局指标表
+metrics = MetricsRegistry()
+
+_export_lock = threading.Lock()
+_trace_file = os.getenv("URBAN_TRACE_FILE")
+_metrics_file = os.getenv("URBAN_METRICS_FILE")
+
+
+def configure(trace_file: Optional[str] = None, metrics_file: Optional[str] = None):
+    """
+    设置导出位置（默认取环境变量 URBAN_TRACE_FILE / URBAN_METRICS_FILE）
+
+    Args:
+        trace_file: 完成的 trace 追加写入的 JSONL 文件
+        metrics_file: write_metrics() 写入的 Prometheus 文本文件
+    """
+    global _trace_file, _metrics_file
+    if trace_file is not None:
+        _trace_file = trace_file
+    if metrics_file is not None:
+        _metrics_file = metrics_file
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """开始一条 trace（一个查询）"""
+    t = Trace(name, **attrs)
+    token = _current_trace.set(t)
+    try:
+        yield t
+    finally:
+        t.duration = time.perf_counter() - t._t0
+        _current_trace.reset(token)
+        metrics.observe("query", "", t.duration)
+        _export(t)
+
+
+@contextmanager
+def span(name: str, tool: str = "", **attrs):
+    """
+    记录一个阶段
+
+    Args:
+        name: 阶段名（selection / tool / cache_lookup / http_request / final_answer ...）
+        tool: 工具名（指标按工具细分）
+    """
+    parent = _current_span.get()
+    s = Span(name, parent=parent.span_id if parent else None, **({"tool": tool} if tool else {}), **attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.set(error=type(e).__name__)
+        raise
+    finally:
+        s.finish()
+        _current_span.reset(token)
+        current = _current_trace.get()
+        if current is not None:
+            current.add(s)
+        metrics.observe(name, tool, s.duration)
+
+
+def current_trace() -> Optional[Trace]:
+    """当前上下文中的 trace"""
+    return _current_trace.get()
+
+
+def bind(fn: Callable) -> Callable:
+    """绑定当前上下文，使提交到线程池的函数仍记录到同一条 trace"""
+    ctx = contextvars.copy_context()
+
+    def bound(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return bound
+
+
+def _export(t: Trace):
+    if not _trace_file:
+        return
+    line = json.dumps(t.to_dict(), ensure_ascii=False, default=str)
+    with _export_lock:
+        with open(_trace_file, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def write_metrics(path: Optional[str] = None) -> Optional[str]:
+    """
+    将当前指标写成 Prometheus 文本文件（node_exporter textfile 格式）
+
+    Returns:
+        写入的路径，未配置时返回 None
+    """
+    path = path or _metrics_file
+    if not path:
+        return None
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(metrics.to_prometheus())
+    os.replace(tmp, path)
+    return path
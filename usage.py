@@ -0,0 +1,308 @@
+"""
+LLM Token 与成本统计
+
+- 每个查询的每个阶段（selection / planning / final_answer）记录
+  prompt / completion / cached-prompt tokens 与估算成本
+- 结果附带 usage 字段；全局 ledger 按工具和整次运行聚合
+- 规划模式一次查询调用多个工具：每个步骤记录一条（工具名、结果大小），
+  ledger 按各步骤结果大小把该查询的用量分摊到各自的工具
+
+用法:
+    with usage.collect() as u:               # 一个查询
+        usage.record("selection", response)  # LangChain AIMessage（流式时为合并后的 chunk）
+        u.tool = "github_user_info"
+    result["usage"] = u.to_dict()
+
+价格（美元 / 百万 tokens）可用环境变量 LLM_PRICING 覆盖:
+    LLM_PRICING='{"my-model": {"input": 1.0, "cached_input": 0.5, "output": 4.0}}'
+"""
+
+import os
+import json
+import threading
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import tracing
+
+
+# 美元 / 百万 tokens
+MODEL_PRICES = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+    "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+}
+
+_current = contextvars.ContextVar("urban_usage", default=None)
+
+
+def _prices(model: str) -> Optional[Dict[str, float]]:
+    """查找模型价格（环境变量优先，其次最长前缀匹配）"""
+    overrides = os.getenv("LLM_PRICING")
+    table = dict(MODEL_PRICES)
+    if overrides:
+        try:
+            table.update(json.loads(overrides))
+        except json.JSONDecodeError:
+            print("⚠️  LLM_PRICING is not valid JSON, using built-in prices")
+
+    if model in table:
+        return table[model]
+    candidates = [name for name in table if model.startswith(name)]
+    return table[max(candidates, key=len)] if candidates else None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> Optional[float]:
+    """估算一次调用的成本（美元），未知模型返回 None"""
+    prices = _prices(model)
+    if not prices:
+        return None
+    cached_price = prices.get("cached_input", prices["input"])
+    cost = ((prompt_tokens - cached_tokens) * prices["input"]
+            + cached_tokens * cached_price
+            + completion_tokens * prices["output"]) / 1_000_000
+    return round(cost, 8)
+
+
+def cache_savings(model: str, cached_tokens: int) -> float:
+    """Prompt 缓存节省的成本（美元）"""
+    prices = _prices(model)
+    if not prices or not cached_tokens:
+        return 0.0
+    saved = cached_tokens * (prices["input"] - prices.get("cached_input", prices["input"])) / 1_000_000
+    return round(saved, 8)
+
+
+def extract_usage(message: Any) -> Dict[str, int]:
+    """从 LangChain 消息中提取 token 用量"""
+    metadata = getattr(message, "usage_metadata", None) or {}
+    details = metadata.get("input_token_details") or {}
+    return {
+        "prompt_tokens": metadata.get("input_tokens", 0) or 0,
+        "completion_tokens": metadata.get("output_tokens", 0) or 0,
+        "cached_prompt_tokens": details.get("cache_read", 0) or 0,
+    }
+
+
+class QueryUsage:
+    """一个查询的分阶段用量"""
+
+    def __init__(self):
+        self.stages = {}
+        self.tool = None
+        self.from_cache = False
+        self.steps = []
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, model: str, counts: Dict[str, int], **extra):
+        entry = {
+            "model": model,
+            **counts,
+            "cost_usd": estimate_cost(model, counts["prompt_tokens"], counts["completion_tokens"],
+                                      counts["cached_prompt_tokens"]),
+            **extra,
+        }
+        with self._lock:
+            if stage in self.stages:
+                # 同一阶段多次调用（如重试）累加
+                previous = self.stages[stage]
+                for key in ("prompt_tokens", "completion_tokens", "cached_prompt_tokens"):
+                    entry[key] += previous[key]
+                if previous["cost_usd"] is not None and entry["cost_usd"] is not None:
+                    entry["cost_usd"] = round(entry["cost_usd"] + previous["cost_usd"], 8)
+            self.stages[stage] = entry
+
+    def add_step(self, tool: str, payload_chars: int = 0, from_cache: bool = False):
+        """记录规划模式的一个步骤（用于按工具分摊用量）"""
+        with self._lock:
+            self.steps.append({"tool": tool, "payload_chars": payload_chars, "from_cache": from_cache})
+
+    def shares(self) -> Dict[str, Dict[str, Any]]:
+        """
+        每个工具分摊的比例
+
+        Returns:
+            {tool: {"weight": 0~1, "payload_chars": int, "from_cache": bool}}；
+            没有步骤时整个查询归到 self.tool
+        """
+        with self._lock:
+            steps = list(self.steps)
+        if not steps:
+            return {self.tool or "unknown": {"weight": 1.0, "payload_chars": None, "from_cache": self.from_cache}}
+
+        by_tool = {}
+        for step in steps:
+            share = by_tool.setdefault(step["tool"], {"payload_chars": 0, "from_cache": False, "steps": 0})
+            share["payload_chars"] += step["payload_chars"]
+            share["from_cache"] = share["from_cache"] or step["from_cache"]
+            share["steps"] += 1
+        # 按结果大小分摊；结果都为空时按步骤数平均
+        key = "payload_chars" if any(share["payload_chars"] for share in by_tool.values()) else "steps"
+        total = sum(share[key] for share in by_tool.values())
+        return {tool: {"weight": share[key] / total, "payload_chars": share["payload_chars"],
+                       "from_cache": share["from_cache"]}
+                for tool, share in by_tool.items()}
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = list(self.stages.values())
+        totals = {"prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0, "cost_usd": 0.0}
+        for entry in stages:
+            for key in ("prompt_tokens", "completion_tokens", "cached_prompt_tokens"):
+                totals[key] += entry[key]
+            totals["cost_usd"] += entry["cost_usd"] or 0.0
+        totals["cost_usd"] = round(totals["cost_usd"], 8)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {name: dict(entry) for name, entry in self.stages.items()}
+        return {"stages": stages, "total": self.totals()}
+
+
+class UsageLedger:
+    """按工具和整次运行聚合用量"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_tool = defaultdict(lambda: defaultdict(float))
+        self._run = defaultdict(float)
+
+    def add(self, query_usage: QueryUsage):
+        usage = query_usage.to_dict()
+        shares = query_usage.shares()
+        with self._lock:
+            self._run["queries"] += 1
+            for tool, share in shares.items():
+                bucket = self._by_tool[tool]
+                bucket["queries"] += 1
+                bucket["tool_cache_hits"] += 1 if share["from_cache"] else 0
+                if share["payload_chars"] is not None:
+                    bucket["payload_chars"] += share["payload_chars"]
+
+            for stage, entry in usage["stages"].items():
+                cost = entry["cost_usd"] or 0.0
+                saved = cache_savings(entry["model"], entry["cached_prompt_tokens"])
+                for key in ("prompt_tokens", "completion_tokens", "cached_prompt_tokens"):
+                    self._run[key] += entry[key]
+                self._run["cost_usd"] += cost
+                self._run["cache_savings_usd"] += saved
+
+                for tool, share in shares.items():
+                    bucket = self._by_tool[tool]
+                    weight = share["weight"]
+                    for key in ("prompt_tokens", "completion_tokens", "cached_prompt_tokens"):
+                        bucket[key] += entry[key] * weight
+                        bucket[f"{stage}_{key}"] += entry[key] * weight
+                    bucket["cost_usd"] += cost * weight
+                    bucket["cache_savings_usd"] += saved * weight
+                    if share["payload_chars"] is None and "payload_chars" in entry:
+                        bucket["payload_chars"] += entry["payload_chars"]
+
+    def summary(self) -> Dict[str, Any]:
+        """{"run": {...}, "by_tool": {tool: {...}}}"""
+        with self._lock:
+            by_tool = {tool: _rounded(values) for tool, values in self._by_tool.items()}
+            run = _rounded(self._run)
+        for values in by_tool.values():
+            queries = values.get("queries") or 1
+            values["avg_final_answer_prompt_tokens"] = round(
+                values.get("final_answer_prompt_tokens", 0) / queries, 1
+            )
+        return {"run": run, "by_tool": by_tool}
+
+    def reset(self):
+        with self._lock:
+            self._by_tool.clear()
+            self._run.clear()
+
+
+def _rounded(values: Dict[str, float]) -> Dict[str, Any]:
+    return {key: (round(v, 8) if isinstance(v, float) and not v.is_integer() else int(v))
+            for key, v in values.items()}
+
+
+# 全局（整次运行）聚合
+ledger = UsageLedger()
+
+
+@contextmanager
+def collect():
+    """收集一个查询的用量，结束时计入全局 ledger"""
+    query_usage = QueryUsage()
+    token = _current.set(query_usage)
+    try:
+        yield query_usage
+    finally:
+        _current.reset(token)
+        ledger.add(query_usage)
+
+
+def record(stage: str, message: Any, model: Optional[str] = None, tool: str = "", **extra):
+    """
+    记录一次 LLM 调用的用量到当前查询
+
+    Args:
+        stage: 阶段名（selection / planning / final_answer）
+        message: LangChain AIMessage / 合并后的 AIMessageChunk
+        model: 模型名（默认取 response_metadata 或 OPENAI_MODEL）
+        tool: 工具名（用于 Prometheus 指标）
+        extra: 附加字段（如 payload_chars）
+    """
+    counts = extract_usage(message)
+    if model is None:
+        metadata = getattr(message, "response_metadata", None) or {}
+        model = metadata.get("model_name") or os.getenv("OPENAI_MODEL", "gpt-4o")
+
+    for kind, key in (("prompt", "prompt_tokens"), ("completion", "completion_tokens"),
+                      ("cached_prompt", "cached_prompt_tokens")):
+        if counts[key]:
+            tracing.metrics.inc("urban_llm_tokens_total", counts[key], stage=stage, tool=tool, kind=kind)
+
+    cost = estimate_cost(model, counts["prompt_tokens"], counts["completion_tokens"], counts["cached_prompt_tokens"])
+    if cost:
+        tracing.metrics.inc("urban_llm_cost_usd_total", cost, stage=stage, tool=tool)
+
+    current = _current.get()
+    if current is not None:
+        current.add(stage, model, counts, **extra)
+
+
+def record_step(tool: str, payload_chars: int = 0, from_cache: bool = False):
+    """
+    记录当前查询的一个规划步骤，ledger 据此把用量分摊到各个工具
+
+    Args:
+        tool: 步骤调用的工具名
+        payload_chars: 该步骤结果在最终答案 prompt 中的字符数
+        from_cache: 工具结果是否来自缓存
+    """
+    current = _current.get()
+    if current is not None:
+        current.add_step(tool, payload_chars, from_cache)
+
+
+def print_summary(summary: Optional[Dict[str, Any]] = None):
+    """打印运行级与工具级用量汇总"""
+    summary = summary or ledger.summary()
+    run = summary["run"]
+    if not run.get("queries"):
+        return
+
+    print(f"\n{'='*60}")
+    print("💰 LLM Usage Summary")
+    print(f"{'='*60}")
+    print(f"  Queries: {run.get('queries', 0)}")
+    print(f"  Tokens: prompt {run.get('prompt_tokens', 0)} (cached {run.get('cached_prompt_tokens', 0)}), "
+          f"completion {run.get('completion_tokens', 0)}")
+    print(f"  Estimated cost: ${run.get('cost_usd', 0):.4f} (prompt cache saved ${run.get('cache_savings_usd', 0):.4f})")
+    print("  By tool:")
+    for tool, values in sorted(summary["by_tool"].items(), key=lambda item: -item[1].get("cost_usd", 0)):
+        print(f"    - {tool}: {values.get('queries', 0)} queries, ${values.get('cost_usd', 0):.4f}, "
+              f"avg answer prompt {values['avg_final_answer_prompt_tokens']} tokens, "
+              f"tool cache hits {values.get('tool_cache_hits', 0)}")
+    print(f"{'='*60}\n")